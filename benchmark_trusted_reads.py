@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: trusted reads vs full Pydantic validation for coach listings
+
+Builds a page of coach documents and times converting them into
+CoachResponse dicts with full validation (the previous get_coaches path),
+model_construct, and the projected-dict path used by utils/trusted_read.py.
+
+Usage: python benchmark_trusted_reads.py [page_size] [rounds]
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from models.coach_models import CoachResponse
+from utils.trusted_read import dump_from_db
+from coach_fixtures import make_coach
+
+
+def main():
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    fields = CoachResponse.model_fields
+    page = [{k: v for k, v in make_coach(i).items() if k in fields} for i in range(page_size)]
+
+    candidates = {
+        "full validation": lambda: [CoachResponse(**coach).dict() for coach in page],
+        "model_construct": lambda: [CoachResponse.model_construct(**coach).__dict__.copy() for coach in page],
+        "trusted dump": lambda: [dump_from_db(CoachResponse, coach, exclude=("contact_info.password",)) for coach in page],
+    }
+
+    print(f"📊 Converting {page_size} coaches x {rounds} rounds")
+    baseline = None
+    for name, convert in candidates.items():
+        seconds = min(timeit.repeat(convert, number=1, repeat=rounds))
+        baseline = baseline or seconds
+        print(f"   {name:<16} {seconds * 1000:8.2f} ms/page   {baseline / seconds:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
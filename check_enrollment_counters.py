@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Maintenance Script: Check and repair enrollment counters
+
+Compares active_enrollment_count / total_enrollment_count on every course and
+branch with the enrollments collection. The server runs the same check nightly;
+use this to run it on demand.
+
+Usage:
+    python check_enrollment_counters.py            # check and repair
+    python check_enrollment_counters.py --dry-run  # report mismatches only
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# Add the project root to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent))
+
+from utils.enrollment_counts import check_enrollment_counters
+
+
+async def main(dry_run: bool):
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    db = client.get_database(os.getenv("DB_NAME", "student_management_db"))
+
+    print("🔍 Checking enrollment counters...")
+    report = await check_enrollment_counters(db, repair=not dry_run)
+    for name, count in report["checked"].items():
+        print(f"📊 Checked {count} {name}")
+    for mismatch in report["mismatches"]:
+        print(f"⚠️  {mismatch['collection']} {mismatch['id']}: stored {mismatch['stored']}, expected {mismatch['expected']}")
+    if dry_run:
+        print(f"✅ Found {len(report['mismatches'])} mismatched counters (dry run, nothing changed)")
+    else:
+        print(f"✅ Repaired {report['repaired']} counters")
+        if report["skipped"]:
+            print(f"⏭️  Skipped {report['skipped']} counters changed during the check; run again to recheck them")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and repair enrollment counters")
+    parser.add_argument("--dry-run", action="store_true", help="Only report mismatches")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Coach documents shared by the trusted-read tests and benchmark.
+"""
+
+from datetime import datetime
+
+
+def make_coach(i: int) -> dict:
+    return {
+        "id": f"coach-{i}",
+        "personal_info": {"first_name": "Coach", "last_name": str(i), "gender": "male", "date_of_birth": "1990-01-01"},
+        "contact_info": {"email": f"coach{i}@example.com", "country_code": "+91", "phone": f"90000{i:05d}"},
+        "address_info": {"address": "1 Main St", "area": "Center", "city": "Hyderabad", "state": "TS", "zip_code": "500001", "country": "India"},
+        "professional_info": {"education_qualification": "BSc", "professional_experience": "5 years", "designation_id": "d-1", "certifications": ["Black Belt"]},
+        "areas_of_expertise": ["Karate"],
+        "branch_id": "branch-1",
+        "assignment_details": {"courses": ["course-1"], "salary": 20000.0, "join_date": "2024-01-01"},
+        "emergency_contact": {"name": "Kin", "phone": "+911", "relationship": "Sibling"},
+        "email": f"coach{i}@example.com",
+        "phone": f"+9190000{i:05d}",
+        "full_name": f"Coach {i}",
+        "password_hash": "hashed",
+        "role": "coach",
+        "is_active": True,
+        "created_at": datetime(2024, 1, 1),
+        "updated_at": datetime(2024, 1, 2)
+    }
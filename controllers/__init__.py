@@ -9,6 +9,7 @@ from .payment_controller import PaymentController
 from .request_controller import RequestController
 from .event_controller import EventController
 from .reports_controller import ReportsController
+from .catalog_controller import CatalogController
 
 __all__ = [
     'AuthController',
@@ -19,5 +20,6 @@ __all__ = [
     'PaymentController',
     'RequestController',
     'EventController',
-    'ReportsController'
+    'ReportsController',
+    'CatalogController'
 ]
@@ -11,28 +11,14 @@ from models.user_models import UserCreate, UserLogin, ForgotPassword, ResetPassw
 from utils.auth import hash_password, verify_password, create_access_token, get_current_active_user, SECRET_KEY, ALGORITHM
 from utils.database import get_db
 from utils.helpers import serialize_doc, log_activity, send_sms
+from utils.cache import invalidate_student_profiles
+from utils.enrollment_counts import record_enrollment_created
 from utils.email_service import send_password_reset_email
 
 class AuthController:
     @staticmethod
-    async def register_user(user_data: UserCreate, request: Request):
-        """Register a new student (public endpoint)"""
-        db = get_db()
-        
-        # Check if user exists
-        existing_user = await db.users.find_one({
-            "$or": [{"email": user_data.email}, {"phone": user_data.phone}]
-        })
-        if existing_user:
-            raise HTTPException(status_code=400, detail="User with this email or phone already exists")
-        
-        # Generate password if not provided
-        if not user_data.password:
-            user_data.password = secrets.token_urlsafe(8)
-        
-        # Hash password
-        hashed_password = hash_password(user_data.password)
-        
+    def build_user_document(user_data: UserCreate, hashed_password: str) -> dict:
+        """User document for a new registration"""
         # Generate full name from first and last name
         full_name = f"{user_data.first_name} {user_data.last_name}".strip()
         
@@ -76,6 +62,52 @@ class AuthController:
             if not user_dict.get("branch_id"):
                 user_dict["branch_id"] = user_data.branch.branch_id
 
+        return user_dict
+
+    @staticmethod
+    def welcome_sms(user_data: UserCreate, user_dict: dict, enrolled: bool) -> str:
+        """Credentials message sent to a newly registered user"""
+        course_info = "No course selected"
+        branch_info = "No branch assigned"
+
+        if enrolled and user_data.course and user_data.branch:
+            course_info = f"Course: {user_data.course.course_id} ({user_data.course.duration})"
+            branch_info = f"Branch: {user_data.branch.branch_id}"
+        elif user_data.branch_id:
+            branch_info = f"Branch: {user_data.branch_id}"
+
+        return (
+            f"Welcome {user_dict['full_name']}!\n"
+            f"Your account has been created.\n"
+            f"Email: {user_dict['email']}\n"
+            f"Password: {user_data.password}\n"
+            f"Date of Birth: {user_dict['date_of_birth']}\n"
+            f"Gender: {user_dict['gender']}\n"
+            f"{course_info}\n"
+            f"{branch_info}"
+        )
+
+    @staticmethod
+    async def register_user(user_data: UserCreate, request: Request):
+        """Register a new student (public endpoint)"""
+        db = get_db()
+        
+        # Check if user exists
+        existing_user = await db.users.find_one({
+            "$or": [{"email": user_data.email}, {"phone": user_data.phone}]
+        })
+        if existing_user:
+            raise HTTPException(status_code=400, detail="User with this email or phone already exists")
+        
+        # Generate password if not provided
+        if not user_data.password:
+            user_data.password = secrets.token_urlsafe(8)
+        
+        # Hash password
+        hashed_password = hash_password(user_data.password)
+        
+        user_dict = AuthController.build_user_document(user_data, hashed_password)
+
         result = await db.users.insert_one(user_dict)
 
         # Create enrollment record if course information is provided (for students)
@@ -100,6 +132,7 @@ class AuthController:
                 )
 
                 enrollment_result = await db.enrollments.insert_one(enrollment.dict())
+                await record_enrollment_created(db, enrollment.dict())
                 enrollment_id = enrollment.id
 
             except Exception as e:
@@ -108,25 +141,7 @@ class AuthController:
                 pass
         
         # Send credentials via SMS (mock)
-        course_info = "No course selected"
-        branch_info = "No branch assigned"
-
-        if enrollment_id and user_data.course and user_data.branch:
-            course_info = f"Course: {user_data.course.course_id} ({user_data.course.duration})"
-            branch_info = f"Branch: {user_data.branch.branch_id}"
-        elif user_data.branch_id:
-            branch_info = f"Branch: {user_data.branch_id}"
-
-        sms_message = (
-            f"Welcome {user_dict['full_name']}!\n"
-            f"Your account has been created.\n"
-            f"Email: {user_dict['email']}\n"
-            f"Password: {user_data.password}\n"
-            f"Date of Birth: {user_dict['date_of_birth']}\n"
-            f"Gender: {user_dict['gender']}\n"
-            f"{course_info}\n"
-            f"{branch_info}"
-        )
+        sms_message = AuthController.welcome_sms(user_data, user_dict, enrolled=enrollment_id is not None)
         await send_sms(user_dict["phone"], sms_message)
         
         await log_activity(
@@ -290,6 +305,7 @@ class AuthController:
             {"id": current_user["id"]},
             {"$set": update_data}
         )
+        invalidate_student_profiles(current_user["id"])
         return {"message": "Profile updated successfully"}
 
     @staticmethod
@@ -8,6 +8,10 @@ from models.user_models import UserRole
 from utils.auth import require_role, get_current_active_user
 from utils.database import get_db
 from utils.helpers import serialize_doc
+from utils.catalog import on_catalog_write
+from utils.course_assignments import sync_branch
+from utils.enrollment_counts import ACTIVE_FIELD
+from utils.branch_stats import get_branch_statistics
 
 class BranchController:
     @staticmethod
@@ -26,6 +30,8 @@ class BranchController:
         branch_dict = branch.dict()
         
         await db.branches.insert_one(branch_dict)
+        await sync_branch(db, branch.id)
+        await on_catalog_write(db)
         return {"message": "Branch created successfully", "branch_id": branch.id}
 
     @staticmethod
@@ -41,76 +47,8 @@ class BranchController:
         db = get_db()
         branches = await db.branches.find({"is_active": True}).skip(skip).limit(limit).to_list(length=limit)
 
-        # Enhance branches with coach and student counts
-        enhanced_branches = []
-        for branch in branches:
-            branch_id = branch["id"]
-
-            # Count coaches assigned to this branch
-            coach_count = await db.coaches.count_documents({
-                "branch_id": branch_id,
-                "is_active": True
-            })
-
-            # Also count coaches assigned as managers or branch admins (if they exist in users collection)
-            # Count manager if assigned
-            if branch.get("manager_id"):
-                manager_exists = await db.users.count_documents({
-                    "id": branch["manager_id"],
-                    "role": {"$in": ["coach", "coach_admin"]},
-                    "is_active": True
-                })
-                coach_count += manager_exists
-
-            # Count branch admins (coaches assigned as admins)
-            if branch.get("assignments", {}).get("branch_admins"):
-                admin_coaches = await db.users.count_documents({
-                    "id": {"$in": branch["assignments"]["branch_admins"]},
-                    "role": {"$in": ["coach", "coach_admin"]},
-                    "is_active": True
-                })
-                coach_count += admin_coaches
-
-            # Count students - try multiple methods to find the correct field structure
-            branch_id = branch["id"]
-            student_count = 0
-
-            # Method 1: Try flat branch_id field
-            student_count = await db.users.count_documents({
-                "role": "student",
-                "branch_id": branch_id,
-                "is_active": True
-            })
-
-            # Method 2: If no results, try nested branch.branch_id field
-            if student_count == 0:
-                student_count = await db.users.count_documents({
-                    "role": "student",
-                    "branch.branch_id": branch_id,
-                    "is_active": True
-                })
-
-            # Method 3: If still no results, count unique students from enrollments
-            if student_count == 0:
-                pipeline = [
-                    {"$match": {"branch_id": branch_id, "is_active": True}},
-                    {"$group": {"_id": "$student_id"}},
-                    {"$count": "unique_students"}
-                ]
-                unique_students = await db.enrollments.aggregate(pipeline).to_list(length=1)
-                student_count = unique_students[0]["unique_students"] if unique_students else 0
-
-            # Add statistics to branch data
-            branch_with_stats = {
-                **branch,
-                "statistics": {
-                    "coach_count": coach_count,
-                    "student_count": student_count,
-                    "course_count": len(branch.get("operational_details", {}).get("courses_offered", [])),
-                    "active_courses": len(branch.get("assignments", {}).get("courses", []))
-                }
-            }
-            enhanced_branches.append(branch_with_stats)
+        statistics = await get_branch_statistics(db, branches)
+        enhanced_branches = [{**branch, "statistics": statistics[branch["id"]]} for branch in branches]
 
         return {"branches": serialize_doc(enhanced_branches)}
 
@@ -162,6 +100,69 @@ class BranchController:
             "limit": limit
         }
 
+    @staticmethod
+    async def get_nearby_branches(
+        latitude: float,
+        longitude: float,
+        max_distance_km: float = 25,
+        course_id: Optional[str] = None,
+        active_only: bool = True,
+        limit: int = 10
+    ):
+        """Closest branches to a point, optionally only those offering a course - Public endpoint"""
+        db = get_db()
+
+        query = {}
+        if active_only:
+            query["is_active"] = True
+        if course_id:
+            query["assignments.courses"] = course_id
+
+        # $geoNear must be the first stage; it uses the geo_location 2dsphere index
+        pipeline = [
+            {"$geoNear": {
+                "near": {"type": "Point", "coordinates": [longitude, latitude]},
+                "key": "geo_location",
+                "distanceField": "distance_meters",
+                "maxDistance": max_distance_km * 1000,
+                "query": query,
+                "spherical": True
+            }},
+            {"$limit": limit},
+            {"$project": {
+                "_id": 0,
+                "id": 1,
+                "branch": 1,
+                "location_id": 1,
+                "geo_location": 1,
+                "operational_details.timings": 1,
+                "distance_meters": 1
+            }}
+        ]
+        branches = await db.branches.aggregate(pipeline).to_list(length=limit)
+
+        formatted_branches = []
+        for branch in branches:
+            info = branch.get("branch", {})
+            formatted_branches.append({
+                "id": branch.get("id"),
+                "name": info.get("name"),
+                "code": info.get("code"),
+                "email": info.get("email"),
+                "phone": info.get("phone"),
+                "address": info.get("address", {}),
+                "location_id": branch.get("location_id"),
+                "coordinates": branch.get("geo_location", {}).get("coordinates"),
+                "timings": branch.get("operational_details", {}).get("timings", []),
+                "distance_km": round(branch["distance_meters"] / 1000, 2)
+            })
+
+        return {
+            "message": f"Found {len(formatted_branches)} branches within {max_distance_km} km",
+            "branches": formatted_branches,
+            "total": len(formatted_branches)
+        }
+
     @staticmethod
     async def get_branch(
         branch_id: str,
@@ -176,69 +177,8 @@ class BranchController:
         if not branch:
             raise HTTPException(status_code=404, detail="Branch not found")
 
-        # Count coaches assigned to this branch
-        coach_count = await db.coaches.count_documents({
-            "branch_id": branch_id,
-            "is_active": True
-        })
-
-        # Also count coaches assigned as managers or branch admins (if they exist in users collection)
-        # Count manager if assigned
-        if branch.get("manager_id"):
-            manager_exists = await db.users.count_documents({
-                "id": branch["manager_id"],
-                "role": {"$in": ["coach", "coach_admin"]},
-                "is_active": True
-            })
-            coach_count += manager_exists
-
-        # Count branch admins (coaches assigned as admins)
-        if branch.get("assignments", {}).get("branch_admins"):
-            admin_coaches = await db.users.count_documents({
-                "id": {"$in": branch["assignments"]["branch_admins"]},
-                "role": {"$in": ["coach", "coach_admin"]},
-                "is_active": True
-            })
-            coach_count += admin_coaches
-
-        # Count students - try multiple methods to find the correct field structure
-        student_count = 0
-
-        # Method 1: Try flat branch_id field
-        student_count = await db.users.count_documents({
-            "role": "student",
-            "branch_id": branch_id,
-            "is_active": True
-        })
-
-        # Method 2: If no results, try nested branch.branch_id field
-        if student_count == 0:
-            student_count = await db.users.count_documents({
-                "role": "student",
-                "branch.branch_id": branch_id,
-                "is_active": True
-            })
-
-        # Method 3: If still no results, count unique students from enrollments
-        if student_count == 0:
-            pipeline = [
-                {"$match": {"branch_id": branch_id, "is_active": True}},
-                {"$group": {"_id": "$student_id"}},
-                {"$count": "unique_students"}
-            ]
-            unique_students = await db.enrollments.aggregate(pipeline).to_list(length=1)
-            student_count = unique_students[0]["unique_students"] if unique_students else 0
-
-        # Add statistics to branch data
-        branch_with_stats = {
-            **branch,
-            "statistics": {
-                "coach_count": coach_count,
-                "student_count": student_count,
-                "course_count": len(branch.get("operational_details", {}).get("courses_offered", [])),
-                "active_courses": len(branch.get("assignments", {}).get("courses", []))
-            }
-        }
+        statistics = await get_branch_statistics(db, [branch])
+        branch_with_stats = {**branch, "statistics": statistics[branch_id]}
 
         return serialize_doc(branch_with_stats)
 
@@ -351,10 +291,7 @@ class BranchController:
         active_courses = len(branch.get("assignments", {}).get("courses", []))
 
         # Get enrollment statistics
-        total_enrollments = await db.enrollments.count_documents({
-            "branch_id": branch_id,
-            "is_active": True
-        })
+        total_enrollments = branch.get(ACTIVE_FIELD, 0)
 
         return {
             "branch_id": branch_id,
@@ -428,6 +365,9 @@ class BranchController:
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Branch not found")
+
+        await sync_branch(db, branch_id)
+        await on_catalog_write(db)
         
         return {"message": "Branch updated successfully"}
 
@@ -521,4 +461,7 @@ class BranchController:
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Branch not found")
 
+        await sync_branch(db, branch_id)
+        await on_catalog_write(db)
+
         return {"message": "Branch deleted successfully"}
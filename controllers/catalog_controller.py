@@ -0,0 +1,25 @@
+from fastapi import HTTPException, Response
+from typing import Optional
+
+from utils.public_catalog import get_public_catalog, CATALOG_CACHE_CONTROL
+
+class CatalogController:
+    @staticmethod
+    def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+    @staticmethod
+    async def get_public_catalog(if_none_match: Optional[str] = None):
+        """Serve the prebuilt public catalog bundle - Public endpoint (no authentication required)"""
+        try:
+            snapshot = await get_public_catalog()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error building public catalog: {str(e)}")
+
+        headers = {"ETag": snapshot.etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+        if CatalogController._etag_matches(if_none_match, snapshot.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=snapshot.body, media_type="application/json", headers=headers)
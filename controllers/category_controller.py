@@ -1,6 +1,7 @@
 from fastapi import HTTPException, Depends
 from typing import Optional, List
 from datetime import datetime
+import asyncio
 
 from models.category_models import CategoryCreate, CategoryUpdate, Category, CategoryResponse
 from models.user_models import UserRole
@@ -8,6 +9,11 @@ from utils.auth import require_role, get_current_active_user
 from utils.unified_auth import require_role_unified, get_current_user_or_superadmin
 from utils.database import get_db
 from utils.helpers import serialize_doc
+from utils.catalog import on_catalog_write
+from utils.cache import category_tree_cache, location_map_cache
+from utils.category_hierarchy import build_category_hierarchy
+from utils.pricing import course_base_price
+from utils.locations import get_location_map, branch_location
 
 class CategoryController:
     @staticmethod
@@ -36,8 +42,43 @@ class CategoryController:
         category_dict = category.dict()
         
         await db.categories.insert_one(category_dict)
+        await on_catalog_write(db)
         return {"message": "Category created successfully", "category_id": category.id}
 
+    @staticmethod
+    async def _category_tree(db) -> dict:
+        """All categories, their children and course counts, built from two queries and cached.
+
+        Returns {"ordered": [...by display_order], "by_id": {...}, "children": {parent_id: [...]},
+        "course_counts": {category_id: n}}; children lists only hold active categories.
+        """
+        tree = category_tree_cache.get("tree")
+        if tree is not None:
+            return tree
+
+        categories, count_rows = await asyncio.gather(
+            db.categories.find({}, {"_id": 0}).sort("display_order", 1).to_list(length=None),
+            db.courses.aggregate([
+                {"$match": {"category_id": {"$nin": [None, ""]}}},
+                {"$group": {"_id": "$category_id", "count": {"$sum": 1}}}
+            ]).to_list(length=None)
+        )
+        categories.sort(key=lambda c: c.get("display_order", 0))
+
+        children = {}
+        for category in categories:
+            if category.get("parent_category_id") and category.get("is_active"):
+                children.setdefault(category["parent_category_id"], []).append(category)
+
+        tree = {
+            "ordered": categories,
+            "by_id": {category["id"]: category for category in categories},
+            "children": children,
+            "course_counts": {row["_id"]: row["count"] for row in count_rows}
+        }
+        category_tree_cache.set("tree", tree)
+        return tree
+
     @staticmethod
     async def get_categories(
         parent_id: Optional[str] = None,
@@ -49,27 +90,21 @@ class CategoryController:
     ):
         """Get categories with optional filtering"""
         db = get_db()
-        
-        # Build query
-        query = {}
-        if parent_id is not None:
-            query["parent_category_id"] = parent_id
-        if active_only:
-            query["is_active"] = True
-        
-        # Get categories with sorting
-        categories_cursor = db.categories.find(query).sort("display_order", 1).skip(skip).limit(limit)
-        categories = await categories_cursor.to_list(limit)
-        
-        # Get total count
-        total = await db.categories.count_documents(query)
+        tree = await CategoryController._category_tree(db)
+        course_counts = tree["course_counts"]
+
+        # Filter and paginate the cached tree
+        matching = [
+            category for category in tree["ordered"]
+            if (parent_id is None or category.get("parent_category_id") == parent_id)
+            and (not active_only or category.get("is_active"))
+        ]
+        total = len(matching)
+        categories = matching[skip:skip + limit]
         
         # Enrich categories with additional data
         enriched_categories = []
         for category in categories:
-            # Count courses in this category
-            course_count = await db.courses.count_documents({"category_id": category["id"]})
-            
             category_response = {
                 "id": category["id"],
                 "name": category["name"],
@@ -80,22 +115,15 @@ class CategoryController:
                 "display_order": category["display_order"],
                 "icon_url": category.get("icon_url"),
                 "color_code": category.get("color_code"),
-                "course_count": course_count,
+                "course_count": course_counts.get(category["id"], 0),
                 "created_at": category["created_at"],
                 "updated_at": category["updated_at"]
             }
             
             # Include subcategories if requested
             if include_subcategories:
-                subcategories = await db.categories.find({
-                    "parent_category_id": category["id"],
-                    "is_active": True
-                }).sort("display_order", 1).to_list(100)
-                
-                subcategory_list = []
-                for subcat in subcategories:
-                    subcat_course_count = await db.courses.count_documents({"category_id": subcat["id"]})
-                    subcategory_list.append({
+                category_response["subcategories"] = [
+                    {
                         "id": subcat["id"],
                         "name": subcat["name"],
                         "code": subcat["code"],
@@ -105,12 +133,12 @@ class CategoryController:
                         "display_order": subcat["display_order"],
                         "icon_url": subcat.get("icon_url"),
                         "color_code": subcat.get("color_code"),
-                        "course_count": subcat_course_count,
+                        "course_count": course_counts.get(subcat["id"], 0),
                         "created_at": subcat["created_at"],
                         "updated_at": subcat["updated_at"]
-                    })
-                
-                category_response["subcategories"] = subcategory_list
+                    }
+                    for subcat in tree["children"].get(category["id"], [])
+                ]
             
             enriched_categories.append(category_response)
         
@@ -132,28 +160,23 @@ class CategoryController:
         """Get categories - Public endpoint (no authentication required)"""
         db = get_db()
         
-        # Build query for top-level categories only
-        query = {"parent_category_id": None}
-        if active_only:
-            query["is_active"] = True
-        
         # Apply pagination
         if limit > 100:
             limit = 100  # Cap at 100 for public endpoint
         
-        # Get categories with sorting
-        categories_cursor = db.categories.find(query).sort("display_order", 1).skip(skip).limit(limit)
-        categories = await categories_cursor.to_list(limit)
-        
-        # Get total count
-        total = await db.categories.count_documents(query)
+        # Top-level categories only, from the cached tree
+        tree = await CategoryController._category_tree(db)
+        course_counts = tree["course_counts"]
+        matching = [
+            category for category in tree["ordered"]
+            if category.get("parent_category_id") is None and (not active_only or category.get("is_active"))
+        ]
+        total = len(matching)
+        categories = matching[skip:skip + limit]
         
         # Format categories for public consumption
         public_categories = []
         for category in categories:
-            # Count courses in this category
-            course_count = await db.courses.count_documents({"category_id": category["id"]})
-            
             public_category = {
                 "id": category["id"],
                 "name": category["name"],
@@ -161,30 +184,23 @@ class CategoryController:
                 "description": category.get("description"),
                 "icon_url": category.get("icon_url"),
                 "color_code": category.get("color_code"),
-                "course_count": course_count
+                "course_count": course_counts.get(category["id"], 0)
             }
             
             # Include subcategories if requested
             if include_subcategories:
-                subcategories = await db.categories.find({
-                    "parent_category_id": category["id"],
-                    "is_active": True
-                }).sort("display_order", 1).to_list(100)
-                
-                subcategory_list = []
-                for subcat in subcategories:
-                    subcat_course_count = await db.courses.count_documents({"category_id": subcat["id"]})
-                    subcategory_list.append({
+                public_category["subcategories"] = [
+                    {
                         "id": subcat["id"],
                         "name": subcat["name"],
                         "code": subcat["code"],
                         "description": subcat.get("description"),
                         "icon_url": subcat.get("icon_url"),
                         "color_code": subcat.get("color_code"),
-                        "course_count": subcat_course_count
-                    })
-                
-                public_category["subcategories"] = subcategory_list
+                        "course_count": course_counts.get(subcat["id"], 0)
+                    }
+                    for subcat in tree["children"].get(category["id"], [])
+                ]
             
             public_categories.append(public_category)
         
@@ -203,30 +219,23 @@ class CategoryController:
     ):
         """Get single category by ID"""
         db = get_db()
+        tree = await CategoryController._category_tree(db)
+        course_counts = tree["course_counts"]
         
-        category = await db.categories.find_one({"id": category_id})
+        category = tree["by_id"].get(category_id)
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
         
-        # Count courses in this category
-        course_count = await db.courses.count_documents({"category_id": category_id})
-        
-        # Get subcategories
-        subcategories = await db.categories.find({
-            "parent_category_id": category_id,
-            "is_active": True
-        }).sort("display_order", 1).to_list(100)
-        
-        subcategory_list = []
-        for subcat in subcategories:
-            subcat_course_count = await db.courses.count_documents({"category_id": subcat["id"]})
-            subcategory_list.append({
+        subcategory_list = [
+            {
                 "id": subcat["id"],
                 "name": subcat["name"],
                 "code": subcat["code"],
                 "description": subcat.get("description"),
-                "course_count": subcat_course_count
-            })
+                "course_count": course_counts.get(subcat["id"], 0)
+            }
+            for subcat in tree["children"].get(category_id, [])
+        ]
         
         category_response = {
             "id": category["id"],
@@ -238,7 +247,7 @@ class CategoryController:
             "display_order": category["display_order"],
             "icon_url": category.get("icon_url"),
             "color_code": category.get("color_code"),
-            "course_count": course_count,
+            "course_count": course_counts.get(category_id, 0),
             "subcategories": subcategory_list,
             "created_at": category["created_at"],
             "updated_at": category["updated_at"]
@@ -295,6 +304,7 @@ class CategoryController:
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Category not found")
         
+        await on_catalog_write(db)
         return {"message": "Category updated successfully"}
 
     @staticmethod
@@ -335,6 +345,7 @@ class CategoryController:
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Category not found")
         
+        await on_catalog_write(db)
         return {"message": "Category deleted successfully"}
 
     @staticmethod
@@ -348,76 +359,71 @@ class CategoryController:
         """Get category details with associated courses - Public endpoint"""
         db = get_db()
 
-        # Build query
-        query = {}
-        if category_id:
-            query["id"] = category_id
-        if active_only:
-            query["is_active"] = True
-
         # Apply pagination
         if limit > 100:
             limit = 100
 
-        # Get categories
-        categories_cursor = db.categories.find(query).sort("display_order", 1).skip(skip).limit(limit)
-        categories = await categories_cursor.to_list(limit)
-
-        # Get total count
-        total = await db.categories.count_documents(query)
+        # Filter and paginate the cached tree
+        tree = await CategoryController._category_tree(db)
+        course_counts = tree["course_counts"]
+        matching = [
+            category for category in tree["ordered"]
+            if (not category_id or category["id"] == category_id) and (not active_only or category.get("is_active"))
+        ]
+        total = len(matching)
+        categories = matching[skip:skip + limit]
+
+        # Courses for the whole page and the duration options, one query each
+        courses_by_category = {}
+        duration_options = []
+        if include_courses and categories:
+            course_query = {"category_id": {"$in": [category["id"] for category in categories]}}
+            if active_only:
+                course_query["settings.active"] = True
+            course_list, durations = await asyncio.gather(
+                db.courses.find(course_query).to_list(length=None),
+                db.durations.find({"is_active": True}).to_list(100)
+            )
+            for course in course_list:
+                courses_by_category.setdefault(course["category_id"], []).append(course)
+            duration_options = [
+                {
+                    "id": dur["id"],
+                    "name": dur["name"],
+                    "duration_months": dur["duration_months"],
+                    "pricing_multiplier": dur.get("pricing_multiplier", 1.0)
+                }
+                for dur in durations
+            ]
 
         # Enrich categories with course data
         enriched_categories = []
         for category in categories:
-            # Get courses in this category
-            courses = []
-            if include_courses:
-                course_query = {"category_id": category["id"]}
-                if active_only:
-                    course_query["settings.active"] = True
-
-                course_list = await db.courses.find(course_query).to_list(100)
-
-                for course in course_list:
-                    # Get available durations for this course
-                    durations = await db.durations.find({"is_active": True}).to_list(100)
-                    duration_options = []
-                    for dur in durations:
-                        duration_options.append({
-                            "id": dur["id"],
-                            "name": dur["name"],
-                            "duration_months": dur["duration_months"],
-                            "pricing_multiplier": dur.get("pricing_multiplier", 1.0)
-                        })
-
-                    course_data = {
-                        "id": course["id"],
-                        "title": course["title"],
-                        "code": course["code"],
-                        "difficulty_level": course["difficulty_level"],
-                        "pricing": {
-                            "currency": course.get("pricing", {}).get("currency", "INR"),
-                            "amount": course.get("pricing", {}).get("amount", 0)
-                        },
-                        "available_durations": duration_options
-                    }
-                    courses.append(course_data)
-
-            # Get subcategories
-            subcategories = await db.categories.find({
-                "parent_category_id": category["id"],
-                "is_active": True
-            }).sort("display_order", 1).to_list(100)
-
-            subcategory_list = []
-            for subcat in subcategories:
-                subcat_course_count = await db.courses.count_documents({"category_id": subcat["id"]})
-                subcategory_list.append({
+            courses = [
+                {
+                    "id": course["id"],
+                    "title": course["title"],
+                    "code": course["code"],
+                    "difficulty_level": course["difficulty_level"],
+                    "pricing": {
+                        "currency": course.get("pricing", {}).get("currency", "INR"),
+                        "amount": course_base_price(course)
+                    },
+                    "available_durations": [dict(option) for option in duration_options]
+                }
+                # Each category previously returned at most 100 courses
+                for course in courses_by_category.get(category["id"], [])[:100]
+            ]
+
+            subcategory_list = [
+                {
                     "id": subcat["id"],
                     "name": subcat["name"],
                     "code": subcat["code"],
-                    "course_count": subcat_course_count
-                })
+                    "course_count": course_counts.get(subcat["id"], 0)
+                }
+                for subcat in tree["children"].get(category["id"], [])
+            ]
 
             category_data = {
                 "id": category["id"],
@@ -445,124 +451,51 @@ class CategoryController:
         active_only: bool = True,
         include_locations: bool = False,
         skip: int = 0,
-        limit: int = 20
+        limit: int = 20,
+        materialized: bool = True
     ):
         """Get categories with their courses and available durations in nested structure - Public endpoint"""
         db = get_db()
 
-        # Build query
-        query = {}
-        if category_id:
-            query["id"] = category_id
-        if active_only:
-            query["is_active"] = True
-
         # Apply pagination
         if limit > 50:
             limit = 50
 
-        # Get categories
-        categories_cursor = db.categories.find(query).sort("display_order", 1).skip(skip).limit(limit)
-        categories = await categories_cursor.to_list(limit)
-
-        # Get total count
-        total = await db.categories.count_documents(query)
-
-        # Enrich categories with complete hierarchy
-        enriched_categories = []
-        for category in categories:
-            # Get courses in this category
-            course_query = {"category_id": category["id"]}
-            if active_only:
-                course_query["settings.active"] = True
-
-            course_list = await db.courses.find(course_query).to_list(100)
-
-            courses_data = []
-            for course in course_list:
-                # Get available durations
-                durations = await db.durations.find({"is_active": True}).sort("display_order", 1).to_list(100)
-
-                duration_list = []
-                base_price = course.get("pricing", {}).get("amount", 0)
-
-                for duration in durations:
-                    multiplier = duration.get("pricing_multiplier", 1.0)
-                    final_price = base_price * multiplier
-
-                    duration_data = {
-                        "id": duration["id"],
-                        "name": duration["name"],
-                        "duration_months": duration["duration_months"],
-                        "pricing_multiplier": multiplier,
-                        "final_price": final_price
-                    }
-                    duration_list.append(duration_data)
-
-                # Get locations if requested
-                locations_available = []
-                if include_locations:
-                    # Find branches that offer this course
-                    branches = await db.branches.find({
-                        "assignments.courses": course["id"],
-                        "is_active": True
-                    }).to_list(100)
-
-                    location_map = {}
-                    for branch in branches:
-                        city = branch["branch"]["address"]["city"]
-                        if city not in location_map:
-                            # Try to find location by city name
-                            location = await db.locations.find_one({
-                                "name": {"$regex": city, "$options": "i"},
-                                "is_active": True
-                            })
-                            if location:
-                                location_map[city] = {
-                                    "location_id": location["id"],
-                                    "location_name": location["name"],
-                                    "branch_count": 1
-                                }
-                            else:
-                                location_map[city] = {
-                                    "location_id": None,
-                                    "location_name": city,
-                                    "branch_count": 1
-                                }
-                        else:
-                            location_map[city]["branch_count"] += 1
-
-                    locations_available = list(location_map.values())
-
-                course_data = {
-                    "id": course["id"],
-                    "title": course["title"],
-                    "code": course["code"],
-                    "difficulty_level": course["difficulty_level"],
-                    "base_pricing": {
-                        "currency": course.get("pricing", {}).get("currency", "INR"),
-                        "amount": base_price
-                    },
-                    "durations": duration_list,
-                    "locations_available": locations_available
+        # Active categories are served from the materialized hierarchy when it is available
+        if materialized and active_only:
+            # The collection only holds active categories
+            materialized_query = {"id": category_id} if category_id else {}
+            entries, total = await asyncio.gather(
+                db.category_hierarchy.find(materialized_query, {"_id": 0, "display_order": 0, "materialized_at": 0})
+                    .sort("display_order", 1).skip(skip).limit(limit).to_list(limit),
+                db.category_hierarchy.count_documents(materialized_query)
+            )
+            # An empty collection means the hierarchy has not been materialized yet
+            if total or await db.category_hierarchy.count_documents({}, limit=1):
+                if not include_locations:
+                    for entry in entries:
+                        for course in entry["courses"]:
+                            course["locations_available"] = []
+                return {
+                    "message": f"Retrieved {len(entries)} categories with complete hierarchy successfully",
+                    "categories": entries,
+                    "total": total
                 }
-                courses_data.append(course_data)
-
-            category_data = {
-                "id": category["id"],
-                "name": category["name"],
-                "code": category["code"],
-                "description": category.get("description"),
-                "course_count": len(courses_data),
-                "courses": courses_data
-            }
 
-            enriched_categories.append(category_data)
+        # Otherwise join the page of categories live, one query per collection
+        tree = await CategoryController._category_tree(db)
+        matching = [
+            category for category in tree["ordered"]
+            if (not category_id or category["id"] == category_id) and (not active_only or category.get("is_active"))
+        ]
+        enriched_categories = await build_category_hierarchy(
+            db, matching[skip:skip + limit], active_only=active_only, include_locations=include_locations
+        )
 
         return {
             "message": f"Retrieved {len(enriched_categories)} categories with complete hierarchy successfully",
             "categories": enriched_categories,
-            "total": total
+            "total": len(matching)
         }
 
     @staticmethod
@@ -590,11 +523,29 @@ class CategoryController:
         # Get all durations
         durations = await db.durations.find({"is_active": True}).sort("display_order", 1).to_list(100)
 
+        # Branches offering any of these courses in one query, filtered on the indexed location_id
+        locations = await get_location_map(db)
+        if location_id and location_id not in locations["locations"]:
+            # Not in the cached map: either a location added since it was built or an unknown id
+            if not await db.locations.find_one({"id": location_id}, {"_id": 0, "id": 1}):
+                raise HTTPException(status_code=404, detail="Location not found")
+            location_map_cache.clear()
+            locations = await get_location_map(db)
+        branch_query = {"assignments.courses": {"$in": [course["id"] for course in courses]}}
+        if active_only:
+            branch_query["is_active"] = True
+        if location_id:
+            branch_query["location_id"] = location_id
+        branches_by_course = {}
+        async for branch in db.branches.find(branch_query):
+            for assigned_course_id in dict.fromkeys(branch.get("assignments", {}).get("courses", [])):
+                branches_by_course.setdefault(assigned_course_id, []).append(branch)
+
         courses_data = []
         all_prices = []
 
         for course in courses:
-            base_price = course.get("pricing", {}).get("amount", 0)
+            base_price = course_base_price(course)
 
             # Get durations for this course
             duration_list = []
@@ -612,29 +563,11 @@ class CategoryController:
                 }
                 duration_list.append(duration_data)
 
-            # Get locations and branches for this course
-            branch_query = {"assignments.courses": course["id"]}
-            if active_only:
-                branch_query["is_active"] = True
-            if location_id:
-                # Filter by location if specified
-                location = await db.locations.find_one({"id": location_id})
-                if location:
-                    branch_query["branch.address.city"] = {"$regex": location["name"], "$options": "i"}
-
-            branches = await db.branches.find(branch_query).to_list(100)
-
-            # Group branches by location
+            # Group this course's branches by their resolved location
             location_map = {}
-            for branch in branches:
+            for branch in branches_by_course.get(course["id"], [])[:100]:
+                location_record = branch_location(locations, branch)
                 city = branch["branch"]["address"]["city"]
-
-                # Try to find the location record
-                location_record = await db.locations.find_one({
-                    "name": {"$regex": city, "$options": "i"},
-                    "is_active": True
-                })
-
                 location_key = location_record["id"] if location_record else city
 
                 if location_key not in location_map:
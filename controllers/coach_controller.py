@@ -1,6 +1,7 @@
 from fastapi import HTTPException, Request
 from typing import Optional, List
 from datetime import datetime
+import asyncio
 import secrets
 import uuid
 
@@ -10,9 +11,16 @@ from utils.auth import hash_password, verify_password, create_access_token, SECR
 from utils.database import get_db
 from utils.helpers import serialize_doc, log_activity, send_sms, send_whatsapp
 from utils.email_service import send_password_reset_email
+from utils.trusted_read import projection_for, dump_from_db
+from utils.course_assignments import sync_coach, get_course_assignments, get_coach_course_ids, BRANCH
+from utils.enrollment_counts import ACTIVE_FIELD
+from utils.cache import invalidate_branches_with_courses
 import jwt
 from datetime import timedelta
 
+# contact_info is stored without the password, but never let it reach a response
+COACH_RESPONSE_EXCLUDE = ("contact_info.password",)
+
 class CoachController:
     @staticmethod
     async def create_coach(
@@ -83,6 +91,8 @@ class CoachController:
         
         # Insert into coaches collection
         result = await db.coaches.insert_one(coach_dict)
+        await sync_coach(db, coach.id)
+        invalidate_branches_with_courses()
         
         # Send credentials via SMS
         sms_message = (
@@ -126,27 +136,15 @@ class CoachController:
         if area_of_expertise:
             filter_query["areas_of_expertise"] = {"$in": [area_of_expertise]}
         
-        coaches = await db.coaches.find(filter_query).skip(skip).limit(limit).to_list(length=limit)
-        
+        coaches = await db.coaches.find(
+            filter_query, projection_for(CoachResponse, exclude=COACH_RESPONSE_EXCLUDE)
+        ).skip(skip).limit(limit).to_list(length=limit)
+
         # Convert to response format (remove sensitive data)
-        coach_responses = []
-        for coach in coaches:
-            coach_response = CoachResponse(
-                id=coach["id"],
-                personal_info=coach["personal_info"],
-                contact_info=coach["contact_info"],  # Already cleaned of password
-                address_info=coach["address_info"],
-                professional_info=coach["professional_info"],
-                areas_of_expertise=coach["areas_of_expertise"],
-                branch_id=coach.get("branch_id"),  # Include branch assignment
-                assignment_details=coach.get("assignment_details"),  # Include course assignments
-                emergency_contact=coach.get("emergency_contact"),  # Include emergency contact
-                full_name=coach["full_name"],
-                is_active=coach["is_active"],
-                created_at=coach["created_at"],
-                updated_at=coach["updated_at"]
-            )
-            coach_responses.append(coach_response.dict())
+        coach_responses = [
+            dump_from_db(CoachResponse, coach, exclude=COACH_RESPONSE_EXCLUDE)
+            for coach in coaches
+        ]
         
         total_count = await db.coaches.count_documents(filter_query)
         
@@ -162,28 +160,14 @@ class CoachController:
         """Get coach by ID"""
         db = get_db()
         
-        coach = await db.coaches.find_one({"id": coach_id})
+        coach = await db.coaches.find_one(
+            {"id": coach_id}, projection_for(CoachResponse, exclude=COACH_RESPONSE_EXCLUDE)
+        )
         if not coach:
             raise HTTPException(status_code=404, detail="Coach not found")
         
         # Convert to response format
-        coach_response = CoachResponse(
-            id=coach["id"],
-            personal_info=coach["personal_info"],
-            contact_info=coach["contact_info"],
-            address_info=coach["address_info"],
-            professional_info=coach["professional_info"],
-            areas_of_expertise=coach["areas_of_expertise"],
-            branch_id=coach.get("branch_id"),  # Include branch assignment
-            assignment_details=coach.get("assignment_details"),  # Include course assignments
-            emergency_contact=coach.get("emergency_contact"),  # Include emergency contact
-            full_name=coach["full_name"],
-            is_active=coach["is_active"],
-            created_at=coach["created_at"],
-            updated_at=coach["updated_at"]
-        )
-        
-        return coach_response.dict()
+        return dump_from_db(CoachResponse, coach, exclude=COACH_RESPONSE_EXCLUDE)
 
     @staticmethod
     async def update_coach(
@@ -271,6 +255,9 @@ class CoachController:
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Coach not found")
+
+        await sync_coach(db, coach_id)
+        invalidate_branches_with_courses()
         
         # Log activity
         await log_activity(
@@ -302,6 +289,9 @@ class CoachController:
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Coach not found")
+
+        await sync_coach(db, coach_id)
+        invalidate_branches_with_courses()
         
         # Log activity
         await log_activity(
@@ -332,40 +322,21 @@ class CoachController:
             raise HTTPException(status_code=403, detail="You can only view your own course assignments")
 
         try:
-            # Get courses where this coach is the instructor
+            # Courses where this coach is the instructor or listed in assignment_details
+            course_ids = await get_coach_course_ids(db, coach_id)
             courses = await db.courses.find({
-                "instructor_id": coach_id,
+                "id": {"$in": course_ids},
                 "settings.active": True
-            }).to_list(length=100)
+            }).to_list(length=None) if course_ids else []
 
-            # Also get courses from coach's assignment_details
-            assigned_course_ids = coach.get("assignment_details", {}).get("courses", [])
-            if assigned_course_ids:
-                assigned_courses = await db.courses.find({
-                    "id": {"$in": assigned_course_ids},
-                    "settings.active": True
-                }).to_list(length=100)
-
-                # Merge courses (avoid duplicates)
-                course_ids_seen = {course["id"] for course in courses}
-                for assigned_course in assigned_courses:
-                    if assigned_course["id"] not in course_ids_seen:
-                        courses.append(assigned_course)
+            # Branch assignments for all of these courses with one query
+            assignments = await get_course_assignments(db, [course["id"] for course in courses], kinds=[BRANCH])
 
             # Enhance courses with additional data
             enhanced_courses = []
             for course in courses:
-                # Get enrollment count for this course
-                enrollment_count = await db.enrollments.count_documents({
-                    "course_id": course["id"],
-                    "is_active": True
-                })
-
-                # Get branch information
-                branches = await db.branches.find({
-                    "assignments.courses": course["id"],
-                    "is_active": True
-                }).to_list(length=10)
+                enrollment_count = course.get(ACTIVE_FIELD, 0)
+                branches = assignments[course["id"]][BRANCH]
 
                 enhanced_course = serialize_doc(course)
                 enhanced_course.update({
@@ -374,8 +345,8 @@ class CoachController:
                     "difficulty_level": course.get("difficulty_level", "Beginner"),
                     "branch_assignments": [
                         {
-                            "branch_id": branch["id"],
-                            "branch_name": branch["branch"]["name"]
+                            "branch_id": branch["branch_id"],
+                            "branch_name": branch["branch_name"]
                         }
                         for branch in branches
                     ]
@@ -388,7 +359,7 @@ class CoachController:
             raise HTTPException(status_code=500, detail=f"Error fetching coach courses: {str(e)}")
 
     @staticmethod
-    async def get_coach_students(coach_id: str, current_user: dict = None):
+    async def get_coach_students(coach_id: str, current_user: dict = None, skip: int = 0, limit: int = 100):
         """Get students enrolled in courses taught by a specific coach"""
         if not current_user:
             raise HTTPException(status_code=401, detail="Authentication required")
@@ -405,43 +376,40 @@ class CoachController:
             raise HTTPException(status_code=403, detail="You can only view your own students")
 
         try:
-            # Get courses taught by this coach
-            course_ids = []
-
-            # Get courses where this coach is the instructor
-            instructor_courses = await db.courses.find({
-                "instructor_id": coach_id,
-                "settings.active": True
-            }).to_list(length=100)
-            course_ids.extend([course["id"] for course in instructor_courses])
-
-            # Also get courses from coach's assignment_details
+            # Courses where this coach is the instructor, plus courses from assignment_details
             assigned_course_ids = coach.get("assignment_details", {}).get("courses", [])
-            course_ids.extend(assigned_course_ids)
-
-            # Remove duplicates
-            course_ids = list(set(course_ids))
-
-            if not course_ids:
-                return {"students": [], "total": 0}
+            course_filter = {"$or": [{"instructor_id": coach_id, "settings.active": True}]}
+            if assigned_course_ids:
+                course_filter["$or"].append({"id": {"$in": assigned_course_ids}})
+            courses = await db.courses.find(course_filter, {"id": 1, "title": 1, "name": 1}).to_list(length=None)
+            courses_by_id = {course["id"]: course for course in courses}
+
+            if not courses_by_id:
+                return {"students": [], "total": 0, "skip": skip, "limit": limit}
+
+            # Page through enrollments for these courses
+            enrollment_filter = {"course_id": {"$in": list(courses_by_id)}, "is_active": True}
+            enrollments, total = await asyncio.gather(
+                db.enrollments.find(enrollment_filter)
+                .sort([("enrollment_date", -1), ("id", 1)])
+                .skip(skip)
+                .limit(limit)
+                .to_list(length=None),
+                db.enrollments.count_documents(enrollment_filter)
+            )
 
-            # Get enrollments for these courses
-            enrollments = await db.enrollments.find({
-                "course_id": {"$in": course_ids},
-                "is_active": True
-            }).to_list(length=1000)
+            # Resolve all students on the page with one query
+            student_ids = list({enrollment["student_id"] for enrollment in enrollments})
+            students = await db.users.find(
+                {"id": {"$in": student_ids}, "role": "student"},
+                {"id": 1, "full_name": 1, "first_name": 1, "last_name": 1, "email": 1, "contact_info.email": 1}
+            ).to_list(length=None) if student_ids else []
+            students_by_id = {student["id"]: student for student in students}
 
-            # Get student details and course information
             enhanced_students = []
             for enrollment in enrollments:
-                # Get student details
-                student = await db.users.find_one({
-                    "id": enrollment["student_id"],
-                    "role": "student"
-                })
-
-                # Get course details
-                course = await db.courses.find_one({"id": enrollment["course_id"]})
+                student = students_by_id.get(enrollment["student_id"])
+                course = courses_by_id.get(enrollment["course_id"])
 
                 if student and course:
                     enhanced_student = {
@@ -457,7 +425,7 @@ class CoachController:
                     }
                     enhanced_students.append(enhanced_student)
 
-            return {"students": enhanced_students, "total": len(enhanced_students)}
+            return {"students": enhanced_students, "total": total, "skip": skip, "limit": limit}
 
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error fetching coach students: {str(e)}")
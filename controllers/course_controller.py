@@ -1,12 +1,18 @@
 from fastapi import HTTPException, Depends
 from typing import Optional
 from datetime import datetime
+import asyncio
 
 from models.course_models import CourseCreate, CourseUpdate, Course
 from models.user_models import UserRole
 from utils.auth import require_role, get_current_active_user
 from utils.database import get_db
 from utils.helpers import serialize_doc
+from utils.catalog import on_catalog_write
+from utils.pricing import course_base_price
+from utils.course_assignments import sync_course, get_course_assignments, BRANCH, COACH
+from utils.enrollment_counts import count_active_enrollments, ACTIVE_FIELD
+from utils.locations import get_location_map, summarize_branch_locations
 
 class CourseController:
     @staticmethod
@@ -25,76 +31,44 @@ class CourseController:
         course_dict = course.dict()
 
         await db.courses.insert_one(course_dict)
+        await sync_course(db, course.id)
+        await on_catalog_write(db)
         return {"message": "Course created successfully", "course_id": course.id}
 
     @staticmethod
-    async def get_courses(
-        category_id: Optional[str] = None,
-        difficulty_level: Optional[str] = None,
-        instructor_id: Optional[str] = None,
-        active_only: bool = True,
-        skip: int = 0,
-        limit: int = 50,
-        current_user: dict = None
-    ):
-        """Get courses with enhanced data including branch assignments, instructor counts, and student enrollments"""
-        if not current_user:
-            raise HTTPException(status_code=401, detail="Authentication required")
-
-        db = get_db()
-        filter_query = {}
+    async def _enhance_courses(db, courses: list) -> list:
+        """Add branch assignments, instructors and enrollment counts to a page of courses.
 
-        if active_only:
-            filter_query["settings.active"] = True
-        if category_id:
-            filter_query["category_id"] = category_id
-        if difficulty_level:
-            filter_query["difficulty_level"] = difficulty_level
-        if instructor_id:
-            filter_query["instructor_id"] = instructor_id
+        Assignments for the whole page come from one course_assignments query and
+        enrollment counts from the counters stored on each course.
+        """
+        assignments = await get_course_assignments(db, [course["id"] for course in courses])
 
-        courses = await db.courses.find(filter_query).skip(skip).limit(limit).to_list(length=limit)
-
-        # Enhance courses with additional data
         enhanced_courses = []
         for course in courses:
-            # Get branch assignments for this course
-            branches = await db.branches.find({
-                "assignments.courses": course["id"],
-                "is_active": True
-            }).to_list(length=100)
-
-            # Get instructor assignments (coaches assigned to this course)
-            # Query coaches collection for coaches assigned to this specific course
-            instructors = await db.coaches.find({
-                "assignment_details.courses": course["id"],
-                "is_active": True
-            }).to_list(length=100)
-
-            # Get student enrollment count
-            enrollment_count = await db.enrollments.count_documents({
-                "course_id": course["id"],
-                "is_active": True
-            })
+            # Active branches offering this course and active coaches assigned to it
+            branches = assignments[course["id"]][BRANCH]
+            instructors = assignments[course["id"]][COACH]
+            enrollment_count = course.get(ACTIVE_FIELD, 0)
 
             # Create enhanced course object
             enhanced_course = serialize_doc(course)
             enhanced_course.update({
                 "branch_assignments": [
                     {
-                        "branch_id": branch["id"],
-                        "branch_name": branch["branch"]["name"],
-                        "branch_code": branch["branch"]["code"],
-                        "location": f"{branch['branch']['address']['area']}, {branch['branch']['address']['city']}"
+                        "branch_id": branch["branch_id"],
+                        "branch_name": branch["branch_name"],
+                        "branch_code": branch["branch_code"],
+                        "location": branch["branch_location"]
                     }
                     for branch in branches
                 ],
                 "instructor_count": len(instructors),
                 "instructor_assignments": [
                     {
-                        "instructor_id": instructor["id"],
-                        "instructor_name": instructor.get("full_name", f"{instructor.get('first_name', '')} {instructor.get('last_name', '')}".strip()),
-                        "email": instructor.get("email", instructor.get("contact_info", {}).get("email", ""))
+                        "instructor_id": instructor["coach_id"],
+                        "instructor_name": instructor["coach_name"],
+                        "email": instructor["coach_email"]
                     }
                     for instructor in instructors
                 ],
@@ -110,6 +84,37 @@ class CourseController:
 
             enhanced_courses.append(enhanced_course)
 
+        return enhanced_courses
+
+    @staticmethod
+    async def get_courses(
+        category_id: Optional[str] = None,
+        difficulty_level: Optional[str] = None,
+        instructor_id: Optional[str] = None,
+        active_only: bool = True,
+        skip: int = 0,
+        limit: int = 50,
+        current_user: dict = None
+    ):
+        """Get courses with enhanced data including branch assignments, instructor counts, and student enrollments"""
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Authentication required")
+
+        db = get_db()
+        filter_query = {}
+
+        if active_only:
+            filter_query["settings.active"] = True
+        if category_id:
+            filter_query["category_id"] = category_id
+        if difficulty_level:
+            filter_query["difficulty_level"] = difficulty_level
+        if instructor_id:
+            filter_query["instructor_id"] = instructor_id
+
+        courses = await db.courses.find(filter_query).skip(skip).limit(limit).to_list(length=limit)
+
+        enhanced_courses = await CourseController._enhance_courses(db, courses)
         return {"courses": enhanced_courses}
 
     @staticmethod
@@ -156,22 +161,19 @@ class CourseController:
                 "settings.active": True
             }).to_list(length=100)
 
+            # Coaches assigned at this branch and enrollments at this branch, one query each
+            # (the stored counters are per course, not per course and branch)
+            course_ids = [course["id"] for course in courses]
+            assignments, enrollment_counts = await asyncio.gather(
+                get_course_assignments(db, course_ids, kinds=[COACH], branch_id=branch_id),
+                count_active_enrollments(db, course_ids, branch_id=branch_id)
+            )
+
             # Enhance courses with additional data
             enhanced_courses = []
             for course in courses:
-                # Get instructor assignments (coaches assigned to this course at this branch)
-                instructors = await db.coaches.find({
-                    "assignment_details.courses": course["id"],
-                    "branch_id": branch_id,
-                    "is_active": True
-                }).to_list(length=100)
-
-                # Get student enrollment count for this course at this branch
-                enrollment_count = await db.enrollments.count_documents({
-                    "course_id": course["id"],
-                    "branch_id": branch_id,
-                    "is_active": True
-                })
+                instructors = assignments[course["id"]][COACH]
+                enrollment_count = enrollment_counts[course["id"]]
 
                 # Create enhanced course object
                 enhanced_course = serialize_doc(course)
@@ -179,7 +181,7 @@ class CourseController:
                 enhanced_course.update({
                     "name": course.get("title", course.get("name", "Unknown Course")),
                     "enrolled_students": enrollment_count,
-                    "instructor_name": instructors[0].get("full_name", f"{instructors[0].get('first_name', '')} {instructors[0].get('last_name', '')}".strip()) if instructors else None,
+                    "instructor_name": instructors[0]["coach_name"] if instructors else None,
                     "instructor_count": len(instructors),
                     "difficulty_level": course.get("difficulty_level", "Beginner")
                 })
@@ -228,6 +230,10 @@ class CourseController:
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Course not found")
+
+        if "instructor_id" in update_data:
+            await sync_course(db, course_id)
+        await on_catalog_write(db)
         
         return {"message": "Course updated successfully"}
 
@@ -245,11 +251,9 @@ class CourseController:
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
 
-        active_enrollments = await db.enrollments.count_documents({"course_id": course_id, "is_active": True})
-
         stats = {
             "course_details": serialize_doc(course),
-            "active_enrollments": active_enrollments
+            "active_enrollments": course.get(ACTIVE_FIELD, 0)
         }
         return stats
 
@@ -278,6 +282,7 @@ class CourseController:
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Course not found")
 
+        await on_catalog_write(db)
         return {"message": "Course deleted successfully"}
 
     @staticmethod
@@ -302,60 +307,7 @@ class CourseController:
         courses_cursor = db.courses.find(query).skip(skip).limit(limit)
         courses = await courses_cursor.to_list(limit)
 
-        # Enhance courses with additional data
-        enhanced_courses = []
-        for course in courses:
-            # Get branch assignments for this course
-            branches = await db.branches.find({
-                "assignments.courses": course["id"],
-                "is_active": True
-            }).to_list(length=100)
-
-            # Get instructor assignments (coaches assigned to this course)
-            # Query coaches collection for coaches assigned to this specific course
-            instructors = await db.coaches.find({
-                "assignment_details.courses": course["id"],
-                "is_active": True
-            }).to_list(length=100)
-
-            # Get student enrollment count
-            enrollment_count = await db.enrollments.count_documents({
-                "course_id": course["id"],
-                "is_active": True
-            })
-
-            # Create enhanced course object
-            enhanced_course = serialize_doc(course)
-            enhanced_course.update({
-                "branch_assignments": [
-                    {
-                        "branch_id": branch["id"],
-                        "branch_name": branch["branch"]["name"],
-                        "branch_code": branch["branch"]["code"],
-                        "location": f"{branch['branch']['address']['area']}, {branch['branch']['address']['city']}"
-                    }
-                    for branch in branches
-                ],
-                "instructor_count": len(instructors),
-                "instructor_assignments": [
-                    {
-                        "instructor_id": instructor["id"],
-                        "instructor_name": instructor.get("full_name", f"{instructor.get('first_name', '')} {instructor.get('last_name', '')}".strip()),
-                        "email": instructor.get("email", instructor.get("contact_info", {}).get("email", ""))
-                    }
-                    for instructor in instructors
-                ],
-                "student_enrollment_count": enrollment_count,
-                # Add display fields for frontend compatibility
-                "name": course["title"],  # Map title to name for frontend
-                "branches": len(branches),  # Number of branches
-                "masters": len(instructors),  # Number of instructors
-                "students": enrollment_count,  # Number of students
-                "icon": "🥋",  # Default icon for martial arts courses
-                "enabled": course.get("settings", {}).get("active", True)
-            })
-
-            enhanced_courses.append(enhanced_course)
+        enhanced_courses = await CourseController._enhance_courses(db, courses)
 
         # Get total count
         total = await db.courses.count_documents(query)
@@ -403,47 +355,30 @@ class CourseController:
         # Get total count
         total = await db.courses.count_documents(query)
 
+        # Durations, branches and locations for the whole page, fetched once
+        durations = await db.durations.find({"is_active": True}).sort("display_order", 1).to_list(100) if include_durations else []
+        location_map = await get_location_map(db)
+        branches_by_course = {}
+        async for branch in db.branches.find(
+            {"assignments.courses": {"$in": [course["id"] for course in courses]}, "is_active": True},
+            {"_id": 0, "id": 1, "location_id": 1, "branch.address.city": 1, "assignments.courses": 1}
+        ):
+            for assigned_course_id in dict.fromkeys(branch["assignments"]["courses"]):
+                branches_by_course.setdefault(assigned_course_id, []).append(branch)
+
         # Enrich courses with additional data
         enriched_courses = []
         for course in courses:
             # Get available durations
-            available_durations = []
-            if include_durations:
-                durations = await db.durations.find({"is_active": True}).sort("display_order", 1).to_list(100)
-                base_price = course.get("pricing", {}).get("amount", 0)
-
-                for duration in durations:
-                    multiplier = duration.get("pricing_multiplier", 1.0)
-                    duration_data = {
-                        "id": duration["id"],
-                        "name": duration["name"],
-                        "duration_months": duration["duration_months"],
-                        "pricing_multiplier": multiplier
-                    }
-                    available_durations.append(duration_data)
-
-            # Get locations where this course is offered
-            branches = await db.branches.find({
-                "assignments.courses": course["id"],
-                "is_active": True
-            }).to_list(100)
-
-            location_map = {}
-            for branch in branches:
-                city = branch["branch"]["address"]["city"]
-                if city not in location_map:
-                    # Try to find location record
-                    location = await db.locations.find_one({
-                        "name": {"$regex": city, "$options": "i"},
-                        "is_active": True
-                    })
-                    location_map[city] = {
-                        "location_id": location["id"] if location else None,
-                        "location_name": location["name"] if location else city,
-                        "branch_count": 1
-                    }
-                else:
-                    location_map[city]["branch_count"] += 1
+            available_durations = [
+                {
+                    "id": duration["id"],
+                    "name": duration["name"],
+                    "duration_months": duration["duration_months"],
+                    "pricing_multiplier": duration.get("pricing_multiplier", 1.0)
+                }
+                for duration in durations
+            ]
 
             course_data = {
                 "id": course["id"],
@@ -453,11 +388,11 @@ class CourseController:
                 "difficulty_level": course["difficulty_level"],
                 "pricing": {
                     "currency": course.get("pricing", {}).get("currency", "INR"),
-                    "amount": course.get("pricing", {}).get("amount", 0)
+                    "amount": course_base_price(course)
                 },
                 "student_requirements": course.get("student_requirements", {}),
                 "available_durations": available_durations,
-                "locations_offered": list(location_map.values())
+                "locations_offered": summarize_branch_locations(location_map, branches_by_course.get(course["id"], [])[:100])
             }
             enriched_courses.append(course_data)
 
@@ -493,7 +428,7 @@ class CourseController:
 
         # Find branches in this location
         branches = await db.branches.find({
-            "branch.address.city": {"$regex": location["name"], "$options": "i"},
+            "location_id": location_id,
             "is_active": True
         }).to_list(100)
 
@@ -548,28 +483,28 @@ class CourseController:
         # Get total count
         total = await db.courses.count_documents(course_query)
 
+        # Categories and durations for the whole page, fetched once
+        categories = await db.categories.find({"id": {"$in": list({course.get("category_id") for course in courses})}}).to_list(length=None)
+        categories = {category["id"]: category for category in categories}
+        durations = await db.durations.find({"is_active": True}).sort("display_order", 1).to_list(100) if include_durations else []
+
         # Enrich courses with additional data
         enriched_courses = []
         for course in courses:
             # Get category info
-            category = await db.categories.find_one({"id": course["category_id"]})
+            category = categories.get(course["category_id"])
 
             # Get available durations
-            available_durations = []
-            if include_durations:
-                durations = await db.durations.find({"is_active": True}).sort("display_order", 1).to_list(100)
-                base_price = course.get("pricing", {}).get("amount", 0)
-
-                for duration in durations:
-                    multiplier = duration.get("pricing_multiplier", 1.0)
-                    final_price = base_price * multiplier
-                    duration_data = {
-                        "id": duration["id"],
-                        "name": duration["name"],
-                        "duration_months": duration["duration_months"],
-                        "final_price": final_price
-                    }
-                    available_durations.append(duration_data)
+            base_price = course_base_price(course)
+            available_durations = [
+                {
+                    "id": duration["id"],
+                    "name": duration["name"],
+                    "duration_months": duration["duration_months"],
+                    "final_price": base_price * duration.get("pricing_multiplier", 1.0)
+                }
+                for duration in durations
+            ]
 
             # Get branches offering this course
             branches_offering = []
@@ -589,7 +524,7 @@ class CourseController:
                 "difficulty_level": course["difficulty_level"],
                 "pricing": {
                     "currency": course.get("pricing", {}).get("currency", "INR"),
-                    "amount": course.get("pricing", {}).get("amount", 0)
+                    "amount": course_base_price(course)
                 },
                 "available_durations": available_durations,
                 "branches_offering": branches_offering
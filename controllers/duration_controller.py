@@ -8,6 +8,8 @@ from utils.auth import require_role, get_current_active_user
 from utils.unified_auth import require_role_unified, get_current_user_or_superadmin
 from utils.database import get_db
 from utils.helpers import serialize_doc
+from utils.catalog import on_catalog_write
+from utils.pricing import course_base_price
 
 class DurationController:
     @staticmethod
@@ -40,6 +42,7 @@ class DurationController:
         duration_dict = duration.dict()
         
         await db.durations.insert_one(duration_dict)
+        await on_catalog_write(db)
         return {"message": "Duration created successfully", "duration_id": duration.id}
 
     @staticmethod
@@ -225,6 +228,7 @@ class DurationController:
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Duration not found")
         
+        await on_catalog_write(db)
         return {"message": "Duration updated successfully"}
 
     @staticmethod
@@ -253,6 +257,7 @@ class DurationController:
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Duration not found")
         
+        await on_catalog_write(db)
         return {"message": "Duration deleted successfully"}
 
     @staticmethod
@@ -278,7 +283,7 @@ class DurationController:
 
         # Enrich durations with pricing calculations
         enriched_durations = []
-        base_price = course.get("pricing", {}).get("amount", 0)
+        base_price = course_base_price(course)
         currency = course.get("pricing", {}).get("currency", "INR")
 
         for duration in durations:
@@ -331,7 +336,7 @@ class DurationController:
 
         # Check if course is available at this location
         branches = await db.branches.find({
-            "branch.address.city": {"$regex": location["name"], "$options": "i"},
+            "location_id": location_id,
             "assignments.courses": course_id,
             "is_active": True
         }).to_list(100)
@@ -357,7 +362,7 @@ class DurationController:
 
         # Enrich durations with pricing and branch availability
         enriched_durations = []
-        base_price = course.get("pricing", {}).get("amount", 0)
+        base_price = course_base_price(course)
 
         for duration in durations:
             multiplier = duration.get("pricing_multiplier", 1.0)
@@ -9,6 +9,9 @@ from models.user_models import UserRole
 from utils.auth import require_role, get_current_active_user
 from utils.database import db
 from utils.helpers import serialize_doc, send_whatsapp
+from utils.cache import invalidate_student_profiles, invalidate_payment_stats
+from utils.enrollment_counts import record_enrollment_created
+from utils.payment_students import student_display_name
 
 class EnrollmentController:
     @staticmethod
@@ -40,10 +43,12 @@ class EnrollmentController:
         )
         
         await db.enrollments.insert_one(enrollment.dict())
+        await record_enrollment_created(db, enrollment.dict())
         
         # Create initial payment records
         admission_payment = Payment(
             student_id=enrollment_data.student_id,
+            student_name=student_display_name(student),
             enrollment_id=enrollment.id,
             amount=enrollment_data.admission_fee,
             payment_type="admission_fee",
@@ -54,6 +59,7 @@ class EnrollmentController:
         
         course_payment = Payment(
             student_id=enrollment_data.student_id,
+            student_name=student_display_name(student),
             enrollment_id=enrollment.id,
             amount=enrollment_data.fee_amount,
             payment_type="course_fee",
@@ -63,6 +69,8 @@ class EnrollmentController:
         )
         
         await db.payments.insert_many([admission_payment.dict(), course_payment.dict()])
+        invalidate_student_profiles(enrollment_data.student_id)
+        invalidate_payment_stats()
         
         # Send enrollment confirmation
         await send_whatsapp(student["phone"], f"Welcome! You're enrolled in {course['name']}. Start date: {enrollment_data.start_date.date()}")
@@ -176,10 +184,12 @@ class EnrollmentController:
         )
 
         await db.enrollments.insert_one(enrollment.dict())
+        await record_enrollment_created(db, enrollment.dict())
 
         # Create initial payment records (pending)
         admission_payment = Payment(
             student_id=student_id,
+            student_name=student_display_name(student),
             enrollment_id=enrollment.id,
             amount=admission_fee,
             payment_type="admission_fee",
@@ -190,6 +200,7 @@ class EnrollmentController:
 
         course_payment = Payment(
             student_id=student_id,
+            student_name=student_display_name(student),
             enrollment_id=enrollment.id,
             amount=fee_amount,
             payment_type="course_fee",
@@ -199,6 +210,8 @@ class EnrollmentController:
         )
 
         await db.payments.insert_many([admission_payment.dict(), course_payment.dict()])
+        invalidate_student_profiles(student_id)
+        invalidate_payment_stats()
 
         # Send enrollment confirmation
         await send_whatsapp(student["phone"], f"Welcome! You're enrolled in {course['name']}. Start date: {enrollment_data.start_date.date()}")
@@ -1,6 +1,7 @@
 from fastapi import HTTPException, Depends
 from typing import Optional, List
 from datetime import datetime
+import asyncio
 
 from models.location_models import LocationCreate, LocationUpdate, Location, LocationWithBranches, LocationResponse
 from models.user_models import UserRole
@@ -8,8 +9,30 @@ from utils.auth import require_role, get_current_active_user
 from utils.unified_auth import require_role_unified, get_current_user_or_superadmin
 from utils.database import get_db
 from utils.helpers import serialize_doc
+from utils.catalog import on_catalog_write
+from utils.cache import location_states_cache
+from utils.pricing import course_base_price
 
 class LocationController:
+    @staticmethod
+    def _page_with_branches(query: dict, skip: int, limit: int, branch_match: dict, branch_stages: List[dict]) -> List[dict]:
+        """Pipeline for a page of locations with their branches joined as "branches" in one $lookup"""
+        return [
+            {"$match": query},
+            {"$sort": {"display_order": 1}},
+            {"$skip": skip},
+            {"$limit": limit},
+            {"$lookup": {
+                "from": "branches",
+                "let": {"location_id": "$id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$location_id", "$$location_id"]}, **branch_match}},
+                    *branch_stages
+                ],
+                "as": "branches"
+            }}
+        ]
+
     @staticmethod
     async def create_location(
         location_data: LocationCreate,
@@ -30,6 +53,7 @@ class LocationController:
         location_dict = location.dict()
         
         await db.locations.insert_one(location_dict)
+        await on_catalog_write(db)
         return {"message": "Location created successfully", "location_id": location.id}
 
     @staticmethod
@@ -47,20 +71,17 @@ class LocationController:
         if active_only:
             query["is_active"] = True
         
-        # Get locations with sorting
-        locations_cursor = db.locations.find(query).sort("display_order", 1).skip(skip).limit(limit)
-        locations = await locations_cursor.to_list(limit)
-        
-        # Get total count
-        total = await db.locations.count_documents(query)
+        # Page of locations with their branch counts, and the total count
+        pipeline = LocationController._page_with_branches(query, skip, limit, {}, [{"$count": "count"}])
+        locations, total = await asyncio.gather(
+            db.locations.aggregate(pipeline).to_list(limit),
+            db.locations.count_documents(query)
+        )
         
         # Enrich locations with branch count
         enriched_locations = []
         for location in locations:
-            # Count branches in this location
-            branch_count = await db.branches.count_documents({
-                "branch.address.city": {"$regex": location["name"], "$options": "i"}
-            })
+            branch_count = location["branches"][0]["count"] if location["branches"] else 0
             
             location_response = {
                 "id": location["id"],
@@ -92,6 +113,10 @@ class LocationController:
         active_only: bool = True
     ):
         """Get unique states from locations - Public endpoint (no authentication required)"""
+        cached = location_states_cache.get(active_only)
+        if cached is not None:
+            return cached
+
         db = get_db()
 
         # Build query
@@ -112,11 +137,13 @@ class LocationController:
         # Format states for frontend consumption
         states = [{"state": state_doc["_id"], "location_count": state_doc["count"]} for state_doc in states_data]
 
-        return {
+        response = {
             "message": f"Retrieved {len(states)} states successfully",
             "states": states,
             "total": len(states)
         }
+        location_states_cache.set(active_only, response)
+        return response
 
     @staticmethod
     async def get_locations_with_branches(
@@ -136,24 +163,18 @@ class LocationController:
         if limit > 100:
             limit = 100  # Cap at 100 for public endpoint
         
-        # Get locations with sorting
-        locations_cursor = db.locations.find(location_query).sort("display_order", 1).skip(skip).limit(limit)
-        locations = await locations_cursor.to_list(limit)
-        
-        # Get total count
-        total = await db.locations.count_documents(location_query)
+        # Page of locations with up to 100 branches each, and the total count
+        branch_query = {"is_active": True} if active_only else {}
+        pipeline = LocationController._page_with_branches(location_query, skip, limit, branch_query, [{"$limit": 100}])
+        locations, total = await asyncio.gather(
+            db.locations.aggregate(pipeline).to_list(limit),
+            db.locations.count_documents(location_query)
+        )
         
-        # Get branches for each location
+        # Format the branches of each location
         locations_with_branches = []
         for location in locations:
-            # Find branches in this location (matching by city name)
-            branch_query = {
-                "branch.address.city": {"$regex": location["name"], "$options": "i"}
-            }
-            if active_only:
-                branch_query["is_active"] = True
-            
-            branches = await db.branches.find(branch_query).to_list(100)
+            branches = location["branches"]
             
             # Format branches for public consumption
             formatted_branches = []
@@ -217,7 +238,7 @@ class LocationController:
         
         # Count branches in this location
         branch_count = await db.branches.count_documents({
-            "branch.address.city": {"$regex": location["name"], "$options": "i"}
+            "location_id": location["id"]
         })
         
         location_response = {
@@ -276,6 +297,7 @@ class LocationController:
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Location not found")
         
+        await on_catalog_write(db)
         return {"message": "Location updated successfully"}
 
     @staticmethod
@@ -296,7 +318,7 @@ class LocationController:
         
         # Check if location has branches
         branch_count = await db.branches.count_documents({
-            "branch.address.city": {"$regex": location["name"], "$options": "i"}
+            "location_id": location["id"]
         })
         if branch_count > 0:
             raise HTTPException(
@@ -310,6 +332,7 @@ class LocationController:
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Location not found")
         
+        await on_catalog_write(db)
         return {"message": "Location deleted successfully"}
 
     @staticmethod
@@ -335,24 +358,18 @@ class LocationController:
         if limit > 100:
             limit = 100
 
-        # Get locations
-        locations_cursor = db.locations.find(query).sort("display_order", 1).skip(skip).limit(limit)
-        locations = await locations_cursor.to_list(limit)
-
-        # Get total count
-        total = await db.locations.count_documents(query)
+        # Page of locations with up to 100 branches each, and the total count
+        branch_query = {"is_active": True} if active_only else {}
+        pipeline = LocationController._page_with_branches(query, skip, limit, branch_query, [{"$limit": 100}])
+        locations, total = await asyncio.gather(
+            db.locations.aggregate(pipeline).to_list(limit),
+            db.locations.count_documents(query)
+        )
 
         # Enrich locations with branch and course data
         enriched_locations = []
         for location in locations:
-            # Get branches in this location using location_id
-            branch_query = {
-                "location_id": location["id"]
-            }
-            if active_only:
-                branch_query["is_active"] = True
-
-            branches = await db.branches.find(branch_query).to_list(100)
+            branches = location["branches"]
 
             # Format branches
             formatted_branches = []
@@ -419,11 +436,6 @@ class LocationController:
         """Get branches filtered by location - Public endpoint"""
         db = get_db()
 
-        # Verify location exists
-        location = await db.locations.find_one({"id": location_id})
-        if not location:
-            raise HTTPException(status_code=404, detail="Location not found")
-
         # Find branches in this location using location_id
         branch_query = {
             "location_id": location_id
@@ -435,12 +447,33 @@ class LocationController:
         if limit > 100:
             limit = 100
 
-        # Get branches
-        branches_cursor = db.branches.find(branch_query).skip(skip).limit(limit)
-        branches = await branches_cursor.to_list(limit)
+        # Location, page of branches and total count
+        location, branches, total = await asyncio.gather(
+            db.locations.find_one({"id": location_id}),
+            db.branches.find(branch_query).skip(skip).limit(limit).to_list(limit),
+            db.branches.count_documents(branch_query)
+        )
+        if not location:
+            raise HTTPException(status_code=404, detail="Location not found")
 
-        # Get total count
-        total = await db.branches.count_documents(branch_query)
+        # Active courses and their categories for the whole page, one query each
+        courses_by_id = {}
+        categories_by_id = {}
+        if include_courses:
+            course_ids = list({
+                course_id
+                for branch in branches
+                for course_id in branch.get("assignments", {}).get("courses", [])
+            })
+            if course_ids:
+                courses = await db.courses.find({
+                    "id": {"$in": course_ids},
+                    "settings.active": True
+                }).to_list(length=None)
+                courses_by_id = {course["id"]: course for course in courses}
+                category_ids = list({course["category_id"] for course in courses})
+                categories = await db.categories.find({"id": {"$in": category_ids}}, {"_id": 0, "id": 1, "name": 1}).to_list(length=None)
+                categories_by_id = {category["id"]: category for category in categories}
 
         # Enrich branches with course data
         enriched_branches = []
@@ -448,29 +481,23 @@ class LocationController:
             # Get available courses if requested
             available_courses = []
             if include_courses:
-                course_ids = branch.get("assignments", {}).get("courses", [])
-                if course_ids:
-                    courses = await db.courses.find({
-                        "id": {"$in": course_ids},
-                        "settings.active": True
-                    }).to_list(100)
-
-                    for course in courses:
-                        # Get category info
-                        category = await db.categories.find_one({"id": course["category_id"]})
-
-                        course_data = {
-                            "id": course["id"],
-                            "title": course["title"],
-                            "code": course["code"],
-                            "category": category["name"] if category else "Unknown",
-                            "difficulty_level": course["difficulty_level"],
-                            "pricing": {
-                                "currency": course.get("pricing", {}).get("currency", "INR"),
-                                "amount": course.get("pricing", {}).get("amount", 0)
-                            }
+                # Each branch previously returned at most 100 courses
+                branch_course_ids = dict.fromkeys(branch.get("assignments", {}).get("courses", []))
+                for course in [courses_by_id[c] for c in branch_course_ids if c in courses_by_id][:100]:
+                    category = categories_by_id.get(course["category_id"])
+
+                    course_data = {
+                        "id": course["id"],
+                        "title": course["title"],
+                        "code": course["code"],
+                        "category": category["name"] if category else "Unknown",
+                        "difficulty_level": course["difficulty_level"],
+                        "pricing": {
+                            "currency": course.get("pricing", {}).get("currency", "INR"),
+                            "amount": course_base_price(course)
                         }
-                        available_courses.append(course_data)
+                    }
+                    available_courses.append(course_data)
 
             # Get timings if requested
             timings = []
@@ -1,23 +1,40 @@
 from fastapi import HTTPException, Depends, status
 from datetime import datetime, timedelta
+import asyncio
+import logging
+import base64
+import json
 import uuid
 import secrets
+from contextlib import aclosing
 
 from models.payment_models import PaymentStatus, PaymentType, PaymentMethod, Payment, RegistrationPaymentCreate, RegistrationPaymentResponse
 from models.student_models import StudentPaymentCreate, CoursePaymentInfo
 from models.user_models import UserRole, UserCreate
 from models.notification_models import PaymentNotification, PaymentNotificationCreate
-from utils.auth import require_role
+from utils.auth import require_role, hash_password
 from utils.database import get_db
 from utils.helpers import send_whatsapp
+from utils.cache import invalidate_student_profiles, invalidate_payment_stats, payment_stats_cache
+from utils.enrollment_counts import record_enrollment_created
+from utils.payment_students import student_display_name
+from utils.overdue_sweeper import refresh_payment_restriction
+from utils.pricing import get_price_matrix, PRICE_MATRIX_MISS_REFRESH_SECONDS
+from utils.transactions import run_transaction, supports_transactions
+from utils.post_commit import post_commit_action, post_commit_entry, record_post_commit, wake_post_commit_worker
+from utils.notification_stream import payment_notification_hub, inc_unread_count, get_unread_count, stream_events
+from utils.jobs import create_job, claim_job, get_job, save_job_progress, start_job
+from utils.payment_dues import get_outstanding_dues, MAX_DUES_PAGE_SIZE
+from utils.payment_reminders import run_payment_reminders, resumable_job_query, REMINDER_JOB_TYPE
 
 class PaymentController:
     @staticmethod
     async def student_process_payment(
         payment_data: StudentPaymentCreate,
-        current_user: dict = Depends(require_role([UserRole.STUDENT]))
+        current_user: dict = Depends(require_role([UserRole.STUDENT], allow_payment_restricted=True))
     ):
         """Allow a student to process a payment for their enrollment."""
+        db = get_db()
         student_id = current_user["id"]
 
         # Validate enrollment and payment
@@ -25,13 +42,13 @@ class PaymentController:
         if not enrollment:
             raise HTTPException(status_code=404, detail="Enrollment not found or does not belong to you.")
 
-        # Find the pending payment for this enrollment
+        # Find the pending (or, once past its due date, overdue) payment for this enrollment
         # This assumes there's a specific pending payment the student is trying to clear
         # In a real system, you might have a more complex payment reconciliation logic
         pending_payment = await db.payments.find_one({
             "enrollment_id": payment_data.enrollment_id,
             "student_id": student_id,
-            "payment_status": PaymentStatus.PENDING.value,
+            "payment_status": {"$in": [PaymentStatus.PENDING.value, PaymentStatus.OVERDUE.value]},
             "amount": payment_data.amount  # Ensure the amount matches
         })
 
@@ -62,6 +79,9 @@ class PaymentController:
             {"id": enrollment["id"]},
             {"$set": {"payment_status": PaymentStatus.PAID}}  # Simplified: mark enrollment paid if this payment clears it
         )
+        await refresh_payment_restriction(db, student_id)
+        invalidate_student_profiles(student_id)
+        invalidate_payment_stats()
 
         # Send payment confirmation
         await send_whatsapp(current_user["phone"], f"Payment of ₹{payment_data.amount} received for enrollment {payment_data.enrollment_id}. Thank you!")
@@ -77,64 +97,16 @@ class PaymentController:
             if db is None:
                 raise HTTPException(status_code=500, detail="Database connection not available")
 
-            # Get course details
-            course = await db.courses.find_one({"id": course_id})
-            if not course:
+            # Quotes come from the in-memory price matrix; only an unknown course or branch rebuilds it early
+            matrix = await get_price_matrix(db)
+            if course_id not in matrix.courses or branch_id not in matrix.branch_names:
+                matrix = await get_price_matrix(db, max_age_seconds=PRICE_MATRIX_MISS_REFRESH_SECONDS)
+            if course_id not in matrix.courses:
                 raise HTTPException(status_code=404, detail="Course not found")
-
-            # Get branch details
-            branch = await db.branches.find_one({"id": branch_id})
-            if not branch:
+            if branch_id not in matrix.branch_names:
                 raise HTTPException(status_code=404, detail="Branch not found")
 
-            # Get category details
-            category = await db.categories.find_one({"id": course.get("category_id")}) if course.get("category_id") else None
-
-            # Get duration details for pricing multiplier
-            # Try to find by ID first, then by code
-            duration_info = await db.durations.find_one({"id": duration})
-            if not duration_info:
-                duration_info = await db.durations.find_one({"code": duration})
-
-            pricing_multiplier = duration_info.get("pricing_multiplier", 1.0) if duration_info else 1.0
-            duration_name = duration_info.get("name", duration) if duration_info else duration
-
-            # Calculate pricing - handle different pricing structures
-            base_price = 15000  # Default base price
-            if course.get("pricing"):
-                if isinstance(course["pricing"], dict):
-                    base_price = course["pricing"].get("amount", base_price)
-                elif isinstance(course["pricing"], (int, float)):
-                    base_price = course["pricing"]
-            elif course.get("price"):
-                base_price = course["price"]
-            elif course.get("fee"):
-                base_price = course["fee"]
-
-            course_fee = float(base_price) * pricing_multiplier
-            admission_fee = 500.0  # Fixed admission fee
-            total_amount = course_fee + admission_fee
-
-            # Import PaymentCalculation
-            from models.student_models import PaymentCalculation
-
-            # Create pricing calculation
-            pricing = PaymentCalculation(
-                course_fee=course_fee,
-                admission_fee=admission_fee,
-                total_amount=total_amount,
-                currency="INR",
-                duration_multiplier=pricing_multiplier
-            )
-
-            return CoursePaymentInfo(
-                course_id=course_id,
-                course_name=course.get("title", course.get("name", "Course")),
-                category_name=category.get("name", "Category") if category else "Category",
-                branch_name=branch.get("name", branch.get("branch", {}).get("name", "Branch")),
-                duration=duration_name,
-                pricing=pricing
-            )
+            return matrix.quote(course_id, branch_id, duration)
 
         except HTTPException:
             raise
@@ -146,33 +118,55 @@ class PaymentController:
     async def process_registration_payment(payment_data: RegistrationPaymentCreate):
         """Process payment for student registration"""
         db = get_db()
+        written = False
 
         try:
-            # Get payment information
-            payment_info = await PaymentController.get_course_payment_info(
-                payment_data.course_id,
-                payment_data.branch_id,
-                payment_data.duration
+            # Generate password if not provided
+            if not payment_data.student_data.get("password"):
+                payment_data.student_data["password"] = secrets.token_urlsafe(8)
+            user_data = UserCreate(**payment_data.student_data)
+
+            # Independent steps run together: the quote (in memory), the duplicate check and the
+            # password hash, which runs off the event loop
+            payment_info, existing_user, hashed_password = await asyncio.gather(
+                PaymentController.get_course_payment_info(
+                    payment_data.course_id,
+                    payment_data.branch_id,
+                    payment_data.duration
+                ),
+                db.users.find_one({"$or": [{"email": user_data.email}, {"phone": user_data.phone}]}, {"_id": 0, "id": 1}),
+                asyncio.to_thread(hash_password, user_data.password)
             )
+            if existing_user:
+                raise HTTPException(status_code=400, detail="User with this email or phone already exists")
 
             # Generate transaction ID
             transaction_id = f"TXN{datetime.utcnow().strftime('%Y%m%d')}{secrets.token_hex(4).upper()}"
 
-            # Create user first
             from controllers.auth_controller import AuthController
+            from models.enrollment_models import Enrollment
 
-            # Generate password if not provided
-            if not payment_data.student_data.get("password"):
-                payment_data.student_data["password"] = secrets.token_urlsafe(8)
+            user_dict = AuthController.build_user_document(user_data, hashed_password)
+            student_id = user_dict["id"]
 
-            # Create user account
-            user_create_data = UserCreate(**payment_data.student_data)
-            user_result = await AuthController.register_user(user_create_data, None)
-            student_id = user_result["user_id"]
+            enrollment = Enrollment(
+                student_id=student_id,
+                course_id=payment_data.course_id,
+                branch_id=payment_data.branch_id,
+                start_date=datetime.utcnow(),
+                end_date=datetime.utcnow() + timedelta(days=365),  # Default 1 year
+                fee_amount=payment_info.pricing.course_fee,
+                admission_fee=payment_info.pricing.admission_fee,
+                payment_status="paid",
+                enrollment_date=datetime.utcnow(),
+                is_active=True
+            )
 
             # Create payment record
             payment = Payment(
                 student_id=student_id,
+                student_name=student_display_name(user_dict),
+                enrollment_id=enrollment.id,
                 amount=payment_info.pricing.total_amount,
                 payment_type=PaymentType.REGISTRATION_FEE,
                 payment_method=payment_data.payment_method,
@@ -193,45 +187,41 @@ class PaymentController:
                 }
             )
 
-            await db.payments.insert_one(payment.dict())
-
-            # Create enrollment record if not already created by registration
-            enrollment_id = user_result.get("enrollment_id")
-            if not enrollment_id:
-                from models.enrollment_models import Enrollment
-
-                enrollment = Enrollment(
-                    student_id=student_id,
-                    course_id=payment_data.course_id,
-                    branch_id=payment_data.branch_id,
-                    start_date=datetime.utcnow(),
-                    end_date=datetime.utcnow() + timedelta(days=365),  # Default 1 year
-                    fee_amount=payment_info.pricing.course_fee,
-                    admission_fee=payment_info.pricing.admission_fee,
-                    payment_status="paid",
-                    enrollment_date=datetime.utcnow(),
-                    is_active=True
-                )
-
-                await db.enrollments.insert_one(enrollment.dict())
-                enrollment_id = enrollment.id
-
-            # Create notification for superadmin
+            # Notifications and messages don't hold up the response: they go to the outbox
             student_data = {
                 "id": student_id,
-                "full_name": payment_data.student_data.get("full_name", ""),
-                "email": payment_data.student_data.get("email", ""),
-                "phone": payment_data.student_data.get("phone", "")
+                "full_name": user_dict["full_name"],
+                "email": user_dict["email"],
+                "phone": user_dict["phone"]
             }
-            await PaymentController.create_payment_notification(
-                payment.id, student_id, payment_info, student_data
-            )
-
-            # Send confirmation message
-            phone = payment_data.student_data.get("phone", "")
-            if phone:
+            side_effects = [
+                post_commit_entry(
+                    "payment_notification", payment_id=payment.id, student_id=student_id,
+                    payment_info=payment_info.dict(), student_data=student_data
+                ),
+                post_commit_entry("send_sms", phone=user_dict["phone"], message=AuthController.welcome_sms(user_data, user_dict, enrolled=True)),
+                post_commit_entry(
+                    "log_activity", action="user_registration", user_id=student_id, user_name=user_dict["full_name"],
+                    details={"email": user_dict["email"], "role": user_dict["role"]}
+                )
+            ]
+            if user_dict["phone"]:
                 message = f"Welcome! Your registration is complete. Payment of ₹{payment_info.pricing.total_amount} received. Transaction ID: {transaction_id}"
-                await send_whatsapp(phone, message)
+                side_effects.append(post_commit_entry("send_whatsapp", phone=user_dict["phone"], message=message))
+
+            # The user, payment, enrollment and their side effects are committed together or not at all
+            async def write_registration(session):
+                nonlocal written
+                written = True
+                await db.users.insert_one(user_dict, session=session)
+                await db.payments.insert_one(payment.dict(), session=session)
+                await db.enrollments.insert_one(enrollment.dict(), session=session)
+                await record_post_commit(db, side_effects, session=session)
+                await record_enrollment_created(db, enrollment.dict(), session=session)
+
+            await run_transaction(db, write_registration)
+            invalidate_payment_stats()
+            wake_post_commit_worker()
 
             return RegistrationPaymentResponse(
                 payment_id=payment.id,
@@ -243,6 +233,11 @@ class PaymentController:
             )
 
         except Exception as e:
+            # Without transactions, undo whatever part of the registration was written
+            if written and not await supports_transactions(db):
+                await PaymentController._undo_registration(
+                    db, student_id, payment.id, enrollment.id, [entry["id"] for entry in side_effects]
+                )
             # Handle payment failure
             raise HTTPException(
                 status_code=400,
@@ -250,9 +245,28 @@ class PaymentController:
             )
 
     @staticmethod
-    async def create_payment_notification(payment_id: str, student_id: str, payment_info: CoursePaymentInfo, student_data: dict):
-        """Create notification for superadmin about new payment"""
+    async def _undo_registration(db, student_id: str, payment_id: str, enrollment_id: str, outbox_ids: list):
+        """Remove a partially written registration on a server without transactions.
+
+        Counter updates are the last write, so a failed registration never counted its
+        enrollment fully; the nightly counter check repairs a half-applied increment.
+        """
+        try:
+            await asyncio.gather(
+                db.users.delete_one({"id": student_id}),
+                db.payments.delete_one({"id": payment_id}),
+                db.enrollments.delete_one({"id": enrollment_id}),
+                db.post_commit_outbox.delete_many({"id": {"$in": outbox_ids}})
+            )
+        except Exception as e:
+            logging.error(f"Could not undo partial registration of {student_id}: {e}")
+
+    @staticmethod
+    @post_commit_action("payment_notification")
+    async def create_payment_notification(payment_id: str, student_id: str, payment_info: dict, student_data: dict):
+        """Create notification for superadmin about new payment (run from the post-commit outbox)"""
         db = get_db()
+        payment_info = CoursePaymentInfo(**payment_info)
 
         notification = PaymentNotification(
             payment_id=payment_id,
@@ -266,7 +280,12 @@ class PaymentController:
             priority="high"
         )
 
-        await db.payment_notifications.insert_one(notification.dict())
+        document = notification.dict()
+        await db.payment_notifications.insert_one(document)
+        unread_count = await inc_unread_count(db, 1)
+        document.pop("_id", None)
+        payment_notification_hub.publish_local("notification", document)
+        payment_notification_hub.publish_local("unread_count", {"unread_count": unread_count})
         return notification
 
     @staticmethod
@@ -279,27 +298,12 @@ class PaymentController:
                 raise HTTPException(status_code=500, detail="Database connection not available")
 
             # Get notifications with proper error handling
-            notifications = await db.payment_notifications.find(
+            return await db.payment_notifications.find(
                 {},
+                {"_id": 0},
                 sort=[("created_at", -1)]
             ).skip(skip).limit(limit).to_list(limit)
 
-            # Convert MongoDB documents to JSON-serializable format
-            serialized_notifications = []
-            for notification in notifications:
-                # Convert ObjectId and datetime objects to strings
-                serialized_notif = {}
-                for key, value in notification.items():
-                    if key == "_id":
-                        continue  # Skip MongoDB ObjectId
-                    elif hasattr(value, 'isoformat'):  # datetime objects
-                        serialized_notif[key] = value.isoformat()
-                    else:
-                        serialized_notif[key] = value
-                serialized_notifications.append(serialized_notif)
-
-            return serialized_notifications
-
         except Exception as e:
             print(f"Error in get_payment_notifications: {e}")
             import traceback
@@ -312,8 +316,9 @@ class PaymentController:
         """Mark a notification as read"""
         db = get_db()
 
+        # Only the first read of a notification changes the unread count
         result = await db.payment_notifications.update_one(
-            {"id": notification_id},
+            {"id": notification_id, "is_read": {"$ne": True}},
             {
                 "$set": {
                     "is_read": True,
@@ -323,125 +328,196 @@ class PaymentController:
         )
 
         if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Notification not found")
+            if not await db.payment_notifications.find_one({"id": notification_id}, {"_id": 0, "id": 1}):
+                raise HTTPException(status_code=404, detail="Notification not found")
+        else:
+            unread_count = await inc_unread_count(db, -1)
+            payment_notification_hub.publish_local("unread_count", {"unread_count": unread_count})
 
         return {"message": "Notification marked as read"}
 
+    @staticmethod
+    async def get_unread_notification_count():
+        """Unread payment notifications, for the dashboard badge"""
+        return {"unread_count": await get_unread_count(get_db())}
+
+    @staticmethod
+    async def stream_payment_notifications():
+        """Live (event, data) pairs for the dashboard, starting with the unread count; None when idle"""
+        yield "unread_count", {"unread_count": await get_unread_count(get_db())}
+        async with aclosing(stream_events()) as events:
+            async for event in events:
+                yield event
+
     @staticmethod
     async def get_payment_stats():
         """Get payment statistics for dashboard"""
-        db = get_db()
+        cached = payment_stats_cache.get("stats")
+        if cached is not None:
+            return cached
 
-        # Get total collected (paid payments)
-        total_collected_pipeline = [
-            {"$match": {"payment_status": PaymentStatus.PAID.value}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        total_collected_result = await db.payments.aggregate(total_collected_pipeline).to_list(1)
-        total_collected = total_collected_result[0]["total"] if total_collected_result else 0
+        db = get_db()
 
-        # Get pending payments
-        pending_payments_pipeline = [
-            {"$match": {"payment_status": PaymentStatus.PENDING.value}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        pending_payments_result = await db.payments.aggregate(pending_payments_pipeline).to_list(1)
-        pending_payments = pending_payments_result[0]["total"] if pending_payments_result else 0
+        def total(stages):
+            return [*stages, {"$group": {"_id": None, "total": {"$sum": "$amount"}}}]
 
-        # Get this month's collection
-        from datetime import datetime
+        # Total collected, outstanding (pending or overdue) and this month's collection in one pass over payments
         current_month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        this_month_pipeline = [
-            {
-                "$match": {
+        outstanding = [PaymentStatus.PENDING.value, PaymentStatus.OVERDUE.value]
+        stats_pipeline = [
+            {"$match": {"payment_status": {"$in": [PaymentStatus.PAID.value, *outstanding]}}},
+            {"$facet": {
+                "total_collected": total([{"$match": {"payment_status": PaymentStatus.PAID.value}}]),
+                "pending_payments": total([{"$match": {"payment_status": {"$in": outstanding}}}]),
+                "this_month_collection": total([{"$match": {
                     "payment_status": PaymentStatus.PAID.value,
                     "payment_date": {"$gte": current_month_start}
-                }
-            },
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+                }}])
+            }}
         ]
-        this_month_result = await db.payments.aggregate(this_month_pipeline).to_list(1)
-        this_month_collection = this_month_result[0]["total"] if this_month_result else 0
 
-        # Get total students count
-        total_students = await db.users.count_documents({"role": "student"})
+        # Get total students count alongside
+        facets, total_students = await asyncio.gather(
+            db.payments.aggregate(stats_pipeline).to_list(1),
+            db.users.count_documents({"role": "student"})
+        )
+        facet = facets[0] if facets else {}
+
+        def facet_total(name):
+            rows = facet.get(name) or []
+            return rows[0]["total"] if rows else 0
 
-        return {
-            "total_collected": total_collected,
-            "pending_payments": pending_payments,
-            "this_month_collection": this_month_collection,
+        stats = {
+            "total_collected": facet_total("total_collected"),
+            "pending_payments": facet_total("pending_payments"),
+            "this_month_collection": facet_total("this_month_collection"),
             "total_students": total_students
         }
+        payment_stats_cache.set("stats", stats)
+        return stats
+
+    @staticmethod
+    def _encode_cursor(payment: dict) -> str:
+        """Opaque keyset cursor pointing just past ``payment`` in (created_at, id) descending order"""
+        created_at = payment.get("created_at")
+        # Legacy payments without a date sort last and are paged by id alone
+        position = {"created_at": created_at.isoformat() if isinstance(created_at, datetime) else None, "id": payment["id"]}
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
 
     @staticmethod
-    async def get_payments(skip: int = 0, limit: int = 50, status: str = None, payment_type: str = None):
-        """Get payments with filtering and student information"""
+    def _decode_cursor(cursor: str) -> dict:
         try:
-            db = get_db()
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            created_at = datetime.fromisoformat(position["created_at"]) if position["created_at"] is not None else None
+            payment_id = position["id"]
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if created_at is None:
+            return {"created_at": None, "id": {"$lt": payment_id}}
+        return {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": payment_id}},
+            # $lt never matches a missing date, but those payments still follow every dated one
+            {"created_at": None}
+        ]}
 
-            if db is None:
-                raise HTTPException(status_code=500, detail="Database connection not available")
+    @staticmethod
+    async def get_payments(skip: int = 0, limit: int = 50, status: str = None, payment_type: str = None, cursor: str = None):
+        """Get payments with filtering and student information.
+
+        Pages are read newest first from the payments indexes (see utils/indexes.py), so
+        sorting and paging never wait on a join. Pass the returned ``next_cursor`` as
+        ``cursor`` for keyset pagination; ``skip`` is still honoured for offset paging,
+        but not together with a cursor.
+        """
+        db = get_db()
 
-            # Build filter query
-            filter_query = {}
-            if status and status != "all":
-                filter_query["payment_status"] = status
-            if payment_type and payment_type != "all":
-                filter_query["payment_type"] = payment_type
-
-            # Get payments with student information
-            pipeline = [
-                {"$match": filter_query},
-                {
-                    "$lookup": {
-                        "from": "users",
-                        "localField": "student_id",
-                        "foreignField": "id",
-                        "as": "student_info"
-                    }
-                },
-                {"$unwind": {"path": "$student_info", "preserveNullAndEmptyArrays": True}},
-                {
-                    "$project": {
-                        "id": 1,
-                        "student_id": 1,
-                        "student_name": {"$ifNull": ["$student_info.full_name", {"$concat": ["$student_info.first_name", " ", "$student_info.last_name"]}]},
-                        "amount": 1,
-                        "payment_type": 1,
-                        "payment_method": 1,
-                        "payment_status": 1,
-                        "transaction_id": 1,
-                        "payment_date": 1,
-                        "course_name": {"$ifNull": ["$course_details.course_name", None]},
-                        "branch_name": {"$ifNull": ["$branch_details.branch_name", None]},
-                        "created_at": 1
-                    }
-                },
-                {"$sort": {"created_at": -1}},
-                {"$skip": skip},
-                {"$limit": limit}
-            ]
+        if db is None:
+            raise HTTPException(status_code=500, detail="Database connection not available")
+        if cursor and skip:
+            raise HTTPException(status_code=400, detail="skip can't be combined with cursor")
+
+        # Build filter query
+        filter_query = {}
+        if status and status != "all":
+            filter_query["payment_status"] = status
+        if payment_type and payment_type != "all":
+            filter_query["payment_type"] = payment_type
+        if cursor:
+            filter_query.update(PaymentController._decode_cursor(cursor))
+
+        payments = await db.payments.find(
+            filter_query,
+            {
+                "_id": 0, "id": 1, "student_id": 1, "student_name": 1, "amount": 1, "payment_type": 1,
+                "payment_method": 1, "payment_status": 1, "transaction_id": 1, "payment_date": 1,
+                "course_details.course_name": 1, "branch_details.branch_name": 1, "created_at": 1
+            }
+        ).sort([("created_at", -1), ("id", -1)]).skip(skip).limit(limit).to_list(limit)
+
+        # Payments written before student_name was stored: one lookup for this page only
+        missing_ids = list({payment["student_id"] for payment in payments if payment.get("student_name") is None})
+        if missing_ids:
+            students = await db.users.find(
+                {"id": {"$in": missing_ids}},
+                {"_id": 0, "id": 1, "full_name": 1, "first_name": 1, "last_name": 1}
+            ).to_list(length=None)
+            names = {student["id"]: student_display_name(student) for student in students}
+            for payment in payments:
+                if payment.get("student_name") is None:
+                    payment["student_name"] = names.get(payment["student_id"])
 
-            payments = await db.payments.aggregate(pipeline).to_list(limit)
+        for payment in payments:
+            payment["course_name"] = (payment.pop("course_details", None) or {}).get("course_name")
+            payment["branch_name"] = (payment.pop("branch_details", None) or {}).get("branch_name")
 
-            # Convert MongoDB documents to JSON-serializable format
-            serialized_payments = []
-            for payment in payments:
-                # Convert ObjectId and datetime objects to strings
-                serialized_payment = {}
-                for key, value in payment.items():
-                    if key == "_id":
-                        continue  # Skip MongoDB ObjectId
-                    elif hasattr(value, 'isoformat'):  # datetime objects
-                        serialized_payment[key] = value.isoformat()
-                    else:
-                        serialized_payment[key] = value
-                serialized_payments.append(serialized_payment)
-
-            return {"payments": serialized_payments}
+        next_cursor = PaymentController._encode_cursor(payments[-1]) if len(payments) == limit else None
+        # FastAPI serializes the datetimes, so the documents are returned as read
+        return {"payments": payments, "next_cursor": next_cursor}
 
-        except Exception as e:
-            print(f"Error in get_payments: {e}")
-            import traceback
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    @staticmethod
+    async def get_outstanding_dues(current_user: dict, branch_id: str = None, skip: int = 0, limit: int = 50):
+        """Outstanding dues per student with per-branch totals and aging buckets; students only see their own"""
+        student_id = current_user["id"] if current_user["role"] == UserRole.STUDENT.value else None
+        limit = min(max(limit, 1), MAX_DUES_PAGE_SIZE)
+        return await get_outstanding_dues(get_db(), student_id=student_id, branch_id=branch_id, skip=max(skip, 0), limit=limit)
+
+    @staticmethod
+    async def send_payment_reminders(current_user: dict, resume_job_id: str = None):
+        """Send one reminder per student with pending/overdue payments, as a background job.
+
+        Pass ``resume_job_id`` to continue a failed or interrupted run from its last finished batch.
+        """
+        db = get_db()
+
+        # Only this run may write the job from now on; a run it takes over stops at its next batch
+        run_id = str(uuid.uuid4())
+        progress = None
+        if resume_job_id:
+            job = await get_job(resume_job_id, db=db)
+            if not job or job.get("type") != REMINDER_JOB_TYPE:
+                raise HTTPException(status_code=404, detail="Reminder job not found")
+            claimed = await claim_job(resume_job_id, run_id, resumable_job_query(), db=db)
+            if not claimed:
+                raise HTTPException(status_code=409, detail=f"Reminder job is {job['status']} and cannot be resumed")
+            job = claimed
+            progress = job.get("progress") or {}
+        else:
+            job = await create_job(REMINDER_JOB_TYPE, created_by=current_user["id"], db=db, owner=run_id)
+
+        async def save_progress(current: dict):
+            await save_job_progress(job["id"], run_id, current, db=db)
+
+        async def run():
+            return await run_payment_reminders(db, progress=progress, on_progress=save_progress)
+
+        start_job(job["id"], run, db=db, owner=run_id)
+        return {"message": "Payment reminders started", "job_id": job["id"], "resumed": bool(resume_job_id)}
+
+    @staticmethod
+    async def get_payment_reminder_job(job_id: str):
+        """Status and progress of a payment reminder run"""
+        job = await get_job(job_id, db=get_db())
+        if not job or job.get("type") != REMINDER_JOB_TYPE:
+            raise HTTPException(status_code=404, detail="Reminder job not found")
+        return job
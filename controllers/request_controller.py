@@ -9,6 +9,8 @@ from models.user_models import UserRole
 from utils.auth import require_role
 from utils.database import db
 from utils.helpers import serialize_doc
+from utils.cache import invalidate_student_profiles
+from utils.enrollment_counts import record_enrollment_created, set_enrollment_active
 
 class RequestController:
     @staticmethod
@@ -72,6 +74,7 @@ class RequestController:
                 {"id": transfer_request["student_id"]},
                 {"$set": {"branch_id": transfer_request["new_branch_id"]}}
             )
+            invalidate_student_profiles(transfer_request["student_id"])
 
         return {"message": "Transfer request updated successfully.", "request": serialize_doc(updated_request)}
 
@@ -143,10 +146,7 @@ class RequestController:
         # If approved, perform the change
         if update_data.status == CourseChangeRequestStatus.APPROVED:
             # 1. Deactivate old enrollment
-            await db.enrollments.update_one(
-                {"id": change_request["current_enrollment_id"]},
-                {"$set": {"is_active": False}}
-            )
+            await set_enrollment_active(db, change_request["current_enrollment_id"], False)
 
             # 2. Create new enrollment
             new_course = await db.courses.find_one({"id": change_request["new_course_id"]})
@@ -172,5 +172,7 @@ class RequestController:
                 admission_fee=0  # No new admission fee for a course change
             )
             await db.enrollments.insert_one(new_enrollment.dict())
+            await record_enrollment_created(db, new_enrollment.dict())
+            invalidate_student_profiles(change_request["student_id"])
 
         return {"message": "Course change request updated successfully.", "request": serialize_doc(updated_request)}
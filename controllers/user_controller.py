@@ -1,26 +1,45 @@
 from fastapi import HTTPException, Depends, Request
 from typing import Optional, List
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import ValidationError
+from pymongo import InsertOne, UpdateOne, UpdateMany
+from pymongo.errors import BulkWriteError
+import asyncio
+import csv
+import io
 import secrets
 import uuid
 
-from models.user_models import UserCreate, UserUpdate, BaseUser, UserRole
+from models.payment_models import PaymentStatus
+from models.user_models import (
+    UserCreate, UserUpdate, BaseUser, UserRole,
+    BulkUserSelection, BulkUserUpdate, BulkUserTransfer
+)
 from utils.auth import hash_password, require_role, get_current_active_user
 from utils.unified_auth import require_role_unified, get_current_user_or_superadmin
 from utils.database import get_db
 from utils.helpers import serialize_doc, log_activity, send_sms, send_whatsapp
+from utils.jobs import create_job, start_job, get_job
+from utils.cache import student_profile_cache, invalidate_student_profiles
+from utils.enrollment_counts import (
+    record_enrollment_created, record_enrollments_created, set_enrollment_active, recount_enrollment_counters
+)
+from utils.payment_students import sync_payment_student_name
+
+# Bulk import tuning
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_ROWS = 10000
+
+# Bulk update/deactivate/transfer tuning
+BULK_BATCH_SIZE = 500
+MAX_BULK_USERS = 10000
+_password_hash_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="password-hash")
 
 class UserController:
     @staticmethod
-    async def create_user(
-        user_data: UserCreate,
-        request: Request,
-        current_user: dict = None
-    ):
-        """Create new user (Super Admin or Coach Admin)"""
-        if not current_user:
-            raise HTTPException(status_code=401, detail="Authentication required")
-            
+    def _check_create_permission(current_user: dict, user_data: UserCreate):
+        """Raise if the current user may not create ``user_data``"""
         # Get current user role as enum
         current_role = current_user.get("role")
         if isinstance(current_role, str):
@@ -28,7 +47,7 @@ class UserController:
                 current_role = UserRole(current_role)
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid user role")
-        
+
         # If a coach admin is creating a user, they must be in the same branch
         if current_role == UserRole.COACH_ADMIN:
             if not current_user.get("branch_id") or user_data.branch_id != current_user["branch_id"]:
@@ -37,20 +56,9 @@ class UserController:
             if user_data.role in [UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN]:
                 raise HTTPException(status_code=403, detail="Coach Admins cannot create other admin users.")
 
-        # Check if user exists
-        db = get_db()
-        existing_user = await db.users.find_one({
-            "$or": [{"email": user_data.email}, {"phone": user_data.phone}]
-        })
-        if existing_user:
-            raise HTTPException(status_code=400, detail="User already exists")
-        
-        # Generate password if not provided
-        if not user_data.password:
-            user_data.password = secrets.token_urlsafe(8)
-
-        hashed_password = hash_password(user_data.password)
-
+    @staticmethod
+    def _build_user_document(user_data: UserCreate, hashed_password: str) -> dict:
+        """Build the users collection document for a new user"""
         # Generate full name from first and last name
         full_name = f"{user_data.first_name} {user_data.last_name}".strip()
 
@@ -94,6 +102,35 @@ class UserController:
             if not user_dict.get("branch_id"):
                 user_dict["branch_id"] = user_data.branch.branch_id
 
+        return user_dict
+
+    @staticmethod
+    async def create_user(
+        user_data: UserCreate,
+        request: Request,
+        current_user: dict = None
+    ):
+        """Create new user (Super Admin or Coach Admin)"""
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Authentication required")
+            
+        UserController._check_create_permission(current_user, user_data)
+
+        # Check if user exists
+        db = get_db()
+        existing_user = await db.users.find_one({
+            "$or": [{"email": user_data.email}, {"phone": user_data.phone}]
+        })
+        if existing_user:
+            raise HTTPException(status_code=400, detail="User already exists")
+        
+        # Generate password if not provided
+        if not user_data.password:
+            user_data.password = secrets.token_urlsafe(8)
+
+        hashed_password = hash_password(user_data.password)
+        user_dict = UserController._build_user_document(user_data, hashed_password)
+
         await db.users.insert_one(user_dict)
 
         # Create enrollment record if course information is provided (for students)
@@ -118,6 +155,7 @@ class UserController:
                 )
 
                 enrollment_result = await db.enrollments.insert_one(enrollment.dict())
+                await record_enrollment_created(db, enrollment.dict())
                 enrollment_id = enrollment.id
 
             except Exception as e:
@@ -143,6 +181,241 @@ class UserController:
 
         return response_data
 
+    @staticmethod
+    def parse_import_csv(content: str) -> List[dict]:
+        """Parse a CSV upload into import rows.
+
+        Dotted headers such as ``course.course_id`` or ``branch.branch_id`` are
+        expanded into the nested objects accepted by UserCreate; empty cells
+        are treated as missing values.
+        """
+        rows = []
+        for record in csv.DictReader(io.StringIO(content)):
+            row = {}
+            for key, value in record.items():
+                if not key or value is None or value.strip() == "":
+                    continue
+                target = row
+                parts = key.strip().split(".")
+                for part in parts[:-1]:
+                    target = target.setdefault(part, {})
+                target[parts[-1]] = value.strip()
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    async def _hash_passwords(passwords: List[str]) -> List[str]:
+        """Hash passwords concurrently in the worker pool (bcrypt releases the GIL)"""
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*[
+            loop.run_in_executor(_password_hash_pool, hash_password, password)
+            for password in passwords
+        ])
+
+    @staticmethod
+    async def _import_user_batch(db, batch: List[tuple], report: List[dict], send_credentials: bool):
+        """Create one batch of validated (row_number, UserCreate) pairs"""
+        # One $in query per batch to find users that already exist
+        emails = [user_data.email for _, user_data in batch]
+        phones = [user_data.phone for _, user_data in batch]
+        existing = await db.users.find(
+            {"$or": [{"email": {"$in": emails}}, {"phone": {"$in": phones}}]},
+            {"email": 1, "phone": 1}
+        ).to_list(length=None)
+        existing_emails = {user.get("email") for user in existing}
+        existing_phones = {user.get("phone") for user in existing}
+
+        new_users = []
+        for row_number, user_data in batch:
+            if user_data.email in existing_emails or user_data.phone in existing_phones:
+                report.append({
+                    "row": row_number,
+                    "status": "duplicate",
+                    "email": user_data.email,
+                    "errors": ["User already exists"]
+                })
+                continue
+            if not user_data.password:
+                user_data.password = secrets.token_urlsafe(8)
+            new_users.append((row_number, user_data))
+
+        if not new_users:
+            return
+
+        hashed_passwords = await UserController._hash_passwords([u.password for _, u in new_users])
+        user_docs = [
+            UserController._build_user_document(user_data, hashed_password)
+            for (_, user_data), hashed_password in zip(new_users, hashed_passwords)
+        ]
+
+        failed_rows = {}
+        try:
+            await db.users.insert_many(user_docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed_rows[error["index"]] = error.get("errmsg", "Insert failed")
+
+        from models.enrollment_models import Enrollment, PaymentStatus
+
+        enrollments = []
+        enrollment_results = []
+        created = []
+        for index, ((row_number, user_data), user_dict) in enumerate(zip(new_users, user_docs)):
+            if index in failed_rows:
+                report.append({
+                    "row": row_number,
+                    "status": "failed",
+                    "email": user_data.email,
+                    "errors": [failed_rows[index]]
+                })
+                continue
+
+            result = {"row": row_number, "status": "created", "email": user_data.email, "user_id": user_dict["id"]}
+            if user_data.course and user_data.branch and user_data.role == UserRole.STUDENT:
+                enrollment = Enrollment(
+                    student_id=user_dict["id"],
+                    course_id=user_data.course.course_id,
+                    branch_id=user_data.branch.branch_id,
+                    start_date=datetime.utcnow(),
+                    end_date=datetime.utcnow() + timedelta(days=365),  # Default 1 year
+                    fee_amount=0.0,  # Will be updated when payment is processed
+                    admission_fee=0.0,  # Will be updated when payment is processed
+                    payment_status=PaymentStatus.PENDING,
+                    enrollment_date=datetime.utcnow(),
+                    is_active=True
+                )
+                enrollments.append(enrollment.dict())
+                enrollment_results.append(result)
+                result["enrollment_id"] = enrollment.id
+            report.append(result)
+            created.append((user_dict, user_data.password))
+
+        if enrollments:
+            # Users are already created; enrollment failures are reported on their rows without failing the import
+            failed_enrollments = {}
+            try:
+                await db.enrollments.insert_many(enrollments, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    failed_enrollments[error["index"]] = error.get("errmsg", "Enrollment insert failed")
+            except Exception as e:
+                print(f"❌ Error creating bulk enrollment records: {e}")
+                failed_enrollments = {index: str(e) for index in range(len(enrollments))}
+
+            for index, error in failed_enrollments.items():
+                result = enrollment_results[index]
+                result.pop("enrollment_id", None)
+                result["enrollment_error"] = error
+            inserted = [enrollment for index, enrollment in enumerate(enrollments) if index not in failed_enrollments]
+            if inserted:
+                try:
+                    await record_enrollments_created(db, inserted)
+                except Exception as e:
+                    # The enrollments exist; the nightly counter check repairs the counts
+                    print(f"❌ Error counting bulk enrollment records: {e}")
+
+        if send_credentials and created:
+            await asyncio.gather(*[
+                send_sms(user_dict["phone"], f"Account created. Email: {user_dict['email']}, Password: {password}")
+                for user_dict, password in created
+            ])
+
+    @staticmethod
+    async def _import_users(rows: List[dict], current_user: dict, send_credentials: bool = True) -> dict:
+        """Validate, de-duplicate and insert import rows, returning a per-row report"""
+        db = get_db()
+        report = []
+        valid = []
+        seen_emails = set()
+        seen_phones = set()
+
+        for row_number, row in enumerate(rows, start=1):
+            try:
+                user_data = UserCreate(**row)
+                UserController._check_create_permission(current_user, user_data)
+            except ValidationError as e:
+                report.append({
+                    "row": row_number,
+                    "status": "invalid",
+                    "email": row.get("email"),
+                    "errors": [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+                })
+                continue
+            except HTTPException as e:
+                report.append({"row": row_number, "status": "invalid", "email": row.get("email"), "errors": [e.detail]})
+                continue
+
+            # Duplicates within the uploaded file itself
+            if user_data.email in seen_emails or user_data.phone in seen_phones:
+                report.append({
+                    "row": row_number,
+                    "status": "duplicate",
+                    "email": user_data.email,
+                    "errors": ["Duplicate email or phone within import"]
+                })
+                continue
+            seen_emails.add(user_data.email)
+            seen_phones.add(user_data.phone)
+            valid.append((row_number, user_data))
+
+        for start in range(0, len(valid), IMPORT_BATCH_SIZE):
+            await UserController._import_user_batch(
+                db, valid[start:start + IMPORT_BATCH_SIZE], report, send_credentials
+            )
+
+        report.sort(key=lambda item: item["row"])
+        summary = {status: 0 for status in ("created", "duplicate", "invalid", "failed")}
+        for item in report:
+            summary[item["status"]] += 1
+        summary["enrollment_failed"] = sum(1 for item in report if "enrollment_error" in item)
+
+        return {"total_rows": len(rows), "summary": summary, "results": report}
+
+    @staticmethod
+    async def bulk_import_users(
+        rows: List[dict],
+        request: Request,
+        current_user: dict = None,
+        send_credentials: bool = True,
+        run_in_background: bool = False
+    ):
+        """Bulk create users from CSV/JSON rows (Super Admin or Coach Admin)"""
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Authentication required")
+        if not rows:
+            raise HTTPException(status_code=400, detail="No users provided for import")
+        if len(rows) > MAX_IMPORT_ROWS:
+            raise HTTPException(status_code=400, detail=f"Imports are limited to {MAX_IMPORT_ROWS} rows")
+
+        async def run_import():
+            result = await UserController._import_users(rows, current_user, send_credentials)
+            await log_activity(
+                request=request,
+                action="admin_bulk_import_users",
+                user_id=current_user["id"],
+                user_name=current_user["full_name"],
+                details={"total_rows": result["total_rows"], **result["summary"]}
+            )
+            return result
+
+        if run_in_background:
+            job = await create_job("user_import", created_by=current_user["id"], details={"total_rows": len(rows)})
+            start_job(job["id"], run_import)
+            return {"message": "User import started", "job_id": job["id"], "status": job["status"]}
+
+        result = await run_import()
+        return {"message": "User import completed", **result}
+
+    @staticmethod
+    async def get_import_job(job_id: str, current_user: dict = None):
+        """Get status and report of a background user import"""
+        job = await get_job(job_id)
+        if not job or job.get("type") != "user_import":
+            raise HTTPException(status_code=404, detail="Import job not found")
+        if current_user.get("role") != UserRole.SUPER_ADMIN.value and job.get("created_by") != current_user.get("id"):
+            raise HTTPException(status_code=403, detail="You can only view your own import jobs")
+        return serialize_doc(job)
+
     @staticmethod
     async def get_users(
         role: Optional[UserRole] = None,
@@ -335,14 +608,14 @@ class UserController:
                         )
 
                         await db.enrollments.insert_one(enrollment.dict())
+                        await record_enrollment_created(db, enrollment.dict())
                         print(f"✅ Created new enrollment: {enrollment.id}")
 
                         # Deactivate other enrollments for this student
                         for old_enrollment in existing_enrollments:
                             if old_enrollment["id"] != enrollment.id:
-                                await db.enrollments.update_one(
-                                    {"id": old_enrollment["id"]},
-                                    {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
+                                await set_enrollment_active(
+                                    db, old_enrollment["id"], False, {"updated_at": datetime.utcnow()}
                                 )
                                 print(f"✅ Deactivated old enrollment: {old_enrollment['id']}")
 
@@ -351,35 +624,8 @@ class UserController:
             # Don't fail the user update if enrollment handling fails
 
     @staticmethod
-    async def update_user(
-        user_id: str,
-        user_update: UserUpdate,
-        request: Request,
-        current_user: dict = None
-    ):
-        """Update user (Super Admin or Coach Admin)"""
-        if not current_user:
-            raise HTTPException(status_code=401, detail="Authentication required")
-            
-        target_user = await get_db().users.find_one({"id": user_id})
-        if not target_user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # Get current user role as enum
-        current_role = current_user.get("role")
-        if isinstance(current_role, str):
-            try:
-                current_role = UserRole(current_role)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid user role")
-
-        if current_role == UserRole.COACH_ADMIN:
-            # Coach Admins can only update students in their own branch
-            if target_user["role"] != UserRole.STUDENT.value:
-                raise HTTPException(status_code=403, detail="Coach Admins can only update student profiles.")
-            if target_user.get("branch_id") != current_user.get("branch_id"):
-                raise HTTPException(status_code=403, detail="Coach Admins can only update students in their own branch.")
-
+    def _build_update_data(user_update: UserUpdate) -> dict:
+        """Convert a UserUpdate into the $set document for the users collection"""
         # Convert user_update to dict and handle date serialization
         update_dict = user_update.dict(exclude_unset=True)
         update_data = {}
@@ -407,6 +653,9 @@ class UserController:
                         "location_id": v.location_id,
                         "branch_id": v.branch_id
                     }
+                # Branch statistics count students by the flat branch_id
+                if update_data["branch"].get("branch_id") and "branch_id" not in update_dict:
+                    update_data["branch_id"] = update_data["branch"]["branch_id"]
             elif k in ["course_category_id", "course_id", "course_duration", "location_id"]:
                 # Handle flat fields for backward compatibility
                 # Convert flat fields to nested structure
@@ -429,6 +678,40 @@ class UserController:
             else:
                 update_data[k] = v
 
+        return update_data
+
+    @staticmethod
+    async def update_user(
+        user_id: str,
+        user_update: UserUpdate,
+        request: Request,
+        current_user: dict = None
+    ):
+        """Update user (Super Admin or Coach Admin)"""
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Authentication required")
+            
+        target_user = await get_db().users.find_one({"id": user_id})
+        if not target_user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        # Get current user role as enum
+        current_role = current_user.get("role")
+        if isinstance(current_role, str):
+            try:
+                current_role = UserRole(current_role)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid user role")
+
+        if current_role == UserRole.COACH_ADMIN:
+            # Coach Admins can only update students in their own branch
+            if target_user["role"] != UserRole.STUDENT.value:
+                raise HTTPException(status_code=403, detail="Coach Admins can only update student profiles.")
+            if target_user.get("branch_id") != current_user.get("branch_id"):
+                raise HTTPException(status_code=403, detail="Coach Admins can only update students in their own branch.")
+
+        update_data = UserController._build_update_data(user_update)
+
         if not update_data:
             raise HTTPException(status_code=400, detail="No update data provided")
 
@@ -452,6 +735,10 @@ class UserController:
             # This case should be rare due to the check above, but it's good practice
             raise HTTPException(status_code=404, detail="User not found")
         
+        # Payments carry the student's name for the payment listings
+        if target_user.get("role") == "student" and {"first_name", "last_name", "full_name"} & update_data.keys():
+            await sync_payment_student_name(get_db(), user_id, {**target_user, **update_data})
+
         await log_activity(
             request=request,
             action="admin_update_user",
@@ -459,6 +746,7 @@ class UserController:
             user_name=current_user["full_name"],
             details={"updated_user_id": user_id, "update_data": user_update.dict(exclude_unset=True)}
         )
+        invalidate_student_profiles(user_id)
 
         return {"message": "User updated successfully"}
 
@@ -534,6 +822,7 @@ class UserController:
 
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
+        invalidate_student_profiles(user_id)
 
         await log_activity(
             request=request,
@@ -545,6 +834,285 @@ class UserController:
 
         return {"message": "User deactivated successfully"}
 
+    @staticmethod
+    def _bulk_selection_query(selection: BulkUserSelection, current_user: dict) -> dict:
+        """Build the users query for a bulk operation, scoped to the caller's permissions"""
+        query = {}
+        if selection.user_ids:
+            if len(selection.user_ids) > MAX_BULK_USERS:
+                raise HTTPException(status_code=400, detail=f"Bulk operations are limited to {MAX_BULK_USERS} user ids")
+            query["id"] = {"$in": list(dict.fromkeys(selection.user_ids))}
+
+        filter_fields = selection.filter.dict(exclude_none=True) if selection.filter else {}
+        if not selection.user_ids and not filter_fields:
+            raise HTTPException(status_code=400, detail="Provide user_ids or at least one filter field")
+        for key, value in filter_fields.items():
+            query[key] = value.value if isinstance(value, UserRole) else value
+
+        # Coach Admins can only manage students in their own branch
+        if current_user.get("role") == UserRole.COACH_ADMIN.value:
+            own_branch = current_user.get("branch_id")
+            if not own_branch or query.get("branch_id", own_branch) != own_branch:
+                raise HTTPException(status_code=403, detail="Coach Admins can only manage students in their own branch.")
+            if query.get("role", UserRole.STUDENT.value) != UserRole.STUDENT.value:
+                raise HTTPException(status_code=403, detail="Coach Admins can only manage student profiles.")
+            query["branch_id"] = own_branch
+            query["role"] = UserRole.STUDENT.value
+
+        return query
+
+    @staticmethod
+    def _bulk_selection_summary(query: dict) -> dict:
+        """Describe a bulk selection for the activity log without its (up to MAX_BULK_USERS) id list"""
+        return {
+            "filter": {key: value for key, value in query.items() if key != "id"},
+            "user_id_count": len(query["id"]["$in"]) if "id" in query else 0
+        }
+
+    @staticmethod
+    async def _iter_user_batches(db, query: dict, projection: dict):
+        """Yield matching users in id order, BULK_BATCH_SIZE at a time"""
+        last_id = None
+        while True:
+            page_query = dict(query)
+            if last_id:
+                id_condition = dict(query.get("id", {}))
+                id_condition["$gt"] = last_id
+                page_query["id"] = id_condition
+            batch = await db.users.find(page_query, {"id": 1, **projection}).sort("id", 1).limit(BULK_BATCH_SIZE).to_list(length=None)
+            if not batch:
+                return
+            yield batch
+            if len(batch) < BULK_BATCH_SIZE:
+                return
+            last_id = batch[-1]["id"]
+
+    @staticmethod
+    async def _run_bulk_user_operation(db, query: dict, projection: dict, build_ops, cascade=None) -> dict:
+        """Apply per-user write operations in bounded bulk_write batches.
+
+        ``build_ops(batch)`` returns the users collection operations for a
+        batch; ``cascade(batch)`` applies related enrollment changes and
+        returns how many enrollment documents it modified.
+        """
+        totals = {"matched": 0, "modified": 0, "enrollments_updated": 0, "batches": 0}
+        async for batch in UserController._iter_user_batches(db, query, projection):
+            operations = build_ops(batch)
+            if operations:
+                result = await db.users.bulk_write(operations, ordered=False)
+                totals["matched"] += result.matched_count
+                totals["modified"] += result.modified_count
+            if cascade:
+                totals["enrollments_updated"] += await cascade(batch)
+            invalidate_student_profiles(*[u["id"] for u in batch])
+            totals["batches"] += 1
+        return totals
+
+    @staticmethod
+    async def _bulk_enrollment_updates(db, student_ids: List[str], course_id: str, branch_id: str) -> int:
+        """Batched equivalent of handle_enrollment_updates for many students"""
+        if not student_ids:
+            return 0
+        from models.enrollment_models import Enrollment, PaymentStatus
+
+        existing_enrollments = await db.enrollments.find({
+            "student_id": {"$in": student_ids},
+            "is_active": True
+        }).to_list(length=None)
+        by_student = {}
+        for enrollment in existing_enrollments:
+            by_student.setdefault(enrollment["student_id"], []).append(enrollment)
+
+        operations = []
+        superseded_ids = []
+        for student_id in student_ids:
+            enrollments = by_student.get(student_id, [])
+            match = next(
+                (e for e in enrollments if e.get("course_id") == course_id and e.get("branch_id") == branch_id),
+                None
+            )
+            if match:
+                operations.append(UpdateOne(
+                    {"id": match["id"]},
+                    {"$set": {"updated_at": datetime.utcnow(), "is_active": True}}
+                ))
+                continue
+            enrollment = Enrollment(
+                student_id=student_id,
+                course_id=course_id,
+                branch_id=branch_id,
+                start_date=datetime.utcnow(),
+                end_date=datetime.utcnow() + timedelta(days=365),
+                fee_amount=0.0,
+                admission_fee=0.0,
+                payment_status=PaymentStatus.PENDING,
+                enrollment_date=datetime.utcnow(),
+                is_active=True
+            )
+            operations.append(InsertOne(enrollment.dict()))
+            superseded_ids.extend(e["id"] for e in enrollments)
+
+        if superseded_ids:
+            operations.append(UpdateMany(
+                {"id": {"$in": superseded_ids}},
+                {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
+            ))
+
+        result = await db.enrollments.bulk_write(operations, ordered=False)
+        await recount_enrollment_counters(
+            db,
+            [course_id] + [e.get("course_id") for e in existing_enrollments],
+            [branch_id] + [e.get("branch_id") for e in existing_enrollments]
+        )
+        return result.inserted_count + result.modified_count
+
+    @staticmethod
+    async def bulk_update_users(
+        bulk_update: BulkUserUpdate,
+        request: Request,
+        current_user: dict = None
+    ):
+        """Apply the same update to many users (Super Admin or Coach Admin)"""
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Authentication required")
+
+        db = get_db()
+        query = UserController._bulk_selection_query(bulk_update, current_user)
+        update_data = UserController._build_update_data(bulk_update.update)
+        if not update_data:
+            raise HTTPException(status_code=400, detail="No update data provided")
+        unique_fields = [field for field in ("email", "phone", "biometric_id") if field in update_data]
+        if unique_fields:
+            raise HTTPException(status_code=400, detail=f"Unique fields cannot be bulk updated: {', '.join(unique_fields)}")
+        update_data["updated_at"] = datetime.utcnow()
+
+        # Enrollment changes follow the same rule as update_user: both course and branch are required
+        course_id = update_data.get("course", {}).get("course_id")
+        branch_id = update_data.get("branch", {}).get("branch_id")
+
+        async def update_student_enrollments(batch):
+            student_ids = [u["id"] for u in batch if u.get("role") == UserRole.STUDENT.value]
+            return await UserController._bulk_enrollment_updates(db, student_ids, course_id, branch_id)
+
+        totals = await UserController._run_bulk_user_operation(
+            db, query, {"role": 1},
+            lambda batch: [UpdateOne({"id": u["id"]}, {"$set": update_data}) for u in batch],
+            update_student_enrollments if course_id and branch_id else None
+        )
+
+        await log_activity(
+            request=request,
+            action="admin_bulk_update_users",
+            user_id=current_user["id"],
+            user_name=current_user["full_name"],
+            details={"selection": UserController._bulk_selection_summary(query), "update_data": bulk_update.update.dict(exclude_unset=True), **totals}
+        )
+
+        return {"message": f"{totals['modified']} users updated successfully", **totals}
+
+    @staticmethod
+    async def bulk_deactivate_users(
+        selection: BulkUserSelection,
+        request: Request,
+        current_user: dict = None
+    ):
+        """Deactivate many users and their active enrollments (Super Admin only)"""
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Authentication required")
+
+        db = get_db()
+        query = UserController._bulk_selection_query(selection, current_user)
+        now = datetime.utcnow()
+
+        async def cascade(batch):
+            enrollment_filter = {"student_id": {"$in": [u["id"] for u in batch]}, "is_active": True}
+            affected = await db.enrollments.find(enrollment_filter, {"_id": 0, "course_id": 1, "branch_id": 1}).to_list(length=None)
+            if not affected:
+                return 0
+            result = await db.enrollments.update_many(enrollment_filter, {"$set": {"is_active": False, "updated_at": now}})
+            await recount_enrollment_counters(
+                db, [e.get("course_id") for e in affected], [e.get("branch_id") for e in affected]
+            )
+            return result.modified_count
+
+        totals = await UserController._run_bulk_user_operation(
+            db, query, {},
+            lambda batch: [UpdateOne({"id": u["id"]}, {"$set": {"is_active": False, "updated_at": now}}) for u in batch],
+            cascade
+        )
+
+        await log_activity(
+            request=request,
+            action="admin_bulk_deactivate_users",
+            user_id=current_user["id"],
+            user_name=current_user["full_name"],
+            details={"selection": UserController._bulk_selection_summary(query), **totals}
+        )
+
+        return {"message": f"{totals['modified']} users deactivated successfully", **totals}
+
+    @staticmethod
+    async def bulk_transfer_users(
+        transfer: BulkUserTransfer,
+        request: Request,
+        current_user: dict = None
+    ):
+        """Move many users to another branch, carrying their active enrollments (Super Admin or Coach Admin)"""
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Authentication required")
+
+        db = get_db()
+        query = UserController._bulk_selection_query(transfer, current_user)
+        new_branch = await db.branches.find_one({"id": transfer.new_branch_id}, {"id": 1})
+        if not new_branch:
+            raise HTTPException(status_code=404, detail="Branch not found")
+        now = datetime.utcnow()
+
+        def build_ops(batch):
+            operations = []
+            for user in batch:
+                update_data = {"branch_id": transfer.new_branch_id, "updated_at": now}
+                # Keep the legacy nested branch object in sync where it exists
+                if isinstance(user.get("branch"), dict):
+                    update_data["branch.branch_id"] = transfer.new_branch_id
+                    if transfer.new_location_id:
+                        update_data["branch.location_id"] = transfer.new_location_id
+                operations.append(UpdateOne({"id": user["id"]}, {"$set": update_data}))
+            return operations
+
+        async def cascade(batch):
+            student_ids = [u["id"] for u in batch if u.get("role") == UserRole.STUDENT.value]
+            if not student_ids:
+                return 0
+            enrollment_filter = {"student_id": {"$in": student_ids}, "is_active": True}
+            previous_branch_ids = await db.enrollments.distinct("branch_id", enrollment_filter)
+            result = await db.enrollments.update_many(
+                enrollment_filter,
+                {"$set": {"branch_id": transfer.new_branch_id, "updated_at": now}}
+            )
+            # Course counters are unchanged by a branch move; only the branches need recounting
+            await recount_enrollment_counters(db, branch_ids=previous_branch_ids + [transfer.new_branch_id])
+            # Pending transfer requests to this branch are fulfilled by the move
+            await db.transfer_requests.update_many(
+                {"student_id": {"$in": student_ids}, "new_branch_id": transfer.new_branch_id, "status": "pending"},
+                {"$set": {"status": "approved", "updated_at": now}}
+            )
+            return result.modified_count
+
+        totals = await UserController._run_bulk_user_operation(
+            db, query, {"role": 1, "branch": 1}, build_ops, cascade
+        )
+
+        await log_activity(
+            request=request,
+            action="admin_bulk_transfer_users",
+            user_id=current_user["id"],
+            user_name=current_user["full_name"],
+            details={"selection": UserController._bulk_selection_summary(query), "new_branch_id": transfer.new_branch_id, **totals}
+        )
+
+        return {"message": f"{totals['modified']} users transferred successfully", **totals}
+
     @staticmethod
     async def delete_user(
         user_id: str,
@@ -566,6 +1134,7 @@ class UserController:
 
         # Delete user from database
         result = await get_db().users.delete_one({"id": user_id})
+        invalidate_student_profiles(user_id)
 
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
@@ -582,127 +1151,115 @@ class UserController:
         return {"message": "User deleted successfully"}
 
     @staticmethod
-    async def get_student_details(
-        current_user: dict = Depends(get_current_user_or_superadmin)
-    ):
-        """Get detailed student information with course enrollment data (Authenticated endpoint)"""
-
-        if not current_user:
-            raise HTTPException(status_code=401, detail="Authentication required")
-
-        db = get_db()
-
-        # Build query based on user role
-        query = {"role": "student", "is_active": True}
-
-        # Role-based access control
-        current_role = current_user.get("role")
-        if isinstance(current_role, str):
+    def _calculate_age(date_of_birth) -> Optional[int]:
+        """Calculate age in years from an ISO date string or date object"""
+        birth_date = None
+        if isinstance(date_of_birth, str):
             try:
-                current_role = UserRole(current_role)
+                birth_date = datetime.strptime(date_of_birth, "%Y-%m-%d").date()
             except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid user role")
+                birth_date = None
+        elif isinstance(date_of_birth, date):
+            birth_date = date_of_birth
 
-        # Apply branch filtering for non-super-admin users
-        if current_role != UserRole.SUPER_ADMIN:
-            user_branch_id = current_user.get("branch_id")
-            if not user_branch_id:
-                raise HTTPException(status_code=403, detail="User not assigned to any branch")
-            query["branch_id"] = user_branch_id
+        if not birth_date:
+            return None
 
-        # Get students
-        students_cursor = db.users.find(query)
-        students = await students_cursor.to_list(1000)
+        today = date.today()
+        return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
 
+    @staticmethod
+    async def _build_student_details(db, students: List[dict]) -> List[dict]:
+        """
+        Enrich a page of students with course information.
+
+        Enrollments, courses and legacy durations are resolved with one `$in`
+        query each, so the number of database calls does not depend on how
+        many students are on the page.
+        """
         if not students:
-            return {
-                "message": "No students found",
-                "students": [],
-                "total": 0
-            }
+            return []
+
+        student_ids = [student["id"] for student in students]
+        enrollments = await db.enrollments.find({
+            "student_id": {"$in": student_ids},
+            "is_active": True
+        }).to_list(length=None)
+
+        enrollments_by_student = {}
+        for enrollment in enrollments:
+            enrollments_by_student.setdefault(enrollment["student_id"], []).append(enrollment)
+
+        # DEPRECATED: Legacy course data stored in user documents, used as a
+        # fallback when a student has no resolvable enrollment
+        legacy_students = [student for student in students if isinstance(student.get("course"), dict)]
+
+        course_ids = {enrollment["course_id"] for enrollment in enrollments}
+        course_ids.update(
+            student["course"].get("course_id") for student in legacy_students
+            if student["course"].get("course_id")
+        )
+        courses = {}
+        if course_ids:
+            course_docs = await db.courses.find(
+                {"id": {"$in": list(course_ids)}},
+                {"id": 1, "title": 1, "difficulty_level": 1}
+            ).to_list(length=None)
+            courses = {course["id"]: course for course in course_docs}
+
+        # Duration references stored as ids still need a lookup
+        duration_ids = {
+            student["course"]["duration"] for student in legacy_students
+            if isinstance(student["course"].get("duration"), str)
+            and student["course"]["duration"].startswith(("uuid-", "duration-"))
+        }
+        durations = {}
+        if duration_ids:
+            duration_docs = await db.durations.find(
+                {"id": {"$in": list(duration_ids)}},
+                {"id": 1, "name": 1}
+            ).to_list(length=None)
+            durations = {duration["id"]: duration for duration in duration_docs}
 
-        # Enrich student data with course and enrollment information
         enriched_students = []
-
         for student in students:
             student_id = student["id"]
-
-            # Calculate age from date_of_birth
-            age = None
-            if student.get("date_of_birth"):
-                if isinstance(student["date_of_birth"], str):
-                    try:
-                        birth_date = datetime.strptime(student["date_of_birth"], "%Y-%m-%d").date()
-                    except ValueError:
-                        birth_date = None
-                elif isinstance(student["date_of_birth"], date):
-                    birth_date = student["date_of_birth"]
-                else:
-                    birth_date = None
-
-                if birth_date:
-                    today = date.today()
-                    age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
-
-            # Get course information from multiple sources
             courses_info = []
 
-            # Method 1: Check for enrollments in enrollments collection
-            enrollments = await db.enrollments.find({"student_id": student_id, "is_active": True}).to_list(100)
-
-            for enrollment in enrollments:
-                course = await db.courses.find_one({"id": enrollment["course_id"]})
-                if course:
-                    # Calculate duration from enrollment dates
-                    duration_days = None
-                    if enrollment.get("start_date") and enrollment.get("end_date"):
-                        start_date = enrollment["start_date"]
-                        end_date = enrollment["end_date"]
-                        if isinstance(start_date, str):
-                            start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-                        if isinstance(end_date, str):
-                            end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-                        duration_days = (end_date - start_date).days
-
-                    # Determine level from course difficulty
-                    level = course.get("difficulty_level", "Beginner")
-
-                    courses_info.append({
-                        "course_name": course.get("title", "Unknown Course"),
-                        "level": level,
-                        "duration": f"{duration_days} days" if duration_days else "Not specified",
-                        "enrollment_date": enrollment.get("enrollment_date"),
-                        "payment_status": enrollment.get("payment_status", "pending")
-                    })
+            # Method 1: Enrollments collection
+            for enrollment in enrollments_by_student.get(student_id, []):
+                course = courses.get(enrollment["course_id"])
+                if not course:
+                    continue
+
+                # Calculate duration from enrollment dates
+                duration_days = None
+                if enrollment.get("start_date") and enrollment.get("end_date"):
+                    start_date = enrollment["start_date"]
+                    end_date = enrollment["end_date"]
+                    if isinstance(start_date, str):
+                        start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+                    if isinstance(end_date, str):
+                        end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+                    duration_days = (end_date - start_date).days
+
+                courses_info.append({
+                    "course_name": course.get("title", "Unknown Course"),
+                    "level": course.get("difficulty_level", "Beginner"),
+                    "duration": f"{duration_days} days" if duration_days else "Not specified",
+                    "enrollment_date": enrollment.get("enrollment_date"),
+                    "payment_status": enrollment.get("payment_status", "pending")
+                })
 
             # DEPRECATED: Legacy fallback for students with course data in user documents
             # This will be removed after data migration is complete
             if not courses_info and student.get("course"):
                 course_info = student["course"]
-                branch_info = student.get("branch", {})
-
-                # Get course details from courses collection
-                course_id = course_info.get("course_id")
-                course = await db.courses.find_one({"id": course_id})
+                course = courses.get(course_info.get("course_id"))
                 if course:
-                    # Get branch details
-                    branch_name = "Not specified"
-                    if branch_info.get("branch_id"):
-                        branch = await db.branches.find_one({"id": branch_info["branch_id"]})
-                        if branch:
-                            branch_name = branch.get("name", "Unknown Branch")
-
-                    # Get duration details - handle both UUID and string formats
                     duration_name = course_info.get("duration", "Not specified")
-                    if course_info.get("duration"):
-                        # If it's already a readable string, use it directly
-                        if isinstance(course_info["duration"], str) and not course_info["duration"].startswith(("uuid-", "duration-")):
-                            duration_name = course_info["duration"]
-                        else:
-                            # Try to look up in durations collection
-                            duration = await db.durations.find_one({"id": course_info["duration"]})
-                            if duration:
-                                duration_name = duration.get("name", duration_name)
+                    if isinstance(duration_name, str) and duration_name in durations:
+                        duration_name = durations[duration_name].get("name", duration_name)
 
                     courses_info.append({
                         "course_name": course.get("title", "Unknown Course"),
@@ -713,26 +1270,114 @@ class UserController:
                         "source": "legacy_user_document"  # Mark as legacy data for migration tracking
                     })
 
-            # Prepare student details response
-            student_details = {
+            enriched_students.append({
                 "student_id": student_id,
                 "student_name": student.get("full_name", f"{student.get('first_name', '')} {student.get('last_name', '')}").strip(),
                 "gender": student.get("gender", "Not specified"),
-                "age": age,
+                "age": UserController._calculate_age(student.get("date_of_birth")),
                 "courses": courses_info,
                 "email": student.get("email"),
                 "phone": student.get("phone"),
                 "action": "view_profile"  # Default action - can be customized based on requirements
+            })
+
+        return enriched_students
+
+    @staticmethod
+    def student_details_query(current_user: dict) -> dict:
+        """Build the students filter for the caller's role"""
+        query = {"role": "student", "is_active": True}
+
+        current_role = current_user.get("role")
+        if isinstance(current_role, str):
+            try:
+                current_role = UserRole(current_role)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid user role")
+
+        # Apply branch filtering for non-super-admin users
+        if current_role != UserRole.SUPER_ADMIN:
+            user_branch_id = current_user.get("branch_id")
+            if not user_branch_id:
+                raise HTTPException(status_code=403, detail="User not assigned to any branch")
+            query["branch_id"] = user_branch_id
+
+        return query
+
+    @staticmethod
+    async def get_student_details(
+        current_user: dict = Depends(get_current_user_or_superadmin),
+        limit: int = 1000,
+        cursor: Optional[str] = None
+    ):
+        """Get detailed student information with course enrollment data (Authenticated endpoint)
+
+        Results are ordered by student id; pass the returned `next_cursor` back
+        as `cursor` to fetch the following page.
+        """
+
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Authentication required")
+
+        db = get_db()
+        query = UserController.student_details_query(current_user)
+
+        page_query = dict(query)
+        if cursor:
+            page_query["id"] = {"$gt": cursor}
+
+        # Fetch one extra row to know whether another page exists
+        students = await db.users.find(page_query, {"password": 0}).sort("id", 1).limit(limit + 1).to_list(length=limit + 1)
+        has_more = len(students) > limit
+        students = students[:limit]
+
+        if not students:
+            return {
+                "message": "No students found",
+                "students": [],
+                "total": 0,
+                "next_cursor": None
             }
 
-            enriched_students.append(student_details)
+        enriched_students = await UserController._build_student_details(db, students)
+        total = await db.users.count_documents(query)
 
         return {
             "message": f"Retrieved {len(enriched_students)} student details successfully",
             "students": enriched_students,
-            "total": len(enriched_students)
+            "total": total,
+            "next_cursor": students[-1]["id"] if has_more else None
         }
 
+    @staticmethod
+    async def stream_student_details(
+        query: dict,
+        batch_size: int = 200
+    ):
+        """Yield student details one page at a time for streaming responses.
+
+        `query` comes from `student_details_query` so access checks run before
+        the response starts.
+        """
+        db = get_db()
+
+        cursor = None
+        while True:
+            page_query = dict(query)
+            if cursor:
+                page_query["id"] = {"$gt": cursor}
+
+            students = await db.users.find(page_query, {"password": 0}).sort("id", 1).limit(batch_size).to_list(length=batch_size)
+            if not students:
+                break
+
+            for student_details in await UserController._build_student_details(db, students):
+                yield student_details
+
+            if len(students) < batch_size:
+                break
+            cursor = students[-1]["id"]
+
     @staticmethod
     async def get_user_enrollments(user_id: str, current_user: dict = None):
         """Get enrollment history for a specific student"""
@@ -886,3 +1531,138 @@ class UserController:
 
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error fetching payment history: {str(e)}")
+
+    @staticmethod
+    async def _find_by_ids(collection, ids, projection: dict) -> List[dict]:
+        """Fetch documents by id with one $in query, skipping the round trip when there are none"""
+        ids = [i for i in ids if i]
+        if not ids:
+            return []
+        return await collection.find({"id": {"$in": ids}}, projection).to_list(length=None)
+
+    @staticmethod
+    async def _build_student_profile360(db, user_id: str) -> Optional[dict]:
+        """Assemble a student's 360 profile with a fixed number of concurrent queries"""
+        # Round 1: everything keyed by the student id
+        user, enrollments, payments, attendance_by_course = await asyncio.gather(
+            db.users.find_one({"id": user_id}, {"password": 0}),
+            db.enrollments.find({"student_id": user_id}).sort("created_at", -1).to_list(length=100),
+            db.payments.find({"student_id": user_id}).sort("created_at", -1).to_list(length=500),
+            db.attendance.aggregate([
+                {"$match": {"student_id": user_id}},
+                {"$group": {
+                    "_id": "$course_id",
+                    "total_classes": {"$sum": 1},
+                    "present_classes": {"$sum": {"$cond": [
+                        {"$or": [{"$eq": ["$is_present", True]}, {"$eq": ["$status", "present"]}]}, 1, 0
+                    ]}},
+                    "last_attended": {"$max": "$attendance_date"}
+                }}
+            ]).to_list(length=None)
+        )
+        if not user:
+            return None
+
+        # Round 2: course and branch names for every enrollment
+        courses, branches = await asyncio.gather(
+            UserController._find_by_ids(
+                db.courses, {e.get("course_id") for e in enrollments},
+                {"id": 1, "title": 1, "name": 1, "difficulty_level": 1, "category_id": 1}
+            ),
+            UserController._find_by_ids(db.branches, {e.get("branch_id") for e in enrollments}, {"id": 1, "branch.name": 1})
+        )
+        courses_by_id = {course["id"]: course for course in courses}
+        branches_by_id = {branch["id"]: branch for branch in branches}
+        enrollments_by_id = {enrollment["id"]: enrollment for enrollment in enrollments}
+
+        def attendance_summary(rows: List[dict]) -> dict:
+            total = sum(row.get("total_classes", 0) for row in rows)
+            present = sum(row.get("present_classes", 0) for row in rows)
+            last_attended = max((row["last_attended"] for row in rows if row.get("last_attended")), default=None)
+            return {
+                "total_classes": total,
+                "present_classes": present,
+                "attendance_percentage": round(present / total * 100, 2) if total else 0.0,
+                "last_attended": last_attended
+            }
+
+        attendance_rows = {}
+        for row in attendance_by_course:
+            attendance_rows.setdefault(row.get("_id"), []).append(row)
+
+        # Payment history with balances per enrollment
+        outstanding_statuses = {PaymentStatus.PENDING.value, PaymentStatus.OVERDUE.value}
+        payment_summary = {"total_paid": 0.0, "total_pending": 0.0, "total_overdue": 0.0, "balance_due": 0.0}
+        enrollment_balances = {}
+        payment_history = []
+        for payment in payments:
+            amount = payment.get("amount") or 0
+            status = payment.get("payment_status")
+            balance = enrollment_balances.setdefault(payment.get("enrollment_id"), {"amount_paid": 0.0, "balance_due": 0.0})
+            if status == PaymentStatus.PAID.value:
+                payment_summary["total_paid"] += amount
+                balance["amount_paid"] += amount
+            elif status in outstanding_statuses:
+                payment_summary["total_" + status] += amount
+                payment_summary["balance_due"] += amount
+                balance["balance_due"] += amount
+
+            enrollment = enrollments_by_id.get(payment.get("enrollment_id"), {})
+            course = courses_by_id.get(enrollment.get("course_id"))
+            course_name = (
+                course.get("title", course.get("name")) if course
+                else (payment.get("course_details") or {}).get("course_name", "Course")
+            )
+            payment_data = serialize_doc(payment)
+            payment_data["course_name"] = course_name
+            payment_data["description"] = f"{course_name} - {str(payment.get('payment_type', 'payment')).replace('_', ' ').title()}"
+            payment_history.append(payment_data)
+
+        enrollment_details = []
+        for enrollment in enrollments:
+            course = courses_by_id.get(enrollment.get("course_id"))
+            branch = branches_by_id.get(enrollment.get("branch_id"))
+            enrollment_data = serialize_doc(enrollment)
+            enrollment_data.update({
+                "course_name": course.get("title", course.get("name", "Unknown Course")) if course else "Unknown Course",
+                "course_difficulty": course.get("difficulty_level", "Beginner") if course else "Beginner",
+                "branch_name": branch.get("branch", {}).get("name", "Unknown Branch") if branch else "Unknown Branch",
+                "status": enrollment.get("status", "active"),
+                "is_active": enrollment.get("is_active", True),
+                "payments": enrollment_balances.get(enrollment["id"], {"amount_paid": 0.0, "balance_due": 0.0}),
+                "attendance": attendance_summary(attendance_rows.get(enrollment.get("course_id"), []))
+            })
+            enrollment_details.append(enrollment_data)
+
+        return {
+            "user": serialize_doc(user),
+            "enrollments": enrollment_details,
+            "payments": payment_history,
+            "payment_summary": payment_summary,
+            "attendance_summary": attendance_summary(attendance_by_course)
+        }
+
+    @staticmethod
+    async def get_student_profile360(user_id: str, current_user: dict = None):
+        """Get a student's profile, enrollments, payments and attendance in one response"""
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Authentication required")
+
+        profile = student_profile_cache.get(user_id)
+        if profile is None:
+            profile = await UserController._build_student_profile360(get_db(), user_id)
+            if not profile:
+                raise HTTPException(status_code=404, detail="Student not found")
+            student_profile_cache.set(user_id, profile)
+
+        user = profile["user"]
+        if user.get("role") != "student":
+            raise HTTPException(status_code=400, detail="User is not a student")
+
+        # Permission check: coaches can only view students from their branch
+        current_role = current_user.get("role")
+        if current_role in ["coach", "coach_admin"] and current_user.get("branch_id"):
+            if user.get("branch_id") != current_user["branch_id"]:
+                raise HTTPException(status_code=403, detail="You can only view students from your branch")
+
+        return {"message": "Student profile retrieved successfully", **profile}
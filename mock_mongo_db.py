@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+In-memory stand-in for the Motor database used by the query-count tests.
+
+Every round trip a controller would make to MongoDB (find, find_one,
+count_documents, aggregate, writes) is recorded in ``MockDatabase.calls`` so
+tests can assert how many queries an endpoint issues without a running server.
+Only the filter operators the controllers actually use are implemented.
+"""
+
+import re
+from copy import deepcopy
+from datetime import datetime
+
+
+def _get_path(doc, path):
+    """Resolve a dotted path, returning a list of candidate values (arrays fan out)."""
+    values = [doc]
+    for part in path.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, dict) and part in value:
+                next_values.append(value[part])
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict) and part in item:
+                        next_values.append(item[part])
+        values = next_values
+    return values
+
+
+def _expand(values):
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+
+def _compare(op, value, operand):
+    try:
+        if op == "$gt":
+            return value > operand
+        if op == "$gte":
+            return value >= operand
+        if op == "$lt":
+            return value < operand
+        if op == "$lte":
+            return value <= operand
+    except TypeError:
+        return False
+    return False
+
+
+def _match_condition(values, condition):
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, operand in condition.items():
+            candidates = _expand(values)
+            if op == "$in":
+                if not any(v in operand for v in candidates) and not (None in operand and not values):
+                    return False
+            elif op == "$nin":
+                if any(v in operand for v in candidates):
+                    return False
+            elif op == "$ne":
+                if operand in candidates:
+                    return False
+            elif op == "$eq":
+                if operand not in candidates:
+                    return False
+            elif op == "$exists":
+                if bool(values) != bool(operand):
+                    return False
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                if not any(_compare(op, v, operand) for v in candidates):
+                    return False
+            elif op == "$regex":
+                flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+                if not any(isinstance(v, str) and re.search(operand, v, flags) for v in candidates):
+                    return False
+            elif op == "$options":
+                continue
+            elif op == "$type":
+                types = {"string": str, "date": datetime}
+                if not any(isinstance(v, types[operand]) for v in candidates):
+                    return False
+            else:
+                raise NotImplementedError(f"Operator {op} is not supported by MockDatabase")
+        return True
+    if condition is None:
+        return not values or None in values
+    return condition in _expand(values)
+
+
+def matches(doc, filter_query):
+    """Return True if ``doc`` satisfies ``filter_query``."""
+    for key, condition in (filter_query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, sub) for sub in condition):
+                return False
+        elif not _match_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return deepcopy(doc)
+    included = {k for k, v in projection.items() if v}
+    if not included:
+        return {k: deepcopy(v) for k, v in doc.items() if k not in projection}
+    result = {}
+    for key in included:
+        _project_path(doc, result, key.split("."))
+    return result
+
+
+def _project_path(source, target, parts):
+    """Copy the dotted path ``parts`` from ``source`` into ``target``, through subdocuments and arrays like MongoDB."""
+    head = parts[0]
+    if head not in source:
+        return
+    value = source[head]
+    if len(parts) == 1:
+        target[head] = deepcopy(value)
+    elif isinstance(value, dict):
+        _project_path(value, target.setdefault(head, {}), parts[1:])
+    elif isinstance(value, list):
+        existing = target.setdefault(head, [{} for item in value if isinstance(item, dict)])
+        for item, projected in zip([item for item in value if isinstance(item, dict)], existing):
+            _project_path(item, projected, parts[1:])
+
+
+def _sort_key(doc, key):
+    values = _get_path(doc, key)
+    value = values[0] if values else None
+    return (value is not None, value)
+
+
+class MockCursor:
+    def __init__(self, docs):
+        self._docs = docs
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=1):
+        keys = key_or_list if isinstance(key_or_list, list) else [(key_or_list, direction)]
+        for key, order in reversed(keys):
+            self._docs.sort(key=lambda d: _sort_key(d, key), reverse=order == -1)
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def _results(self):
+        docs = self._docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return docs
+
+    async def to_list(self, length=None):
+        docs = self._results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        self._iter = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class MockResult:
+    def __init__(self, **kwargs):
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.inserted_count = 0
+        self.upserted_count = 0
+        self.inserted_id = None
+        self.inserted_ids = []
+        self.__dict__.update(kwargs)
+
+
+class MockCollection:
+    def __init__(self, name, database):
+        self.name = name
+        self.database = database
+        self.docs = []
+        # Canned results for aggregate(); pipelines are not evaluated
+        self.aggregate_results = []
+
+    def _record(self, op, *args):
+        self.database.calls.append((self.name, op) + args)
+
+    def find(self, filter_query=None, projection=None, sort=None):
+        self._record("find", filter_query)
+        docs = [_project(d, projection) for d in self.docs if matches(d, filter_query)]
+        cursor = MockCursor(docs)
+        if sort:
+            cursor.sort(sort)
+        return cursor
+
+    async def find_one(self, filter_query=None, projection=None, sort=None):
+        self._record("find_one", filter_query)
+        docs = [d for d in self.docs if matches(d, filter_query)]
+        if sort:
+            docs = MockCursor(docs).sort(sort)._docs
+        return _project(docs[0], projection) if docs else None
+
+    async def count_documents(self, filter_query=None, **kwargs):
+        self._record("count_documents", filter_query)
+        return len([d for d in self.docs if matches(d, filter_query)])
+
+    async def distinct(self, key, filter_query=None, **kwargs):
+        self._record("distinct", filter_query)
+        values = []
+        for doc in self.docs:
+            if matches(doc, filter_query):
+                for value in _expand(_get_path(doc, key)):
+                    if not isinstance(value, list) and value not in values:
+                        values.append(value)
+        return values
+
+    def aggregate(self, pipeline, **kwargs):
+        self._record("aggregate", pipeline)
+        results = self.aggregate_results(pipeline) if callable(self.aggregate_results) else self.aggregate_results
+        return MockCursor(deepcopy(list(results)))
+
+    async def insert_one(self, doc, **kwargs):
+        self._record("insert_one", doc)
+        self.docs.append(deepcopy(doc))
+        return MockResult(inserted_id=doc.get("id"))
+
+    async def insert_many(self, docs, ordered=True, **kwargs):
+        self._record("insert_many", len(docs))
+        self.docs.extend(deepcopy(list(docs)))
+        return MockResult(inserted_ids=[d.get("id") for d in docs])
+
+    def _apply_update(self, doc, update):
+        for key, value in update.get("$set", {}).items():
+            target = doc
+            parts = key.split(".")
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = deepcopy(value)
+        for key, value in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + value
+        for key, value in update.get("$addToSet", {}).items():
+            values = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+            existing = doc.setdefault(key, [])
+            existing.extend(v for v in values if v not in existing)
+        for key, value in update.get("$pull", {}).items():
+            doc[key] = [v for v in doc.get(key, []) if v != value]
+        for key in update.get("$unset", {}):
+            doc.pop(key, None)
+
+    async def update_one(self, filter_query, update, upsert=False, **kwargs):
+        self._record("update_one", filter_query)
+        return self._update(filter_query, update, upsert, many=False)
+
+    async def update_many(self, filter_query, update, upsert=False, **kwargs):
+        self._record("update_many", filter_query)
+        return self._update(filter_query, update, upsert, many=True)
+
+    def _update(self, filter_query, update, upsert, many):
+        matched = [d for d in self.docs if matches(d, filter_query)]
+        if not many:
+            matched = matched[:1]
+        for doc in matched:
+            self._apply_update(doc, update)
+        if not matched and upsert:
+            doc = {k: v for k, v in filter_query.items() if not k.startswith("$")}
+            for key, value in update.get("$setOnInsert", {}).items():
+                doc[key] = value
+            self._apply_update(doc, update)
+            self.docs.append(doc)
+            return MockResult(upserted_count=1)
+        return MockResult(matched_count=len(matched), modified_count=len(matched))
+
+    async def find_one_and_update(self, filter_query, update, upsert=False, return_document=False, **kwargs):
+        self._record("find_one_and_update", filter_query)
+        matched = [d for d in self.docs if matches(d, filter_query)]
+        if not matched:
+            if upsert:
+                self._update(filter_query, update, True, many=False)
+                return deepcopy(self.docs[-1]) if return_document else None
+            return None
+        before = deepcopy(matched[0])
+        self._apply_update(matched[0], update)
+        return deepcopy(matched[0]) if return_document else before
+
+    async def bulk_write(self, operations, ordered=True, **kwargs):
+        self._record("bulk_write", len(operations))
+        matched = modified = inserted = upserted = 0
+        deleted = 0
+        for operation in operations:
+            document = getattr(operation, "_doc", None)
+            filter_query = getattr(operation, "_filter", None)
+            if type(operation).__name__ in ("DeleteOne", "DeleteMany"):
+                before = len(self.docs)
+                remaining = [d for d in self.docs if not matches(d, filter_query)]
+                if type(operation).__name__ == "DeleteOne" and before - len(remaining) > 1:
+                    index = next(i for i, d in enumerate(self.docs) if matches(d, filter_query))
+                    remaining = self.docs[:index] + self.docs[index + 1:]
+                self.docs = remaining
+                deleted += before - len(remaining)
+                continue
+            if document is not None and filter_query is None:
+                self.docs.append(deepcopy(document))
+                inserted += 1
+                continue
+            if type(operation).__name__ == "ReplaceOne":
+                index = next((i for i, d in enumerate(self.docs) if matches(d, filter_query)), None)
+                if index is not None:
+                    self.docs[index] = deepcopy(document)
+                    matched += 1
+                    modified += 1
+                elif getattr(operation, "_upsert", False):
+                    self.docs.append(deepcopy(document))
+                    upserted += 1
+                continue
+            many = type(operation).__name__ == "UpdateMany"
+            result = self._update(filter_query, document, getattr(operation, "_upsert", False), many=many)
+            matched += result.matched_count
+            modified += result.modified_count
+            upserted += result.upserted_count
+        return MockResult(
+            matched_count=matched, modified_count=modified,
+            inserted_count=inserted, upserted_count=upserted, deleted_count=deleted
+        )
+
+    async def delete_one(self, filter_query, **kwargs):
+        self._record("delete_one", filter_query)
+        for index, doc in enumerate(self.docs):
+            if matches(doc, filter_query):
+                del self.docs[index]
+                return MockResult(deleted_count=1)
+        return MockResult(deleted_count=0)
+
+    async def delete_many(self, filter_query, **kwargs):
+        self._record("delete_many", filter_query)
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not matches(d, filter_query)]
+        return MockResult(deleted_count=before - len(self.docs))
+
+    async def create_index(self, keys, **kwargs):
+        return kwargs.get("name", str(keys))
+
+
+class MockSession:
+    """Transaction on the mock database: writes apply directly and are rolled back on failure."""
+
+    def __init__(self, database):
+        self.database = database
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def with_transaction(self, callback):
+        snapshot = {name: deepcopy(c.docs) for name, c in self.database._collections.items()}
+        try:
+            return await callback(self)
+        except Exception:
+            for name, collection in self.database._collections.items():
+                collection.docs = snapshot.get(name, [])
+            raise
+
+
+class MockClient:
+    """Client of a replica set (transactions supported) or of a standalone server."""
+
+    def __init__(self, database, replica_set=True):
+        self.database = database
+        self.replica_set = replica_set
+        self.admin = self
+
+    async def command(self, name, **kwargs):
+        return {"isWritablePrimary": True, "setName": "rs0"} if self.replica_set else {"isWritablePrimary": True}
+
+    async def start_session(self):
+        return MockSession(self.database)
+
+
+class MockDatabase:
+    """Dict-backed database exposing collections as attributes, like Motor."""
+
+    def __init__(self, replica_set=True):
+        self._collections = {}
+        self.calls = []
+        self.client = MockClient(self, replica_set)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name not in self._collections:
+            self._collections[name] = MockCollection(name, self)
+        return self._collections[name]
+
+    def __getitem__(self, name):
+        return self.__getattr__(name)
+
+    def reset_calls(self):
+        self.calls = []
+
+    def query_count(self, collection=None):
+        return len([c for c in self.calls if collection is None or c[0] == collection])
@@ -1,8 +1,11 @@
 # Models package for Student Management System
 
 # Import all models for easy access
-from .user_models import UserRole, BaseUser, UserCreate, UserLogin, ForgotPassword, ResetPassword, UserUpdate
-from .branch_models import Branch, BranchCreate, BranchUpdate
+from .user_models import (
+    UserRole, BaseUser, UserCreate, UserLogin, ForgotPassword, ResetPassword, UserUpdate, BulkUserImport,
+    BulkUserFilter, BulkUserSelection, BulkUserUpdate, BulkUserTransfer
+)
+from .branch_models import Branch, BranchCreate, BranchUpdate, GeoPoint
 from .course_models import Course, CourseCreate, CourseUpdate
 from .category_models import Category, CategoryCreate, CategoryUpdate, CategoryResponse
 from .duration_models import Duration, DurationCreate, DurationUpdate, DurationResponse
@@ -30,10 +33,11 @@ from .settings_models import (
 
 __all__ = [
     # User models
-    'UserRole', 'BaseUser', 'UserCreate', 'UserLogin', 'ForgotPassword', 'ResetPassword', 'UserUpdate',
+    'UserRole', 'BaseUser', 'UserCreate', 'UserLogin', 'ForgotPassword', 'ResetPassword', 'UserUpdate', 'BulkUserImport',
+    'BulkUserFilter', 'BulkUserSelection', 'BulkUserUpdate', 'BulkUserTransfer',
     
     # Branch models
-    'Branch', 'BranchCreate', 'BranchUpdate',
+    'Branch', 'BranchCreate', 'BranchUpdate', 'GeoPoint',
     
     # Course models
     'Course', 'CourseCreate', 'CourseUpdate',
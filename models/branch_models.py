@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, validator
 from datetime import datetime, date
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Literal
 import uuid
 
 class Address(BaseModel):
@@ -11,6 +11,20 @@ class Address(BaseModel):
     pincode: str
     country: str
 
+class GeoPoint(BaseModel):
+    """GeoJSON point, as stored for the branches 2dsphere index"""
+    type: Literal["Point"] = "Point"
+    coordinates: List[float]  # [longitude, latitude]
+
+    @validator('coordinates')
+    def validate_coordinates(cls, v):
+        if len(v) != 2:
+            raise ValueError('Coordinates must be [longitude, latitude]')
+        longitude, latitude = v
+        if not -180 <= longitude <= 180 or not -90 <= latitude <= 90:
+            raise ValueError('Longitude must be between -180 and 180 and latitude between -90 and 90')
+        return v
+
 class BranchInfo(BaseModel):
     name: str
     code: str
@@ -42,6 +56,7 @@ class Branch(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     branch: BranchInfo
     location_id: str  # Reference to location
+    geo_location: Optional[GeoPoint] = None  # Branch coordinates for nearby search
     manager_id: str
     operational_details: OperationalDetails
     assignments: Assignments
@@ -53,6 +68,7 @@ class Branch(BaseModel):
 class BranchCreate(BaseModel):
     branch: BranchInfo
     location_id: str  # Reference to location
+    geo_location: Optional[GeoPoint] = None  # Branch coordinates for nearby search
     manager_id: str
     operational_details: OperationalDetails
     assignments: Assignments
@@ -61,6 +77,7 @@ class BranchCreate(BaseModel):
 class BranchUpdate(BaseModel):
     branch: Optional[BranchInfo] = None
     location_id: Optional[str] = None  # Reference to location
+    geo_location: Optional[GeoPoint] = None  # Branch coordinates for nearby search
     manager_id: Optional[str] = None
     operational_details: Optional[OperationalDetails] = None
     assignments: Optional[Assignments] = None
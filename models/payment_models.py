@@ -30,6 +30,7 @@ class PaymentMethod(str, Enum):
 class Payment(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     student_id: str
+    student_name: Optional[str] = None  # Denormalized for listings; see utils.payment_students
     enrollment_id: Optional[str] = None  # Made optional for registration payments
     amount: float
     payment_type: PaymentType
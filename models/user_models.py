@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, EmailStr
 from datetime import datetime, date
-from typing import Optional
+from typing import Optional, List, Dict, Any
 from enum import Enum
 import uuid
 
@@ -85,3 +85,26 @@ class UserUpdate(BaseModel):
     course_id: Optional[str] = None
     course_duration: Optional[str] = None
     location_id: Optional[str] = None
+
+class BulkUserImport(BaseModel):
+    # Raw rows are validated individually so one bad row does not reject the batch
+    users: List[Dict[str, Any]]
+    send_credentials: bool = True
+    run_in_background: bool = False
+
+class BulkUserFilter(BaseModel):
+    role: Optional[UserRole] = None
+    branch_id: Optional[str] = None
+    is_active: Optional[bool] = None
+
+class BulkUserSelection(BaseModel):
+    # Select users either by explicit ids or by filter (both are combined when given)
+    user_ids: Optional[List[str]] = None
+    filter: Optional[BulkUserFilter] = None
+
+class BulkUserUpdate(BulkUserSelection):
+    update: UserUpdate
+
+class BulkUserTransfer(BulkUserSelection):
+    new_branch_id: str
+    new_location_id: Optional[str] = None
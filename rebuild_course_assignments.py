@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Maintenance Script: Rebuild the course_assignments edge collection
+
+Recreates every (course, branch, coach) edge from branches.assignments.courses,
+coaches.assignment_details.courses and courses.instructor_id, and ensures the
+indexes exist. Run this after editing those fields directly in the database.
+
+Usage:
+    python rebuild_course_assignments.py
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# Add the project root to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent))
+
+from utils.indexes import ensure_indexes
+from utils.course_assignments import rebuild_course_assignments
+
+
+async def main():
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    db = client.get_database(os.getenv("DB_NAME", "student_management_db"))
+
+    print("🚀 Rebuilding course_assignments...")
+    await ensure_indexes(db)
+    count = await rebuild_course_assignments(db)
+    print(f"✅ Rebuilt {count} course assignment edges")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -18,6 +18,7 @@ from .email_routes import router as email_router
 from .dashboard_routes import router as dashboard_router
 from .settings_routes import router as settings_router
 from .reports_routes import router as reports_router
+from .public_routes import router as public_router
 
 __all__ = [
     'auth_router',
@@ -37,5 +38,6 @@ __all__ = [
     'email_router',
     'dashboard_router',
     'settings_router',
-    'reports_router'
+    'reports_router',
+    'public_router'
 ]
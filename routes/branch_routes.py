@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
+from typing import Optional
 from controllers.branch_controller import BranchController
 from models.branch_models import BranchCreate, BranchUpdate
 from models.holiday_models import HolidayCreate
@@ -24,6 +25,19 @@ async def get_branches(
 ):
     return await BranchController.get_branches(skip, limit, current_user)
 
+# Declared before /{branch_id} so "nearby" is not taken as a branch id
+@router.get("/nearby")
+async def get_nearby_branches(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the search point"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude of the search point"),
+    max_distance_km: float = Query(25, gt=0, le=500, description="Search radius in kilometres"),
+    course_id: Optional[str] = Query(None, description="Only branches offering this course"),
+    active_only: bool = True,
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Get the closest branches to a point - Public endpoint (no authentication required)"""
+    return await BranchController.get_nearby_branches(lat, lng, max_distance_km, course_id, active_only, limit)
+
 @router.get("/{branch_id}")
 async def get_branch(
     branch_id: str,
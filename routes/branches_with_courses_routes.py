@@ -11,6 +11,10 @@ async def get_branches_with_courses(
     branch_id: Optional[str] = Query(None, description="Filter by specific branch ID, or 'all' for all branches"),
     status: Optional[str] = Query(None, description="Filter by branch status ('active' or 'inactive')"),
     include_inactive: bool = Query(False, description="Include inactive branches when no status filter is applied"),
+    skip: int = Query(0, ge=0, description="Number of branches to skip"),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of branches to return"),
+    include_courses: bool = Query(True, description="Include the course list of each branch"),
+    include_bank_details: bool = Query(True, description="Include each branch's bank details"),
     current_user: dict = Depends(get_current_user_or_superadmin)
 ):
     """
@@ -20,6 +24,13 @@ async def get_branches_with_courses(
     - `branch_id` (optional): Filter by specific branch ID, or "all" for all branches
     - `status` (optional): Filter by branch status ("active" or "inactive")
     - `include_inactive` (optional): Include inactive branches when no status filter is applied (default: false)
+    - `skip` / `limit` (optional): Pagination over branches (default: 0 / 100, max limit 500)
+    - `include_courses` (optional): Include each branch's course list (default: true)
+    - `include_bank_details` (optional): Include each branch's bank details (default: true)
+
+    Responses are cached for a minute per parameter combination; branch, course and
+    coach writes clear the cache. `total` is the number of matching branches and
+    `summary` covers the returned page.
     
     **Authentication:** Requires Bearer token
     
@@ -29,6 +40,8 @@ async def get_branches_with_courses(
         "message": "Branches with courses retrieved successfully",
         "branches": [...],
         "total": 2,
+        "skip": 0,
+        "limit": 100,
         "summary": {
             "total_branches": 2,
             "total_courses": 5,
@@ -52,5 +65,9 @@ async def get_branches_with_courses(
         branch_id=branch_id,
         status=status,
         include_inactive=include_inactive,
+        skip=skip,
+        limit=limit,
+        include_courses=include_courses,
+        include_bank_details=include_bank_details,
         current_user=current_user
     )
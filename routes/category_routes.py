@@ -80,10 +80,11 @@ async def get_categories_with_courses_and_durations(
     active_only: bool = True,
     include_locations: bool = False,
     skip: int = 0,
-    limit: int = 20
+    limit: int = 20,
+    materialized: bool = True
 ):
     """Get categories with their courses and available durations in nested structure - Public endpoint (no authentication required)"""
-    return await CategoryController.get_categories_with_courses_and_durations(category_id, active_only, include_locations, skip, limit)
+    return await CategoryController.get_categories_with_courses_and_durations(category_id, active_only, include_locations, skip, limit, materialized)
 
 @router.get("/public/location-hierarchy")
 async def get_category_location_hierarchy(
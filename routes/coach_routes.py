@@ -92,10 +92,12 @@ async def get_coach_courses(
 @router.get("/{coach_id}/students")
 async def get_coach_students(
     coach_id: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
     current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN, UserRole.COACH]))
 ):
     """Get students enrolled in courses taught by a specific coach"""
-    return await CoachController.get_coach_students(coach_id, current_user)
+    return await CoachController.get_coach_students(coach_id, current_user, skip, limit)
 
 @router.post("/{coach_id}/send-credentials")
 async def send_coach_credentials(
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, status, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from typing import Optional
+import json
 from controllers.payment_controller import PaymentController
 from models.student_models import StudentPaymentCreate
 from models.payment_models import RegistrationPaymentCreate
 from models.user_models import UserRole
 from utils.auth import require_role
+from utils.payment_dues import MAX_DUES_PAGE_SIZE
 from utils.unified_auth import require_role_unified
 
 router = APIRouter()
@@ -12,7 +16,8 @@ router = APIRouter()
 @router.post("/students/payments", status_code=status.HTTP_201_CREATED)
 async def student_process_payment(
     payment_data: StudentPaymentCreate,
-    current_user: dict = Depends(require_role([UserRole.STUDENT]))
+    # Students restricted for overdue payments can still pay them
+    current_user: dict = Depends(require_role([UserRole.STUDENT], allow_payment_restricted=True))
 ):
     return await PaymentController.student_process_payment(payment_data, current_user)
 
@@ -39,6 +44,32 @@ async def get_payment_notifications(
     """Get payment notifications for superadmin dashboard"""
     return await PaymentController.get_payment_notifications(skip, limit)
 
+@router.get("/notifications/unread-count")
+async def get_unread_notification_count(
+    current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN]))
+):
+    """Unread payment notification count for the dashboard badge"""
+    return await PaymentController.get_unread_notification_count()
+
+@router.get("/notifications/stream")
+async def stream_payment_notifications(
+    current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN]))
+):
+    """Server-sent events: `notification` for each new payment notification, `unread_count` when the badge changes"""
+    async def sse_messages():
+        async for event in PaymentController.stream_payment_notifications():
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                name, data = event
+                yield f"event: {name}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+    return StreamingResponse(
+        sse_messages(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.put("/notifications/{notification_id}/read")
 async def mark_notification_read(
     notification_id: str,
@@ -54,13 +85,43 @@ async def get_payment_stats(
     """Get payment statistics for dashboard"""
     return await PaymentController.get_payment_stats()
 
+@router.get("/dues")
+async def get_outstanding_dues(
+    branch_id: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_DUES_PAGE_SIZE),
+    # Students restricted for overdue payments still need to see what they owe
+    current_user: dict = Depends(require_role(
+        [UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN, UserRole.COACH, UserRole.STUDENT], allow_payment_restricted=True
+    ))
+):
+    """Outstanding dues per student, with per-branch totals and aging buckets"""
+    return await PaymentController.get_outstanding_dues(current_user, branch_id, skip, limit)
+
+@router.post("/send-reminders", status_code=status.HTTP_202_ACCEPTED)
+async def send_payment_reminders(
+    resume_job_id: Optional[str] = Query(None, description="Failed or interrupted reminder job to continue"),
+    current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN]))
+):
+    """Send one reminder per student with pending/overdue payments, as a background job"""
+    return await PaymentController.send_payment_reminders(current_user, resume_job_id)
+
+@router.get("/send-reminders/{job_id}")
+async def get_payment_reminder_job(
+    job_id: str,
+    current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN]))
+):
+    """Status and progress of a payment reminder run"""
+    return await PaymentController.get_payment_reminder_job(job_id)
+
 @router.get("")
 async def get_payments(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     status: Optional[str] = Query(None),
     payment_type: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page, for keyset pagination"),
     current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN]))
 ):
-    """Get payments with filtering"""
-    return await PaymentController.get_payments(skip, limit, status, payment_type)
+    """Get payments with filtering, newest first"""
+    return await PaymentController.get_payments(skip, limit, status, payment_type, cursor)
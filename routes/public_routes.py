@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Header
+from typing import Optional
+from controllers.catalog_controller import CatalogController
+
+router = APIRouter()
+
+@router.get("/catalog")
+async def get_public_catalog(if_none_match: Optional[str] = Header(None)):
+    """Get the full public catalog (categories, courses, locations, branches, durations with prices) - Public endpoint (no authentication required)"""
+    return await CatalogController.get_public_catalog(if_none_match)
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends, Request, Path
+from fastapi import APIRouter, Depends, Request, Path, Query, UploadFile, File, Form, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from typing import Optional
+import json
 from controllers.user_controller import UserController
-from models.user_models import UserCreate, UserUpdate, UserRole
+from models.user_models import (
+    UserCreate, UserUpdate, UserRole, BulkUserImport,
+    BulkUserSelection, BulkUserUpdate, BulkUserTransfer
+)
 from utils.auth import require_role
 from utils.unified_auth import require_role_unified, get_current_user_or_superadmin
 
@@ -15,6 +21,74 @@ async def create_user(
 ):
     return await UserController.create_user(user_data, request, current_user)
 
+@router.post("/bulk-import")
+async def bulk_import_users(
+    import_data: BulkUserImport,
+    request: Request,
+    current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN]))
+):
+    """Bulk create users from a JSON list of rows, returning a per-row report"""
+    return await UserController.bulk_import_users(
+        import_data.users, request, current_user,
+        send_credentials=import_data.send_credentials,
+        run_in_background=import_data.run_in_background
+    )
+
+@router.post("/bulk-import/csv")
+async def bulk_import_users_csv(
+    request: Request,
+    file: UploadFile = File(..., description="CSV with a header row; use course.* and branch.* columns for nested fields"),
+    send_credentials: bool = Form(True),
+    run_in_background: bool = Form(False),
+    current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN]))
+):
+    """Bulk create users from an uploaded CSV file, returning a per-row report"""
+    try:
+        content = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
+    rows = UserController.parse_import_csv(content)
+    return await UserController.bulk_import_users(
+        rows, request, current_user,
+        send_credentials=send_credentials,
+        run_in_background=run_in_background
+    )
+
+@router.get("/bulk-import/{job_id}")
+async def get_bulk_import_job(
+    job_id: str,
+    current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN]))
+):
+    """Get the status and per-row report of a background user import"""
+    return await UserController.get_import_job(job_id, current_user)
+
+@router.patch("/bulk")
+async def bulk_update_users(
+    bulk_update: BulkUserUpdate,
+    request: Request,
+    current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN]))
+):
+    """Apply the same update to all users matching user_ids and/or filter"""
+    return await UserController.bulk_update_users(bulk_update, request, current_user)
+
+@router.post("/bulk/deactivate")
+async def bulk_deactivate_users(
+    selection: BulkUserSelection,
+    request: Request,
+    current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN]))
+):
+    """Deactivate all users matching user_ids and/or filter - accessible by Super Admin only"""
+    return await UserController.bulk_deactivate_users(selection, request, current_user)
+
+@router.post("/bulk/transfer")
+async def bulk_transfer_users(
+    transfer: BulkUserTransfer,
+    request: Request,
+    current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN]))
+):
+    """Move all users matching user_ids and/or filter to another branch"""
+    return await UserController.bulk_transfer_users(transfer, request, current_user)
+
 @router.get("")
 async def get_users(
     role: Optional[UserRole] = None,
@@ -28,10 +102,30 @@ async def get_users(
 
 @router.get("/students/details")
 async def get_student_details(
+    limit: int = Query(1000, ge=1, le=1000, description="Number of students per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor value from the previous page"),
+    stream: bool = Query(False, description="Stream every matching student as newline-delimited JSON"),
     current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN, UserRole.COACH]))
 ):
     """Get detailed student information with course enrollment data (Authenticated endpoint)"""
-    return await UserController.get_student_details(current_user)
+    if stream:
+        query = UserController.student_details_query(current_user)
+
+        async def ndjson_lines():
+            async for student in UserController.stream_student_details(query):
+                yield json.dumps(jsonable_encoder(student)) + "\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    return await UserController.get_student_details(current_user, limit, cursor)
+
+@router.get("/{user_id}/profile360")
+async def get_student_profile360(
+    user_id: str,
+    current_user: dict = Depends(require_role_unified([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN, UserRole.COACH]))
+):
+    """Get a student's profile, enrollments, payment balances and attendance summary in one call"""
+    return await UserController.get_student_profile360(user_id, current_user)
 
 @router.get("/{user_id}/enrollments")
 async def get_user_enrollments(
@@ -4,6 +4,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from pathlib import Path
 import os
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
 # Import routes
@@ -25,7 +27,8 @@ from routes import (
     email_router,
     dashboard_router,
     settings_router,
-    reports_router
+    reports_router,
+    public_router
 )
 from routes.superadmin_routes import router as superadmin_router
 from routes.branches_with_courses_routes import router as branches_with_courses_router
@@ -48,10 +51,71 @@ async def lifespan(app: FastAPI):
     # Initialize the database connection in utils
     from utils.database import init_db
     init_db(app.mongodb)
+
+    # Create indexes and backfill derived collections
+    from utils.indexes import ensure_indexes
+    from utils.course_assignments import backfill_course_assignments
+    from utils.enrollment_counts import backfill_enrollment_counters, run_nightly_counter_check
+    from utils.category_hierarchy import refresh_category_hierarchy
+    from utils.locations import backfill_branch_locations
+    from utils.branch_stats import backfill_student_branch_ids
+    from utils.payment_students import backfill_payment_student_names, normalize_payment_created_at
+    from utils.overdue_sweeper import run_overdue_sweeper
+    from utils.pricing import get_price_matrix, run_catalog_version_poller
+    from utils.post_commit import run_post_commit_worker
+    from utils.notification_stream import seed_unread_count, run_notification_change_stream
+    await ensure_indexes(app.mongodb)
+    try:
+        await backfill_branch_locations(app.mongodb)
+    except Exception as e:
+        logging.warning(f"Branch location backfill failed: {e}")
+    try:
+        await backfill_student_branch_ids(app.mongodb)
+    except Exception as e:
+        logging.warning(f"Student branch_id backfill failed: {e}")
+    try:
+        await backfill_payment_student_names(app.mongodb)
+        await normalize_payment_created_at(app.mongodb)
+    except Exception as e:
+        logging.warning(f"Payment student_name backfill failed: {e}")
+    try:
+        await backfill_course_assignments(app.mongodb)
+    except Exception as e:
+        logging.warning(f"Course assignment backfill failed: {e}")
+    try:
+        await backfill_enrollment_counters(app.mongodb)
+    except Exception as e:
+        logging.warning(f"Enrollment counter backfill failed: {e}")
+    try:
+        # Rebuilt on every start so it reflects writes made while no worker was running
+        await refresh_category_hierarchy(app.mongodb)
+    except Exception as e:
+        logging.warning(f"Category hierarchy refresh failed: {e}")
+    try:
+        await seed_unread_count(app.mongodb)
+    except Exception as e:
+        logging.warning(f"Unread notification count seed failed: {e}")
+    try:
+        # Price quotes are served from memory; build the matrix before the first registration
+        await get_price_matrix(app.mongodb)
+    except Exception as e:
+        logging.warning(f"Price matrix build failed: {e}")
+
+    # Background jobs
+    background_tasks = [
+        asyncio.create_task(run_nightly_counter_check(app.mongodb)),
+        asyncio.create_task(run_overdue_sweeper(app.mongodb)),
+        asyncio.create_task(run_catalog_version_poller(app.mongodb)),
+        asyncio.create_task(run_post_commit_worker(app.mongodb)),
+        asyncio.create_task(run_notification_change_stream(app.mongodb))
+    ]
     
     yield
     
     # Shutdown
+    # Post-commit outbox entries left unfinished run in another worker or after the next start
+    for task in background_tasks:
+        task.cancel()
     app.mongodb_client.close()
 
 # Create FastAPI app
@@ -91,6 +155,7 @@ app.include_router(email_router, prefix="/api/email", tags=["Email"])
 app.include_router(dashboard_router, prefix="/api/dashboard", tags=["Dashboard"])
 app.include_router(settings_router, prefix="/api/settings", tags=["Settings"])
 app.include_router(reports_router, prefix="/api/reports", tags=["Reports"])
+app.include_router(public_router, prefix="/api/public", tags=["Public Catalog"])
 app.include_router(branches_with_courses_router, prefix="/api", tags=["Branches with Courses"])
 
 @app.get("/")
@@ -1590,14 +1590,19 @@ async def update_payment(
     if payment_update.payment_status == PaymentStatus.PAID:
         update_data["payment_date"] = datetime.utcnow()
 
-    result = await db.payments.update_one(
+    payment = await db.payments.find_one_and_update(
         {"id": payment_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection={"_id": 0, "student_id": 1}
     )
 
-    if result.matched_count == 0:
+    if payment is None:
         raise HTTPException(status_code=404, detail="Payment not found")
 
+    # Moving a payment into or out of overdue changes whether the student is restricted
+    from utils.overdue_sweeper import refresh_payment_restriction
+    await refresh_payment_restriction(db, payment["student_id"])
+
     return {"message": "Payment updated successfully"}
 
 @api_router.post("/payments/{payment_id}/proof")
@@ -1643,61 +1648,6 @@ async def get_payments(
     payments = await db.payments.find(filter_query).skip(skip).limit(limit).to_list(length=limit)
     return {"payments": serialize_doc(payments)}
 
-@api_router.get("/payments/dues")
-async def get_outstanding_dues(
-    branch_id: Optional[str] = None,
-    current_user: dict = Depends(get_current_active_user)
-):
-    """Get outstanding dues"""
-    filter_query = {"payment_status": PaymentStatus.PENDING.value, "due_date": {"$lt": datetime.utcnow()}}
-    
-    if current_user["role"] == "student":
-        filter_query["student_id"] = current_user["id"]
-    
-    overdue_payments = await db.payments.find(filter_query).to_list(length=1000)
-    
-    # Group by student
-    dues_by_student = {}
-    for payment in overdue_payments:
-        student_id = payment["student_id"]
-        if student_id not in dues_by_student:
-            dues_by_student[student_id] = {"total_amount": 0, "payments": []}
-        dues_by_student[student_id]["total_amount"] += payment["amount"]
-        dues_by_student[student_id]["payments"].append(payment)
-    
-    return {"outstanding_dues": serialize_doc(dues_by_student)}
-
-@api_router.post("/payments/send-reminders")
-async def send_payment_reminders(
-    current_user: dict = Depends(require_role([UserRole.SUPER_ADMIN, UserRole.COACH_ADMIN]))
-):
-    """
-    Find all pending/overdue payments and send reminders.
-    """
-    # Find payments that are pending or overdue
-    due_payments_cursor = db.payments.find({
-        "payment_status": {"$in": [PaymentStatus.PENDING.value, PaymentStatus.OVERDUE.value]}
-    })
-    due_payments = await due_payments_cursor.to_list(length=None)
-
-    if not due_payments:
-        return {"message": "No due payments found to send reminders for."}
-
-    reminders_sent = 0
-    for payment in due_payments:
-        student = await db.users.find_one({"id": payment["student_id"]})
-        if student:
-            message = (
-                f"Hi {student['full_name']}, this is a friendly reminder that your payment of "
-                f"₹{payment['amount']} for enrollment {payment['enrollment_id']} is due on "
-                f"{payment['due_date'].date()}. Thank you."
-            )
-            await send_sms(student["phone"], message)
-            await send_whatsapp(student["phone"], message)
-            reminders_sent += 1
-
-    return {"message": f"Successfully sent {reminders_sent} payment reminders."}
-
 # PRODUCTS/ACCESSORIES MANAGEMENT
 @api_router.post("/products")
 async def create_product(
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for resolved branch locations
+
+Branches without a location_id are resolved by exact city name (so "Delhi"
+no longer matches "New Delhi"), and the location endpoints look branches up
+by the indexed location_id instead of a city regex.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+from fastapi import HTTPException
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from utils.cache import location_map_cache
+from utils.locations import backfill_branch_locations
+from controllers.category_controller import CategoryController
+from controllers.course_controller import CourseController
+
+
+@pytest.fixture(autouse=True)
+def clear_map():
+    location_map_cache.clear()
+    yield
+
+
+def make_branch(branch_id, city, courses, location_id=None):
+    branch = {
+        "id": branch_id, "is_active": True, "assignments": {"courses": courses},
+        "branch": {"name": branch_id, "code": branch_id.upper(), "email": "", "phone": "",
+                   "address": {"area": "Center", "city": city, "state": "Delhi", "pincode": "110001"}},
+        "operational_details": {"timings": []}
+    }
+    if location_id:
+        branch["location_id"] = location_id
+    return branch
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    db.locations.docs = [
+        {"id": "loc-new-delhi", "name": "New Delhi", "code": "NDL", "state": "Delhi", "is_active": True},
+        {"id": "loc-delhi", "name": "Delhi", "code": "DEL", "state": "Delhi", "is_active": True},
+    ]
+    db.categories.docs = [{"id": "cat-1", "name": "Karate", "code": "KAR", "is_active": True}]
+    db.courses.docs = [
+        {"id": f"course-{i}", "title": f"Course {i}", "code": f"C{i}", "description": "", "category_id": "cat-1",
+         "difficulty_level": "Beginner", "pricing": {"amount": 100}, "settings": {"active": True}}
+        for i in range(3)
+    ]
+    db.durations.docs = [{"id": "d-1", "name": "1 Month", "duration_months": 1, "is_active": True}]
+    db.branches.docs = [
+        make_branch("b-delhi", " delhi", ["course-0", "course-1"]),
+        make_branch("b-new-delhi", "New Delhi", ["course-1", "course-2"], location_id="loc-new-delhi"),
+        make_branch("b-unknown", "Gurgaon", ["course-2"]),
+    ]
+    init_db(db)
+    return db
+
+
+def test_backfill_resolves_exact_city_names_only():
+    db = build_database()
+    report = asyncio.run(backfill_branch_locations(db))
+
+    assert report == {"resolved": 1, "unresolved": ["b-unknown"]}
+    assert db.branches.docs[0]["location_id"] == "loc-delhi"
+    assert db.branches.docs[1]["location_id"] == "loc-new-delhi"
+    assert "location_id" not in db.branches.docs[2]
+
+
+def test_courses_by_location_uses_location_id():
+    db = build_database()
+    asyncio.run(backfill_branch_locations(db))
+
+    result = asyncio.run(CourseController.get_courses_by_location("loc-delhi", include_branches=True))
+    assert result["location"]["branch_count"] == 1
+    assert sorted(c["id"] for c in result["courses"]) == ["course-0", "course-1"]
+    assert all(c["branches_offering"][0]["id"] == "b-delhi" for c in result["courses"])
+
+
+def test_category_location_hierarchy_groups_by_resolved_location():
+    db = build_database()
+    asyncio.run(backfill_branch_locations(db))
+    db.reset_calls()
+
+    result = asyncio.run(CategoryController.get_category_location_hierarchy("cat-1"))
+    by_id = {c["id"]: c for c in result["courses"]}
+    assert [loc["location_id"] for loc in by_id["course-1"]["locations"]] == ["loc-delhi", "loc-new-delhi"]
+    assert by_id["course-2"]["locations"][1]["location_id"] is None
+    assert result["summary"]["total_locations"] == 2
+    # category, courses, durations, location map (2) and one branches query for all courses
+    assert db.query_count() == 6
+
+    filtered = asyncio.run(CategoryController.get_category_location_hierarchy("cat-1", location_id="loc-new-delhi"))
+    assert filtered["summary"]["total_branches"] == 2
+
+
+def test_category_location_filter_checks_locations_missing_from_cache():
+    db = build_database()
+    asyncio.run(backfill_branch_locations(db))
+    asyncio.run(CategoryController.get_category_location_hierarchy("cat-1"))
+
+    # An unknown id is an error rather than an unfiltered list of every location's branches
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(CategoryController.get_category_location_hierarchy("cat-1", location_id="loc-nowhere"))
+    assert error.value.status_code == 404
+
+    # A location added after the map was cached still filters
+    db.locations.docs.append({"id": "loc-gurgaon", "name": "Gurgaon", "code": "GGN", "state": "Haryana", "is_active": True})
+    db.branches.docs[2]["location_id"] = "loc-gurgaon"
+    result = asyncio.run(CategoryController.get_category_location_hierarchy("cat-1", location_id="loc-gurgaon"))
+    assert result["summary"]["total_branches"] == 1
+    assert [loc["location_name"] for c in result["courses"] for loc in c["locations"]] == ["Gurgaon"]
+
+
+if __name__ == "__main__":
+    for test in (test_backfill_resolves_exact_city_names_only,
+                 test_courses_by_location_uses_location_id,
+                 test_category_location_hierarchy_groups_by_resolved_location,
+                 test_category_location_filter_checks_locations_missing_from_cache):
+        location_map_cache.clear()
+        test()
+    print("✅ Branch location tests passed")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Query-count tests for the branch statistics
+
+get_branches used to issue up to five coach/user counts per branch, with
+fallbacks through the nested branch field and the enrollments. The counts for a
+whole page should now come from three queries regardless of page size.
+"""
+
+import asyncio
+import sys
+from collections import Counter
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase, matches
+from utils.database import init_db
+from utils.branch_stats import backfill_student_branch_ids
+from controllers.branch_controller import BranchController
+
+SUPER_ADMIN = {"id": "admin-1", "role": "super_admin"}
+BRANCH_COUNT = 20
+
+
+def group_by_branch(collection):
+    """Evaluate the $match/$group branch count pipeline against a mock collection"""
+    def run(pipeline):
+        match = pipeline[0]["$match"]
+        counts = Counter(doc["branch_id"] for doc in collection.docs if matches(doc, match))
+        return [{"_id": branch_id, "count": count} for branch_id, count in counts.items()]
+    return run
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    db.branches.docs = [
+        {
+            "id": f"b{i}",
+            "is_active": True,
+            "manager_id": "manager-1" if i == 0 else None,
+            "assignments": {"courses": ["c1", "c2"], "branch_admins": ["admin-coach", "inactive-coach"] if i == 0 else []},
+            "operational_details": {"courses_offered": ["Karate"]}
+        }
+        for i in range(BRANCH_COUNT)
+    ]
+    db.coaches.docs = [
+        {"id": "coach-1", "branch_id": "b0", "is_active": True},
+        {"id": "coach-2", "branch_id": "b0", "is_active": False},
+        {"id": "coach-3", "branch_id": "b1", "is_active": True}
+    ]
+    db.users.docs = [
+        {"id": "manager-1", "role": "coach", "is_active": True},
+        {"id": "admin-coach", "role": "coach_admin", "is_active": True},
+        {"id": "inactive-coach", "role": "coach", "is_active": False},
+        {"id": "s1", "role": "student", "branch_id": "b0", "is_active": True},
+        {"id": "s2", "role": "student", "branch_id": "b0", "is_active": False},
+        # Legacy student with only the nested branch field
+        {"id": "s3", "role": "student", "branch": {"branch_id": "b1"}, "is_active": True}
+    ]
+    db.coaches.aggregate_results = group_by_branch(db.coaches)
+    db.users.aggregate_results = group_by_branch(db.users)
+    init_db(db)
+    return db
+
+
+def test_backfill_copies_nested_branch_id():
+    db = build_database()
+    assert asyncio.run(backfill_student_branch_ids(db)) == 1
+    assert db.users.docs[-1]["branch_id"] == "b1"
+    assert asyncio.run(backfill_student_branch_ids(db)) == 0
+
+
+def test_get_branches_counts_with_fixed_queries():
+    db = build_database()
+    asyncio.run(backfill_student_branch_ids(db))
+    db.reset_calls()
+
+    result = asyncio.run(BranchController.get_branches(current_user=SUPER_ADMIN))
+    stats = {branch["id"]: branch["statistics"] for branch in result["branches"]}
+
+    assert len(stats) == BRANCH_COUNT
+    # coach-1, the manager and the active branch admin
+    assert stats["b0"] == {"coach_count": 3, "student_count": 1, "course_count": 1, "active_courses": 2}
+    assert stats["b1"]["coach_count"] == 1 and stats["b1"]["student_count"] == 1
+    assert stats["b5"]["coach_count"] == 0 and stats["b5"]["student_count"] == 0
+
+    assert db.query_count("coaches") == 1
+    assert db.query_count("users") == 2
+    assert db.query_count("enrollments") == 0
+
+
+def test_get_branch_uses_same_statistics():
+    db = build_database()
+    db.reset_calls()
+
+    branch = asyncio.run(BranchController.get_branch("b0", current_user=SUPER_ADMIN))
+
+    assert branch["statistics"]["coach_count"] == 3
+    assert branch["statistics"]["student_count"] == 1
+    assert db.query_count("users") == 2
+
+
+if __name__ == "__main__":
+    test_backfill_copies_nested_branch_id()
+    test_get_branches_counts_with_fixed_queries()
+    test_get_branch_uses_same_statistics()
+    print("✅ Branch statistics query-count tests passed")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Query-count tests for BranchesWithCoursesController
+
+get_branches_with_courses used to run a course find and coach/student counts
+for every branch. A page should now cost one branch find, one count, one course
+$in query and one grouped coach count, and repeated calls should hit the cache.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from utils.cache import branches_with_courses_cache, invalidate_branches_with_courses
+from utils.enrollment_counts import ACTIVE_FIELD
+from controllers.branches_with_courses_controller import BranchesWithCoursesController
+from test_branch_stats_query_count import group_by_branch
+
+SUPER_ADMIN = {"id": "admin-1", "role": "super_admin"}
+BRANCH_COUNT = 25
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    branches_with_courses_cache.clear()
+    yield
+    branches_with_courses_cache.clear()
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    db.branches.docs = [
+        {
+            "id": f"b{i:02d}",
+            "is_active": i != 0,
+            "branch": {"name": f"Branch {i}"},
+            "assignments": {"courses": ["c1", "c2"] if i % 2 else ["c2"]},
+            "bank_details": {"account_number": "123"},
+            ACTIVE_FIELD: i
+        }
+        for i in range(BRANCH_COUNT)
+    ]
+    db.courses.docs = [
+        {"id": "c1", "title": "Karate", "settings": {"active": True}},
+        {"id": "c2", "title": "Kung Fu", "settings": {"active": False}}
+    ]
+    db.coaches.docs = [
+        {"id": "coach-1", "branch_id": "b01", "is_active": True},
+        {"id": "coach-2", "branch_id": "b01", "is_active": True},
+        {"id": "coach-3", "branch_id": "b02", "is_active": False}
+    ]
+    db.coaches.aggregate_results = group_by_branch(db.coaches)
+    init_db(db)
+    return db
+
+
+def test_page_uses_fixed_queries():
+    db = build_database()
+
+    result = asyncio.run(BranchesWithCoursesController.get_branches_with_courses(
+        skip=0, limit=10, current_user=SUPER_ADMIN
+    ))
+
+    assert result["total"] == BRANCH_COUNT - 1
+    assert [branch["id"] for branch in result["branches"]] == [f"b{i:02d}" for i in range(1, 11)]
+    first = result["branches"][0]
+    assert [course["id"] for course in first["courses"]] == ["c1", "c2"]
+    assert first["statistics"] == {"coach_count": 2, "student_count": 1, "course_count": 2, "active_courses": 1}
+    assert first["created_at"] is None
+    assert result["summary"]["total_students"] == sum(range(1, 11))
+
+    assert db.query_count("branches") == 2
+    assert db.query_count("courses") == 1
+    assert db.query_count("coaches") == 1
+
+
+def test_optional_fields_and_cache():
+    db = build_database()
+
+    async def scenario():
+        await BranchesWithCoursesController.get_branches_with_courses(
+            include_courses=False, include_bank_details=False, current_user=SUPER_ADMIN
+        )
+        db.reset_calls()
+        return await BranchesWithCoursesController.get_branches_with_courses(
+            include_courses=False, include_bank_details=False, current_user=SUPER_ADMIN
+        )
+
+    result = asyncio.run(scenario())
+    branch = result["branches"][0]
+    assert "courses" not in branch and "bank_details" not in branch
+    assert branch["statistics"]["course_count"] == 2
+    assert db.query_count() == 0
+
+    invalidate_branches_with_courses()
+    asyncio.run(BranchesWithCoursesController.get_branches_with_courses(current_user=SUPER_ADMIN))
+    assert db.query_count("branches") == 2
+
+
+def test_missing_branch_is_404():
+    build_database()
+    with pytest.raises(Exception) as error:
+        asyncio.run(BranchesWithCoursesController.get_branches_with_courses(branch_id="nope", current_user=SUPER_ADMIN))
+    assert error.value.status_code == 404
+
+
+if __name__ == "__main__":
+    for test in (test_page_uses_fixed_queries, test_optional_fields_and_cache, test_missing_branch_is_404):
+        branches_with_courses_cache.clear()
+        test()
+    print("✅ Branches with courses query-count tests passed")
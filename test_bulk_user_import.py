@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk user import in UserController
+
+Runs the import against the in-memory MockDatabase and checks per-row
+reporting, duplicate detection with one query per batch, and background runs.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from pymongo.errors import BulkWriteError
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from utils.auth import verify_password
+from controllers.user_controller import UserController
+
+SUPER_ADMIN = {"id": "admin-1", "role": "super_admin", "full_name": "Admin"}
+
+
+def make_row(i: int, **overrides) -> dict:
+    row = {
+        "email": f"student{i}@example.com",
+        "phone": f"+9190000{i:05d}",
+        "first_name": "Student",
+        "last_name": str(i),
+        "role": "student",
+        "password": f"Secret{i}!"
+    }
+    row.update(overrides)
+    return row
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    db.users.docs = [{"id": "existing-1", "email": "taken@example.com", "phone": "+910000000000", "role": "student"}]
+    init_db(db)
+    return db
+
+
+def test_bulk_import_reports_each_row():
+    db = build_database()
+    rows = [
+        make_row(1, course={"category_id": "cat-1", "course_id": "course-1", "duration": "6 months"},
+                 branch={"location_id": "loc-1", "branch_id": "branch-1"}),
+        make_row(2),
+        make_row(3, email="taken@example.com"),
+        make_row(4, email="not-an-email"),
+        make_row(5, phone="+9190000{:05d}".format(2)),
+    ]
+
+    result = asyncio.run(UserController.bulk_import_users(rows, None, SUPER_ADMIN))
+
+    statuses = [item["status"] for item in result["results"]]
+    assert statuses == ["created", "created", "duplicate", "invalid", "duplicate"]
+    assert result["summary"] == {"created": 2, "duplicate": 2, "invalid": 1, "failed": 0, "enrollment_failed": 0}
+    assert "enrollment_id" in result["results"][0]
+
+    created = next(u for u in db.users.docs if u["email"] == "student1@example.com")
+    assert verify_password("Secret1!", created["password"])
+    assert created["branch_id"] == "branch-1"
+    assert len(db.enrollments.docs) == 1
+
+    # One duplicate lookup and one insert for the whole batch
+    assert db.query_count("users") == 2
+    assert [c[1] for c in db.calls if c[0] == "users"] == ["find", "insert_many"]
+
+
+def test_failed_enrollments_are_reported_on_their_rows():
+    db = build_database()
+    db.courses.docs = [{"id": "course-1"}]
+    enrolled = {"course": {"category_id": "cat-1", "course_id": "course-1", "duration": "6 months"},
+                "branch": {"location_id": "loc-1", "branch_id": "branch-1"}}
+    rows = [make_row(1, **enrolled), make_row(2), make_row(3, **enrolled)]
+
+    async def partly_failing_insert(docs, ordered=True, **kwargs):
+        db.enrollments.docs.append(docs[0])
+        raise BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "E11000 duplicate key"}], "nInserted": 1})
+
+    db.enrollments.insert_many = partly_failing_insert
+    result = asyncio.run(UserController.bulk_import_users(rows, None, SUPER_ADMIN, send_credentials=False))
+
+    first, second, third = result["results"]
+    assert first["status"] == second["status"] == third["status"] == "created"
+    assert first["enrollment_id"] == db.enrollments.docs[0]["id"] and "enrollment_error" not in first
+    assert "enrollment_id" not in third and third["enrollment_error"] == "E11000 duplicate key"
+    assert result["summary"]["enrollment_failed"] == 1
+    # Only the written enrollment is counted
+    assert db.courses.docs[0]["total_enrollment_count"] == 1
+
+    async def failing_insert(docs, ordered=True, **kwargs):
+        raise RuntimeError("connection reset")
+
+    db.enrollments.insert_many = failing_insert
+    result = asyncio.run(UserController.bulk_import_users([make_row(4, **enrolled)], None, SUPER_ADMIN, send_credentials=False))
+    assert result["results"][0]["enrollment_error"] == "connection reset"
+    assert "enrollment_id" not in result["results"][0]
+
+
+def test_coach_admin_rows_are_limited_to_own_branch():
+    build_database()
+    coach_admin = {"id": "ca-1", "role": "coach_admin", "full_name": "Coach Admin", "branch_id": "branch-1"}
+    rows = [make_row(1, branch_id="branch-1"), make_row(2, branch_id="branch-2")]
+
+    result = asyncio.run(UserController.bulk_import_users(rows, None, coach_admin, send_credentials=False))
+
+    assert [item["status"] for item in result["results"]] == ["created", "invalid"]
+
+
+def test_parse_import_csv_expands_nested_columns():
+    content = (
+        "email,phone,first_name,last_name,role,course.course_id,course.category_id,course.duration,branch.branch_id,branch.location_id\n"
+        "a@example.com,+911,A,One,student,course-1,cat-1,6 months,branch-1,loc-1\n"
+        "b@example.com,+912,B,Two,coach,,,,,\n"
+    )
+    rows = UserController.parse_import_csv(content)
+
+    assert rows[0]["course"] == {"course_id": "course-1", "category_id": "cat-1", "duration": "6 months"}
+    assert rows[0]["branch"] == {"branch_id": "branch-1", "location_id": "loc-1"}
+    assert "course" not in rows[1]
+
+
+def test_bulk_import_can_run_in_background():
+    async def run():
+        db = build_database()
+        response = await UserController.bulk_import_users(
+            [make_row(1), make_row(2)], None, SUPER_ADMIN, send_credentials=False, run_in_background=True
+        )
+        for _ in range(200):
+            job = await UserController.get_import_job(response["job_id"], SUPER_ADMIN)
+            if job["status"] in ("completed", "failed"):
+                return db, job
+            await asyncio.sleep(0.05)
+        return db, job
+
+    db, job = asyncio.run(run())
+    assert job["status"] == "completed"
+    assert job["result"]["summary"]["created"] == 2
+    assert len([u for u in db.users.docs if u["email"].startswith("student")]) == 2
+
+
+if __name__ == "__main__":
+    test_bulk_import_reports_each_row()
+    test_failed_enrollments_are_reported_on_their_rows()
+    test_coach_admin_rows_are_limited_to_own_branch()
+    test_parse_import_csv_expands_nested_columns()
+    test_bulk_import_can_run_in_background()
+    print("✅ Bulk user import tests passed")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk update, deactivate and transfer operations in UserController
+
+Runs against the in-memory MockDatabase and checks batching, enrollment
+cascades and the single summarized activity-log entry.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import controllers.user_controller as user_controller
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from controllers.user_controller import UserController
+from models.user_models import BulkUserSelection, BulkUserUpdate, BulkUserTransfer, BulkUserFilter, UserUpdate
+
+SUPER_ADMIN = {"id": "admin-1", "role": "super_admin", "full_name": "Admin"}
+COACH_ADMIN = {"id": "ca-1", "role": "coach_admin", "full_name": "Coach Admin", "branch_id": "branch-1"}
+
+
+def build_database(student_count: int = 12) -> MockDatabase:
+    db = MockDatabase()
+    db.branches.docs = [{"id": "branch-1"}, {"id": "branch-2"}]
+    for i in range(student_count):
+        student_id = f"student-{i:03d}"
+        db.users.docs.append({
+            "id": student_id,
+            "role": "student",
+            "is_active": True,
+            "branch_id": "branch-1",
+            "branch": {"location_id": "loc-1", "branch_id": "branch-1"},
+            "full_name": f"Student {i}"
+        })
+        db.enrollments.docs.append({
+            "id": f"enrollment-{i}",
+            "student_id": student_id,
+            "course_id": "course-1",
+            "branch_id": "branch-1",
+            "is_active": True
+        })
+    db.users.docs.append({"id": "coach-1", "role": "coach", "is_active": True, "branch_id": "branch-1"})
+    init_db(db)
+    return db
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(user_controller, "BULK_BATCH_SIZE", 5)
+
+
+def test_bulk_deactivate_by_filter_cascades_in_batches(small_batches):
+    db = build_database()
+    selection = BulkUserSelection(filter=BulkUserFilter(role="student", branch_id="branch-1"))
+
+    result = asyncio.run(UserController.bulk_deactivate_users(selection, None, SUPER_ADMIN))
+
+    assert result["modified"] == 12
+    assert result["enrollments_updated"] == 12
+    assert result["batches"] == 3
+    assert db.query_count("users") == 6  # one page read and one bulk_write per batch
+    assert not any(u["is_active"] for u in db.users.docs if u["role"] == "student")
+    assert not any(e["is_active"] for e in db.enrollments.docs)
+    assert next(u for u in db.users.docs if u["id"] == "coach-1")["is_active"]
+    assert db.query_count("activity_logs") == 1
+
+
+def test_bulk_transfer_moves_students_and_enrollments():
+    db = build_database(3)
+    db.transfer_requests.docs = [{"id": "tr-1", "student_id": "student-000", "new_branch_id": "branch-2", "status": "pending"}]
+    transfer = BulkUserTransfer(user_ids=["student-000", "student-001"], new_branch_id="branch-2", new_location_id="loc-2")
+
+    result = asyncio.run(UserController.bulk_transfer_users(transfer, None, SUPER_ADMIN))
+
+    assert result["modified"] == 2
+    moved = [u for u in db.users.docs if u["id"] in ("student-000", "student-001")]
+    assert all(u["branch_id"] == "branch-2" and u["branch"] == {"location_id": "loc-2", "branch_id": "branch-2"} for u in moved)
+    assert [e["branch_id"] for e in db.enrollments.docs] == ["branch-2", "branch-2", "branch-1"]
+    assert db.transfer_requests.docs[0]["status"] == "approved"
+    # The activity log summarizes the selection instead of storing the id list
+    details = db.activity_logs.docs[0]["details"]
+    assert details["selection"] == {"filter": {}, "user_id_count": 2}
+    assert details["modified"] == 2 and "query" not in details
+
+
+def test_bulk_update_course_change_creates_enrollments():
+    db = build_database(4)
+    bulk_update = BulkUserUpdate(
+        filter=BulkUserFilter(role="student"),
+        update=UserUpdate(
+            course={"category_id": "cat-1", "course_id": "course-2", "duration": "6 months"},
+            branch={"location_id": "loc-1", "branch_id": "branch-1"}
+        )
+    )
+
+    result = asyncio.run(UserController.bulk_update_users(bulk_update, None, SUPER_ADMIN))
+
+    assert result["modified"] == 4
+    active = [e for e in db.enrollments.docs if e["is_active"]]
+    assert len(active) == 4 and all(e["course_id"] == "course-2" for e in active)
+    # one $in read, one bulk_write and one counter recount each for courses and branches
+    assert db.query_count("enrollments") == 4
+
+
+def test_bulk_operations_are_scoped_for_coach_admins():
+    db = build_database(2)
+    db.users.docs.append({"id": "student-other", "role": "student", "is_active": True, "branch_id": "branch-2"})
+    selection = BulkUserUpdate(user_ids=["student-000", "student-other", "coach-1"], update=UserUpdate(gender="female"))
+
+    result = asyncio.run(UserController.bulk_update_users(selection, None, COACH_ADMIN))
+
+    assert result["modified"] == 1
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(UserController.bulk_update_users(
+            BulkUserUpdate(filter=BulkUserFilter(branch_id="branch-2"), update=UserUpdate(gender="male")), None, COACH_ADMIN
+        ))
+    assert exc.value.status_code == 403
+
+
+def test_bulk_update_requires_selection_and_rejects_unique_fields():
+    build_database(1)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(UserController.bulk_update_users(BulkUserUpdate(update=UserUpdate(gender="male")), None, SUPER_ADMIN))
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(UserController.bulk_update_users(
+            BulkUserUpdate(user_ids=["student-000"], update=UserUpdate(phone="+910")), None, SUPER_ADMIN
+        ))
+    assert exc.value.status_code == 400
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for get_categories_with_courses_and_durations
+
+The live path should join categories, courses, durations, branches and
+locations with one query per collection; the materialized path should serve
+the same structure from the category_hierarchy collection.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+
+from utils.cache import category_tree_cache, location_map_cache
+from utils.locations import backfill_branch_locations
+from utils import category_hierarchy
+from utils.category_hierarchy import refresh_category_hierarchy, schedule_category_hierarchy_refresh
+from controllers.category_controller import CategoryController
+from test_category_tree import build_database
+
+
+@pytest.fixture(autouse=True)
+def clear_tree():
+    category_tree_cache.clear()
+    location_map_cache.clear()
+    yield
+
+
+def add_locations(db):
+    db.locations.docs = [{"id": "loc-hyd", "name": "Hyderabad", "is_active": True}]
+    db.branches.docs = [
+        {"id": f"b{i}", "is_active": True, "assignments": {"courses": ["course-0", "course-3"]},
+         "branch": {"address": {"city": city}}}
+        for i, city in enumerate(["hyderabad", "Hyderabad ", "Pune"])
+    ]
+    for course in db.courses.docs:
+        course["pricing"] = {"currency": "INR", "amount": 1000}
+    db.durations.docs[0]["pricing_multiplier"] = 2.0
+    report = asyncio.run(backfill_branch_locations(db))
+    assert report == {"resolved": 2, "unresolved": ["b2"]}
+    db.reset_calls()
+
+
+def fetch(**kwargs):
+    return asyncio.run(CategoryController.get_categories_with_courses_and_durations(**kwargs))
+
+
+def test_live_hierarchy_uses_one_query_per_collection():
+    db = build_database()
+    add_locations(db)
+    result = fetch(include_locations=True, materialized=False)
+
+    by_id = {c["id"]: c for c in result["categories"]}
+    assert result["total"] == 5 - 1  # inactive category excluded
+    course = by_id["karate"]["courses"][0]
+    assert course["durations"][0]["final_price"] == 2000.0
+    assert course["locations_available"] == [
+        {"location_id": "loc-hyd", "location_name": "Hyderabad", "branch_count": 2},
+        {"location_id": None, "location_name": "Pune", "branch_count": 1},
+    ]
+    # category tree (2) + courses + durations + branches + location map (locations, branches)
+    assert db.query_count() == 7
+
+
+def test_materialized_hierarchy_matches_live_and_uses_two_queries():
+    db = build_database()
+    add_locations(db)
+    live = fetch(include_locations=True, materialized=False)
+    asyncio.run(refresh_category_hierarchy(db))
+
+    db.reset_calls()
+    materialized = fetch(include_locations=True)
+    assert materialized == live
+    assert db.query_count() == 2
+
+    without_locations = fetch(category_id="karate")
+    assert without_locations["total"] == 1
+    assert all(c["locations_available"] == [] for c in without_locations["categories"][0]["courses"])
+
+
+def test_scheduled_refresh_picks_up_writes():
+    db = build_database()
+    asyncio.run(refresh_category_hierarchy(db))
+    db.categories.docs[0]["is_active"] = False
+
+    async def write_and_refresh():
+        schedule_category_hierarchy_refresh()
+        await category_hierarchy._refresh_task
+
+    asyncio.run(write_and_refresh())
+    assert [c["id"] for c in fetch()["categories"]] == ["karate", "kumite", "kata"]
+
+
+if __name__ == "__main__":
+    for test in (test_live_hierarchy_uses_one_query_per_collection,
+                 test_materialized_hierarchy_matches_live_and_uses_two_queries,
+                 test_scheduled_refresh_picks_up_writes):
+        category_tree_cache.clear()
+        location_map_cache.clear()
+        test()
+    print("✅ Category hierarchy tests passed")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the cached category tree
+
+The category listings should get course counts from one $group and the
+parent/child structure from one categories query, then serve repeat requests
+from the cache until a category or course write invalidates it.
+"""
+
+import asyncio
+import sys
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from utils.cache import category_tree_cache, invalidate_category_tree
+from controllers.category_controller import CategoryController
+
+NOW = datetime(2024, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def clear_tree():
+    category_tree_cache.clear()
+    yield
+
+
+def make_category(category_id, order, parent=None, active=True):
+    return {"id": category_id, "name": category_id.title(), "code": category_id.upper(), "parent_category_id": parent,
+            "is_active": active, "display_order": order, "created_at": NOW, "updated_at": NOW}
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    db.categories.docs = [
+        make_category("kungfu", 2),
+        make_category("karate", 1),
+        make_category("kata", 2, parent="karate"),
+        make_category("kumite", 1, parent="karate"),
+        make_category("retired", 3, parent="karate", active=False),
+    ]
+    db.courses.docs = [
+        {"id": f"course-{i}", "title": f"Course {i}", "code": f"C{i}", "difficulty_level": "Beginner",
+         "category_id": category, "settings": {"active": True}}
+        for i, category in enumerate(["karate", "karate", "kata", "kungfu"])
+    ]
+    db.durations.docs = [{"id": "d-3", "name": "3 Months", "duration_months": 3, "is_active": True}]
+
+    def group_courses(pipeline):
+        counts = Counter(course["category_id"] for course in db.courses.docs)
+        return [{"_id": category_id, "count": count} for category_id, count in counts.items()]
+    db.courses.aggregate_results = group_courses
+    init_db(db)
+    return db
+
+
+def test_categories_tree_uses_two_queries_then_cache():
+    db = build_database()
+    result = asyncio.run(CategoryController.get_categories(parent_id=None, include_subcategories=True))
+
+    assert [c["id"] for c in result["categories"]] == ["karate", "kumite", "kungfu", "kata"]
+    karate = result["categories"][0]
+    assert karate["course_count"] == 2
+    assert [(s["id"], s["course_count"]) for s in karate["subcategories"]] == [("kumite", 0), ("kata", 1)]
+    assert db.query_count() == 2
+
+    db.reset_calls()
+    public = asyncio.run(CategoryController.get_public_categories())
+    single = asyncio.run(CategoryController.get_category("karate"))
+    assert [c["id"] for c in public["categories"]] == ["karate", "kungfu"]
+    assert public["total"] == 2
+    assert single["course_count"] == 2 and len(single["subcategories"]) == 2
+    assert db.query_count() == 0
+
+
+def test_invalidation_picks_up_writes():
+    db = build_database()
+    asyncio.run(CategoryController.get_category("kungfu"))
+
+    db.courses.docs.append({"id": "course-9", "category_id": "kungfu"})
+    assert asyncio.run(CategoryController.get_category("kungfu"))["course_count"] == 1
+    invalidate_category_tree()
+    assert asyncio.run(CategoryController.get_category("kungfu"))["course_count"] == 2
+
+
+def test_categories_with_details_batches_courses_and_durations():
+    db = build_database()
+    result = asyncio.run(CategoryController.get_categories_with_details())
+
+    by_id = {c["id"]: c for c in result["categories"]}
+    assert by_id["karate"]["course_count"] == 2
+    assert by_id["karate"]["courses"][0]["available_durations"][0]["id"] == "d-3"
+    assert [s["id"] for s in by_id["karate"]["subcategories"]] == ["kumite", "kata"]
+    # category tree (2) + courses + durations, independent of the number of categories
+    assert db.query_count() == 4
+
+
+if __name__ == "__main__":
+    for test in (test_categories_tree_uses_two_queries_then_cache,
+                 test_invalidation_picks_up_writes,
+                 test_categories_with_details_batches_courses_and_durations):
+        category_tree_cache.clear()
+        test()
+    print("✅ Category tree tests passed")
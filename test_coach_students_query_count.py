@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Query-count test for CoachController.get_coach_students
+
+Runs the controller against the in-memory MockDatabase and checks that the
+number of database calls does not grow with the number of students.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from controllers.coach_controller import CoachController
+
+SUPER_ADMIN = {"id": "admin-1", "role": "super_admin", "full_name": "Admin"}
+
+
+def build_database(student_count: int) -> MockDatabase:
+    db = MockDatabase()
+    db.coaches.docs = [{"id": "coach-1", "assignment_details": {"courses": ["course-2"]}}]
+    db.courses.docs = [
+        {"id": "course-1", "title": "Karate", "instructor_id": "coach-1", "settings": {"active": True}},
+        {"id": "course-2", "title": "Judo", "settings": {"active": True}},
+        {"id": "course-3", "title": "Boxing", "settings": {"active": True}},
+    ]
+    for i in range(student_count):
+        db.users.docs.append({"id": f"student-{i}", "role": "student", "full_name": f"Student {i}", "email": f"s{i}@example.com"})
+        db.enrollments.docs.append({
+            "id": f"enrollment-{i:04d}",
+            "student_id": f"student-{i}",
+            "course_id": ["course-1", "course-2", "course-3"][i % 3],
+            "branch_id": "branch-1",
+            "is_active": True,
+            "enrollment_date": datetime(2024, 1, 1) + timedelta(days=i)
+        })
+    init_db(db)
+    return db
+
+
+def test_coach_students_query_count_is_constant():
+    small_db = build_database(6)
+    small = asyncio.run(CoachController.get_coach_students("coach-1", SUPER_ADMIN))
+    large_db = build_database(600)
+    large = asyncio.run(CoachController.get_coach_students("coach-1", SUPER_ADMIN, limit=1000))
+
+    assert small["total"] == 4
+    assert large["total"] == 400
+    assert len(large["students"]) == 400
+    assert small_db.query_count() == large_db.query_count() == 5
+    assert {s["course_name"] for s in large["students"]} == {"Karate", "Judo"}
+
+
+def test_coach_students_pagination():
+    build_database(30)
+    first = asyncio.run(CoachController.get_coach_students("coach-1", SUPER_ADMIN, skip=0, limit=15))
+    second = asyncio.run(CoachController.get_coach_students("coach-1", SUPER_ADMIN, skip=15, limit=15))
+
+    assert first["total"] == second["total"] == 20
+    assert len(first["students"]) == 15 and len(second["students"]) == 5
+    ids = [s["id"] for s in first["students"] + second["students"]]
+    assert len(set(ids)) == 20
+
+
+if __name__ == "__main__":
+    test_coach_students_query_count_is_constant()
+    test_coach_students_pagination()
+    print("✅ Coach students query-count tests passed")
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Tests for the course_assignments edge collection
+
+Checks that the edges follow branch, coach and course writes, and that the
+course listings resolve assignments from the edges instead of scanning
+branches and coaches per course.
+"""
+
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from utils.course_assignments import COURSE_ASSIGNMENTS_VERSION, backfill_course_assignments, rebuild_course_assignments, sync_branch, sync_coach
+from controllers.course_controller import CourseController
+from controllers.coach_controller import CoachController
+
+SUPER_ADMIN = {"id": "admin-1", "role": "super_admin", "full_name": "Admin"}
+
+
+def make_branch(branch_id: str, course_ids, is_active=True) -> dict:
+    return {
+        "id": branch_id,
+        "branch": {"name": f"Branch {branch_id}", "code": branch_id.upper(), "address": {"area": "Center", "city": "Hyderabad"}},
+        "assignments": {"courses": list(course_ids)},
+        "is_active": is_active
+    }
+
+
+def build_database(course_count: int = 4) -> MockDatabase:
+    db = MockDatabase()
+    course_ids = [f"course-{i}" for i in range(course_count)]
+    db.courses.docs = [
+        {"id": course_id, "title": f"Course {i}", "settings": {"active": True}, "instructor_id": "coach-2" if i == 0 else None}
+        for i, course_id in enumerate(course_ids)
+    ]
+    db.branches.docs = [make_branch("b1", course_ids), make_branch("b2", course_ids[:1]), make_branch("b3", course_ids, is_active=False)]
+    db.coaches.docs = [
+        {"id": "coach-1", "full_name": "Coach One", "email": "c1@example.com", "branch_id": "b1",
+         "assignment_details": {"courses": course_ids}, "is_active": True},
+        {"id": "coach-2", "full_name": "Coach Two", "email": "c2@example.com", "branch_id": "b2",
+         "assignment_details": {"courses": [course_ids[-1]]}, "is_active": True},
+    ]
+    init_db(db)
+    asyncio.run(rebuild_course_assignments(db))
+    db.reset_calls()
+    return db
+
+
+def test_get_courses_reads_assignments_from_edges():
+    db = build_database()
+    result = asyncio.run(CourseController.get_courses(current_user=SUPER_ADMIN))
+
+    first = result["courses"][0]
+    assert {b["branch_id"] for b in first["branch_assignments"]} == {"b1", "b2"}
+    assert first["branch_assignments"][0]["location"] == "Center, Hyderabad"
+    assert first["instructor_assignments"] == [{"instructor_id": "coach-1", "instructor_name": "Coach One", "email": "c1@example.com"}]
+    assert db.query_count("course_assignments") == 1
+    assert db.query_count("branches") == 0
+    assert db.query_count("coaches") == 0
+
+
+def test_edges_follow_branch_and_coach_writes():
+    db = build_database()
+    db.branches.docs[1]["assignments"]["courses"] = ["course-1"]
+    asyncio.run(sync_branch(db, "b2"))
+    db.coaches.docs[0]["is_active"] = False
+    asyncio.run(sync_coach(db, "coach-1"))
+
+    result = asyncio.run(CourseController.get_courses(current_user=SUPER_ADMIN))
+    by_id = {c["id"]: c for c in result["courses"]}
+    assert [b["branch_id"] for b in by_id["course-0"]["branch_assignments"]] == ["b1"]
+    assert {b["branch_id"] for b in by_id["course-1"]["branch_assignments"]} == {"b1", "b2"}
+    assert all(c["instructor_count"] == 0 for cid, c in by_id.items() if cid != "course-3")
+
+
+def edge_keys(db):
+    return [(e["kind"], e["course_id"], e["branch_id"], e["coach_id"]) for e in db.course_assignments.docs]
+
+
+def test_concurrent_rebuilds_and_syncs_keep_tuples_unique():
+    db = build_database()
+    expected = sorted(edge_keys(db))
+
+    async def scenario():
+        await asyncio.gather(
+            rebuild_course_assignments(db), rebuild_course_assignments(db),
+            sync_branch(db, "b1"), sync_branch(db, "b1"), sync_coach(db, "coach-1")
+        )
+
+    asyncio.run(scenario())
+    assert sorted(edge_keys(db)) == expected
+
+
+def test_sync_and_rebuild_drop_stale_tuples():
+    db = build_database()
+    # The coach moves branch: the edges under the old branch go
+    db.coaches.docs[1]["branch_id"] = "b1"
+    asyncio.run(sync_coach(db, "coach-2"))
+    assert [key for key in edge_keys(db) if key[0] == "coach" and key[3] == "coach-2"] == [
+        ("coach", "course-3", "b1", "coach-2")
+    ]
+
+    # Assignments removed while no sync ran are dropped by the next rebuild
+    db.branches.docs[2]["assignments"]["courses"] = []
+    asyncio.run(rebuild_course_assignments(db))
+    assert not [key for key in edge_keys(db) if key[2] == "b3"]
+
+
+def test_backfill_runs_once_per_lease():
+    db = build_database()
+    db.course_assignments.docs = []
+
+    asyncio.run(backfill_course_assignments(db))
+    count = len(db.course_assignments.docs)
+    db.course_assignments.docs = []
+    # Another worker starting in the same window leaves it to the first
+    db.job_leases.docs[0]["owner"] = "another-worker"
+    asyncio.run(backfill_course_assignments(db))
+
+    assert count > 0 and db.course_assignments.docs == []
+
+
+def test_backfill_skips_a_current_collection():
+    db = build_database()
+    db.course_assignments.docs = []
+    asyncio.run(backfill_course_assignments(db))
+    # Later starts, even after the lease expired, leave the edges to the syncs
+    db.job_leases.docs[0]["owner"] = None
+    db.job_leases.docs[0]["expires_at"] = datetime.utcnow()
+    db.reset_calls()
+    asyncio.run(backfill_course_assignments(db))
+    assert not [call for call in db.calls if call[0] == "course_assignments" and call[1] != "find_one"]
+
+    # A new edge format rebuilds once more
+    db.job_leases.docs[0]["version"] = COURSE_ASSIGNMENTS_VERSION - 1
+    db.branches.docs[2]["assignments"]["courses"] = []
+    asyncio.run(backfill_course_assignments(db))
+    assert not [key for key in edge_keys(db) if key[2] == "b3"]
+    assert db.job_leases.docs[0]["version"] == COURSE_ASSIGNMENTS_VERSION
+
+
+def test_rebuild_keeps_an_unassignment_made_while_it_runs():
+    db = build_database()
+    list_coach_ids = db.coaches.distinct
+
+    async def unassign_during_listing(*args, **kwargs):
+        # b1 drops course-1 (and its sync runs) after the rebuild listed the branches
+        db.branches.docs[0]["assignments"]["courses"].remove("course-1")
+        await sync_branch(db, "b1")
+        return await list_coach_ids(*args, **kwargs)
+
+    db.coaches.distinct = unassign_during_listing
+    asyncio.run(rebuild_course_assignments(db))
+    assert ("branch", "course-1", "b1", None) not in edge_keys(db)
+
+
+def test_coach_courses_include_instructor_and_assigned_courses():
+    db = build_database()
+    result = asyncio.run(CoachController.get_coach_courses("coach-2", SUPER_ADMIN))
+
+    assert {c["id"] for c in result["courses"]} == {"course-0", "course-3"}
+    assert db.query_count("branches") == 0
+    assert db.query_count("course_assignments") == 2
+
+
+def test_courses_by_branch_filters_instructors_to_branch():
+    build_database()
+    result = asyncio.run(CourseController.get_courses_by_branch("b2", SUPER_ADMIN))
+
+    assert result["courses"][0]["instructor_name"] is None
+    result = asyncio.run(CourseController.get_courses_by_branch("b1", SUPER_ADMIN))
+    assert all(c["instructor_name"] == "Coach One" for c in result["courses"])
+
+
+if __name__ == "__main__":
+    test_get_courses_reads_assignments_from_edges()
+    test_edges_follow_branch_and_coach_writes()
+    test_concurrent_rebuilds_and_syncs_keep_tuples_unique()
+    test_sync_and_rebuild_drop_stale_tuples()
+    test_backfill_runs_once_per_lease()
+    test_backfill_skips_a_current_collection()
+    test_rebuild_keeps_an_unassignment_made_while_it_runs()
+    test_coach_courses_include_instructor_and_assigned_courses()
+    test_courses_by_branch_filters_instructors_to_branch()
+    print("✅ Course assignment tests passed")
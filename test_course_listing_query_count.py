@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Query-count tests for the course listings
+
+get_courses, get_public_courses, get_courses_by_branch and get_coach_courses
+used to issue branch, coach and enrollment queries for every course on a page.
+They should now issue a fixed number of queries regardless of page size, and
+only the per-branch listing should query enrollments.
+"""
+
+import asyncio
+import sys
+from collections import Counter
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import matches
+from controllers.course_controller import CourseController
+from controllers.coach_controller import CoachController
+from test_course_assignments import build_database, SUPER_ADMIN
+
+COURSE_COUNT = 30
+
+
+def group_enrollments(db):
+    """Evaluate the $match/$group enrollment count pipeline against the mock enrollments"""
+    def run(pipeline):
+        match = pipeline[0]["$match"]
+        counts = Counter(doc["course_id"] for doc in db.enrollments.docs if matches(doc, match))
+        return [{"_id": course_id, "count": count} for course_id, count in counts.items()]
+    return run
+
+
+def build_listing_database():
+    db = build_database(COURSE_COUNT)
+    db.enrollments.docs = [
+        {"id": f"e-{i}", "course_id": f"course-{i % 3}", "branch_id": "b1" if i % 2 else "b2", "is_active": i != 0}
+        for i in range(12)
+    ]
+    db.enrollments.aggregate_results = group_enrollments(db)
+    # Stored counters, as maintained by utils.enrollment_counts
+    for course in db.courses.docs:
+        course["active_enrollment_count"] = sum(
+            1 for e in db.enrollments.docs if e["course_id"] == course["id"] and e["is_active"]
+        )
+    return db
+
+
+def test_get_courses_uses_fixed_queries():
+    db = build_listing_database()
+    result = asyncio.run(CourseController.get_courses(limit=COURSE_COUNT, current_user=SUPER_ADMIN))
+
+    by_id = {c["id"]: c for c in result["courses"]}
+    assert len(by_id) == COURSE_COUNT
+    assert by_id["course-0"]["student_enrollment_count"] == 3
+    assert by_id["course-1"]["students"] == 4
+    assert by_id["course-5"]["student_enrollment_count"] == 0
+    assert db.query_count() == 2  # courses, edges
+    assert db.query_count("enrollments") == 0
+
+
+def test_public_courses_and_branch_courses_use_fixed_queries():
+    db = build_listing_database()
+    asyncio.run(CourseController.get_public_courses(limit=COURSE_COUNT))
+    assert db.query_count() == 3  # courses, edges, total
+
+    db.reset_calls()
+    result = asyncio.run(CourseController.get_courses_by_branch("b1", SUPER_ADMIN))
+    by_id = {c["id"]: c for c in result["courses"]}
+    assert by_id["course-1"]["enrolled_students"] == 2
+    assert db.query_count() == 4  # branch, courses, edges, enrollment counts
+
+
+def test_coach_courses_use_fixed_queries():
+    db = build_listing_database()
+    result = asyncio.run(CoachController.get_coach_courses("coach-1", SUPER_ADMIN))
+
+    assert len(result["courses"]) == COURSE_COUNT
+    assert db.query_count() == 4  # coach, edge ids, courses, branch edges
+
+
+if __name__ == "__main__":
+    test_get_courses_uses_fixed_queries()
+    test_public_courses_and_branch_courses_use_fixed_queries()
+    test_coach_courses_use_fixed_queries()
+    print("✅ Course listing query-count tests passed")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tests for the denormalized enrollment counters
+
+Covers the $inc bookkeeping on enrollment writes and the consistency check
+that repairs drifted counters without losing concurrent increments, run by
+one worker per night.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase, matches, _get_path
+import utils.enrollment_counts as enrollment_counts
+from utils.database import init_db
+from utils.leases import acquire_lease
+from utils.enrollment_counts import (
+    record_enrollment_created, record_enrollments_created, set_enrollment_active,
+    recount_enrollment_counters, check_enrollment_counters, run_nightly_counter_check,
+    ACTIVE_FIELD, TOTAL_FIELD, COUNTER_CHECK_LEASE
+)
+
+
+def group_enrollments(db):
+    """Evaluate the counter $match/$group pipeline against the mock enrollments"""
+    def run(pipeline):
+        match = pipeline[0]["$match"]
+        key = pipeline[1]["$group"]["_id"].lstrip("$")
+        groups = {}
+        for doc in db.enrollments.docs:
+            if not matches(doc, match):
+                continue
+            row = groups.setdefault(_get_path(doc, key)[0], {"total": 0, "active": 0})
+            row["total"] += 1
+            row["active"] += 1 if doc.get("is_active") else 0
+        return [{"_id": owner_id, **row} for owner_id, row in groups.items()]
+    return run
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    db.courses.docs = [{"id": "c1"}, {"id": "c2"}]
+    db.branches.docs = [{"id": "b1"}, {"id": "b2"}]
+    db.enrollments.aggregate_results = group_enrollments(db)
+    init_db(db)
+    return db
+
+
+def counters(doc):
+    return doc.get(ACTIVE_FIELD, 0), doc.get(TOTAL_FIELD, 0)
+
+
+async def create(db, enrollment):
+    await db.enrollments.insert_one(enrollment)
+    await record_enrollment_created(db, enrollment)
+
+
+def test_create_and_deactivate_adjust_counters_once():
+    db = build_database()
+
+    async def scenario():
+        await create(db, {"id": "e1", "course_id": "c1", "branch_id": "b1", "is_active": True})
+        await create(db, {"id": "e2", "course_id": "c1", "branch_id": "b2", "is_active": True})
+        # Deactivating twice must only be counted once
+        assert await set_enrollment_active(db, "e1", False) is not None
+        assert await set_enrollment_active(db, "e1", False) is None
+
+    asyncio.run(scenario())
+    c1, _ = db.courses.docs
+    b1, b2 = db.branches.docs
+    assert counters(c1) == (1, 2)
+    assert counters(b1) == (0, 1)
+    assert counters(b2) == (1, 1)
+
+
+def test_bulk_creates_and_recount():
+    db = build_database()
+    enrollments = [
+        {"id": f"e{i}", "course_id": "c1" if i % 2 else "c2", "branch_id": "b1", "is_active": i != 0}
+        for i in range(5)
+    ]
+
+    async def scenario():
+        await db.enrollments.insert_many(enrollments)
+        await record_enrollments_created(db, enrollments)
+        assert counters(db.courses.docs[1]) == (2, 3)
+        assert counters(db.branches.docs[0]) == (4, 5)
+        await db.enrollments.update_many({"course_id": "c1"}, {"$set": {"branch_id": "b2"}})
+        await recount_enrollment_counters(db, branch_ids=["b1", "b2"])
+
+    asyncio.run(scenario())
+    assert counters(db.branches.docs[0]) == (2, 3)
+    assert counters(db.branches.docs[1]) == (2, 2)
+
+
+def test_consistency_check_reports_and_repairs_drift():
+    db = build_database()
+    db.enrollments.docs = [
+        {"id": "e1", "course_id": "c1", "branch_id": "b1", "is_active": True},
+        {"id": "e2", "course_id": "c1", "branch_id": "b1", "is_active": False},
+    ]
+    db.courses.docs[0].update({ACTIVE_FIELD: 5, TOTAL_FIELD: 2})
+    db.courses.docs[1].update({ACTIVE_FIELD: 0, TOTAL_FIELD: 0})
+    db.branches.docs[0].update({ACTIVE_FIELD: 1, TOTAL_FIELD: 2})
+
+    report = asyncio.run(check_enrollment_counters(db, repair=False))
+    assert report["checked"] == {"courses": 2, "branches": 2}
+    assert {(m["collection"], m["id"]) for m in report["mismatches"]} == {("courses", "c1"), ("branches", "b2")}
+    assert counters(db.courses.docs[0]) == (5, 2)
+
+    report = asyncio.run(check_enrollment_counters(db))
+    assert report["repaired"] == 2
+    assert counters(db.courses.docs[0]) == (1, 2)
+    assert db.branches.docs[1][ACTIVE_FIELD] == 0
+    assert asyncio.run(check_enrollment_counters(db))["mismatches"] == []
+
+
+def test_repair_skips_counters_moved_during_the_check():
+    db = build_database()
+    db.enrollments.docs = [{"id": "e1", "course_id": "c1", "branch_id": "b1", "is_active": True}]
+    db.courses.docs[0].update({ACTIVE_FIELD: 0, TOTAL_FIELD: 0})
+    db.courses.docs[1].update({ACTIVE_FIELD: 3, TOTAL_FIELD: 3})
+    count = group_enrollments(db)
+
+    def count_while_enrolling(pipeline):
+        # An enrollment in c1 is written and counted between the counter read and the recount
+        if "course_id" in pipeline[0]["$match"] and len(db.enrollments.docs) == 1:
+            db.enrollments.docs.append({"id": "e2", "course_id": "c1", "branch_id": "b2", "is_active": True})
+            db.courses.docs[0].update({ACTIVE_FIELD: 1, TOTAL_FIELD: 1})
+        return count(pipeline)
+
+    db.enrollments.aggregate_results = count_while_enrolling
+    report = asyncio.run(check_enrollment_counters(db))
+
+    # c1 is left as the increment made it; c2 and the branches are repaired
+    assert counters(db.courses.docs[0]) == (1, 1)
+    assert counters(db.courses.docs[1]) == (0, 0)
+    assert report["skipped"] == 1 and report["repaired"] == 3
+
+
+def test_nightly_check_runs_in_the_lease_holder_only(monkeypatch):
+    db = build_database()
+    db.courses.docs[0].update({ACTIVE_FIELD: 4, TOTAL_FIELD: 4})
+    monkeypatch.setattr(enrollment_counts, "_seconds_until", lambda hour: 0)
+
+    async def run_briefly():
+        task = asyncio.ensure_future(run_nightly_counter_check(db))
+        for _ in range(5):
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(acquire_lease(db, COUNTER_CHECK_LEASE, 60, owner="other-worker"))
+    asyncio.run(run_briefly())
+    assert counters(db.courses.docs[0]) == (4, 4)
+
+    db.job_leases.docs = []
+    asyncio.run(run_briefly())
+    assert counters(db.courses.docs[0]) == (0, 0)
+
+
+if __name__ == "__main__":
+    test_create_and_deactivate_adjust_counters_once()
+    test_bulk_creates_and_recount()
+    test_consistency_check_reports_and_repairs_drift()
+    test_repair_skips_counters_moved_during_the_check()
+    print("✅ Enrollment counter tests passed")
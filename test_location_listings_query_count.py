@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Query-count tests for the LocationController listings
+
+get_locations, get_locations_with_branches and get_locations_with_details used
+to query branches once per location, and get_branches_by_location queried
+courses and categories once per branch and course. Each listing should now
+cost a fixed number of queries per page, and get_states should be cached.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase, matches
+from utils.database import init_db
+from utils.cache import location_states_cache, invalidate_location_states
+from controllers.location_controller import LocationController
+
+LOCATION_COUNT = 12
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    location_states_cache.clear()
+    yield
+    location_states_cache.clear()
+
+
+def run_lookup(db, location, lookup):
+    """Evaluate the branches $lookup sub-pipeline for one location"""
+    stages = lookup["pipeline"]
+    branch_match = dict(stages[0]["$match"])
+    branch_match.pop("$expr")
+    branches = [
+        doc for doc in db[lookup["from"]].docs
+        if doc.get("location_id") == location["id"] and matches(doc, branch_match)
+    ]
+    for stage in stages[1:]:
+        if "$limit" in stage:
+            branches = branches[:stage["$limit"]]
+        elif "$count" in stage:
+            branches = [{stage["$count"]: len(branches)}] if branches else []
+    return branches
+
+
+def page_with_branches(db):
+    """Evaluate the $match/$sort/$skip/$limit/$lookup location pipeline against the mock"""
+    def run(pipeline):
+        stages = {key: value for stage in pipeline for key, value in stage.items()}
+        docs = [doc for doc in db.locations.docs if matches(doc, stages["$match"])]
+        docs.sort(key=lambda doc: doc["display_order"])
+        docs = docs[stages["$skip"]:stages["$skip"] + stages["$limit"]]
+        return [{**doc, "branches": run_lookup(db, doc, stages["$lookup"])} for doc in docs]
+    return run
+
+
+def location(i):
+    return {
+        "id": f"loc-{i}", "name": f"City {i}", "code": f"C{i}", "state": "Telangana" if i % 2 else "Andhra Pradesh",
+        "country": "India", "timezone": "Asia/Kolkata", "is_active": True, "display_order": i,
+        "created_at": "2024-01-01", "updated_at": "2024-01-01"
+    }
+
+
+def branch(branch_id, location_id, courses, is_active=True):
+    return {
+        "id": branch_id, "location_id": location_id, "is_active": is_active,
+        "branch": {
+            "name": branch_id, "code": branch_id.upper(), "email": f"{branch_id}@example.com", "phone": "1",
+            "address": {"line1": "1", "area": "A", "city": "C", "state": "S", "pincode": "500001", "country": "India"}
+        },
+        "assignments": {"courses": courses},
+        "operational_details": {"courses_offered": [], "timings": []}
+    }
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    db.locations.docs = [location(i) for i in range(LOCATION_COUNT)]
+    db.branches.docs = [
+        branch("b1", "loc-0", ["c1", "c2"]),
+        branch("b2", "loc-0", ["c2"]),
+        branch("b3", "loc-0", ["c1"], is_active=False),
+        branch("b4", "loc-1", ["c3"])
+    ]
+    db.courses.docs = [
+        {"id": f"c{i}", "title": f"Course {i}", "code": f"C{i}", "category_id": "cat-1" if i < 3 else "cat-2",
+         "difficulty_level": "Beginner", "settings": {"active": i != 3}}
+        for i in range(1, 4)
+    ]
+    db.categories.docs = [{"id": "cat-1", "name": "Martial Arts"}, {"id": "cat-2", "name": "Fitness"}]
+    db.locations.aggregate_results = page_with_branches(db)
+    init_db(db)
+    return db
+
+
+def test_get_locations_counts_branches_in_one_pipeline():
+    db = build_database()
+
+    result = asyncio.run(LocationController.get_locations(limit=10))
+
+    counts = {loc["id"]: loc["branch_count"] for loc in result["locations"]}
+    assert len(counts) == 10 and result["total"] == LOCATION_COUNT
+    assert counts["loc-0"] == 3 and counts["loc-1"] == 1 and counts["loc-5"] == 0
+    assert db.query_count("locations") == 2
+    assert db.query_count("branches") == 0
+
+
+def test_locations_with_branches_and_details():
+    db = build_database()
+
+    with_branches = asyncio.run(LocationController.get_locations_with_branches(limit=5))
+    details = asyncio.run(LocationController.get_locations_with_details(limit=5))
+
+    assert [b["id"] for b in with_branches["locations"][0]["branches"]] == ["b1", "b2"]
+    first = details["locations"][0]
+    assert first["branch_count"] == 2 and first["total_courses_available"] == 2
+    assert db.query_count("locations") == 4
+    assert db.query_count("branches") == 0
+
+
+def test_branches_by_location_batches_courses_and_categories():
+    db = build_database()
+
+    result = asyncio.run(LocationController.get_branches_by_location("loc-0"))
+
+    courses = {b["id"]: [(c["id"], c["category"]) for c in b["available_courses"]] for b in result["branches"]}
+    assert courses == {"b1": [("c1", "Martial Arts"), ("c2", "Martial Arts")], "b2": [("c2", "Martial Arts")]}
+    assert db.query_count("courses") == 1
+    assert db.query_count("categories") == 1
+
+    with pytest.raises(Exception) as error:
+        asyncio.run(LocationController.get_branches_by_location("missing"))
+    assert error.value.status_code == 404
+
+
+def test_get_states_is_cached():
+    db = build_database()
+    db.locations.aggregate_results = [{"_id": "Andhra Pradesh", "count": 6}, {"_id": "Telangana", "count": 6}]
+
+    first = asyncio.run(LocationController.get_states())
+    second = asyncio.run(LocationController.get_states())
+    assert first == second and first["total"] == 2
+    assert db.query_count("locations") == 1
+
+    invalidate_location_states()
+    asyncio.run(LocationController.get_states())
+    assert db.query_count("locations") == 2
+
+
+if __name__ == "__main__":
+    for test in (
+        test_get_locations_counts_branches_in_one_pipeline,
+        test_locations_with_branches_and_details,
+        test_branches_by_location_batches_courses_and_categories,
+        test_get_states_is_cached
+    ):
+        location_states_cache.clear()
+        test()
+    print("✅ Location listing query-count tests passed")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the nearest-branch search
+
+GET /api/branches/nearby should answer with a single $geoNear aggregation,
+applying the course and active filters inside the geo query.
+"""
+
+import asyncio
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase, matches
+from utils.database import init_db
+from models.branch_models import GeoPoint
+from controllers.branch_controller import BranchController
+
+
+def haversine_meters(a, b):
+    lng1, lat1, lng2, lat2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6378100 * math.asin(math.sqrt(h))
+
+
+def geo_near(db):
+    """Evaluate the $geoNear/$limit pipeline against the mock branches"""
+    def run(pipeline):
+        stage = pipeline[0]["$geoNear"]
+        origin = stage["near"]["coordinates"]
+        results = []
+        for doc in db.branches.docs:
+            point = (doc.get("geo_location") or {}).get("coordinates")
+            if not point or not matches(doc, stage["query"]):
+                continue
+            distance = haversine_meters(origin, point)
+            if distance <= stage["maxDistance"]:
+                results.append({**doc, stage["distanceField"]: distance})
+        results.sort(key=lambda doc: doc[stage["distanceField"]])
+        return results[:pipeline[1]["$limit"]]
+    return run
+
+
+def branch(branch_id, lng, lat, courses, is_active=True):
+    return {
+        "id": branch_id,
+        "branch": {"name": branch_id.title(), "code": branch_id.upper(), "address": {"city": "Hyderabad"}},
+        "geo_location": {"type": "Point", "coordinates": [lng, lat]} if lng is not None else None,
+        "assignments": {"courses": courses},
+        "operational_details": {"timings": [{"day": "Monday", "open": "07:00", "close": "19:00"}]},
+        "is_active": is_active
+    }
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    db.branches.docs = [
+        branch("far", 78.60, 17.50, ["karate"]),
+        branch("near", 78.48, 17.39, ["karate"]),
+        branch("closest-inactive", 78.4867, 17.385, ["karate"], is_active=False),
+        branch("other-course", 78.49, 17.39, ["judo"]),
+        branch("no-coordinates", None, None, ["karate"])
+    ]
+    db.branches.aggregate_results = geo_near(db)
+    init_db(db)
+    return db
+
+
+def test_nearby_branches_filters_and_orders_by_distance():
+    db = build_database()
+
+    result = asyncio.run(BranchController.get_nearby_branches(17.385, 78.4867, max_distance_km=5, course_id="karate"))
+
+    assert [b["id"] for b in result["branches"]] == ["near"]
+    assert result["branches"][0]["distance_km"] < 1
+    assert db.query_count("branches") == 1
+
+    result = asyncio.run(BranchController.get_nearby_branches(17.385, 78.4867, max_distance_km=50, course_id="karate", active_only=False))
+    assert [b["id"] for b in result["branches"]] == ["closest-inactive", "near", "far"]
+
+
+def test_pipeline_starts_with_geo_near():
+    db = build_database()
+    captured = []
+    db.branches.aggregate_results = lambda pipeline: captured.append(pipeline) or []
+
+    asyncio.run(BranchController.get_nearby_branches(17.385, 78.4867, max_distance_km=2, limit=3))
+
+    stage = captured[0][0]["$geoNear"]
+    assert stage["near"]["coordinates"] == [78.4867, 17.385]
+    assert stage["maxDistance"] == 2000
+    assert stage["query"] == {"is_active": True}
+    assert captured[0][1] == {"$limit": 3}
+
+
+def test_geo_point_validation():
+    assert GeoPoint(coordinates=[78.48, 17.38]).type == "Point"
+    with pytest.raises(ValueError):
+        GeoPoint(coordinates=[17.38])
+    with pytest.raises(ValueError):
+        GeoPoint(coordinates=[200, 17.38])
+
+
+if __name__ == "__main__":
+    test_nearby_branches_filters_and_orders_by_distance()
+    test_pipeline_starts_with_geo_near()
+    test_geo_point_validation()
+    print("✅ Nearby branch tests passed")
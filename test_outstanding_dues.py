@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the outstanding dues aggregation
+
+The dues report should be one aggregation whose first stage is served by the
+(payment_status, due_date) index, with aging buckets, branch totals and
+pagination computed server-side instead of grouping 1000 payments in Python.
+"""
+
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from controllers.payment_controller import PaymentController
+from utils.payment_dues import MAX_DUES_PAGE_SIZE, AGING_BUCKETS, outstanding_dues_pipeline, format_outstanding_dues, get_outstanding_dues
+
+NOW = datetime(2024, 6, 1)
+
+
+def stage(pipeline, name):
+    return [s[name] for s in pipeline if name in s]
+
+
+def bucket_for(pipeline, days):
+    """Evaluate the aging $switch for a number of days overdue"""
+    switch = stage(pipeline, "$addFields")[1]["aging_bucket"]["$switch"]
+    for case in switch["branches"]:
+        if days <= case["case"]["$lte"][1]:
+            return case["then"]
+    return switch["default"]
+
+
+def test_pipeline_starts_with_indexed_match_and_paginates_students():
+    pipeline = outstanding_dues_pipeline(NOW, student_id="s1", branch_id="b1", skip=20, limit=10)
+
+    assert pipeline[0] == {"$match": {
+        "payment_status": {"$in": ["pending", "overdue"]}, "due_date": {"$lt": NOW}, "student_id": "s1"
+    }}
+    # The branch filter needs the resolved branch, so it follows the $lookup
+    assert {"$match": {"branch_id": "b1"}} in pipeline
+    assert pipeline.index({"$match": {"branch_id": "b1"}}) > 2
+    facet = stage(pipeline, "$facet")[0]
+    assert {"$skip": 20} in facet["students"] and {"$limit": 10} in facet["students"]
+    assert set(facet) == {"students", "student_count", "branches", "summary"}
+
+
+def test_aging_bucket_boundaries():
+    pipeline = outstanding_dues_pipeline(NOW)
+    assert [label for label, _, _ in AGING_BUCKETS] == ["0-30", "31-60", "61-90", "90+"]
+    assert [bucket_for(pipeline, d) for d in (0, 30, 31, 60, 61, 90, 91, 400)] == [
+        "0-30", "0-30", "31-60", "31-60", "61-90", "61-90", "90+", "90+"
+    ]
+
+
+def test_format_outstanding_dues():
+    result = {
+        "students": [
+            {"_id": "s2", "total_amount": 3000, "oldest_due_date": NOW, "0-30": 1000, "90+": 2000, "payments": [{"id": "p1"}]},
+            {"_id": "s1", "total_amount": 500, "oldest_due_date": NOW, "31-60": 500, "payments": [{"id": "p2"}]}
+        ],
+        "student_count": [{"count": 12}],
+        "branches": [{"_id": "b1", "total_amount": 3500, "payment_count": 2, "students": ["s1", "s2"], "0-30": 1000}],
+        "summary": [{"_id": None, "total_amount": 3500, "payment_count": 2, "0-30": 1000, "31-60": 500, "90+": 2000}]
+    }
+
+    dues = format_outstanding_dues(result, skip=0, limit=2)
+
+    assert list(dues["outstanding_dues"]) == ["s2", "s1"]
+    assert dues["outstanding_dues"]["s2"]["aging"] == {"0-30": 1000, "31-60": 0, "61-90": 0, "90+": 2000}
+    assert dues["branch_totals"][0]["student_count"] == 2
+    assert dues["summary"]["student_count"] == 12 and dues["total"] == 12
+    assert dues["summary"]["aging"]["90+"] == 2000
+
+
+def test_single_aggregation_and_empty_result():
+    db = MockDatabase()
+    db.payments.aggregate_results = []
+
+    dues = asyncio.run(get_outstanding_dues(db))
+
+    assert dues["outstanding_dues"] == {} and dues["total"] == 0
+    assert dues["summary"]["aging"] == {"0-30": 0, "31-60": 0, "61-90": 0, "90+": 0}
+    assert db.query_count("payments") == 1
+
+
+def test_controller_scopes_students_and_caps_page_size():
+    db = MockDatabase()
+    db.payments.aggregate_results = []
+    init_db(db)
+
+    asyncio.run(PaymentController.get_outstanding_dues({"id": "s1", "role": "student"}, skip=-5, limit=5000))
+    asyncio.run(PaymentController.get_outstanding_dues({"id": "a1", "role": "super_admin"}, branch_id="b1"))
+
+    student_pipeline, admin_pipeline = [query for _, _, query in db.calls]
+    assert student_pipeline[0]["$match"]["student_id"] == "s1"
+    facet = stage(student_pipeline, "$facet")[0]
+    assert {"$skip": 0} in facet["students"] and {"$limit": MAX_DUES_PAGE_SIZE} in facet["students"]
+    assert "student_id" not in admin_pipeline[0]["$match"] and {"$match": {"branch_id": "b1"}} in admin_pipeline
+
+
+if __name__ == "__main__":
+    test_pipeline_starts_with_indexed_match_and_paginates_students()
+    test_aging_bucket_boundaries()
+    test_format_outstanding_dues()
+    test_single_aggregation_and_empty_result()
+    test_controller_scopes_students_and_caps_page_size()
+    print("✅ Outstanding dues tests passed")
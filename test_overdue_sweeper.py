@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tests for the overdue payment sweeper
+
+Pending payments past their due date should be moved to overdue with one
+update_many, the payment_restricted flag read by get_current_active_user should
+follow, and the lease should let only one worker sweep per period.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import controllers.payment_controller as payment_controller
+from mock_mongo_db import MockDatabase, matches
+from models.student_models import StudentPaymentCreate
+from models.user_models import UserRole
+from utils.auth import get_current_active_user, require_role
+from utils.cache import payment_stats_cache
+from utils.database import init_db
+from utils.leases import acquire_lease, release_lease
+from utils.overdue_sweeper import refresh_payment_restriction, sweep_overdue_payments
+from utils.payment_dues import outstanding_dues_pipeline
+from controllers.payment_controller import PaymentController
+
+NOW = datetime(2024, 6, 1)
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    db.users.docs = [
+        {"id": "s1", "role": "student"},
+        {"id": "s2", "role": "student"},
+        {"id": "s3", "role": "student", "payment_restricted": True},
+        {"id": "c1", "role": "coach"}
+    ]
+    db.payments.docs = [
+        {"id": "p1", "student_id": "s1", "enrollment_id": "e1", "amount": 1000, "payment_status": "pending",
+         "due_date": NOW - timedelta(days=3)},
+        {"id": "p2", "student_id": "s1", "enrollment_id": "e1", "amount": 2000, "payment_status": "pending",
+         "due_date": NOW - timedelta(days=40)},
+        {"id": "p3", "student_id": "s2", "amount": 400, "payment_status": "pending", "due_date": NOW + timedelta(days=3)},
+        {"id": "p4", "student_id": "s3", "amount": 800, "payment_status": "paid", "due_date": NOW - timedelta(days=3)}
+    ]
+    return db
+
+
+def flags(db):
+    return {user["id"]: user.get("payment_restricted") for user in db.users.docs if user["role"] == "student"}
+
+
+def test_sweep_marks_overdue_and_syncs_restrictions():
+    db = build_database()
+
+    sweep = asyncio.run(sweep_overdue_payments(db, now=NOW))
+
+    statuses = {payment["id"]: payment["payment_status"] for payment in db.payments.docs}
+    assert statuses == {"p1": "overdue", "p2": "overdue", "p3": "pending", "p4": "paid"}
+    assert [call for call in db.calls if call[0] == "payments"] == [
+        ("payments", "update_many", {"payment_status": "pending", "due_date": {"$lt": NOW}}),
+        ("payments", "distinct", {"payment_status": "overdue"})
+    ]
+    assert sweep["payments_marked_overdue"] == 2
+    assert sweep["students_restricted"] == 1 and sweep["students_released"] == 1
+    assert flags(db) == {"s1": True, "s2": None, "s3": False}
+    assert db.overdue_sweeps.docs[0]["payments_marked_overdue"] == 2
+
+
+def test_repeat_sweep_changes_nothing():
+    db = build_database()
+    asyncio.run(sweep_overdue_payments(db, now=NOW))
+
+    sweep = asyncio.run(sweep_overdue_payments(db, now=NOW))
+
+    assert sweep["payments_marked_overdue"] == 0
+    assert sweep["students_restricted"] == 0 and sweep["students_released"] == 0
+    assert len(db.overdue_sweeps.docs) == 2
+
+
+def test_refresh_after_payment_clears_restriction():
+    db = build_database()
+    asyncio.run(sweep_overdue_payments(db, now=NOW))
+
+    for payment in db.payments.docs:
+        if payment["student_id"] == "s1":
+            payment["payment_status"] = "paid"
+    asyncio.run(refresh_payment_restriction(db, "s1"))
+
+    assert flags(db)["s1"] is False
+
+
+def test_swept_payments_stay_in_dues_and_stats():
+    db = build_database()
+    db.users.docs[0].update({"is_active": True, "phone": "+911"})
+    db.enrollments.docs = [{"id": "e1", "student_id": "s1"}]
+    init_db(db)
+    payment_stats_cache.clear()
+
+    def stats_facet(pipeline):
+        docs = [doc for doc in db.payments.docs if matches(doc, pipeline[0]["$match"])]
+        return [{
+            name: [{"_id": None, "total": sum(doc["amount"] for doc in docs if matches(doc, stages[0]["$match"]))}]
+            for name, stages in pipeline[1]["$facet"].items()
+        }]
+
+    db.payments.aggregate_results = stats_facet
+    asyncio.run(sweep_overdue_payments(db, now=NOW))
+
+    dues_match = outstanding_dues_pipeline(NOW)[0]["$match"]
+    assert {doc["id"] for doc in db.payments.docs if matches(doc, dues_match)} == {"p1", "p2"}
+    assert asyncio.run(PaymentController.get_payment_stats())["pending_payments"] == 3400
+    payment_stats_cache.clear()
+
+
+def test_restricted_student_can_still_pay(monkeypatch):
+    db = build_database()
+    db.enrollments.docs = [{"id": "e1", "student_id": "s1"}]
+    init_db(db)
+    asyncio.run(sweep_overdue_payments(db, now=NOW))
+    student = {**db.users.docs[0], "is_active": True, "phone": "+911"}
+
+    async def fake_send(phone, message):
+        return True
+
+    monkeypatch.setattr(payment_controller, "send_whatsapp", fake_send)
+
+    # Everything else is closed to the student, the payment route is not
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_current_active_user(student))
+    assert error.value.status_code == 403
+    role_checker = require_role([UserRole.STUDENT], allow_payment_restricted=True)
+    assert asyncio.run(role_checker(student)) is student
+
+    for payment_id, amount in (("p1", 1000), ("p2", 2000)):
+        payment = StudentPaymentCreate(enrollment_id="e1", amount=amount, payment_method="cash")
+        result = asyncio.run(PaymentController.student_process_payment(payment, student))
+        assert result["payment_id"] == payment_id
+    assert flags(db)["s1"] is False
+    payment_stats_cache.clear()
+
+
+def test_lease_held_by_one_worker_until_expiry_or_release():
+    db = MockDatabase()
+
+    async def scenario():
+        first = await acquire_lease(db, "sweep", 60, owner="worker-a")
+        contended = await acquire_lease(db, "sweep", 60, owner="worker-b")
+        renewed = await acquire_lease(db, "sweep", 60, owner="worker-a")
+        await release_lease(db, "sweep", owner="worker-b")  # not the owner, no effect
+        still_held = await acquire_lease(db, "sweep", 60, owner="worker-b")
+        await release_lease(db, "sweep", owner="worker-a")
+        taken_over = await acquire_lease(db, "sweep", 60, owner="worker-b")
+        return first, contended, renewed, still_held, taken_over
+
+    assert asyncio.run(scenario()) == (True, False, True, False, True)
+    assert len(db.job_leases.docs) == 1
+    assert db.job_leases.docs[0]["owner"] == "worker-b"
+
+
+def test_expired_lease_can_be_taken_over():
+    db = MockDatabase()
+    asyncio.run(acquire_lease(db, "sweep", 60, owner="worker-a"))
+    db.job_leases.docs[0]["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+
+    assert asyncio.run(acquire_lease(db, "sweep", 60, owner="worker-b")) is True
+
+
+if __name__ == "__main__":
+    # The send function is patched through pytest's monkeypatch fixture
+    sys.exit(pytest.main([__file__, "-q"]))
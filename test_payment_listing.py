@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the payment listing
+
+get_payments should page payments straight from the payments collection, using
+the stored student_name and looking up users only for legacy payments on the
+page, and keyset cursors should walk the listing without gaps or repeats.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from utils.payment_students import backfill_payment_student_names, normalize_payment_created_at, sync_payment_student_name
+from controllers.payment_controller import PaymentController
+
+PAYMENT_COUNT = 25
+
+
+def build_database() -> MockDatabase:
+    start = datetime(2024, 1, 1)
+    db = MockDatabase()
+    db.users.docs = [
+        {"id": "s1", "role": "student", "full_name": "Asha Rao"},
+        {"id": "s2", "role": "student", "first_name": "Ravi", "last_name": "Kumar"}
+    ]
+    db.payments.docs = [
+        {
+            "id": f"p{i:02d}",
+            "student_id": "s1" if i % 2 else "s2",
+            "student_name": "Asha Rao" if i % 2 else None,
+            "amount": 100 * i,
+            "payment_type": "course_fee" if i % 3 else "admission_fee",
+            "payment_status": "paid" if i % 4 else "pending",
+            "payment_method": "upi",
+            "course_details": {"course_name": "Karate"},
+            # Every pair of payments shares a timestamp so the id tie-breaker is exercised
+            "created_at": start + timedelta(hours=i // 2)
+        }
+        for i in range(PAYMENT_COUNT)
+    ]
+    init_db(db)
+    return db
+
+
+def test_page_without_join():
+    db = build_database()
+
+    result = asyncio.run(PaymentController.get_payments(limit=10))
+
+    payments = result["payments"]
+    assert [p["id"] for p in payments] == [f"p{i:02d}" for i in range(24, 14, -1)]
+    assert {p["student_name"] for p in payments} == {"Asha Rao", "Ravi Kumar"}
+    assert payments[0]["course_name"] == "Karate" and payments[0]["branch_name"] is None
+    assert "course_details" not in payments[0]
+    assert result["next_cursor"]
+    assert db.query_count("payments") == 1
+    # Only the legacy payments on this page needed a name lookup
+    assert db.query_count("users") == 1
+
+
+def test_keyset_pagination_walks_all_payments():
+    build_database()
+
+    async def walk():
+        seen, cursor = [], None
+        while True:
+            page = await PaymentController.get_payments(limit=7, cursor=cursor)
+            seen.extend(p["id"] for p in page["payments"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                return seen
+
+    seen = asyncio.run(walk())
+    assert seen == [f"p{i:02d}" for i in range(PAYMENT_COUNT - 1, -1, -1)]
+
+
+def test_keyset_pagination_over_legacy_dates():
+    db = build_database()
+    # Older payments without created_at (sorted last) and with it stored as a string
+    legacy = [{"id": f"old{i}", "student_id": "s1", "student_name": "Asha Rao", "amount": 1} for i in range(4)]
+    legacy.append({"id": "p99", "student_id": "s1", "student_name": "Asha Rao", "amount": 1,
+                   "created_at": "2024-01-01T05:30:00+05:30"})
+    db.payments.docs.extend(legacy)
+
+    assert asyncio.run(normalize_payment_created_at(db)) == 1
+    assert db.payments.docs[-1]["created_at"] == datetime(2024, 1, 1)
+
+    async def walk():
+        seen, cursor = [], None
+        while True:
+            # Pages of 7 end on an undated payment, so a cursor is built from one
+            page = await PaymentController.get_payments(limit=7, cursor=cursor)
+            seen.extend(p["id"] for p in page["payments"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                return seen
+
+    seen = asyncio.run(walk())
+    assert len(seen) == len(set(seen)) == PAYMENT_COUNT + 5
+    assert seen[-4:] == ["old3", "old2", "old1", "old0"]
+
+
+def test_filters_and_invalid_cursor():
+    build_database()
+
+    result = asyncio.run(PaymentController.get_payments(status="pending", payment_type="admission_fee"))
+    assert [p["id"] for p in result["payments"]] == ["p24", "p12", "p00"]
+    assert result["next_cursor"] is None
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(PaymentController.get_payments(cursor="not-a-cursor"))
+    assert error.value.status_code == 400
+
+    # Offset paging on top of a cursor would silently skip payments
+    cursor = asyncio.run(PaymentController.get_payments(limit=5))["next_cursor"]
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(PaymentController.get_payments(skip=5, limit=5, cursor=cursor))
+    assert error.value.status_code == 400 and "cursor" in error.value.detail
+
+
+def test_backfill_and_sync_student_names():
+    db = build_database()
+
+    assert asyncio.run(backfill_payment_student_names(db)) == 1
+    assert all(p["student_name"] for p in db.payments.docs)
+    db.reset_calls()
+    asyncio.run(PaymentController.get_payments())
+    assert db.query_count("users") == 0
+
+    asyncio.run(sync_payment_student_name(db, "s2", {"first_name": "Ravi", "last_name": "K"}))
+    assert {p["student_name"] for p in db.payments.docs if p["student_id"] == "s2"} == {"Ravi K"}
+
+
+if __name__ == "__main__":
+    test_page_without_join()
+    test_keyset_pagination_walks_all_payments()
+    test_keyset_pagination_over_legacy_dates()
+    test_filters_and_invalid_cursor()
+    test_backfill_and_sync_student_names()
+    print("✅ Payment listing tests passed")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for live payment notifications
+
+New notifications and unread badge changes should be pushed to open streams,
+and the unread count should come from one counter document kept up to date by
+the writes instead of a count query.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import utils.notification_stream as notification_stream
+from mock_mongo_db import MockDatabase
+from models.student_models import CoursePaymentInfo, PaymentCalculation
+from utils.database import init_db
+from utils.notification_stream import NotificationHub, payment_notification_hub, seed_unread_count
+from controllers.payment_controller import PaymentController
+
+PAYMENT_INFO = CoursePaymentInfo(
+    course_id="c1", course_name="Karate", category_name="Martial Arts", branch_name="Downtown", duration="6 Months",
+    pricing=PaymentCalculation(course_fee=15000, admission_fee=500, total_amount=15500)
+)
+
+
+@pytest.fixture(autouse=True)
+def local_hub(monkeypatch):
+    monkeypatch.setattr(payment_notification_hub, "change_stream_active", False)
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    init_db(db)
+    return db
+
+
+def notify(payment_id):
+    return PaymentController.create_payment_notification(payment_id, "s1", PAYMENT_INFO.dict(), {"full_name": "Asha Rao"})
+
+
+def test_stream_receives_notifications_and_unread_counts():
+    build_database()
+
+    async def scenario():
+        stream = PaymentController.stream_payment_notifications()
+        events = [await stream.__anext__()]
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+
+        notification = await notify("p1")
+        events.append(await pending)
+        events.append(await stream.__anext__())
+        await PaymentController.mark_notification_read(notification.id)
+        events.append(await stream.__anext__())
+        await stream.aclose()
+        return events
+
+    events = asyncio.run(scenario())
+
+    assert [name for name, _ in events] == ["unread_count", "notification", "unread_count", "unread_count"]
+    assert events[0][1] == {"unread_count": 0}
+    assert events[1][1]["payment_id"] == "p1" and "_id" not in events[1][1]
+    assert events[2][1] == {"unread_count": 1} and events[3][1] == {"unread_count": 0}
+    # Closing the stream unsubscribes it
+    assert payment_notification_hub._subscribers == set()
+
+
+def test_unread_count_is_one_point_read():
+    db = build_database()
+
+    async def scenario():
+        first = await notify("p1")
+        await notify("p2")
+        await PaymentController.mark_notification_read(first.id)
+        # Reading twice doesn't count twice
+        await PaymentController.mark_notification_read(first.id)
+        db.reset_calls()
+        return await PaymentController.get_unread_notification_count()
+
+    assert asyncio.run(scenario()) == {"unread_count": 1}
+    assert db.calls == [("notification_counters", "find_one", {"id": "payment_notifications"})]
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(PaymentController.mark_notification_read("missing"))
+    assert error.value.status_code == 404
+
+
+def test_seed_recounts_unread_only_without_a_counter():
+    db = build_database()
+    db.payment_notifications.docs = [{"id": "n1", "is_read": True}, {"id": "n2", "is_read": False}, {"id": "n3"}]
+
+    assert asyncio.run(seed_unread_count(db)) == 2
+    assert asyncio.run(PaymentController.get_unread_notification_count()) == {"unread_count": 2}
+
+    # A later start (or another worker) keeps the live counter instead of overwriting increments
+    asyncio.run(notify("p1"))
+    db.payment_notifications.docs.append({"id": "n4", "is_read": True})
+    db.reset_calls()
+    assert asyncio.run(seed_unread_count(db)) == 3
+    assert db.calls == [("notification_counters", "find_one", {"id": "payment_notifications"})]
+
+
+def test_hub_skips_local_publish_behind_change_stream_and_drops_oldest(monkeypatch):
+    monkeypatch.setattr(notification_stream, "SUBSCRIBER_BUFFER", 2)
+    hub = NotificationHub()
+    queue = hub.subscribe()
+
+    hub.change_stream_active = True
+    hub.publish_local("notification", {"id": "local"})
+    assert queue.empty()
+
+    for n in range(3):
+        hub.publish("unread_count", {"unread_count": n})
+    assert [queue.get_nowait()[1]["unread_count"] for _ in range(queue.qsize())] == [1, 2]
+
+
+def test_idle_stream_yields_keepalive(monkeypatch):
+    monkeypatch.setattr(notification_stream, "STREAM_KEEPALIVE_SECONDS", 0.01)
+
+    async def scenario():
+        events = notification_stream.stream_events(NotificationHub())
+        event = await events.__anext__()
+        await events.aclose()
+        return event
+
+    assert asyncio.run(scenario()) is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
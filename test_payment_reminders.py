@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched payment reminder dispatcher
+
+Reminders should be consolidated per student, students resolved with one $in
+query per batch, sends capped by the dispatcher, and an interrupted run should
+resume after the last finished batch, served as a job by PaymentController.
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import utils.jobs as jobs
+import utils.payment_reminders as payment_reminders
+from fastapi import HTTPException
+from mock_mongo_db import MockDatabase, matches
+from utils.jobs import claim_job, create_job, get_job, save_job_progress, start_job, update_job
+from utils.database import init_db
+from controllers.payment_controller import PaymentController
+from utils.payment_reminders import REMINDER_JOB_TYPE, ReminderDispatcher, resumable_job_query, run_payment_reminders
+
+STUDENT_COUNT = 7
+
+
+def group_due_payments(db):
+    """Evaluate the $match/$group/$sort reminder pipeline against the mock payments"""
+    def run(pipeline):
+        groups = {}
+        for doc in db.payments.docs:
+            if not matches(doc, pipeline[0]["$match"]):
+                continue
+            group = groups.setdefault(doc["student_id"], {"_id": doc["student_id"], "total_due": 0, "payments": []})
+            group["total_due"] += doc["amount"]
+            group["payments"].append({key: doc.get(key) for key in ("amount", "enrollment_id", "due_date", "payment_status")})
+        return [groups[key] for key in sorted(groups)]
+    return run
+
+
+def build_database() -> MockDatabase:
+    due = datetime(2024, 3, 1)
+    db = MockDatabase()
+    db.users.docs = [
+        {"id": f"s{i}", "full_name": f"Student {i}", "phone": f"+9100000000{i}" if i != 3 else None}
+        for i in range(STUDENT_COUNT)
+    ]
+    db.payments.docs = [
+        {"id": f"p{i}-{n}", "student_id": f"s{i}", "amount": 1000, "enrollment_id": f"e{i}",
+         "due_date": due + timedelta(days=n), "payment_status": "pending" if n == 0 else "overdue"}
+        for i in range(STUDENT_COUNT)
+        for n in range(1 + i % 2)
+    ]
+    # Paid payments and payments of unknown students
+    db.payments.docs.append({"id": "paid", "student_id": "s0", "amount": 5, "payment_status": "paid"})
+    db.payments.docs.append({"id": "ghost", "student_id": "zz", "amount": 5, "payment_status": "pending",
+                             "due_date": due})
+    db.payments.aggregate_results = group_due_payments(db)
+    return db
+
+
+@pytest.fixture()
+def sent(monkeypatch):
+    messages = []
+
+    async def fake_send(phone, message):
+        messages.append((phone, message))
+        return True
+
+    monkeypatch.setattr(payment_reminders, "send_sms", fake_send)
+    monkeypatch.setattr(payment_reminders, "send_whatsapp", fake_send)
+    return messages
+
+
+def test_one_consolidated_reminder_per_student(sent):
+    db = build_database()
+    snapshots = []
+
+    async def on_progress(progress):
+        snapshots.append(progress)
+
+    result = asyncio.run(run_payment_reminders(
+        db, on_progress=on_progress, dispatcher=ReminderDispatcher(rate_per_second=0), batch_size=3
+    ))
+
+    # s3 has no phone and zz is not a user
+    assert result["students_processed"] == STUDENT_COUNT + 1
+    assert result["reminders_sent"] == STUDENT_COUNT - 1
+    assert result["skipped"] == 2 and result["failed"] == 0
+    assert len(sent) == 2 * (STUDENT_COUNT - 1)
+    assert any("2 payments totalling ₹2000" in message for _, message in sent)
+    assert db.query_count("users") == 3
+    assert [snapshot["last_student_id"] for snapshot in snapshots] == ["s2", "s5", "zz"]
+
+
+def test_resume_skips_finished_batches(sent):
+    db = build_database()
+
+    result = asyncio.run(run_payment_reminders(
+        db, progress={"students_processed": 3, "reminders_sent": 3, "last_student_id": "s2"},
+        dispatcher=ReminderDispatcher(rate_per_second=0), batch_size=3
+    ))
+
+    assert {phone for phone, _ in sent} == {"+91000000004", "+91000000005", "+91000000006"}
+    assert result["students_processed"] == STUDENT_COUNT + 1
+    assert result["reminders_sent"] == 6
+
+
+def test_resume_stops_the_run_it_takes_over(sent):
+    db = build_database()
+
+    async def scenario():
+        job = await create_job(REMINDER_JOB_TYPE, db=db, owner="run-a")
+        await update_job(job["id"], db=db, status="running")
+        # A job that is still reporting can't be claimed
+        assert await claim_job(job["id"], "run-b", resumable_job_query(), db=db) is None
+
+        async def save_progress(current):
+            # The first batch took long enough for a resume to claim the job
+            if current["last_student_id"] == "s2":
+                later = datetime.utcnow() + timedelta(hours=1)
+                assert (await claim_job(job["id"], "run-b", resumable_job_query(now=later), db=db))["owner"] == "run-b"
+            await save_job_progress(job["id"], "run-a", current, db=db)
+
+        async def run():
+            return await run_payment_reminders(
+                db, on_progress=save_progress, dispatcher=ReminderDispatcher(rate_per_second=0), batch_size=3
+            )
+
+        # The original run stops after that batch without writing the job
+        await start_job(job["id"], run, db=db, owner="run-a")
+        return await get_job(job["id"], db=db)
+
+    job = asyncio.run(scenario())
+
+    assert job["owner"] == "run-b" and job["status"] == "running" and job["progress"] == {}
+    assert {phone for phone, _ in sent} == {"+91000000000", "+91000000001", "+91000000002"}
+
+
+def test_reminder_endpoints_run_and_report_the_job(sent):
+    db = build_database()
+    init_db(db)
+
+    async def scenario():
+        started = await PaymentController.send_payment_reminders({"id": "admin"})
+        await asyncio.gather(*list(jobs._running_tasks))
+        return started, await PaymentController.get_payment_reminder_job(started["job_id"])
+
+    started, job = asyncio.run(scenario())
+
+    assert started["resumed"] is False
+    assert job["status"] == "completed" and job["created_by"] == "admin"
+    assert job["result"]["reminders_sent"] == STUDENT_COUNT - 1 and job["progress"] == job["result"]
+
+    # A finished job can't be resumed and an unknown one isn't found
+    for job_id, status_code in ((job["id"], 409), ("missing", 404)):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(PaymentController.send_payment_reminders({"id": "admin"}, resume_job_id=job_id))
+        assert error.value.status_code == status_code
+
+
+def test_dispatcher_limits_concurrency_and_reports_failures():
+    in_flight = 0
+    peak = 0
+
+    async def slow_send():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return True
+
+    async def failing_send():
+        raise RuntimeError("gateway down")
+
+    async def scenario():
+        dispatcher = ReminderDispatcher(concurrency=2, rate_per_second=0)
+        results = await asyncio.gather(*[dispatcher.send(slow_send) for _ in range(6)])
+        return results, await dispatcher.send(failing_send)
+
+    results, failed = asyncio.run(scenario())
+    assert all(results) and failed is False
+    assert peak == 2
+
+
+def test_dispatcher_spaces_sends_by_rate():
+    async def instant_send():
+        return True
+
+    async def scenario():
+        dispatcher = ReminderDispatcher(concurrency=10, rate_per_second=100)
+        started = time.monotonic()
+        await asyncio.gather(*[dispatcher.send(instant_send) for _ in range(5)])
+        return time.monotonic() - started
+
+    # Five starts at 100/s need at least four 10ms gaps
+    assert asyncio.run(scenario()) >= 0.035
+
+
+if __name__ == "__main__":
+    # The send functions are patched through pytest's monkeypatch fixture
+    sys.exit(pytest.main([__file__, "-q"]))
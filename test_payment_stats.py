@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for PaymentController.get_payment_stats
+
+The dashboard totals should come from one $facet aggregation over payments plus
+the student count, and be served from a short-lived cache until a payment write.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase, matches
+from utils.database import init_db
+from utils.cache import payment_stats_cache, invalidate_payment_stats
+from controllers.payment_controller import PaymentController
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    payment_stats_cache.clear()
+    yield
+    payment_stats_cache.clear()
+
+
+def facet(db):
+    """Evaluate the $match/$facet stats pipeline against the mock payments"""
+    def run(pipeline):
+        docs = [doc for doc in db.payments.docs if matches(doc, pipeline[0]["$match"])]
+        result = {}
+        for name, stages in pipeline[1]["$facet"].items():
+            selected = [doc for doc in docs if matches(doc, stages[0]["$match"])]
+            result[name] = [{"_id": None, "total": sum(doc["amount"] for doc in selected)}] if selected else []
+        return [result]
+    return run
+
+
+def build_database() -> MockDatabase:
+    now = datetime.utcnow()
+    db = MockDatabase()
+    db.payments.docs = [
+        {"id": "p1", "amount": 1000, "payment_status": "paid", "payment_date": now},
+        {"id": "p2", "amount": 500, "payment_status": "paid", "payment_date": now - timedelta(days=62)},
+        {"id": "p3", "amount": 300, "payment_status": "pending"},
+        {"id": "p4", "amount": 200, "payment_status": "overdue"}
+    ]
+    db.users.docs = [{"id": "s1", "role": "student"}, {"id": "s2", "role": "student"}, {"id": "c1", "role": "coach"}]
+    db.payments.aggregate_results = facet(db)
+    init_db(db)
+    return db
+
+
+def test_stats_in_one_aggregation():
+    db = build_database()
+
+    stats = asyncio.run(PaymentController.get_payment_stats())
+
+    assert stats == {"total_collected": 1500, "pending_payments": 500, "this_month_collection": 1000, "total_students": 2}
+    assert db.query_count("payments") == 1
+    assert db.query_count("users") == 1
+
+
+def test_stats_are_cached_until_invalidated():
+    db = build_database()
+
+    asyncio.run(PaymentController.get_payment_stats())
+    db.payments.docs.append({"id": "p5", "amount": 700, "payment_status": "pending"})
+    assert asyncio.run(PaymentController.get_payment_stats())["pending_payments"] == 500
+    assert db.query_count("payments") == 1
+
+    invalidate_payment_stats()
+    assert asyncio.run(PaymentController.get_payment_stats())["pending_payments"] == 1200
+    assert db.query_count("payments") == 2
+
+
+def test_empty_payments():
+    db = build_database()
+    db.payments.docs = []
+
+    stats = asyncio.run(PaymentController.get_payment_stats())
+
+    assert stats["total_collected"] == 0 and stats["pending_payments"] == 0 and stats["this_month_collection"] == 0
+
+
+if __name__ == "__main__":
+    for test in (test_stats_in_one_aggregation, test_stats_are_cached_until_invalidated, test_empty_payments):
+        payment_stats_cache.clear()
+        test()
+    print("✅ Payment stats tests passed")
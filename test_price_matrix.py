@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory price matrix
+
+get_course_payment_info should quote from a course × duration matrix built from
+one read of each catalog collection, with the same fees as the per-request
+lookups it replaces, and rebuild it only after invalidation, expiry, a miss or
+a catalog write made through another worker (noticed by a background poll,
+never by the quote itself).
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from utils.pricing import PRICE_MATRIX_MISS_REFRESH_SECONDS, bump_catalog_version, check_catalog_version, invalidate_price_matrix, get_price_matrix
+from utils.category_hierarchy import build_category_hierarchy
+from utils.public_catalog import build_public_catalog
+from controllers.payment_controller import PaymentController
+
+
+@pytest.fixture(autouse=True)
+def clear_matrix():
+    invalidate_price_matrix()
+    yield
+    invalidate_price_matrix()
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    db.courses.docs = [
+        {"id": "c1", "title": "Karate", "category_id": "cat1", "pricing": {"amount": 10000, "currency": "INR"}},
+        {"id": "c2", "name": "Judo", "category_id": "missing", "price": 8000},
+        {"id": "c3", "title": "Kung Fu"}
+    ]
+    db.branches.docs = [{"id": "b1", "branch": {"name": "Downtown"}}, {"id": "b2", "name": "Uptown"}]
+    db.categories.docs = [{"id": "cat1", "name": "Martial Arts"}]
+    db.durations.docs = [
+        {"id": "d1", "code": "3M", "name": "3 Months", "pricing_multiplier": 1.0},
+        {"id": "d2", "code": "6M", "name": "6 Months", "pricing_multiplier": 1.8}
+    ]
+    init_db(db)
+    return db
+
+
+def quote(course_id, branch_id, duration):
+    return asyncio.run(PaymentController.get_course_payment_info(course_id, branch_id, duration))
+
+
+def test_quotes_match_catalog_pricing():
+    build_database()
+
+    info = quote("c1", "b1", "d2")
+    assert (info.course_name, info.category_name, info.branch_name, info.duration) == (
+        "Karate", "Martial Arts", "Downtown", "6 Months"
+    )
+    assert info.pricing.course_fee == 18000 and info.pricing.total_amount == 18500
+    assert info.pricing.duration_multiplier == 1.8
+
+    # By duration code, a flat price and a missing category
+    info = quote("c2", "b2", "6M")
+    assert (info.course_name, info.category_name, info.branch_name) == ("Judo", "Category", "Uptown")
+    assert info.pricing.course_fee == 14400
+
+    # Default base price and an unknown duration charged at the base price
+    info = quote("c3", "b1", "12M")
+    assert info.duration == "12M" and info.pricing.total_amount == 15500
+
+
+def test_catalog_and_hierarchy_show_the_quoted_fees():
+    db = build_database()
+    for course in db.courses.docs:
+        course.update({"category_id": "cat1", "code": course["id"].upper(), "difficulty_level": "Beginner",
+                       "title": course.get("title", course.get("name")), "settings": {"active": True}})
+    db.categories.docs[0].update({"code": "MA", "is_active": True})
+    for duration in db.durations.docs:
+        duration.update({"is_active": True, "duration_months": 3})
+
+    catalog = asyncio.run(build_public_catalog(db))["categories"][0]["courses"]
+    hierarchy = asyncio.run(build_category_hierarchy(db, db.categories.docs))[0]["courses"]
+
+    for listing in (catalog, hierarchy):
+        # Courses priced through price or the default are not shown at 0
+        shown = {(course["id"], duration["id"]): duration["final_price"] for course in listing for duration in course["durations"]}
+        assert shown == {
+            (course_id, duration_id): quote(course_id, "b1", duration_id).pricing.course_fee
+            for course_id in ("c1", "c2", "c3") for duration_id in ("d1", "d2")
+        }
+
+
+def test_quotes_served_from_memory():
+    db = build_database()
+
+    quote("c1", "b1", "d1")
+    assert db.query_count() == 5
+    db.reset_calls()
+
+    for course_id in ("c1", "c2", "c3"):
+        quote(course_id, "b2", "d2")
+    assert db.query_count() == 0
+
+
+def test_invalidation_picks_up_price_changes():
+    db = build_database()
+    quote("c1", "b1", "d1")
+
+    db.durations.docs[0]["pricing_multiplier"] = 2.0
+    invalidate_price_matrix()
+
+    assert quote("c1", "b1", "3M").pricing.course_fee == 20000
+
+
+def test_write_through_another_worker_rebuilds_matrix():
+    db = build_database()
+    quote("c1", "b1", "d1")
+
+    # A write through this worker rebuilds on the next quote
+    db.courses.docs[0]["pricing"]["amount"] = 12000
+    asyncio.run(bump_catalog_version(db))
+    assert quote("c1", "b1", "d1").pricing.course_fee == 12000
+
+    # Another worker changes a price and bumps the shared version; quotes stay in memory until the next poll
+    db.courses.docs[0]["pricing"]["amount"] = 13000
+    asyncio.run(db.catalog_versions.update_one({"id": "catalog"}, {"$inc": {"version": 1}}))
+    db.reset_calls()
+    assert quote("c1", "b1", "d1").pricing.course_fee == 12000
+    assert db.query_count() == 0
+
+    # The poll rebuilds the matrix in the background, so the quote itself still reads nothing
+    asyncio.run(check_catalog_version(db))
+    assert db.query_count() == 1 + 5
+    db.reset_calls()
+    assert quote("c1", "b1", "d1").pricing.course_fee == 13000
+    assert db.query_count() == 0 and asyncio.run(get_price_matrix(db)).version == 2
+
+    # A poll with nothing new only reads the counter
+    asyncio.run(check_catalog_version(db))
+    assert db.query_count() == 1
+
+
+def test_unknown_course_refreshes_at_most_once_per_window():
+    db = build_database()
+    quote("c1", "b1", "d1")
+    db.reset_calls()
+
+    with pytest.raises(HTTPException) as error:
+        quote("new", "b1", "d1")
+    assert error.value.status_code == 404 and db.query_count() == 0
+
+    # A course created in another worker shows up once the matrix is old enough to rebuild
+    db.courses.docs.append({"id": "new", "title": "Boxing", "pricing": {"amount": 4000}})
+    matrix = asyncio.run(get_price_matrix(db))
+    matrix.built_at -= PRICE_MATRIX_MISS_REFRESH_SECONDS
+    db.reset_calls()
+    assert quote("new", "b1", "d1").pricing.total_amount == 4500
+    assert db.query_count() == 5
+
+    with pytest.raises(HTTPException) as error:
+        quote("c1", "nowhere", "d1")
+    assert error.value.status_code == 404
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
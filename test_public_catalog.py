@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for the prebuilt public catalog bundle
+
+The catalog should be built with one query per collection, served from memory
+afterwards, honour If-None-Match, and be rebuilt after catalog writes, which
+reset every derived view through one hook.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pytest
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+import utils.public_catalog as public_catalog
+from utils.cache import category_tree_cache, location_map_cache
+from utils.catalog import on_catalog_write
+from utils.locations import backfill_branch_locations
+from utils.pricing import get_price_matrix
+from controllers.catalog_controller import CatalogController
+
+
+@pytest.fixture(autouse=True)
+def reset_snapshot():
+    public_catalog._snapshot = None
+    public_catalog._stale = True
+    public_catalog._lock = None
+    yield
+
+
+def build_database() -> MockDatabase:
+    db = MockDatabase()
+    db.categories.docs = [
+        {"id": "cat-1", "name": "Karate", "code": "KAR", "is_active": True, "display_order": 1},
+        {"id": "cat-2", "name": "Archived", "code": "ARC", "is_active": False, "display_order": 2},
+    ]
+    db.courses.docs = [
+        {"id": "course-1", "title": "Kata", "code": "K1", "category_id": "cat-1", "difficulty_level": "Beginner",
+         "pricing": {"currency": "INR", "amount": 1000}, "settings": {"active": True}},
+        {"id": "course-2", "title": "Kumite", "code": "K2", "category_id": "cat-1", "difficulty_level": "Advanced",
+         "pricing": {"currency": "INR", "amount": 2000}, "settings": {"active": False}},
+    ]
+    db.durations.docs = [
+        {"id": "d-6", "name": "6 Months", "code": "6M", "duration_months": 6, "pricing_multiplier": 1.5, "is_active": True, "display_order": 2},
+        {"id": "d-3", "name": "3 Months", "code": "3M", "duration_months": 3, "pricing_multiplier": 1.0, "is_active": True, "display_order": 1},
+    ]
+    db.locations.docs = [
+        {"id": "loc-1", "name": "Hyderabad", "code": "HYD", "state": "Telangana", "is_active": True},
+    ]
+    db.branches.docs = [
+        {"id": "b1", "location_id": "loc-1", "is_active": True, "assignments": {"courses": ["course-1", "course-2"]},
+         "branch": {"name": "Madhapur", "code": "MDP", "email": "b1@example.com", "phone": "1",
+                    "address": {"area": "Madhapur", "city": "Hyderabad", "pincode": "500081"}},
+         "operational_details": {"timings": []}},
+        # Legacy branch without location_id, resolved by the backfill
+        {"id": "b2", "is_active": True, "assignments": {"courses": ["course-1"]},
+         "branch": {"name": "Kukatpally", "code": "KPY", "address": {"city": "hyderabad "}}},
+    ]
+    init_db(db)
+    asyncio.run(backfill_branch_locations(db))
+    db.reset_calls()
+    return db
+
+
+def fetch(if_none_match=None):
+    return asyncio.run(CatalogController.get_public_catalog(if_none_match))
+
+
+def test_catalog_tree_is_built_with_one_query_per_collection():
+    db = build_database()
+    response = fetch()
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == public_catalog.CATALOG_CACHE_CONTROL
+    catalog = json.loads(response.body)
+    assert catalog["version"] and response.headers["etag"] == f'"{catalog["version"]}"'
+    assert [c["id"] for c in catalog["categories"]] == ["cat-1"]
+    course = catalog["categories"][0]["courses"][0]
+    assert [c["id"] for c in catalog["categories"][0]["courses"]] == ["course-1"]
+    assert [(d["id"], d["final_price"]) for d in course["durations"]] == [("d-3", 1000.0), ("d-6", 1500.0)]
+    assert [loc["location_id"] for loc in course["locations"]] == ["loc-1"]
+    assert [b["branch_id"] for b in course["locations"][0]["branches"]] == ["b1", "b2"]
+    assert db.query_count() == 5
+
+    db.reset_calls()
+    fetch()
+    assert db.query_count() == 0
+
+
+def test_if_none_match_returns_not_modified():
+    build_database()
+    etag = fetch().headers["etag"]
+
+    assert fetch(etag).status_code == 304
+    assert fetch(f"W/{etag}, \"other\"").status_code == 304
+    assert fetch('"stale"').status_code == 200
+
+
+def test_invalidation_rebuilds_with_new_version():
+    db = build_database()
+    first = fetch().headers["etag"]
+
+    db.courses.docs[1]["settings"]["active"] = True
+    public_catalog.invalidate_public_catalog()
+    response = fetch(first)
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != first
+    assert len(json.loads(response.body)["categories"][0]["courses"]) == 2
+
+
+def test_catalog_write_hook_resets_every_derived_view():
+    db = build_database()
+    first = fetch().headers["etag"]
+    asyncio.run(get_price_matrix(db))
+    category_tree_cache.set("tree", [])
+    location_map_cache.set("map", {})
+
+    db.courses.docs[0]["pricing"]["amount"] = 1200
+
+    async def write_then_fetch():
+        await on_catalog_write(db)
+        return await CatalogController.get_public_catalog(first)
+
+    response = asyncio.run(write_then_fetch())
+
+    assert len(category_tree_cache) == 0 and len(location_map_cache) == 0
+    assert db.catalog_versions.docs[0]["version"] == 1
+    assert asyncio.run(get_price_matrix(db)).prices[("course-1", "d-3")]["course_fee"] == 1200
+    assert response.status_code == 200 and response.headers["etag"] != first
+
+
+if __name__ == "__main__":
+    for test in (test_catalog_tree_is_built_with_one_query_per_collection,
+                 test_if_none_match_returns_not_modified,
+                 test_invalidation_rebuilds_with_new_version,
+                 test_catalog_write_hook_resets_every_derived_view):
+        public_catalog._snapshot, public_catalog._stale, public_catalog._lock = None, True, None
+        test()
+    print("✅ Public catalog tests passed")
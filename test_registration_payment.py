@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Tests for PaymentController.process_registration_payment
+
+The user, payment and enrollment should be written together in one
+transaction (or undone on a server without transactions), together with the
+post-commit outbox entries that send notifications and messages after the
+response.
+"""
+
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import utils.post_commit as post_commit
+import utils.transactions as transactions
+from mock_mongo_db import MockDatabase
+from models.payment_models import RegistrationPaymentCreate
+from utils.database import init_db
+from utils.pricing import invalidate_price_matrix
+from utils.post_commit import post_commit_entry, process_post_commit_outbox
+from controllers.payment_controller import PaymentController
+
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    invalidate_price_matrix()
+    monkeypatch.setattr(transactions, "_supports_transactions", None)
+    yield
+    invalidate_price_matrix()
+
+
+@pytest.fixture()
+def sent(monkeypatch):
+    messages = []
+
+    async def fake_send(phone, message):
+        messages.append((phone, message))
+        return True
+
+    monkeypatch.setitem(post_commit._actions, "send_sms", fake_send)
+    monkeypatch.setitem(post_commit._actions, "send_whatsapp", fake_send)
+    return messages
+
+
+def build_database(replica_set=True) -> MockDatabase:
+    db = MockDatabase(replica_set=replica_set)
+    db.courses.docs = [{"id": "c1", "title": "Karate", "category_id": "cat1", "pricing": {"amount": 10000}}]
+    db.branches.docs = [{"id": "b1", "branch": {"name": "Downtown"}}]
+    db.categories.docs = [{"id": "cat1", "name": "Martial Arts"}]
+    db.durations.docs = [{"id": "d1", "code": "6M", "name": "6 Months", "pricing_multiplier": 1.5}]
+    init_db(db)
+    return db
+
+
+def registration(email="asha@example.com") -> RegistrationPaymentCreate:
+    return RegistrationPaymentCreate(
+        student_data={
+            "email": email, "phone": "+919876543210", "first_name": "Asha", "last_name": "Rao",
+            "role": "student", "password": "secret123"
+        },
+        course_id="c1", branch_id="b1", category_id="cat1", duration="d1", payment_method="cash"
+    )
+
+
+def register(data):
+    return asyncio.run(PaymentController.process_registration_payment(data))
+
+
+def test_registration_writes_everything_and_defers_messages(sent):
+    db = build_database()
+
+    response = register(registration())
+
+    user, payment, enrollment = db.users.docs[0], db.payments.docs[0], db.enrollments.docs[0]
+    assert response.student_id == user["id"] == payment["student_id"] == enrollment["student_id"]
+    assert response.amount == payment["amount"] == 15500
+    assert payment["enrollment_id"] == enrollment["id"] and payment["student_name"] == "Asha Rao"
+    assert enrollment["fee_amount"] == 15000 and enrollment["payment_status"] == "paid"
+    assert user["password"] != "secret123"
+    assert db.courses.docs[0]["total_enrollment_count"] == 1
+    assert db.branches.docs[0]["active_enrollment_count"] == 1
+
+    # Nothing beyond the registration itself happens before the response
+    assert db.payment_notifications.docs == [] and sent == []
+    assert len(db.post_commit_outbox.docs) == 4
+    assert asyncio.run(process_post_commit_outbox(db)) == 4
+    assert db.post_commit_outbox.docs == []
+    assert db.payment_notifications.docs[0]["amount"] == 15500
+    assert "Asha Rao" in db.payment_notifications.docs[0]["message"]
+    assert [phone for phone, _ in sent] == ["+919876543210", "+919876543210"]
+    assert db.activity_logs.docs[0]["action"] == "user_registration"
+
+
+def test_duplicate_user_writes_nothing(sent):
+    db = build_database()
+    db.users.docs = [{"id": "u0", "email": "asha@example.com", "phone": "+910000000000"}]
+
+    with pytest.raises(HTTPException) as error:
+        register(registration())
+
+    assert error.value.status_code == 400 and "already exists" in error.value.detail
+    assert len(db.users.docs) == 1 and db.payments.docs == [] and db.enrollments.docs == []
+    assert db.post_commit_outbox.docs == []
+
+
+@pytest.mark.parametrize("replica_set", [True, False])
+@pytest.mark.parametrize("failing_write", [("enrollments", "insert_one"), ("courses", "update_one")])
+def test_failed_write_leaves_no_orphans(sent, replica_set, failing_write):
+    db = build_database(replica_set=replica_set)
+
+    async def failing(*args, **kwargs):
+        raise RuntimeError("write conflict")
+
+    collection, method = failing_write
+    setattr(db[collection], method, failing)
+
+    with pytest.raises(HTTPException) as error:
+        register(registration())
+
+    assert error.value.status_code == 400 and "write conflict" in error.value.detail
+    assert db.users.docs == [] and db.payments.docs == [] and db.enrollments.docs == []
+    assert db.post_commit_outbox.docs == []
+
+
+def test_outbox_runs_sends_concurrently_and_retries_failures(monkeypatch):
+    db = build_database()
+    init_db(db)
+    monkeypatch.setattr(post_commit, "POST_COMMIT_CONCURRENCY", 3)
+    in_flight, most_in_flight, sent = [0], [0], []
+
+    async def slow_send(phone, message):
+        in_flight[0] += 1
+        most_in_flight[0] = max(most_in_flight[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        if phone == "broken":
+            raise RuntimeError("gateway down")
+        sent.append(phone)
+
+    monkeypatch.setitem(post_commit._actions, "send_sms", slow_send)
+    db.post_commit_outbox.docs = [post_commit_entry("send_sms", phone=phone, message="hi") for phone in ["1", "broken", "2", "3", "4"]]
+
+    assert asyncio.run(process_post_commit_outbox(db)) == 5
+    assert sorted(sent) == ["1", "2", "3", "4"] and most_in_flight[0] == 3
+    # The failed send stays in the outbox for a later retry
+    [failed] = db.post_commit_outbox.docs
+    assert failed["payload"]["phone"] == "broken" and failed["attempts"] == 1 and failed["status"] == "pending"
+    assert asyncio.run(process_post_commit_outbox(db)) == 0
+
+
+def test_outbox_entry_of_a_dead_worker_runs_after_its_claim_expires(sent):
+    db = build_database()
+    db.post_commit_outbox.docs = [post_commit_entry("send_sms", phone="+91", message="hi")]
+
+    async def crash(phone, message):
+        raise asyncio.CancelledError()
+
+    # The worker dies while sending: the entry stays claimed
+    post_commit._actions["send_sms"], real_send = crash, post_commit._actions["send_sms"]
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(process_post_commit_outbox(db, owner="dead-worker"))
+    post_commit._actions["send_sms"] = real_send
+    assert asyncio.run(process_post_commit_outbox(db)) == 0
+
+    db.post_commit_outbox.docs[0]["available_at"] = datetime.utcnow()
+    assert asyncio.run(process_post_commit_outbox(db)) == 1
+    assert sent == [("+91", "hi")] and db.post_commit_outbox.docs == []
+
+
+if __name__ == "__main__":
+    # The send functions are patched through pytest's monkeypatch fixture
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Query-count test for UserController.get_student_details
+
+Runs the controller against the in-memory MockDatabase and checks that the
+number of database calls stays constant no matter how many students are
+returned.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from controllers.user_controller import UserController
+
+SUPER_ADMIN = {"id": "admin-1", "role": "super_admin", "full_name": "Admin"}
+
+
+def build_database(student_count: int) -> MockDatabase:
+    db = MockDatabase()
+    db.courses.docs = [
+        {"id": f"course-{i}", "title": f"Course {i}", "difficulty_level": "Beginner"}
+        for i in range(3)
+    ]
+    db.durations.docs = [{"id": "duration-6m", "name": "6 Months"}]
+
+    for i in range(student_count):
+        student = {
+            "id": f"student-{i:04d}",
+            "role": "student",
+            "is_active": True,
+            "full_name": f"Student {i}",
+            "email": f"student{i}@example.com",
+            "phone": f"+91{i:010d}",
+            "date_of_birth": "2000-01-01",
+            "branch_id": "branch-1"
+        }
+        if i % 2:
+            # Legacy student with course data only in the user document
+            student["course"] = {"course_id": "course-1", "duration": "duration-6m"}
+            student["branch"] = {"branch_id": "branch-1"}
+        else:
+            db.enrollments.docs.append({
+                "id": f"enrollment-{i}",
+                "student_id": student["id"],
+                "course_id": f"course-{i % 3}",
+                "is_active": True,
+                "start_date": datetime(2024, 1, 1),
+                "end_date": datetime(2024, 1, 1) + timedelta(days=90),
+                "enrollment_date": datetime(2024, 1, 1),
+                "payment_status": "paid"
+            })
+        db.users.docs.append(student)
+    return db
+
+
+async def run_student_details(student_count: int, **kwargs):
+    db = build_database(student_count)
+    init_db(db)
+    result = await UserController.get_student_details(SUPER_ADMIN, **kwargs)
+    return db, result
+
+
+def test_student_details_query_count_is_constant():
+    small_db, small = asyncio.run(run_student_details(4))
+    large_db, large = asyncio.run(run_student_details(400))
+
+    assert len(small["students"]) == 4
+    assert len(large["students"]) == 400
+    assert small_db.query_count() == large_db.query_count()
+    # users page + enrollments + courses + durations + total count
+    assert large_db.query_count() <= 5
+
+
+def test_student_details_enrichment():
+    _, result = asyncio.run(run_student_details(2))
+    enrolled, legacy = result["students"]
+
+    assert enrolled["courses"][0]["course_name"] == "Course 0"
+    assert enrolled["courses"][0]["duration"] == "90 days"
+    assert legacy["courses"][0]["duration"] == "6 Months"
+    assert legacy["courses"][0]["source"] == "legacy_user_document"
+    assert enrolled["age"] is not None
+
+
+def test_student_details_cursor_pagination():
+    async def paginate():
+        db = build_database(25)
+        init_db(db)
+        seen = []
+        cursor = None
+        while True:
+            page = await UserController.get_student_details(SUPER_ADMIN, limit=10, cursor=cursor)
+            seen.extend(s["student_id"] for s in page["students"])
+            assert page["total"] == 25
+            cursor = page["next_cursor"]
+            if not cursor:
+                return seen
+
+    seen = asyncio.run(paginate())
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+
+
+def test_stream_student_details_yields_every_student():
+    async def collect():
+        db = build_database(45)
+        init_db(db)
+        query = UserController.student_details_query(SUPER_ADMIN)
+        return [s async for s in UserController.stream_student_details(query, batch_size=20)]
+
+    assert len(asyncio.run(collect())) == 45
+
+
+if __name__ == "__main__":
+    test_student_details_query_count_is_constant()
+    test_student_details_enrichment()
+    test_student_details_cursor_pagination()
+    test_stream_student_details_yields_every_student()
+    print("✅ Student details query-count tests passed")
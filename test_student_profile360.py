@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for UserController.get_student_profile360
+
+Runs against the in-memory MockDatabase and checks that the profile is
+assembled with a fixed number of queries, cached per student, and refreshed
+after writes.
+"""
+
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from utils.cache import student_profile_cache
+from controllers.user_controller import UserController
+from models.user_models import UserUpdate
+
+SUPER_ADMIN = {"id": "admin-1", "role": "super_admin", "full_name": "Admin"}
+
+
+def build_database(enrollment_count: int = 2) -> MockDatabase:
+    student_profile_cache.clear()
+    db = MockDatabase()
+    db.users.docs = [{
+        "id": "student-1", "role": "student", "full_name": "Student One", "branch_id": "branch-1",
+        "email": "s1@example.com", "phone": "+911", "password": "hashed"
+    }]
+    db.branches.docs = [{"id": "branch-1", "branch": {"name": "Downtown"}}]
+    for i in range(enrollment_count):
+        db.courses.docs.append({"id": f"course-{i}", "title": f"Course {i}", "difficulty_level": "Beginner"})
+        db.enrollments.docs.append({
+            "id": f"enrollment-{i}", "student_id": "student-1", "course_id": f"course-{i}",
+            "branch_id": "branch-1", "is_active": True, "created_at": datetime(2024, 1, i + 1)
+        })
+        db.payments.docs.extend([
+            {"id": f"pay-{i}-a", "student_id": "student-1", "enrollment_id": f"enrollment-{i}", "amount": 500.0,
+             "payment_type": "admission_fee", "payment_status": "paid", "created_at": datetime(2024, 1, 1)},
+            {"id": f"pay-{i}-b", "student_id": "student-1", "enrollment_id": f"enrollment-{i}", "amount": 1000.0,
+             "payment_type": "course_fee", "payment_status": "overdue", "created_at": datetime(2024, 2, 1)},
+        ])
+    db.attendance.aggregate_results = [
+        {"_id": "course-0", "total_classes": 10, "present_classes": 8, "last_attended": datetime(2024, 3, 1)},
+        {"_id": "course-1", "total_classes": 10, "present_classes": 6, "last_attended": datetime(2024, 3, 5)},
+    ]
+    init_db(db)
+    return db
+
+
+def test_profile360_assembles_everything_with_constant_queries():
+    db = build_database(2)
+    profile = asyncio.run(UserController.get_student_profile360("student-1", SUPER_ADMIN))
+    small_count = db.query_count()
+
+    db = build_database(20)
+    asyncio.run(UserController.get_student_profile360("student-1", SUPER_ADMIN))
+    assert db.query_count() == small_count == 6
+
+    assert "password" not in profile["user"]
+    first = next(e for e in profile["enrollments"] if e["id"] == "enrollment-0")
+    assert first["course_name"] == "Course 0"
+    assert first["branch_name"] == "Downtown"
+    assert first["payments"] == {"amount_paid": 500.0, "balance_due": 1000.0}
+    assert first["attendance"]["attendance_percentage"] == 80.0
+    assert profile["payment_summary"] == {"total_paid": 1000.0, "total_pending": 0.0, "total_overdue": 2000.0, "balance_due": 2000.0}
+    assert profile["attendance_summary"]["attendance_percentage"] == 70.0
+    assert profile["payments"][0]["description"].startswith("Course")
+
+
+def test_profile360_is_cached_and_invalidated_on_writes():
+    db = build_database(1)
+    asyncio.run(UserController.get_student_profile360("student-1", SUPER_ADMIN))
+    db.reset_calls()
+
+    asyncio.run(UserController.get_student_profile360("student-1", SUPER_ADMIN))
+    assert db.query_count() == 0
+
+    asyncio.run(UserController.update_user("student-1", UserUpdate(gender="female"), None, SUPER_ADMIN))
+    profile = asyncio.run(UserController.get_student_profile360("student-1", SUPER_ADMIN))
+    assert profile["user"]["gender"] == "female"
+
+
+def test_profile360_enforces_branch_access():
+    build_database(1)
+    coach = {"id": "coach-1", "role": "coach", "full_name": "Coach", "branch_id": "branch-2"}
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(UserController.get_student_profile360("student-1", coach))
+    assert exc.value.status_code == 403
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(UserController.get_student_profile360("missing", SUPER_ADMIN))
+    assert exc.value.status_code == 404
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the trusted-read helpers in utils/trusted_read.py
+
+Checks that projected, unvalidated coach responses match what full
+CoachResponse validation produces.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import utils.trusted_read as trusted_read
+from coach_fixtures import make_coach
+from mock_mongo_db import MockDatabase
+from utils.database import init_db
+from utils.trusted_read import projection_for, dump_from_db
+from controllers.coach_controller import CoachController
+from models.coach_models import CoachResponse
+
+
+def full_validation(coach: dict) -> dict:
+    return CoachResponse(**coach).dict()
+
+
+def test_projection_expands_nested_models():
+    projection = projection_for(CoachResponse)
+    assert projection["_id"] == 0
+    assert projection["personal_info.first_name"] == 1
+    assert projection["assignment_details.courses"] == 1
+    assert projection["contact_info"] == 1  # plain dict field is included whole
+    assert "password_hash" not in projection and "personal_info" not in projection
+
+
+def test_trusted_dump_matches_full_validation():
+    coach = make_coach(1)
+    projected = {k: v for k, v in coach.items() if k in CoachResponse.model_fields}
+    assert dump_from_db(CoachResponse, projected) == full_validation(coach)
+
+    del projected["emergency_contact"]
+    assert dump_from_db(CoachResponse, projected)["emergency_contact"] is None
+
+
+def test_trusted_dump_fills_nested_defaults():
+    coach = make_coach(3)
+    del coach["assignment_details"]["courses"]
+    projected = {k: v for k, v in coach.items() if k in CoachResponse.model_fields}
+
+    data = dump_from_db(CoachResponse, projected)
+
+    assert data["assignment_details"]["courses"] == []
+    assert data == full_validation(coach)
+
+
+def test_excluded_paths_are_stripped(monkeypatch):
+    coach = make_coach(2)
+    coach["contact_info"]["password"] = "plaintext"
+    for trusted in (True, False):
+        monkeypatch.setattr(trusted_read, "TRUSTED_READS", trusted)
+        data = dump_from_db(CoachResponse, coach, exclude=("contact_info.password",))
+        assert "password" not in data["contact_info"]
+
+
+def test_get_coaches_uses_projection():
+    db = MockDatabase()
+    db.coaches.docs = [make_coach(i) for i in range(3)]
+    init_db(db)
+
+    # Stored keys outside the nested models are left out by the dotted projection
+    db.coaches.docs[0]["personal_info"]["internal_note"] = "not for the response"
+    db.coaches.docs[0]["assignment_details"]["payroll_ref"] = "PR-1"
+
+    result = asyncio.run(CoachController.get_coaches(limit=10))
+
+    assert result["total"] == 3
+    assert result["coaches"][0] == full_validation(make_coach(0))
+    assert "internal_note" not in result["coaches"][0]["personal_info"]
+    assert "payroll_ref" not in result["coaches"][0]["assignment_details"]
+    assert "password_hash" not in result["coaches"][0]
+
+
+if __name__ == "__main__":
+    test_projection_expands_nested_models()
+    test_trusted_dump_matches_full_validation()
+    test_trusted_dump_fills_nested_defaults()
+    test_get_coaches_uses_projection()
+    print("✅ Trusted read tests passed")
@@ -7,7 +7,6 @@ import jwt
 import os
 
 from models.user_models import UserRole
-from models.payment_models import PaymentStatus
 from utils.database import get_db
 from utils.helpers import serialize_doc
 
@@ -49,24 +48,23 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         raise HTTPException(status_code=401, detail="User not found")
     return serialize_doc(user)
 
-async def get_current_active_user(current_user: dict = Depends(get_current_user)):
-    db = get_db()
+async def get_current_payable_user(current_user: dict = Depends(get_current_user)):
+    """An active user, including students restricted for overdue payments (they must still be able to pay)"""
     if not current_user.get("is_active", False):
         raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
 
-    # Restrict access for students with overdue payments
-    if current_user["role"] == UserRole.STUDENT:
-        overdue_payment = await db.payments.find_one({
-            "student_id": current_user["id"],
-            "payment_status": PaymentStatus.OVERDUE.value
-        })
-        if overdue_payment:
-            raise HTTPException(status_code=403, detail="Access restricted due to overdue payments.")
+async def get_current_active_user(current_user: dict = Depends(get_current_payable_user)):
+    # Restrict access for students with overdue payments; the flag is kept in sync by utils.overdue_sweeper
+    if current_user["role"] == UserRole.STUDENT and current_user.get("payment_restricted"):
+        raise HTTPException(status_code=403, detail="Access restricted due to overdue payments.")
 
     return current_user
 
-def require_role(allowed_roles: List[UserRole]):
-    async def role_checker(current_user: dict = Depends(get_current_active_user)):
+def require_role(allowed_roles: List[UserRole], allow_payment_restricted: bool = False):
+    current_user_dependency = get_current_payable_user if allow_payment_restricted else get_current_active_user
+
+    async def role_checker(current_user: dict = Depends(current_user_dependency)):
         if current_user["role"] not in [role.value for role in allowed_roles]:
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         return current_user
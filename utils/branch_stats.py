@@ -0,0 +1,85 @@
+"""
+Per-branch coach and student counts.
+
+``get_branch_statistics`` computes the counts for a page of branches with
+three queries that run concurrently: coaches grouped by ``branch_id``, active
+students grouped by ``branch_id`` and one lookup of the managers and branch
+admins referenced by the page. Students are counted by their flat
+``branch_id`` only; ``backfill_student_branch_ids`` copies it from the legacy
+nested ``branch.branch_id`` for students created before it was stored.
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+COACH_ROLES = ["coach", "coach_admin"]
+
+_MISSING_BRANCH_ID = {
+    "role": "student",
+    "branch.branch_id": {"$nin": [None, ""]},
+    "$or": [{"branch_id": {"$exists": False}}, {"branch_id": None}, {"branch_id": ""}]
+}
+
+async def backfill_student_branch_ids(db) -> int:
+    """Copy branch.branch_id into branch_id for students that only have the nested field"""
+    students = await db.users.find(_MISSING_BRANCH_ID, {"_id": 0, "id": 1, "branch.branch_id": 1}).to_list(length=None)
+    if not students:
+        return 0
+    await db.users.bulk_write(
+        [UpdateOne({"id": student["id"]}, {"$set": {"branch_id": student["branch"]["branch_id"]}}) for student in students],
+        ordered=False
+    )
+    return len(students)
+
+async def count_by_branch(collection, branch_ids: List[str], match: Optional[dict] = None) -> Dict[str, int]:
+    """{branch_id: count} of active documents in ``collection`` with one $group"""
+    rows = await collection.aggregate([
+        {"$match": {**(match or {}), "branch_id": {"$in": branch_ids}, "is_active": True}},
+        {"$group": {"_id": "$branch_id", "count": {"$sum": 1}}}
+    ]).to_list(length=None)
+    return {row["_id"]: row["count"] for row in rows}
+
+async def get_branch_statistics(db, branches: List[dict]) -> Dict[str, dict]:
+    """{branch_id: statistics} for the given branch documents"""
+    if not branches:
+        return {}
+
+    branch_ids = [branch["id"] for branch in branches]
+    staff_ids = set()
+    for branch in branches:
+        if branch.get("manager_id"):
+            staff_ids.add(branch["manager_id"])
+        staff_ids.update((branch.get("assignments") or {}).get("branch_admins") or [])
+
+    async def active_staff():
+        if not staff_ids:
+            return []
+        return await db.users.find(
+            {"id": {"$in": list(staff_ids)}, "role": {"$in": COACH_ROLES}, "is_active": True},
+            {"_id": 0, "id": 1}
+        ).to_list(length=None)
+
+    coach_counts, student_counts, staff = await asyncio.gather(
+        count_by_branch(db.coaches, branch_ids),
+        count_by_branch(db.users, branch_ids, {"role": "student"}),
+        active_staff()
+    )
+    active_staff_ids = {user["id"] for user in staff}
+
+    statistics = {}
+    for branch in branches:
+        assignments = branch.get("assignments") or {}
+        coach_count = coach_counts.get(branch["id"], 0)
+        # Managers and branch admins are counted as coaches when they are active coach users
+        if branch.get("manager_id") in active_staff_ids:
+            coach_count += 1
+        coach_count += len(set(assignments.get("branch_admins") or []) & active_staff_ids)
+        statistics[branch["id"]] = {
+            "coach_count": coach_count,
+            "student_count": student_counts.get(branch["id"], 0),
+            "course_count": len((branch.get("operational_details") or {}).get("courses_offered", [])),
+            "active_courses": len(assignments.get("courses", []))
+        }
+    return statistics
@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+class TTLCache:
+    """Small in-process cache with per-entry expiry and LRU eviction.
+
+    Entries live for ``ttl_seconds`` so that writes made by other processes
+    (e.g. another worker or server_old.py) are picked up eventually; writes in
+    this process should call ``invalidate`` so readers see them immediately.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *keys: Hashable):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """Drop every entry whose key matches ``predicate``"""
+        for key in [k for k in self._entries if predicate(k)]:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+# Per-student cache for UserController.get_student_profile360
+student_profile_cache = TTLCache(ttl_seconds=120, max_entries=5000)
+
+def invalidate_student_profiles(*student_ids: str):
+    """Invalidate cached 360 profiles after writes to a student's user, enrollment, payment or attendance data"""
+    student_profile_cache.invalidate(*[student_id for student_id in student_ids if student_id])
+
+# Category tree (categories, children and course counts) for CategoryController listings
+category_tree_cache = TTLCache(ttl_seconds=300, max_entries=1)
+
+def invalidate_category_tree():
+    """Invalidate the cached category tree after category or course writes"""
+    category_tree_cache.clear()
+
+# Location <-> branch lookups for utils.locations.get_location_map
+location_map_cache = TTLCache(ttl_seconds=300, max_entries=1)
+
+def invalidate_location_map():
+    """Invalidate the cached location map after branch or location writes"""
+    location_map_cache.clear()
+
+# Per-filter responses of BranchesWithCoursesController.get_branches_with_courses
+branches_with_courses_cache = TTLCache(ttl_seconds=60, max_entries=256)
+
+def invalidate_branches_with_courses():
+    """Invalidate cached branches-with-courses responses after branch, course or coach writes"""
+    branches_with_courses_cache.clear()
+
+# get_states responses of LocationController, keyed by active_only
+location_states_cache = TTLCache(ttl_seconds=3600, max_entries=2)
+
+def invalidate_location_states():
+    """Invalidate the cached state list after location writes"""
+    location_states_cache.clear()
+
+# Dashboard totals of PaymentController.get_payment_stats
+payment_stats_cache = TTLCache(ttl_seconds=30, max_entries=1)
+
+def invalidate_payment_stats():
+    """Invalidate the cached payment totals after payment writes"""
+    payment_stats_cache.clear()
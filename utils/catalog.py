@@ -0,0 +1,27 @@
+"""
+Catalog write hook.
+
+Courses, categories, durations, branches and locations feed several derived
+views: the public catalog, the category tree and materialized hierarchy, the
+price matrix of every worker, the location map and state list, and the
+branches-with-courses listings. Every catalog write calls ``on_catalog_write``
+once instead of picking invalidations by hand, so a new derived view only
+needs to be added here.
+"""
+
+from utils.cache import (
+    invalidate_branches_with_courses, invalidate_category_tree, invalidate_location_map, invalidate_location_states
+)
+from utils.category_hierarchy import schedule_category_hierarchy_refresh
+from utils.pricing import bump_catalog_version
+from utils.public_catalog import invalidate_public_catalog
+
+async def on_catalog_write(db):
+    """Drop or rebuild everything derived from the catalog after a write"""
+    invalidate_public_catalog()
+    invalidate_category_tree()
+    invalidate_location_map()
+    invalidate_location_states()
+    invalidate_branches_with_courses()
+    schedule_category_hierarchy_refresh()
+    await bump_catalog_version(db)
@@ -0,0 +1,135 @@
+"""
+Category -> course -> duration (-> location) hierarchy.
+
+``build_category_hierarchy`` joins a page of categories with their courses,
+durations and branch locations using one query per collection (locations come
+from the cached location map). The full hierarchy of active categories is also
+materialized into the ``category_hierarchy`` collection so the public endpoint
+can serve it with a single indexed query; catalog writes rebuild it in the
+background through ``utils.catalog.on_catalog_write``.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import DeleteMany, ReplaceOne
+
+from utils.database import get_db
+from utils.locations import get_location_map, summarize_branch_locations
+from utils.pricing import course_base_price
+
+_refresh_task: Optional[asyncio.Task] = None
+_refresh_pending = False
+
+async def build_category_hierarchy(db, categories: List[dict], active_only: bool = True, include_locations: bool = False) -> List[dict]:
+    """Nest courses, durations with final prices and (optionally) locations under each category"""
+    if not categories:
+        return []
+
+    course_query = {"category_id": {"$in": [category["id"] for category in categories]}}
+    if active_only:
+        course_query["settings.active"] = True
+    courses, durations = await asyncio.gather(
+        db.courses.find(course_query, {"_id": 0}).to_list(length=None),
+        db.durations.find({"is_active": True}, {"_id": 0}).sort("display_order", 1).to_list(100)
+    )
+
+    branches_by_course: Dict[str, List[dict]] = {}
+    location_map: dict = {}
+    if include_locations and courses:
+        course_ids = [course["id"] for course in courses]
+        branches, location_map = await asyncio.gather(
+            db.branches.find(
+                {"assignments.courses": {"$in": course_ids}, "is_active": True},
+                {"_id": 0, "id": 1, "location_id": 1, "branch.address.city": 1, "assignments.courses": 1}
+            ).to_list(length=None),
+            get_location_map(db)
+        )
+        for branch in branches:
+            for course_id in dict.fromkeys(branch["assignments"]["courses"]):
+                branches_by_course.setdefault(course_id, []).append(branch)
+
+    courses_by_category: Dict[str, List[dict]] = {}
+    for course in courses:
+        courses_by_category.setdefault(course["category_id"], []).append(course)
+
+    hierarchy = []
+    for category in categories:
+        courses_data = []
+        # Each category previously returned at most 100 courses
+        for course in courses_by_category.get(category["id"], [])[:100]:
+            base_price = course_base_price(course)
+            courses_data.append({
+                "id": course["id"],
+                "title": course["title"],
+                "code": course["code"],
+                "difficulty_level": course["difficulty_level"],
+                "base_pricing": {
+                    "currency": course.get("pricing", {}).get("currency", "INR"),
+                    "amount": base_price
+                },
+                "durations": [
+                    {
+                        "id": duration["id"],
+                        "name": duration["name"],
+                        "duration_months": duration["duration_months"],
+                        "pricing_multiplier": duration.get("pricing_multiplier", 1.0),
+                        "final_price": base_price * duration.get("pricing_multiplier", 1.0)
+                    }
+                    for duration in durations
+                ],
+                "locations_available": (
+                    summarize_branch_locations(location_map, branches_by_course.get(course["id"], []))
+                    if include_locations else []
+                )
+            })
+
+        hierarchy.append({
+            "id": category["id"],
+            "name": category["name"],
+            "code": category["code"],
+            "description": category.get("description"),
+            "course_count": len(courses_data),
+            "courses": courses_data
+        })
+    return hierarchy
+
+async def refresh_category_hierarchy(db) -> int:
+    """Rebuild the materialized hierarchy of all active categories, locations included"""
+    categories = await db.categories.find({"is_active": True}, {"_id": 0}).sort("display_order", 1).to_list(length=None)
+    hierarchy = await build_category_hierarchy(db, categories, active_only=True, include_locations=True)
+    now = datetime.utcnow()
+    operations = [
+        ReplaceOne(
+            {"id": entry["id"]},
+            {**entry, "display_order": category.get("display_order", 0), "materialized_at": now},
+            upsert=True
+        )
+        for category, entry in zip(categories, hierarchy)
+    ]
+    operations.append(DeleteMany({"id": {"$nin": [category["id"] for category in categories]}}))
+    await db.category_hierarchy.bulk_write(operations, ordered=True)
+    return len(hierarchy)
+
+async def _refresh_loop():
+    global _refresh_pending
+    # Writes that arrive during a rebuild trigger one more rebuild afterwards
+    while _refresh_pending:
+        _refresh_pending = False
+        try:
+            await refresh_category_hierarchy(get_db())
+        except Exception as e:
+            logging.warning(f"Category hierarchy refresh failed: {e}")
+
+def schedule_category_hierarchy_refresh():
+    """Rebuild the materialized hierarchy in the background after a catalog write"""
+    global _refresh_task, _refresh_pending
+    _refresh_pending = True
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = loop.create_task(_refresh_loop())
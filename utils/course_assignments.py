@@ -0,0 +1,173 @@
+"""
+Normalized course assignment edges.
+
+Course relationships are stored on the owning documents
+(``branches.assignments.courses``, ``coaches.assignment_details.courses`` and
+``courses.instructor_id``). The ``course_assignments`` collection mirrors them
+as one edge per (course, branch, coach) tuple so listings can resolve every
+assignment for a page of courses with a single indexed query. Edges are
+rewritten from the owning document on every write to it, as upserts on the
+unique (kind, course, branch, coach) tuple plus a delete of the owner's stale
+tuples, so concurrent syncs and rebuilds never collide on the unique index.
+A rebuild is a sync of every owner, so each owner is re-read right before its
+edges are written and an assignment removed during the rebuild stays removed.
+
+Edge kinds:
+    branch      - the branch offers the course (coach_id is None)
+    coach       - the coach is assigned to the course (branch_id is the coach's branch)
+    instructor  - the coach is the course's instructor_id (branch_id is None)
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import DeleteMany, ReplaceOne
+
+from utils.leases import acquire_lease
+
+BRANCH = "branch"
+COACH = "coach"
+INSTRUCTOR = "instructor"
+
+BACKFILL_LEASE = "course_assignments_rebuild"
+# Workers starting within this window share one rebuild
+BACKFILL_LEASE_SECONDS = 600
+# Bump when the edge format changes so the next start rebuilds the collection
+COURSE_ASSIGNMENTS_VERSION = 1
+# Owners synced at once during a rebuild
+REBUILD_CONCURRENCY = 20
+
+def _edge(kind: str, course_id: str, branch_id: Optional[str] = None, coach_id: Optional[str] = None,
+          is_active: bool = True, **display) -> dict:
+    return {
+        "kind": kind,
+        "course_id": course_id,
+        "branch_id": branch_id,
+        "coach_id": coach_id,
+        "is_active": is_active,
+        **display,
+        "updated_at": datetime.utcnow()
+    }
+
+def branch_edges(branch: dict) -> List[dict]:
+    info = branch.get("branch") or {}
+    address = info.get("address") or {}
+    display = {
+        "branch_name": info.get("name"),
+        "branch_code": info.get("code"),
+        "branch_location": f"{address.get('area', '')}, {address.get('city', '')}"
+    }
+    course_ids = dict.fromkeys((branch.get("assignments") or {}).get("courses") or [])
+    return [
+        _edge(BRANCH, course_id, branch_id=branch["id"], is_active=branch.get("is_active", True), **display)
+        for course_id in course_ids
+    ]
+
+def coach_edges(coach: dict) -> List[dict]:
+    display = {
+        "coach_name": coach.get("full_name", f"{coach.get('first_name', '')} {coach.get('last_name', '')}".strip()),
+        "coach_email": coach.get("email", (coach.get("contact_info") or {}).get("email", ""))
+    }
+    course_ids = dict.fromkeys((coach.get("assignment_details") or {}).get("courses") or [])
+    return [
+        _edge(COACH, course_id, branch_id=coach.get("branch_id"), coach_id=coach["id"],
+              is_active=coach.get("is_active", True), **display)
+        for course_id in course_ids
+    ]
+
+def instructor_edges(course: dict) -> List[dict]:
+    if not course.get("instructor_id"):
+        return []
+    return [_edge(INSTRUCTOR, course["id"], coach_id=course["instructor_id"])]
+
+def _edge_key(edge: dict) -> dict:
+    return {key: edge[key] for key in ("kind", "course_id", "branch_id", "coach_id")}
+
+def _upserts(edges: List[dict]) -> list:
+    return [ReplaceOne(_edge_key(edge), edge, upsert=True) for edge in edges]
+
+async def _replace_edges(db, owner_filter: dict, edges: List[dict]):
+    stale_filter = {**owner_filter, "$nor": [_edge_key(edge) for edge in edges]} if edges else owner_filter
+    await db.course_assignments.bulk_write(_upserts(edges) + [DeleteMany(stale_filter)], ordered=True)
+    return len(edges)
+
+async def sync_branch(db, branch_id: str):
+    """Rewrite the branch edges after a write to the branch"""
+    branch = await db.branches.find_one({"id": branch_id}, {"id": 1, "branch": 1, "assignments.courses": 1, "is_active": 1})
+    return await _replace_edges(db, {"kind": BRANCH, "branch_id": branch_id}, branch_edges(branch) if branch else [])
+
+async def sync_coach(db, coach_id: str):
+    """Rewrite the coach edges after a write to the coach"""
+    coach = await db.coaches.find_one({"id": coach_id}, {
+        "id": 1, "full_name": 1, "first_name": 1, "last_name": 1, "email": 1, "contact_info.email": 1,
+        "branch_id": 1, "assignment_details.courses": 1, "is_active": 1
+    })
+    return await _replace_edges(db, {"kind": COACH, "coach_id": coach_id}, coach_edges(coach) if coach else [])
+
+async def sync_course(db, course_id: str):
+    """Rewrite the instructor edge after a write to the course"""
+    course = await db.courses.find_one({"id": course_id}, {"id": 1, "instructor_id": 1})
+    return await _replace_edges(db, {"kind": INSTRUCTOR, "course_id": course_id}, instructor_edges(course) if course else [])
+
+async def rebuild_course_assignments(db) -> int:
+    """Rebuild the whole collection by syncing every branch, coach and instructed course"""
+    started_at = datetime.utcnow()
+    branch_ids = await db.branches.distinct("id")
+    coach_ids = await db.coaches.distinct("id")
+    course_ids = await db.courses.distinct("id", {"instructor_id": {"$nin": [None, ""]}})
+
+    syncs = (
+        [(sync_branch, branch_id) for branch_id in branch_ids]
+        + [(sync_coach, coach_id) for coach_id in coach_ids]
+        + [(sync_course, course_id) for course_id in course_ids]
+    )
+    count = 0
+    for start in range(0, len(syncs), REBUILD_CONCURRENCY):
+        counts = await asyncio.gather(*(sync(db, owner_id) for sync, owner_id in syncs[start:start + REBUILD_CONCURRENCY]))
+        count += sum(counts)
+    # Every existing owner's edges were rewritten above; older edges belong to owners that are gone
+    await db.course_assignments.delete_many({"updated_at": {"$lt": started_at}})
+    return count
+
+async def backfill_course_assignments(db):
+    """Build the collection on start when it is empty or older than COURSE_ASSIGNMENTS_VERSION; writes keep it current after that"""
+    marker = await db.job_leases.find_one({"id": BACKFILL_LEASE}, {"version": 1})
+    current = (marker or {}).get("version", 0) >= COURSE_ASSIGNMENTS_VERSION
+    if current and await db.course_assignments.find_one({}, {"_id": 1}) is not None:
+        return
+    if not await acquire_lease(db, BACKFILL_LEASE, BACKFILL_LEASE_SECONDS):
+        return
+    count = await rebuild_course_assignments(db)
+    # Recorded on the lease document only after a full rebuild, so a partial run is repaired next start
+    await db.job_leases.update_one({"id": BACKFILL_LEASE}, {"$set": {"version": COURSE_ASSIGNMENTS_VERSION}})
+    logging.info(f"Rebuilt {count} course assignment edges")
+
+async def get_course_assignments(
+    db,
+    course_ids: Iterable[str],
+    kinds: Iterable[str] = (BRANCH, COACH),
+    branch_id: Optional[str] = None
+) -> Dict[str, Dict[str, List[dict]]]:
+    """Return active edges for a page of courses as {course_id: {kind: [edge, ...]}} with one query"""
+    course_ids = list(dict.fromkeys(course_ids))
+    kinds = list(kinds)
+    result = {course_id: {kind: [] for kind in kinds} for course_id in course_ids}
+    if not course_ids:
+        return result
+
+    query = {"course_id": {"$in": course_ids}, "kind": {"$in": kinds}, "is_active": True}
+    if branch_id:
+        query["branch_id"] = branch_id
+    async for edge in db.course_assignments.find(query, {"_id": 0}):
+        result[edge["course_id"]][edge["kind"]].append(edge)
+    return result
+
+async def get_coach_course_ids(db, coach_id: str) -> List[str]:
+    """Courses a coach teaches, either as instructor or through assignment_details"""
+    edges = await db.course_assignments.find(
+        {"coach_id": coach_id, "kind": {"$in": [COACH, INSTRUCTOR]}},
+        {"_id": 0, "course_id": 1}
+    ).to_list(length=None)
+    return list(dict.fromkeys(edge["course_id"] for edge in edges))
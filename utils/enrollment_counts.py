@@ -0,0 +1,192 @@
+"""
+Enrollment counters.
+
+Courses and branches carry ``active_enrollment_count`` and
+``total_enrollment_count`` so listings can show enrollment numbers without
+querying the enrollments collection. Single enrollment writes adjust the
+counters with an atomic ``$inc``; bulk writes recount the affected courses and
+branches. ``check_enrollment_counters`` compares every counter with the
+enrollments collection and repairs drift (run nightly by whichever worker
+holds the lease, see ``run_nightly_counter_check``). A repair only applies if
+the counter still holds the value read before the recount, so an ``$inc`` made
+during the check is never overwritten.
+"""
+
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+
+from utils.leases import acquire_lease
+
+ACTIVE_FIELD = "active_enrollment_count"
+TOTAL_FIELD = "total_enrollment_count"
+
+# Hour (UTC) of the nightly consistency check
+COUNTER_CHECK_HOUR = int(os.environ.get("ENROLLMENT_COUNTER_CHECK_HOUR", "2"))
+COUNTER_CHECK_LEASE = "enrollment_counter_check"
+# Held past the run so workers waking up for the same night skip it
+COUNTER_CHECK_LEASE_SECONDS = 3600
+
+async def count_active_enrollments(db, course_ids: Iterable[str], branch_id: Optional[str] = None) -> Dict[str, int]:
+    """Active enrollment count per course at one branch with one $group query.
+
+    Course-wide counts are stored on the course documents; this is only needed
+    for per-branch views.
+    """
+    course_ids = list(dict.fromkeys(course_ids))
+    counts = {course_id: 0 for course_id in course_ids}
+    if not course_ids:
+        return counts
+
+    match = {"course_id": {"$in": course_ids}, "is_active": True}
+    if branch_id:
+        match["branch_id"] = branch_id
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": "$course_id", "count": {"$sum": 1}}}
+    ]
+    async for row in db.enrollments.aggregate(pipeline):
+        if row["_id"] in counts:
+            counts[row["_id"]] = row["count"]
+    return counts
+
+async def inc_enrollment_counters(db, course_id: Optional[str], branch_id: Optional[str], active: int = 0, total: int = 0, session=None):
+    """Atomically adjust the counters on one course and one branch"""
+    inc = {field: value for field, value in ((ACTIVE_FIELD, active), (TOTAL_FIELD, total)) if value}
+    if not inc:
+        return
+    targets = [(collection, owner_id) for collection, owner_id in ((db.courses, course_id), (db.branches, branch_id)) if owner_id]
+    if session is None:
+        await asyncio.gather(*[collection.update_one({"id": owner_id}, {"$inc": inc}) for collection, owner_id in targets])
+    else:
+        # Operations in a transaction run one at a time
+        for collection, owner_id in targets:
+            await collection.update_one({"id": owner_id}, {"$inc": inc}, session=session)
+
+async def record_enrollment_created(db, enrollment: dict, session=None):
+    """Count a newly inserted enrollment"""
+    await inc_enrollment_counters(
+        db, enrollment.get("course_id"), enrollment.get("branch_id"),
+        active=1 if enrollment.get("is_active", True) else 0, total=1, session=session
+    )
+
+async def record_enrollments_created(db, enrollments: List[dict]):
+    """Count a batch of inserted enrollments with one bulk write per collection"""
+    for collection, key in ((db.courses, "course_id"), (db.branches, "branch_id")):
+        totals = Counter(e.get(key) for e in enrollments if e.get(key))
+        actives = Counter(e.get(key) for e in enrollments if e.get(key) and e.get("is_active", True))
+        operations = [
+            UpdateOne({"id": owner_id}, {"$inc": {TOTAL_FIELD: total, ACTIVE_FIELD: actives.get(owner_id, 0)}})
+            for owner_id, total in totals.items()
+        ]
+        if operations:
+            await collection.bulk_write(operations, ordered=False)
+
+async def set_enrollment_active(db, enrollment_id: str, is_active: bool, fields: Optional[dict] = None) -> Optional[dict]:
+    """Activate or deactivate one enrollment and adjust the active counters.
+
+    The filter only matches when the flag actually changes, so concurrent calls
+    cannot count the same transition twice. Returns the enrollment as it was
+    before the update, or None if nothing changed.
+    """
+    previous = await db.enrollments.find_one_and_update(
+        {"id": enrollment_id, "is_active": not is_active},
+        {"$set": {**(fields or {}), "is_active": is_active}},
+        projection={"_id": 0, "course_id": 1, "branch_id": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    if previous:
+        await inc_enrollment_counters(
+            db, previous.get("course_id"), previous.get("branch_id"), active=1 if is_active else -1
+        )
+    return previous
+
+async def _grouped_counts(db, key: str, ids: Optional[List[str]] = None) -> Dict[str, dict]:
+    match = {key: {"$in": ids}} if ids is not None else {key: {"$nin": [None, ""]}}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": f"${key}",
+            "total": {"$sum": 1},
+            "active": {"$sum": {"$cond": [{"$eq": ["$is_active", True]}, 1, 0]}}
+        }}
+    ]
+    return {row["_id"]: row async for row in db.enrollments.aggregate(pipeline)}
+
+async def recount_enrollment_counters(db, course_ids: Iterable[str] = (), branch_ids: Iterable[str] = ()):
+    """Recompute the counters for specific courses and branches (used after bulk enrollment writes)"""
+    for collection, key, ids in ((db.courses, "course_id", course_ids), (db.branches, "branch_id", branch_ids)):
+        ids = [owner_id for owner_id in dict.fromkeys(ids) if owner_id]
+        if not ids:
+            continue
+        counts = await _grouped_counts(db, key, ids)
+        await collection.bulk_write([
+            UpdateOne({"id": owner_id}, {"$set": {
+                ACTIVE_FIELD: counts.get(owner_id, {}).get("active", 0),
+                TOTAL_FIELD: counts.get(owner_id, {}).get("total", 0)
+            }})
+            for owner_id in ids
+        ], ordered=False)
+
+async def check_enrollment_counters(db, repair: bool = True) -> dict:
+    """Compare every course and branch counter with the enrollments collection.
+
+    Mismatched (or missing) counters are reset to the true values when
+    ``repair`` is set. Counters are read before the enrollments are counted and
+    each repair is conditional on the counter being unchanged since, so one
+    moved by a concurrent write is left for the next check (``skipped``).
+    Returns a report of what was checked and changed.
+    """
+    report = {"checked": {}, "mismatches": [], "repaired": 0, "skipped": 0}
+    for name, collection, key in (("courses", db.courses, "course_id"), ("branches", db.branches, "branch_id")):
+        docs = await collection.find({}, {"_id": 0, "id": 1, ACTIVE_FIELD: 1, TOTAL_FIELD: 1}).to_list(length=None)
+        counts = await _grouped_counts(db, key)
+        operations = []
+        for doc in docs:
+            expected = counts.get(doc["id"], {})
+            expected = {ACTIVE_FIELD: expected.get("active", 0), TOTAL_FIELD: expected.get("total", 0)}
+            stored = {ACTIVE_FIELD: doc.get(ACTIVE_FIELD), TOTAL_FIELD: doc.get(TOTAL_FIELD)}
+            if stored != expected:
+                report["mismatches"].append({"collection": name, "id": doc["id"], "stored": stored, "expected": expected})
+                operations.append(UpdateOne({"id": doc["id"], **stored}, {"$set": expected}))
+        report["checked"][name] = len(docs)
+        if repair and operations:
+            result = await collection.bulk_write(operations, ordered=False)
+            report["repaired"] += result.matched_count
+            report["skipped"] += len(operations) - result.matched_count
+    return report
+
+def _seconds_until(hour: int) -> float:
+    now = datetime.utcnow()
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+async def run_nightly_counter_check(db):
+    """Run check_enrollment_counters every night at COUNTER_CHECK_HOUR (UTC) in whichever worker takes the lease;
+    started from the app lifespan"""
+    while True:
+        await asyncio.sleep(_seconds_until(COUNTER_CHECK_HOUR))
+        try:
+            if not await acquire_lease(db, COUNTER_CHECK_LEASE, COUNTER_CHECK_LEASE_SECONDS):
+                continue
+            report = await check_enrollment_counters(db, repair=True)
+            if report["mismatches"]:
+                logging.warning(
+                    f"Repaired {report['repaired']} enrollment counters: {len(report['mismatches'])} mismatches found"
+                )
+        except Exception as e:
+            logging.exception(f"Nightly enrollment counter check failed: {e}")
+
+async def backfill_enrollment_counters(db):
+    """Initialise the counters on first start after they were introduced"""
+    if await db.courses.count_documents({ACTIVE_FIELD: {"$exists": False}}, limit=1) or \
+            await db.branches.count_documents({ACTIVE_FIELD: {"$exists": False}}, limit=1):
+        report = await check_enrollment_counters(db, repair=True)
+        logging.info(f"Backfilled {report['repaired']} enrollment counters")
@@ -7,6 +7,7 @@ import logging
 from models.activitylog_models import ActivityLog
 from models.notification_models import NotificationLog, NotificationType
 from utils.database import get_db
+from utils.post_commit import post_commit_action
 
 def serialize_doc(doc):
     """Convert MongoDB document to JSON serializable format"""
@@ -70,11 +71,18 @@ async def log_activity(
     log_entry_dict = serialize_doc(log_entry.dict())
     await db.activity_logs.insert_one(log_entry_dict)
 
+@post_commit_action("log_activity")
+async def log_activity_after_commit(**fields):
+    """log_activity for an entry of the post-commit outbox, which has no request"""
+    await log_activity(None, **fields)
+
+@post_commit_action("send_sms")
 async def send_sms(phone: str, message: str) -> bool:
     """Mock SMS sending - to be replaced with Firebase integration"""
     logging.info(f"Mock SMS sent to {phone}: {message}")
     return True
 
+@post_commit_action("send_whatsapp")
 async def send_whatsapp(phone: str, message: str) -> bool:
     """Mock WhatsApp sending - to be replaced with zaptra.in integration"""
     logging.info(f"Mock WhatsApp sent to {phone}: {message}")
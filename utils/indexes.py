@@ -0,0 +1,63 @@
+import logging
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE
+
+# (collection, keys, options) for every index the controllers rely on
+INDEXES = [
+    # course_assignments edges: unique per tuple, then one compound index per lookup direction
+    ("course_assignments", [("kind", ASCENDING), ("course_id", ASCENDING), ("branch_id", ASCENDING), ("coach_id", ASCENDING)],
+     {"name": "kind_course_branch_coach", "unique": True}),
+    ("course_assignments", [("course_id", ASCENDING), ("is_active", ASCENDING), ("kind", ASCENDING)],
+     {"name": "course_active_kind"}),
+    ("course_assignments", [("branch_id", ASCENDING), ("kind", ASCENDING), ("course_id", ASCENDING)],
+     {"name": "branch_kind_course"}),
+    ("course_assignments", [("coach_id", ASCENDING), ("kind", ASCENDING), ("course_id", ASCENDING)],
+     {"name": "coach_kind_course"}),
+    # per-course enrollment counts for the course listings
+    ("enrollments", [("course_id", ASCENDING), ("is_active", ASCENDING), ("branch_id", ASCENDING)],
+     {"name": "course_active_branch"}),
+    # branch <-> location lookups
+    ("branches", [("location_id", ASCENDING), ("is_active", ASCENDING)], {"name": "location_active"}),
+    # nearest-branch search; branches without geo_location are left out of the index
+    ("branches", [("geo_location", GEOSPHERE)], {"name": "geo_location_2dsphere"}),
+    # per-branch coach and student counts
+    ("coaches", [("branch_id", ASCENDING), ("is_active", ASCENDING)], {"name": "branch_active"}),
+    ("users", [("role", ASCENDING), ("branch_id", ASCENDING), ("is_active", ASCENDING)], {"name": "role_branch_active"}),
+    # payment listing, newest first, unfiltered and filtered by status and/or type
+    ("payments", [("created_at", DESCENDING), ("id", DESCENDING)], {"name": "created_id"}),
+    ("payments", [("payment_status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+     {"name": "status_created_id"}),
+    ("payments", [("payment_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+     {"name": "type_created_id"}),
+    ("payments", [("payment_status", ASCENDING), ("payment_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+     {"name": "status_type_created_id"}),
+    # outstanding dues: pending payments past their due date
+    ("payments", [("payment_status", ASCENDING), ("due_date", ASCENDING)], {"name": "status_due_date"}),
+    ("enrollments", [("id", ASCENDING)], {"name": "id"}),
+    # payment reminders: due payments streamed per student
+    ("payments", [("payment_status", ASCENDING), ("student_id", ASCENDING)], {"name": "status_student"}),
+    # newest payment notifications and the unread recount at startup
+    ("payment_notifications", [("created_at", DESCENDING)], {"name": "created_at"}),
+    ("payment_notifications", [("is_read", ASCENDING)], {"name": "is_read"}),
+    ("notification_counters", [("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+    # catalog version counter checked before serving a cached price quote
+    ("catalog_versions", [("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+    # lease locks for scheduled jobs shared between workers
+    ("job_leases", [("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+    # post-commit outbox: due entries claimed oldest first, and removed by id once run
+    ("post_commit_outbox", [("status", ASCENDING), ("available_at", ASCENDING)], {"name": "status_available_at"}),
+    ("post_commit_outbox", [("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+    # overdue sweeper: students whose restriction flag is cleared once their payments are settled
+    ("users", [("role", ASCENDING), ("payment_restricted", ASCENDING)], {"name": "role_payment_restricted"}),
+    # materialized category hierarchy, read in display order
+    ("category_hierarchy", [("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+    ("category_hierarchy", [("display_order", ASCENDING)], {"name": "display_order"}),
+]
+
+async def ensure_indexes(db):
+    """Create the indexes in INDEXES; failures are logged so startup is not blocked"""
+    for collection, keys, options in INDEXES:
+        try:
+            await db[collection].create_index(keys, **options)
+        except Exception as e:
+            logging.warning(f"Could not create index {options.get('name')} on {collection}: {e}")
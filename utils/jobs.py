@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.database import get_db
+
+# Keep strong references to running jobs so they are not garbage collected
+_running_tasks: set = set()
+
+# Each helper takes an optional ``db`` for callers that manage their own connection (server_old.py)
+
+class JobOwnershipLost(Exception):
+    """Another run has claimed the job (e.g. a resume after it looked stale); this run must stop"""
+
+async def create_job(job_type: str, created_by: Optional[str] = None, details: Optional[Dict[str, Any]] = None, db=None,
+                     owner: Optional[str] = None) -> dict:
+    """Create a queued background job record in the background_jobs collection, optionally owned by one run"""
+    db = db if db is not None else get_db()
+    job = {
+        "id": str(uuid.uuid4()),
+        "type": job_type,
+        "status": "queued",
+        "created_by": created_by,
+        "owner": owner,
+        "details": details or {},
+        "progress": {},
+        "result": None,
+        "error": None,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+        "started_at": None,
+        "completed_at": None
+    }
+    await db.background_jobs.insert_one(job)
+    return job
+
+async def update_job(job_id: str, db=None, owner: Optional[str] = None, **fields) -> bool:
+    """Update fields on a background job record; with ``owner``, only while that run owns the job"""
+    db = db if db is not None else get_db()
+    fields["updated_at"] = datetime.utcnow()
+    query = {"id": job_id}
+    if owner is not None:
+        query["owner"] = owner
+    result = await db.background_jobs.update_one(query, {"$set": fields})
+    return result.matched_count > 0
+
+async def claim_job(job_id: str, owner: str, claimable: Optional[dict] = None, db=None) -> Optional[dict]:
+    """Make ``owner`` the only run allowed to write the job if it still matches ``claimable``; None otherwise"""
+    db = db if db is not None else get_db()
+    return await db.background_jobs.find_one_and_update(
+        {"id": job_id, **(claimable or {})},
+        {"$set": {"owner": owner, "updated_at": datetime.utcnow()}},
+        projection={"_id": 0},
+        return_document=True
+    )
+
+async def save_job_progress(job_id: str, owner: str, progress: dict, db=None):
+    """Record progress for the owning run; raises JobOwnershipLost once another run has claimed the job"""
+    if not await update_job(job_id, db=db, owner=owner, progress=progress):
+        raise JobOwnershipLost(job_id)
+
+async def get_job(job_id: str, db=None) -> Optional[dict]:
+    """Fetch a background job record by id"""
+    db = db if db is not None else get_db()
+    return await db.background_jobs.find_one({"id": job_id}, {"_id": 0})
+
+async def _run(job_id: str, work: Callable[[], Awaitable[Any]], db=None, owner: Optional[str] = None):
+    if not await update_job(job_id, db=db, owner=owner, status="running", error=None, started_at=datetime.utcnow()):
+        return
+    try:
+        result = await work()
+    except JobOwnershipLost:
+        # The run that took over records the outcome
+        logging.warning(f"Background job {job_id} was claimed by another run; stopping")
+        return
+    except Exception as e:
+        logging.exception(f"Background job {job_id} failed")
+        await update_job(job_id, db=db, owner=owner, status="failed", error=str(e), completed_at=datetime.utcnow())
+        return
+    await update_job(job_id, db=db, owner=owner, status="completed", result=result, completed_at=datetime.utcnow())
+
+def start_job(job_id: str, work: Callable[[], Awaitable[Any]], db=None, owner: Optional[str] = None) -> asyncio.Task:
+    """Run ``work`` in the background, recording its status and result on the job (only while ``owner`` owns it)"""
+    task = asyncio.create_task(_run(job_id, work, db, owner))
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+    return task
@@ -0,0 +1,44 @@
+"""
+Lease locks stored in MongoDB.
+
+Scheduled jobs run in every worker process; a lease in the ``job_leases``
+collection lets exactly one of them do the work per period. A lease is held
+until ``expires_at``; its owner may renew it, and anyone may take it over once
+it expires (e.g. after the owning worker died).
+"""
+
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+# Identifies this process as a lease owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+async def acquire_lease(db, name: str, ttl_seconds: float, owner: str = WORKER_ID) -> bool:
+    """Take or renew the lease ``name`` for ``ttl_seconds``; False if another owner holds it"""
+    now = datetime.utcnow()
+    try:
+        # Create the lease document once; the unique index on id makes concurrent creation safe
+        await db.job_leases.update_one(
+            {"id": name},
+            {"$setOnInsert": {"owner": None, "expires_at": now}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass
+
+    lease = await db.job_leases.find_one_and_update(
+        {"id": name, "$or": [{"expires_at": {"$lte": now}}, {"owner": owner}]},
+        {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds), "acquired_at": now}}
+    )
+    return lease is not None
+
+async def release_lease(db, name: str, owner: str = WORKER_ID):
+    """Give the lease up early so another worker can take it"""
+    await db.job_leases.update_one(
+        {"id": name, "owner": owner},
+        {"$set": {"owner": None, "expires_at": datetime.utcnow()}}
+    )
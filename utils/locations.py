@@ -0,0 +1,101 @@
+"""
+Branch location resolution.
+
+Branches reference their location through ``location_id`` (indexed). Older
+branches were matched to locations by a regex on ``branch.address.city``,
+which is slow and matches the wrong location when one city name contains
+another. ``backfill_branch_locations`` resolves the field for those branches
+by exact (case-insensitive) city name, and ``get_location_map`` serves
+branch -> location lookups from a cached map.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from utils.cache import location_map_cache
+
+_MISSING_LOCATION = {"$or": [{"location_id": {"$exists": False}}, {"location_id": None}, {"location_id": ""}]}
+
+def _normalize(name: Optional[str]) -> str:
+    return " ".join((name or "").split()).lower()
+
+def resolve_location_id(branch: dict, locations_by_name: Dict[str, dict]) -> Optional[str]:
+    """Location id for a branch without one, matched exactly by its address city"""
+    city = ((branch.get("branch") or {}).get("address") or {}).get("city")
+    location = locations_by_name.get(_normalize(city))
+    return location["id"] if location else None
+
+async def backfill_branch_locations(db) -> dict:
+    """Set location_id on branches that do not have one yet"""
+    branches = await db.branches.find(_MISSING_LOCATION, {"_id": 0, "id": 1, "branch.address.city": 1}).to_list(length=None)
+    if not branches:
+        return {"resolved": 0, "unresolved": []}
+
+    locations = await db.locations.find({}, {"_id": 0, "id": 1, "name": 1}).to_list(length=None)
+    locations_by_name = {_normalize(location["name"]): location for location in locations}
+
+    operations = []
+    unresolved = []
+    for branch in branches:
+        location_id = resolve_location_id(branch, locations_by_name)
+        if location_id:
+            operations.append(UpdateOne({"id": branch["id"]}, {"$set": {"location_id": location_id}}))
+        else:
+            unresolved.append(branch["id"])
+    if operations:
+        await db.branches.bulk_write(operations, ordered=False)
+        location_map_cache.clear()
+    if unresolved:
+        logging.warning(f"Could not resolve a location for branches: {', '.join(unresolved)}")
+    return {"resolved": len(operations), "unresolved": unresolved}
+
+async def get_location_map(db) -> dict:
+    """Cached lookups between locations and branches.
+
+    Returns {"locations": {location_id: location}, "branch_location": {branch_id: location_id},
+    "branches_by_location": {location_id: [branch_id, ...]}}.
+    """
+    location_map = location_map_cache.get("map")
+    if location_map is not None:
+        return location_map
+
+    locations = await db.locations.find({}, {"_id": 0}).to_list(length=None)
+    branches = await db.branches.find({}, {"_id": 0, "id": 1, "location_id": 1}).to_list(length=None)
+
+    branches_by_location: Dict[str, List[str]] = {}
+    for branch in branches:
+        if branch.get("location_id"):
+            branches_by_location.setdefault(branch["location_id"], []).append(branch["id"])
+
+    location_map = {
+        "locations": {location["id"]: location for location in locations},
+        "branch_location": {branch["id"]: branch.get("location_id") for branch in branches},
+        "branches_by_location": branches_by_location
+    }
+    location_map_cache.set("map", location_map)
+    return location_map
+
+def branch_location(location_map: dict, branch: dict, active_only: bool = True) -> Optional[dict]:
+    """The location record of a branch, or None if it is unresolved (or inactive when active_only)"""
+    location = location_map["locations"].get(branch.get("location_id") or location_map["branch_location"].get(branch.get("id")))
+    if location is None or (active_only and not location.get("is_active", True)):
+        return None
+    return location
+
+def summarize_branch_locations(location_map: dict, branches: List[dict]) -> List[dict]:
+    """[{location_id, location_name, branch_count}] for a course's branches, grouped by resolved location"""
+    summary: Dict[str, dict] = {}
+    for branch in branches:
+        location = branch_location(location_map, branch)
+        city = ((branch.get("branch") or {}).get("address") or {}).get("city", "")
+        key = location["id"] if location else city
+        if key not in summary:
+            summary[key] = {
+                "location_id": location["id"] if location else None,
+                "location_name": location["name"] if location else city,
+                "branch_count": 0
+            }
+        summary[key]["branch_count"] += 1
+    return list(summary.values())
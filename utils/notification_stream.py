@@ -0,0 +1,133 @@
+"""
+Live payment notifications.
+
+``payment_notification_hub`` fans events out to the open superadmin streams of
+this worker: ``notification`` for a new payment notification and
+``unread_count`` when the unread badge changes. The unread count is a counter
+document in ``notification_counters`` kept up to date with ``$inc`` by the
+writes that change it, so the badge is one point read.
+
+On a replica set ``run_notification_change_stream`` feeds the hub from a
+change stream, so every worker sees writes made by the others. On a
+standalone server (one worker) the writers publish to the hub directly.
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Optional, Set, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from utils.transactions import supports_transactions
+
+UNREAD_COUNTER_ID = "payment_notifications"
+# Events kept for a slow stream before its oldest ones are dropped
+SUBSCRIBER_BUFFER = 100
+CHANGE_STREAM_RETRY_SECONDS = 5
+# Idle time after which a stream gets a keep-alive
+STREAM_KEEPALIVE_SECONDS = 15
+
+class NotificationHub:
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.change_stream_active = False
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event: str, data: dict):
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+    def publish_local(self, event: str, data: dict):
+        """Publish a write made by this worker, unless the change stream will deliver it"""
+        if not self.change_stream_active:
+            self.publish(event, data)
+
+payment_notification_hub = NotificationHub()
+
+async def inc_unread_count(db, amount: int) -> int:
+    """Adjust the unread counter and return its new value"""
+    counter = await db.notification_counters.find_one_and_update(
+        {"id": UNREAD_COUNTER_ID},
+        {"$inc": {"unread": amount}},
+        upsert=True,
+        return_document=True
+    )
+    return counter["unread"]
+
+async def get_unread_count(db) -> int:
+    counter = await db.notification_counters.find_one({"id": UNREAD_COUNTER_ID}, {"_id": 0, "unread": 1})
+    return counter["unread"] if counter else 0
+
+async def seed_unread_count(db) -> int:
+    """Create the counter from a recount when it doesn't exist yet (run at startup).
+
+    An existing counter is left alone: overwriting it from every starting
+    worker would lose the ``$inc`` writes made between the count and the write.
+    """
+    counter = await db.notification_counters.find_one({"id": UNREAD_COUNTER_ID}, {"_id": 0, "unread": 1})
+    if counter is not None:
+        return counter["unread"]
+    unread = await db.payment_notifications.count_documents({"is_read": {"$ne": True}})
+    try:
+        await db.notification_counters.update_one(
+            {"id": UNREAD_COUNTER_ID},
+            {"$setOnInsert": {"unread": unread}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Another worker or a writer created it first
+        pass
+    return await get_unread_count(db)
+
+async def stream_events(hub: NotificationHub = payment_notification_hub) -> AsyncIterator[Optional[Tuple[str, dict]]]:
+    """Events for one open stream; yields None when idle so the caller can send a keep-alive"""
+    queue = hub.subscribe()
+    try:
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield None
+    finally:
+        hub.unsubscribe(queue)
+
+async def run_notification_change_stream(db, hub: NotificationHub = payment_notification_hub):
+    """Feed the hub from a change stream on notifications and their counter; started from the app lifespan"""
+    if not await supports_transactions(db):
+        return
+    pipeline = [{"$match": {
+        "ns.coll": {"$in": ["payment_notifications", "notification_counters"]},
+        "operationType": {"$in": ["insert", "update", "replace"]}
+    }}]
+    resume_token = None
+    while True:
+        try:
+            async with db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                hub.change_stream_active = True
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    document = change.get("fullDocument")
+                    if not document:
+                        continue
+                    document.pop("_id", None)
+                    if change["ns"]["coll"] == "notification_counters":
+                        if document.get("id") == UNREAD_COUNTER_ID:
+                            hub.publish("unread_count", {"unread_count": document.get("unread", 0)})
+                    elif change["operationType"] == "insert":
+                        hub.publish("notification", document)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning(f"Payment notification change stream failed, retrying: {e}")
+        # Writers publish locally while the stream is down
+        hub.change_stream_active = False
+        await asyncio.sleep(CHANGE_STREAM_RETRY_SECONDS)
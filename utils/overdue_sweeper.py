@@ -0,0 +1,84 @@
+"""
+Overdue payment sweeper.
+
+Every ``OVERDUE_SWEEP_INTERVAL_SECONDS`` one worker (chosen by a lease in
+``utils.leases``) marks pending payments past their due date as overdue with a
+single ``update_many`` on the ``(payment_status, due_date)`` index. It then
+syncs the ``payment_restricted`` flag that ``get_current_active_user`` checks,
+and records the run in the ``overdue_sweeps`` collection.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from models.payment_models import PaymentStatus
+from utils.leases import WORKER_ID, acquire_lease, release_lease
+
+OVERDUE_SWEEP_INTERVAL_SECONDS = int(os.environ.get("OVERDUE_SWEEP_INTERVAL_SECONDS", "900"))
+SWEEP_LEASE = "overdue_payment_sweep"
+
+async def sync_payment_restrictions(db) -> dict:
+    """Set payment_restricted on students with overdue payments and clear it on everyone else"""
+    overdue_student_ids = await db.payments.distinct("student_id", {"payment_status": PaymentStatus.OVERDUE.value})
+    restricted = await db.users.update_many(
+        {"id": {"$in": overdue_student_ids}, "role": "student", "payment_restricted": {"$ne": True}},
+        {"$set": {"payment_restricted": True}}
+    )
+    released = await db.users.update_many(
+        {"id": {"$nin": overdue_student_ids}, "role": "student", "payment_restricted": True},
+        {"$set": {"payment_restricted": False}}
+    )
+    return {"students_restricted": restricted.modified_count, "students_released": released.modified_count}
+
+async def refresh_payment_restriction(db, student_id: str):
+    """Recompute payment_restricted for one student after their payments change"""
+    overdue = await db.payments.find_one(
+        {"student_id": student_id, "payment_status": PaymentStatus.OVERDUE.value}, {"_id": 0, "id": 1}
+    )
+    await db.users.update_one({"id": student_id}, {"$set": {"payment_restricted": overdue is not None}})
+
+async def sweep_overdue_payments(db, now: Optional[datetime] = None) -> dict:
+    """Mark pending payments past their due date as overdue and record the run"""
+    started_at = datetime.utcnow()
+    now = now or started_at
+    result = await db.payments.update_many(
+        {"payment_status": PaymentStatus.PENDING.value, "due_date": {"$lt": now}},
+        {"$set": {"payment_status": PaymentStatus.OVERDUE.value, "updated_at": now}}
+    )
+    restrictions = await sync_payment_restrictions(db)
+
+    sweep = {
+        "id": str(uuid.uuid4()),
+        "worker": WORKER_ID,
+        "payments_marked_overdue": result.modified_count,
+        **restrictions,
+        "started_at": started_at,
+        "completed_at": datetime.utcnow()
+    }
+    await db.overdue_sweeps.insert_one(sweep)
+    sweep.pop("_id", None)
+    return sweep
+
+async def run_overdue_sweeper(db):
+    """Sweep every OVERDUE_SWEEP_INTERVAL_SECONDS in whichever worker holds the lease; started from the app lifespan"""
+    try:
+        while True:
+            try:
+                # The lease lasts a whole interval, so other workers skip this period
+                if await acquire_lease(db, SWEEP_LEASE, OVERDUE_SWEEP_INTERVAL_SECONDS):
+                    sweep = await sweep_overdue_payments(db)
+                    if sweep["payments_marked_overdue"]:
+                        logging.info(f"Marked {sweep['payments_marked_overdue']} payments overdue")
+            except Exception as e:
+                logging.exception(f"Overdue payment sweep failed: {e}")
+            await asyncio.sleep(OVERDUE_SWEEP_INTERVAL_SECONDS)
+    except asyncio.CancelledError:
+        try:
+            await release_lease(db, SWEEP_LEASE)
+        except Exception:
+            pass
+        raise
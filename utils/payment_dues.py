@@ -0,0 +1,151 @@
+"""
+Outstanding dues report.
+
+``get_outstanding_dues`` computes overdue totals per student, per branch and
+overall in one aggregation. The first stage matches pending and overdue
+payments past their due date, served by the ``(payment_status, due_date)`` index. Each
+payment is put in an aging bucket by days overdue. Payments carry their
+branch in ``branch_details`` (registration payments) or through their
+enrollment.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from models.payment_models import PaymentStatus
+
+# (label, first day, last day); the last bucket is open-ended
+AGING_BUCKETS = [("0-30", 0, 30), ("31-60", 31, 60), ("61-90", 61, 90), ("90+", 91, None)]
+
+_DAY_MS = 24 * 60 * 60 * 1000
+# Students per page of the dues report
+MAX_DUES_PAGE_SIZE = 200
+
+def _bucket_sums() -> dict:
+    return {
+        label: {"$sum": {"$cond": [{"$eq": ["$aging_bucket", label]}, "$amount", 0]}}
+        for label, _, _ in AGING_BUCKETS
+    }
+
+def _aging_switch() -> dict:
+    branches = [
+        {"case": {"$lte": ["$days_overdue", last]}, "then": label}
+        for label, _, last in AGING_BUCKETS if last is not None
+    ]
+    return {"$switch": {"branches": branches, "default": AGING_BUCKETS[-1][0]}}
+
+def outstanding_dues_pipeline(
+    now: datetime,
+    student_id: Optional[str] = None,
+    branch_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50
+) -> List[dict]:
+    # The overdue sweeper moves pending payments past their due date to overdue
+    match = {
+        "payment_status": {"$in": [PaymentStatus.PENDING.value, PaymentStatus.OVERDUE.value]},
+        "due_date": {"$lt": now}
+    }
+    if student_id:
+        match["student_id"] = student_id
+
+    pipeline = [
+        {"$match": match},
+        {"$lookup": {"from": "enrollments", "localField": "enrollment_id", "foreignField": "id", "as": "enrollment"}},
+        {"$addFields": {
+            "branch_id": {"$ifNull": ["$branch_details.branch_id", {"$arrayElemAt": ["$enrollment.branch_id", 0]}]},
+            "days_overdue": {"$floor": {"$divide": [{"$subtract": [now, "$due_date"]}, _DAY_MS]}}
+        }},
+        {"$addFields": {"aging_bucket": _aging_switch()}}
+    ]
+    if branch_id:
+        pipeline.append({"$match": {"branch_id": branch_id}})
+
+    pipeline.append({"$facet": {
+        "students": [
+            {"$group": {
+                "_id": "$student_id",
+                "total_amount": {"$sum": "$amount"},
+                "oldest_due_date": {"$min": "$due_date"},
+                **_bucket_sums(),
+                "payments": {"$push": {
+                    "id": "$id",
+                    "amount": "$amount",
+                    "payment_type": "$payment_type",
+                    "enrollment_id": "$enrollment_id",
+                    "branch_id": "$branch_id",
+                    "due_date": "$due_date",
+                    "days_overdue": "$days_overdue",
+                    "aging_bucket": "$aging_bucket"
+                }}
+            }},
+            {"$sort": {"total_amount": -1, "_id": 1}},
+            {"$skip": skip},
+            {"$limit": limit}
+        ],
+        "student_count": [{"$group": {"_id": "$student_id"}}, {"$count": "count"}],
+        "branches": [
+            {"$group": {
+                "_id": "$branch_id",
+                "total_amount": {"$sum": "$amount"},
+                "payment_count": {"$sum": 1},
+                "students": {"$addToSet": "$student_id"},
+                **_bucket_sums()
+            }},
+            {"$sort": {"total_amount": -1}}
+        ],
+        "summary": [
+            {"$group": {"_id": None, "total_amount": {"$sum": "$amount"}, "payment_count": {"$sum": 1}, **_bucket_sums()}}
+        ]
+    }})
+    return pipeline
+
+def _aging(row: dict) -> dict:
+    return {label: row.get(label, 0) for label, _, _ in AGING_BUCKETS}
+
+def format_outstanding_dues(result: dict, skip: int, limit: int) -> dict:
+    """Shape the $facet output; outstanding_dues stays keyed by student id, largest dues first"""
+    summary = (result.get("summary") or [{}])[0]
+    student_count = (result.get("student_count") or [{}])[0].get("count", 0)
+    return {
+        "outstanding_dues": {
+            row["_id"]: {
+                "total_amount": row["total_amount"],
+                "oldest_due_date": row["oldest_due_date"],
+                "aging": _aging(row),
+                "payments": row["payments"]
+            }
+            for row in result.get("students", [])
+        },
+        "branch_totals": [
+            {
+                "branch_id": row["_id"],
+                "total_amount": row["total_amount"],
+                "payment_count": row["payment_count"],
+                "student_count": len(row["students"]),
+                "aging": _aging(row)
+            }
+            for row in result.get("branches", [])
+        ],
+        "summary": {
+            "total_amount": summary.get("total_amount", 0),
+            "payment_count": summary.get("payment_count", 0),
+            "student_count": student_count,
+            "aging": _aging(summary)
+        },
+        "total": student_count,
+        "skip": skip,
+        "limit": limit
+    }
+
+async def get_outstanding_dues(
+    db,
+    student_id: Optional[str] = None,
+    branch_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50
+) -> dict:
+    """Pending and overdue payments past their due date grouped per student (paginated), with branch totals and aging buckets"""
+    pipeline = outstanding_dues_pipeline(datetime.utcnow(), student_id, branch_id, skip, limit)
+    results = await db.payments.aggregate(pipeline, allowDiskUse=True).to_list(1)
+    return format_outstanding_dues(results[0] if results else {}, skip, limit)
@@ -0,0 +1,166 @@
+"""
+Batched payment reminders.
+
+``run_payment_reminders`` streams pending and overdue payments grouped by
+student (one aggregation, sorted by student id), resolves the students of each
+batch with one ``$in`` query and sends a single consolidated SMS + WhatsApp
+reminder per student. Sends go through ``ReminderDispatcher``, which caps both
+concurrency and the send rate. Progress, including the last student id of the
+last finished batch, is reported after every batch so an interrupted run can
+resume from there (a student in an unfinished batch may be reminded twice).
+
+A resume claims the job for a new run (``utils.jobs.claim_job``) and progress
+is saved only by the run that owns the job, so the original runner of a job
+that merely looked stale stops at its next batch instead of sending alongside
+the new one.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from models.payment_models import PaymentStatus
+from utils.helpers import send_sms, send_whatsapp
+
+REMINDER_JOB_TYPE = "payment_reminders"
+REMINDER_BATCH_SIZE = int(os.environ.get("PAYMENT_REMINDER_BATCH_SIZE", "200"))
+REMINDER_CONCURRENCY = int(os.environ.get("PAYMENT_REMINDER_CONCURRENCY", "10"))
+REMINDER_RATE_PER_SECOND = float(os.environ.get("PAYMENT_REMINDER_RATE_PER_SECOND", "20"))
+# A "running" job that has not reported progress for this long is treated as interrupted
+REMINDER_STALE_SECONDS = 300
+
+DUE_STATUSES = [PaymentStatus.PENDING.value, PaymentStatus.OVERDUE.value]
+
+def resumable_job_query(now: Optional[datetime] = None) -> dict:
+    """Reminder jobs a resume may claim: failed ones and queued or running ones that stopped reporting"""
+    stale_before = (now or datetime.utcnow()) - timedelta(seconds=REMINDER_STALE_SECONDS)
+    return {"type": REMINDER_JOB_TYPE, "$or": [
+        {"status": "failed"},
+        {"status": {"$in": ["queued", "running"]}, "updated_at": {"$lt": stale_before}}
+    ]}
+
+class ReminderDispatcher:
+    """Runs send coroutines with at most ``concurrency`` in flight and ``rate_per_second`` starts"""
+
+    def __init__(self, concurrency: int = REMINDER_CONCURRENCY, rate_per_second: float = REMINDER_RATE_PER_SECOND):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _wait_for_slot(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def send(self, send: Callable[[], Awaitable[bool]]) -> bool:
+        async with self._semaphore:
+            await self._wait_for_slot()
+            try:
+                return bool(await send())
+            except Exception as e:
+                logging.warning(f"Payment reminder send failed: {e}")
+                return False
+
+def due_payments_pipeline(after_student_id: Optional[str] = None) -> List[dict]:
+    """Due payments grouped per student, in student id order, starting after ``after_student_id``"""
+    match = {"payment_status": {"$in": DUE_STATUSES}}
+    if after_student_id:
+        match["student_id"] = {"$gt": after_student_id}
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": "$student_id",
+            "total_due": {"$sum": "$amount"},
+            "payments": {"$push": {
+                "amount": "$amount",
+                "enrollment_id": "$enrollment_id",
+                "due_date": "$due_date",
+                "payment_status": "$payment_status"
+            }}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+
+def build_reminder_message(student: dict, group: dict) -> str:
+    """One reminder covering every due payment of a student"""
+    payments = sorted(group["payments"], key=lambda payment: str(payment.get("due_date") or ""))
+    name = student.get("full_name") or f"{student.get('first_name', '')} {student.get('last_name', '')}".strip()
+    if len(payments) == 1:
+        payment = payments[0]
+        due_date = payment.get("due_date")
+        return (
+            f"Hi {name}, this is a friendly reminder that your payment of "
+            f"₹{payment['amount']} for enrollment {payment.get('enrollment_id')} is due on "
+            f"{due_date.date() if hasattr(due_date, 'date') else due_date}. Thank you."
+        )
+    earliest = payments[0].get("due_date")
+    return (
+        f"Hi {name}, this is a friendly reminder that you have {len(payments)} payments "
+        f"totalling ₹{group['total_due']} due, the earliest on "
+        f"{earliest.date() if hasattr(earliest, 'date') else earliest}. Thank you."
+    )
+
+async def run_payment_reminders(
+    db,
+    progress: Optional[dict] = None,
+    on_progress: Optional[Callable[[dict], Awaitable[None]]] = None,
+    dispatcher: Optional[ReminderDispatcher] = None,
+    batch_size: int = REMINDER_BATCH_SIZE
+) -> dict:
+    """Send one reminder per student with due payments, resuming from ``progress`` if given"""
+    progress = {
+        "students_processed": 0,
+        "reminders_sent": 0,
+        "failed": 0,
+        "skipped": 0,
+        "last_student_id": None,
+        **(progress or {})
+    }
+    dispatcher = dispatcher or ReminderDispatcher()
+
+    async def remind(student: dict, group: dict) -> bool:
+        message = build_reminder_message(student, group)
+        sms_sent, whatsapp_sent = await asyncio.gather(
+            dispatcher.send(lambda: send_sms(student["phone"], message)),
+            dispatcher.send(lambda: send_whatsapp(student["phone"], message))
+        )
+        return sms_sent or whatsapp_sent
+
+    async def process(batch: List[dict]):
+        students = await db.users.find(
+            {"id": {"$in": [group["_id"] for group in batch]}},
+            {"_id": 0, "id": 1, "full_name": 1, "first_name": 1, "last_name": 1, "phone": 1}
+        ).to_list(length=None)
+        students_by_id = {student["id"]: student for student in students}
+
+        targets = [(students_by_id.get(group["_id"]), group) for group in batch]
+        reachable = [(student, group) for student, group in targets if student and student.get("phone")]
+        results = await asyncio.gather(*[remind(student, group) for student, group in reachable])
+
+        progress["students_processed"] += len(batch)
+        progress["reminders_sent"] += sum(1 for sent in results if sent)
+        progress["failed"] += sum(1 for sent in results if not sent)
+        progress["skipped"] += len(batch) - len(reachable)
+        progress["last_student_id"] = batch[-1]["_id"]
+        if on_progress:
+            await on_progress(dict(progress))
+
+    batch: List[dict] = []
+    cursor = db.payments.aggregate(due_payments_pipeline(progress["last_student_id"]), allowDiskUse=True)
+    async for group in cursor:
+        if not group["_id"]:
+            continue
+        batch.append(group)
+        if len(batch) >= batch_size:
+            await process(batch)
+            batch = []
+    if batch:
+        await process(batch)
+    return progress
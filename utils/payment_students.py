@@ -0,0 +1,74 @@
+"""
+Student names stored on payments.
+
+Payment listings used to ``$lookup`` users for every payment before sorting,
+which keeps the sort from using an index. Payments now carry ``student_name``,
+written when the payment is created and re-synced when the student's name
+changes. ``backfill_payment_student_names`` fills it in for older payments,
+and ``normalize_payment_created_at`` turns ``created_at`` values stored as
+strings into dates so every payment sorts and pages on the same key.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import UpdateMany, UpdateOne
+
+_MISSING_NAME = {"$or": [{"student_name": {"$exists": False}}, {"student_name": None}]}
+
+def student_display_name(user: Optional[dict]) -> Optional[str]:
+    """full_name, falling back to "first_name last_name" as the old listing $lookup did"""
+    if not user:
+        return None
+    if user.get("full_name"):
+        return user["full_name"]
+    name = f"{user.get('first_name') or ''} {user.get('last_name') or ''}".strip()
+    return name or None
+
+async def sync_payment_student_name(db, student_id: str, user: dict):
+    """Rewrite student_name on every payment of a student after a name change"""
+    await db.payments.update_many({"student_id": student_id}, {"$set": {"student_name": student_display_name(user)}})
+
+async def backfill_payment_student_names(db) -> int:
+    """Set student_name on payments that do not have one yet"""
+    student_ids = await db.payments.distinct("student_id", _MISSING_NAME)
+    if not student_ids:
+        return 0
+
+    users = await db.users.find(
+        {"id": {"$in": student_ids}},
+        {"_id": 0, "id": 1, "full_name": 1, "first_name": 1, "last_name": 1}
+    ).to_list(length=None)
+    operations = [
+        UpdateMany({"student_id": user["id"], **_MISSING_NAME}, {"$set": {"student_name": student_display_name(user)}})
+        for user in users
+    ]
+    if operations:
+        await db.payments.bulk_write(operations, ordered=False)
+    missing = len(student_ids) - len(users)
+    if missing:
+        logging.warning(f"{missing} students referenced by payments were not found; their payments keep no student_name")
+    return len(operations)
+
+async def normalize_payment_created_at(db) -> int:
+    """Store created_at written as an ISO string on older payments as a (naive UTC) date"""
+    payments = await db.payments.find(
+        {"created_at": {"$type": "string"}}, {"_id": 0, "id": 1, "created_at": 1}
+    ).to_list(length=None)
+    operations = []
+    for payment in payments:
+        try:
+            created_at = datetime.fromisoformat(payment["created_at"].replace("Z", "+00:00"))
+        except ValueError:
+            logging.warning(f"Payment {payment['id']} has an unreadable created_at: {payment['created_at']!r}")
+            continue
+        if created_at.tzinfo:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        operations.append(UpdateOne(
+            {"id": payment["id"], "created_at": payment["created_at"]},
+            {"$set": {"created_at": created_at}}
+        ))
+    if operations:
+        await db.payments.bulk_write(operations, ordered=False)
+    return len(operations)
@@ -0,0 +1,133 @@
+"""
+Post-commit outbox.
+
+Side effects of a request that the caller should not wait for (notifications,
+SMS/WhatsApp messages, activity logs) are written to the ``post_commit_outbox``
+collection by ``record_post_commit`` in the same transaction as the request's
+own writes, so they exist exactly when the writes committed and survive a
+crash. ``run_post_commit_worker`` (started from the app lifespan in every
+worker) claims due entries and runs up to ``POST_COMMIT_CONCURRENCY`` of them
+at once, so one slow send does not hold up the others.
+
+An entry names an action registered with ``post_commit_action`` and carries
+its keyword arguments. A claim hides the entry for ``POST_COMMIT_CLAIM_SECONDS``;
+a finished entry is deleted, a failed one is retried with backoff up to
+``POST_COMMIT_MAX_ATTEMPTS`` times, and one claimed by a worker that died runs
+again once its claim expires. Actions therefore run at least once.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING
+
+from utils.leases import WORKER_ID
+
+POST_COMMIT_CONCURRENCY = int(os.environ.get("POST_COMMIT_CONCURRENCY", "10"))
+POST_COMMIT_CLAIM_SECONDS = 300
+POST_COMMIT_MAX_ATTEMPTS = 5
+# Entries written by other workers are picked up at least this often
+POST_COMMIT_POLL_SECONDS = 5
+
+PENDING = "pending"
+FAILED = "failed"
+
+_actions: Dict[str, Callable[..., Awaitable]] = {}
+_wakeup: Optional[asyncio.Event] = None
+
+def post_commit_action(name: str):
+    """Register the decorated coroutine function as the outbox action ``name``"""
+    def register(handler: Callable[..., Awaitable]):
+        _actions[name] = handler
+        return handler
+    return register
+
+def post_commit_entry(action: str, /, **payload) -> dict:
+    """An outbox entry running ``action(**payload)``; the payload must be storable in MongoDB"""
+    now = datetime.utcnow()
+    return {
+        "id": str(uuid.uuid4()),
+        "action": action,
+        "payload": payload,
+        "status": PENDING,
+        "attempts": 0,
+        "created_at": now,
+        "available_at": now
+    }
+
+async def record_post_commit(db, entries: List[dict], session=None):
+    """Write outbox entries with the request's other writes (pass the transaction's session)"""
+    if entries:
+        await db.post_commit_outbox.insert_many(entries, session=session)
+
+def wake_post_commit_worker():
+    """Have this process's worker look for new entries now instead of at its next poll"""
+    if _wakeup is not None:
+        _wakeup.set()
+
+async def _claim(db, owner: str) -> Optional[dict]:
+    now = datetime.utcnow()
+    return await db.post_commit_outbox.find_one_and_update(
+        {"status": PENDING, "available_at": {"$lte": now}},
+        {
+            "$set": {"available_at": now + timedelta(seconds=POST_COMMIT_CLAIM_SECONDS), "claimed_by": owner},
+            "$inc": {"attempts": 1}
+        },
+        sort=[("available_at", ASCENDING)]
+    )
+
+async def _run(db, entry: dict):
+    try:
+        handler = _actions.get(entry["action"])
+        if handler is None:
+            raise LookupError(f"unknown post-commit action {entry['action']}")
+        await handler(**entry["payload"])
+    except Exception as e:
+        attempts = entry.get("attempts", 0) + 1
+        logging.exception(f"Post-commit action {entry['action']} failed (attempt {attempts}): {e}")
+        update = {"last_error": str(e), "available_at": datetime.utcnow() + timedelta(seconds=30 * 2 ** attempts)}
+        if attempts >= POST_COMMIT_MAX_ATTEMPTS:
+            update["status"] = FAILED
+        await db.post_commit_outbox.update_one({"id": entry["id"]}, {"$set": update})
+        return
+    await db.post_commit_outbox.delete_one({"id": entry["id"]})
+
+async def process_post_commit_outbox(db, owner: str = WORKER_ID) -> int:
+    """Claim and run every due entry, POST_COMMIT_CONCURRENCY at a time; returns how many ran"""
+    semaphore = asyncio.Semaphore(POST_COMMIT_CONCURRENCY)
+
+    async def run(entry):
+        try:
+            await _run(db, entry)
+        finally:
+            semaphore.release()
+
+    tasks = []
+    while True:
+        await semaphore.acquire()
+        entry = await _claim(db, owner)
+        if entry is None:
+            semaphore.release()
+            break
+        tasks.append(asyncio.create_task(run(entry)))
+    await asyncio.gather(*tasks)
+    return len(tasks)
+
+async def run_post_commit_worker(db):
+    """Run outbox entries as they are recorded until cancelled"""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    while True:
+        _wakeup.clear()
+        try:
+            await process_post_commit_outbox(db)
+        except Exception as e:
+            logging.warning(f"Post-commit outbox run failed: {e}")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), POST_COMMIT_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
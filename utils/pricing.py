@@ -0,0 +1,178 @@
+"""
+In-memory price matrix for course payment quotes.
+
+``PriceMatrix`` holds the fee of every course × duration pair together with
+the course, category and branch names a quote needs, built from one read of
+each catalog collection. Fees do not depend on the branch, so the branch axis
+is only the set of known branches. ``get_price_matrix`` keeps one matrix per
+process and rebuilds it at least every ``PRICE_MATRIX_TTL_SECONDS``.
+
+Catalog writes call ``bump_catalog_version``, which increments a counter
+document in ``catalog_versions``. ``run_catalog_version_poller`` reads that
+counter in the background of every worker and rebuilds a matrix built from an
+older version, so a write made through one worker reaches the others within
+``CATALOG_VERSION_POLL_SECONDS`` while quotes never wait on a catalog read.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from models.student_models import CoursePaymentInfo, PaymentCalculation
+
+DEFAULT_BASE_PRICE = 15000
+ADMISSION_FEE = 500.0
+PRICE_MATRIX_TTL_SECONDS = int(os.environ.get("PRICE_MATRIX_TTL_SECONDS", "300"))
+# A quote for an unknown course or branch rebuilds the matrix at most this often
+PRICE_MATRIX_MISS_REFRESH_SECONDS = 10
+CATALOG_VERSION_ID = "catalog"
+CATALOG_VERSION_POLL_SECONDS = int(os.environ.get("CATALOG_VERSION_POLL_SECONDS", "5"))
+
+_matrix: Optional["PriceMatrix"] = None
+_generation = 0
+# Newest catalog version this worker has seen
+_known_version = 0
+_matrix_lock = asyncio.Lock()
+
+def course_base_price(course: dict) -> float:
+    """Base fee of a course from pricing.amount, pricing, price or fee"""
+    base_price = DEFAULT_BASE_PRICE
+    if course.get("pricing"):
+        if isinstance(course["pricing"], dict):
+            base_price = course["pricing"].get("amount", base_price)
+        elif isinstance(course["pricing"], (int, float)):
+            base_price = course["pricing"]
+    elif course.get("price"):
+        base_price = course["price"]
+    elif course.get("fee"):
+        base_price = course["fee"]
+    return float(base_price)
+
+class PriceMatrix:
+    def __init__(self, courses: list, branches: list, categories: list, durations: list, version: int = 0):
+        self.built_at = time.monotonic()
+        self.version = version
+        category_names = {category["id"]: category.get("name", "Category") for category in categories}
+        self.courses = {
+            course["id"]: {
+                "name": course.get("title", course.get("name", "Course")),
+                "category_name": category_names.get(course.get("category_id"), "Category")
+            }
+            for course in courses
+        }
+        self.branch_names = {
+            branch["id"]: branch.get("name", branch.get("branch", {}).get("name", "Branch"))
+            for branch in branches
+        }
+
+        # Durations are requested by id or by code; an id wins over another duration's code
+        self.durations: Dict[str, Tuple[Optional[str], float]] = {}
+        for key in ("code", "id"):
+            for duration in durations:
+                if duration.get(key):
+                    self.durations[duration[key]] = (duration.get("name"), duration.get("pricing_multiplier", 1.0))
+
+        # None stands for an unknown duration, which is charged at the base price
+        self.prices: Dict[Tuple[str, Optional[str]], dict] = {}
+        for course in courses:
+            base_price = course_base_price(course)
+            for duration_key, (_, multiplier) in [*self.durations.items(), (None, (None, 1.0))]:
+                course_fee = base_price * multiplier
+                self.prices[(course["id"], duration_key)] = {
+                    "course_fee": course_fee,
+                    "admission_fee": ADMISSION_FEE,
+                    "total_amount": course_fee + ADMISSION_FEE,
+                    "currency": "INR",
+                    "duration_multiplier": multiplier
+                }
+
+    def age(self) -> float:
+        return time.monotonic() - self.built_at
+
+    def quote(self, course_id: str, branch_id: str, duration: str) -> CoursePaymentInfo:
+        """Payment info for a known course and branch"""
+        course = self.courses[course_id]
+        duration_key = duration if duration in self.durations else None
+        duration_name = self.durations[duration_key][0] if duration_key else None
+        return CoursePaymentInfo(
+            course_id=course_id,
+            course_name=course["name"],
+            category_name=course["category_name"],
+            branch_name=self.branch_names[branch_id],
+            duration=duration_name or duration,
+            pricing=PaymentCalculation(**self.prices[(course_id, duration_key)])
+        )
+
+async def get_catalog_version(db) -> int:
+    counter = await db.catalog_versions.find_one({"id": CATALOG_VERSION_ID}, {"_id": 0, "version": 1})
+    return counter["version"] if counter else 0
+
+def _note_catalog_version(version: int):
+    # The latest read wins; a read that races a write is corrected by the next poll
+    global _known_version
+    _known_version = version
+
+async def bump_catalog_version(db):
+    """Make every worker rebuild its matrix after a course, duration, category or branch write"""
+    counter = await db.catalog_versions.find_one_and_update(
+        {"id": CATALOG_VERSION_ID},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=True
+    )
+    _note_catalog_version(counter["version"])
+    invalidate_price_matrix()
+
+async def build_price_matrix(db) -> PriceMatrix:
+    # Read before the catalog so a write during the build leaves the matrix behind the counter
+    version = await get_catalog_version(db)
+    courses, branches, categories, durations = await asyncio.gather(
+        db.courses.find({}, {"_id": 0, "id": 1, "title": 1, "name": 1, "category_id": 1, "pricing": 1, "price": 1, "fee": 1}).to_list(length=None),
+        db.branches.find({}, {"_id": 0, "id": 1, "name": 1, "branch.name": 1}).to_list(length=None),
+        db.categories.find({}, {"_id": 0, "id": 1, "name": 1}).to_list(length=None),
+        db.durations.find({}, {"_id": 0, "id": 1, "code": 1, "name": 1, "pricing_multiplier": 1}).to_list(length=None)
+    )
+    return PriceMatrix(courses, branches, categories, durations, version)
+
+def _is_current(matrix: Optional[PriceMatrix], max_age_seconds: float) -> bool:
+    return matrix is not None and matrix.version >= _known_version and matrix.age() < max_age_seconds
+
+async def get_price_matrix(db, max_age_seconds: float = PRICE_MATRIX_TTL_SECONDS) -> PriceMatrix:
+    """The current matrix, rebuilt once (however many requests wait) when missing, behind the newest
+    catalog version seen or older than max_age_seconds"""
+    global _matrix
+    if _is_current(_matrix, max_age_seconds):
+        return _matrix
+    async with _matrix_lock:
+        if _is_current(_matrix, max_age_seconds):
+            return _matrix
+        generation = _generation
+        matrix = await build_price_matrix(db)
+        _note_catalog_version(matrix.version)
+        # A write during the build may not be in this matrix; serve it once but don't keep it
+        if generation == _generation:
+            _matrix = matrix
+        return matrix
+
+def invalidate_price_matrix():
+    """Drop this worker's matrix; other workers notice through ``bump_catalog_version``"""
+    global _matrix, _generation
+    _matrix = None
+    _generation += 1
+
+async def check_catalog_version(db):
+    """Rebuild this worker's matrix if another worker has written the catalog since it was built"""
+    _note_catalog_version(await get_catalog_version(db))
+    if _matrix is not None and _matrix.version < _known_version:
+        await get_price_matrix(db)
+
+async def run_catalog_version_poller(db):
+    """Check the catalog version every CATALOG_VERSION_POLL_SECONDS; started from the app lifespan"""
+    while True:
+        try:
+            await check_catalog_version(db)
+        except Exception as e:
+            logging.warning(f"Catalog version check failed: {e}")
+        await asyncio.sleep(CATALOG_VERSION_POLL_SECONDS)
@@ -0,0 +1,203 @@
+"""
+Versioned public catalog snapshot.
+
+The public registration flow needs categories, courses, locations, branches and
+durations with final prices. That data changes rarely, so it is built once into
+an in-memory snapshot (five queries, joined in memory) and served pre-serialized
+from ``/api/public/catalog``. Catalog writes call ``invalidate_public_catalog``
+(through ``utils.catalog.on_catalog_write``), which rebuilds the snapshot in
+the background; snapshots also expire after ``CATALOG_MAX_AGE_SECONDS`` so
+writes made by other workers are picked up.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from utils.database import get_db
+from utils.pricing import course_base_price
+
+CATALOG_MAX_AGE_SECONDS = 300
+
+# Browsers and CDNs may reuse the bundle for a minute, then revalidate with If-None-Match
+CATALOG_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=300"
+
+@dataclass
+class CatalogSnapshot:
+    version: str
+    etag: str
+    built_at: datetime
+    body: bytes
+    data: dict
+    expires_at: float
+
+_snapshot: Optional[CatalogSnapshot] = None
+_stale = True
+_lock: Optional[asyncio.Lock] = None
+_rebuild_task: Optional[asyncio.Task] = None
+
+def _branch_entry(branch: dict) -> dict:
+    info = branch.get("branch") or {}
+    address = info.get("address") or {}
+    return {
+        "branch_id": branch["id"],
+        "branch_name": info.get("name"),
+        "branch_code": info.get("code"),
+        "address": {
+            "area": address.get("area"),
+            "city": address.get("city"),
+            "pincode": address.get("pincode")
+        },
+        "contact": {
+            "email": info.get("email"),
+            "phone": info.get("phone")
+        },
+        "timings": (branch.get("operational_details") or {}).get("timings", [])
+    }
+
+def _course_entry(course: dict, durations: List[dict], course_locations: List[dict]) -> dict:
+    pricing = course.get("pricing") if isinstance(course.get("pricing"), dict) else {}
+    # The fee a registration is charged (see utils/pricing.py)
+    base_price = course_base_price(course)
+    return {
+        "id": course["id"],
+        "title": course.get("title"),
+        "code": course.get("code"),
+        "description": course.get("description"),
+        "difficulty_level": course.get("difficulty_level"),
+        "base_pricing": {"currency": pricing.get("currency", "INR"), "amount": base_price},
+        "locations": course_locations,
+        "durations": [
+            {
+                "id": duration["id"],
+                "name": duration.get("name"),
+                "code": duration.get("code"),
+                "duration_months": duration.get("duration_months"),
+                "pricing_multiplier": duration.get("pricing_multiplier", 1.0),
+                "final_price": base_price * duration.get("pricing_multiplier", 1.0)
+            }
+            for duration in durations
+        ]
+    }
+
+async def build_public_catalog(db) -> dict:
+    """Build the catalog tree from one query per collection"""
+    categories, courses, durations, branches, locations = await asyncio.gather(
+        db.categories.find({"is_active": True}, {"_id": 0}).sort("display_order", 1).to_list(length=None),
+        db.courses.find({"settings.active": True}, {"_id": 0}).to_list(length=None),
+        db.durations.find({"is_active": True}, {"_id": 0}).sort("display_order", 1).to_list(length=None),
+        db.branches.find({"is_active": True}, {"_id": 0}).to_list(length=None),
+        db.locations.find({"is_active": True}, {"_id": 0}).to_list(length=None)
+    )
+
+    locations_by_id = {location["id"]: location for location in locations}
+
+    # course_id -> location_id -> location entry with its branches
+    course_locations: Dict[str, Dict[str, dict]] = {}
+    for branch in branches:
+        location = locations_by_id.get(branch.get("location_id"))
+        if location is None:
+            continue
+        entry = _branch_entry(branch)
+        for course_id in dict.fromkeys((branch.get("assignments") or {}).get("courses") or []):
+            by_location = course_locations.setdefault(course_id, {})
+            if location["id"] not in by_location:
+                by_location[location["id"]] = {
+                    "location_id": location["id"],
+                    "location_name": location.get("name"),
+                    "location_code": location.get("code"),
+                    "state": location.get("state"),
+                    "branches": []
+                }
+            by_location[location["id"]]["branches"].append(entry)
+
+    courses_by_category: Dict[str, List[dict]] = {}
+    for course in sorted(courses, key=lambda c: c.get("title") or ""):
+        locations_for_course = list(course_locations.get(course["id"], {}).values())
+        courses_by_category.setdefault(course.get("category_id"), []).append(
+            _course_entry(course, durations, locations_for_course)
+        )
+
+    category_entries = [
+        {
+            "id": category["id"],
+            "name": category.get("name"),
+            "code": category.get("code"),
+            "description": category.get("description"),
+            "parent_category_id": category.get("parent_category_id"),
+            "display_order": category.get("display_order", 0),
+            "icon_url": category.get("icon_url"),
+            "color_code": category.get("color_code"),
+            "courses": courses_by_category.get(category["id"], [])
+        }
+        for category in categories
+    ]
+
+    return {
+        "categories": category_entries,
+        "summary": {
+            "total_categories": len(category_entries),
+            "total_courses": sum(len(category["courses"]) for category in category_entries),
+            "total_locations": len({location_id for by_location in course_locations.values() for location_id in by_location}),
+            "total_branches": len(branches),
+            "total_durations": len(durations)
+        }
+    }
+
+def _make_snapshot(data: dict) -> CatalogSnapshot:
+    # The version is a content hash, so every worker serves the same ETag for the same catalog
+    content = json.dumps(data, sort_keys=True, default=str, separators=(",", ":")).encode()
+    version = hashlib.sha256(content).hexdigest()[:16]
+    built_at = datetime.utcnow()
+    payload = {"version": version, "built_at": built_at, **data}
+    return CatalogSnapshot(
+        version=version,
+        etag=f'"{version}"',
+        built_at=built_at,
+        body=json.dumps(payload, default=str, separators=(",", ":")).encode(),
+        data=payload,
+        expires_at=time.monotonic() + CATALOG_MAX_AGE_SECONDS
+    )
+
+async def get_public_catalog() -> CatalogSnapshot:
+    """Return the current snapshot, rebuilding it if it is missing, invalidated or expired"""
+    global _snapshot, _stale, _lock
+    snapshot = _snapshot
+    if snapshot is not None and not _stale and snapshot.expires_at > time.monotonic():
+        return snapshot
+
+    if _lock is None:
+        _lock = asyncio.Lock()
+    async with _lock:
+        # Another request may have rebuilt it while we waited
+        if _snapshot is not None and not _stale and _snapshot.expires_at > time.monotonic():
+            return _snapshot
+        _stale = False
+        try:
+            _snapshot = _make_snapshot(await build_public_catalog(get_db()))
+        except Exception:
+            _stale = True
+            raise
+        return _snapshot
+
+def invalidate_public_catalog():
+    """Mark the snapshot stale after a catalog write and rebuild it in the background"""
+    global _stale, _rebuild_task
+    _stale = True
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if _rebuild_task is None or _rebuild_task.done():
+        _rebuild_task = loop.create_task(_rebuild())
+
+async def _rebuild():
+    try:
+        await get_public_catalog()
+    except Exception as e:
+        logging.warning(f"Public catalog rebuild failed: {e}")
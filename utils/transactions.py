@@ -0,0 +1,37 @@
+"""
+Multi-document transactions.
+
+MongoDB only runs transactions on a replica set (a single-node local replica
+set is enough) or through mongos. ``run_transaction`` uses one when the server
+supports it and otherwise runs the writes without a session, so callers that
+need all-or-nothing behaviour on a standalone server must undo partial writes
+themselves (check ``supports_transactions``).
+"""
+
+import logging
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_supports_transactions: Optional[bool] = None
+
+async def supports_transactions(db) -> bool:
+    """Whether the server is a replica set member or mongos; asked once per process"""
+    global _supports_transactions
+    if _supports_transactions is None:
+        hello = await db.client.admin.command("hello")
+        _supports_transactions = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        if not _supports_transactions:
+            logging.warning("MongoDB is a standalone server; multi-document writes run without transactions")
+    return _supports_transactions
+
+async def run_transaction(db, callback: Callable[..., Awaitable[T]]) -> T:
+    """Run ``callback(session)`` in a transaction, retried on transient errors; ``session`` is None without one.
+
+    Operations in the callback must be awaited one at a time: a session can't
+    run concurrent operations.
+    """
+    if not await supports_transactions(db):
+        return await callback(None)
+    async with await db.client.start_session() as session:
+        return await session.with_transaction(callback)
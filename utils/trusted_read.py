@@ -0,0 +1,88 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Type, get_args, get_origin
+
+from pydantic import BaseModel
+
+# Documents read from our own collections were validated when they were written,
+# so list endpoints can skip re-validating every row. Set TRUSTED_READS=false to
+# fall back to full model validation (useful when debugging bad data).
+TRUSTED_READS = os.environ.get("TRUSTED_READS", "true").lower() != "false"
+
+def _nested_model(annotation) -> Optional[Type[BaseModel]]:
+    """Return the BaseModel inside annotations like Model, Optional[Model] or List[Model]"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    if get_origin(annotation) is not None:
+        for arg in get_args(annotation):
+            model = _nested_model(arg)
+            if model is not None:
+                return model
+    return None
+
+def _projection_paths(model: Type[BaseModel], prefix: str = "") -> Iterable[str]:
+    for name, field in model.model_fields.items():
+        nested = _nested_model(field.annotation)
+        if nested is not None:
+            yield from _projection_paths(nested, f"{prefix}{name}.")
+        else:
+            yield f"{prefix}{name}"
+
+@lru_cache(maxsize=None)
+def _projection(model: Type[BaseModel], exclude: frozenset) -> Dict[str, int]:
+    paths = [path for path in _projection_paths(model) if path not in exclude]
+    return {"_id": 0, **{path: 1 for path in paths}}
+
+def projection_for(model: Type[BaseModel], exclude: Iterable[str] = ()) -> Dict[str, int]:
+    """MongoDB inclusion projection for the fields of ``model``.
+
+    Nested models are expanded to dotted paths so the database only returns
+    what the response model would keep after validation.
+    """
+    return dict(_projection(model, frozenset(exclude)))
+
+def _strip(data: dict, path: str):
+    head, _, rest = path.partition(".")
+    if not rest:
+        data.pop(head, None)
+    elif isinstance(data.get(head), dict):
+        _strip(data[head], rest)
+
+@lru_cache(maxsize=None)
+def _fields(model: Type[BaseModel]) -> tuple:
+    """(name, field, required, nested model or None) for every field of ``model``, resolved once"""
+    return tuple(
+        (name, field, field.is_required(), _nested_model(field.annotation))
+        for name, field in model.model_fields.items()
+    )
+
+def _fill_defaults(model: Type[BaseModel], doc: Dict[str, Any]) -> Dict[str, Any]:
+    """``doc`` restricted to the fields of ``model``, with defaults for missing ones, down through nested models"""
+    data = {}
+    for name, field, required, nested in _fields(model):
+        if name not in doc:
+            data[name] = None if required else field.get_default(call_default_factory=True)
+            continue
+        value = doc[name]
+        if nested is not None:
+            if isinstance(value, dict):
+                value = _fill_defaults(nested, value)
+            elif isinstance(value, list):
+                value = [_fill_defaults(nested, item) if isinstance(item, dict) else item for item in value]
+        data[name] = value
+    return data
+
+def dump_from_db(model: Type[BaseModel], doc: Dict[str, Any], exclude: Iterable[str] = ()) -> Dict[str, Any]:
+    """Build the response dict for ``model`` from a document fetched with ``projection_for(model)``.
+
+    In trusted mode the projected document is used as-is, with model defaults
+    filled in for missing fields (nested models included); otherwise it is
+    fully validated first.
+    """
+    if TRUSTED_READS:
+        data = _fill_defaults(model, doc)
+    else:
+        data = model(**doc).dict()
+    for path in exclude:
+        _strip(data, path)
+    return data